@@ -46,7 +46,8 @@ Example:
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import os
+from typing import Any, Callable, Dict, List, Optional
 from uuid import uuid4
 
 import structlog
@@ -62,10 +63,14 @@ from .neo4j_block import (
     merge_category_code_relationship,
 )
 from .postgres_block import (
+    claim_graph_metric_refresh,
     coded_fragments_for_code,
     ensure_axial_table,
     ensure_open_coding_table,
     fetch_fragment_by_id,
+    fetch_graph_metric,
+    get_graph_version,
+    store_graph_metric,
     upsert_axial_relationships,
     get_code_id_for_codigo,
     resolve_canonical_code_id,
@@ -398,3 +403,131 @@ def run_gds_analysis(
         return ga.leiden(project_id, persist=persist)
     else:
         raise AxialError(f"Algoritmo no soportado: {algo}")
+
+
+# Presupuesto (segundos) de la betweenness calculada dentro de una petición
+# cuando aún no hay resultado persistido; el recálculo en background no tiene límite.
+BETWEENNESS_SYNC_BUDGET_SECONDS = float(os.getenv("BETWEENNESS_SYNC_BUDGET_SECONDS", "5"))
+
+
+def compute_betweenness_cache(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: str | None = None,
+    time_budget: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Calcula la betweenness del proyecto y la persiste en `graph_metric_cache`.
+
+    El sello de versión del grafo se lee antes de calcular: si el grafo
+    cambia durante el cálculo, el resultado queda marcado como desactualizado.
+    """
+    from .graph_algorithms import GraphAlgorithms
+
+    project_id = project or "default"
+    version = get_graph_version(clients.postgres, project_id)
+    ga = GraphAlgorithms(clients, settings)
+    results = ga.betweenness(project_id, time_budget=time_budget)
+    params = ga.last_run_info.get("betweenness") or {"engine": ga.engine.value, "exact": True}
+    store_graph_metric(
+        clients.postgres,
+        project_id,
+        "betweenness",
+        graph_version=version,
+        params=params,
+        results=results,
+    )
+    _logger.info("betweenness.cache_stored", project_id=project_id, graph_version=version, rows=len(results))
+    return {
+        "project_id": project_id,
+        "algorithm": "betweenness",
+        "results": results,
+        "stale": False,
+        "refreshing": False,
+        "graph_version": version,
+        "info": params,
+    }
+
+
+def betweenness_stale_while_revalidate(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: str | None = None,
+    schedule_refresh: Optional[Callable[[str], None]] = None,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """Betweenness persistida del proyecto, sin bloquear en un recálculo completo.
+
+    - Resultado vigente (misma versión del grafo): se sirve tal cual.
+    - Desactualizado, truncado por presupuesto (o `force_refresh`): se sirve
+      con `stale=True` y, si se obtiene el reclamo, se encola el recálculo
+      con `schedule_refresh`.
+    - Sin resultado previo: se calcula en la petición con
+      `BETWEENNESS_SYNC_BUDGET_SECONDS` (muestreo acotado) y se persiste; si
+      el presupuesto truncó el muestreo, se encola también el recálculo.
+    """
+    project_id = project or "default"
+    version = get_graph_version(clients.postgres, project_id)
+    cached = fetch_graph_metric(clients.postgres, project_id, "betweenness")
+    if cached is None:
+        payload = compute_betweenness_cache(
+            clients, settings, project_id, time_budget=BETWEENNESS_SYNC_BUDGET_SECONDS
+        )
+        if payload["info"].get("budget_exhausted") and schedule_refresh is not None:
+            if claim_graph_metric_refresh(clients.postgres, project_id, "betweenness"):
+                schedule_refresh(project_id)
+                payload["refreshing"] = True
+        return payload
+
+    stale = (
+        force_refresh
+        or version is None
+        or cached["graph_version"] != version
+        or bool(cached["params"].get("budget_exhausted"))
+    )
+    refreshing = cached["refreshing"]
+    if stale and schedule_refresh is not None:
+        if claim_graph_metric_refresh(clients.postgres, project_id, "betweenness"):
+            schedule_refresh(project_id)
+            refreshing = True
+    return {
+        "project_id": project_id,
+        "algorithm": "betweenness",
+        "results": cached["results"],
+        "stale": stale,
+        "refreshing": refreshing,
+        "graph_version": cached["graph_version"],
+        "computed_at": cached["computed_at"],
+        "info": cached["params"],
+    }
+
+
+def run_gds_analysis_many(
+    clients: ServiceClients,
+    settings: AppSettings,
+    algorithms: List[str],
+    persist: bool = False,
+    project: str | None = None,
+) -> Dict[str, List[Dict[str, object]]]:
+    """Ejecuta varios algoritmos de grafo sobre una sola extracción del grafo.
+
+    Equivale a llamar `run_gds_analysis` por algoritmo, pero con un único
+    `GraphAlgorithms` cuyo snapshot comparten todas las métricas.
+
+    Returns:
+        Dict algoritmo -> resultados
+    """
+    from .graph_algorithms import RUN_MANY_ALGORITHMS, GraphAlgorithms
+
+    algos = [a.lower() for a in algorithms]
+    if not algos or any(a not in RUN_MANY_ALGORITHMS for a in algos):
+        raise AxialError(f"Algoritmo no soportado. Usa: {', '.join(RUN_MANY_ALGORITHMS)}.")
+
+    project_id = project or "default"
+    ga = GraphAlgorithms(clients, settings)
+    _logger.info(
+        "run_gds_analysis_many.using_wrapper",
+        algorithms=algos,
+        engine=ga.engine.value,
+        project_id=project_id,
+    )
+    return ga.run_many(project_id, algorithms=algos, persist=persist)
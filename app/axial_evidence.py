@@ -33,69 +33,39 @@ def _cooccurrence_fragment_ids_neo4j(
     settings: AppSettings,
     *,
     project_id: str,
-    code_a: str,
-    code_b: str,
+    pairs: Sequence[Tuple[str, str]],
     limit: int,
-) -> List[str]:
-    if not clients.neo4j:
-        return []
-
-    cypher = """
-    MATCH (f:Fragmento {project_id: $project_id})-[:TIENE_CODIGO]->(c1:Codigo {nombre: $code_a, project_id: $project_id})
-    MATCH (f)-[:TIENE_CODIGO]->(c2:Codigo {nombre: $code_b, project_id: $project_id})
-    RETURN f.id AS fragmento_id
-    LIMIT $limit
-    """
+) -> Dict[Tuple[str, str], List[str]]:
+    if not clients.neo4j or not pairs:
+        return {}
+
+    from app.neo4j_block import fetch_pair_fragment_ids
+
     try:
-        with clients.neo4j.session(database=settings.neo4j.database) as session:
-            result = session.run(
-                cypher,
-                project_id=project_id,
-                code_a=code_a,
-                code_b=code_b,
-                limit=int(limit),
-            )
-            return [str(r["fragmento_id"]) for r in result if r and r.get("fragmento_id")]
+        return fetch_pair_fragment_ids(clients.neo4j, settings.neo4j.database, project_id, pairs, limit=limit)
     except Exception as exc:  # noqa: BLE001
         _logger.debug(
             "axial_evidence.neo4j_cooccurrence_failed",
             project_id=project_id,
             error=str(exc)[:200],
         )
-        return []
+        return {}
 
 
 def _cooccurrence_fragment_ids_pg(
     clients: ServiceClients,
     *,
     project_id: str,
-    code_a: str,
-    code_b: str,
+    pairs: Sequence[Tuple[str, str]],
     limit: int,
-) -> List[str]:
+) -> Dict[Tuple[str, str], List[str]]:
     # Requires open coding evidence table.
-    from app.postgres_block import ensure_open_coding_table
+    from app.postgres_block import ensure_open_coding_table, fetch_pair_fragment_ids
 
+    if not pairs:
+        return {}
     ensure_open_coding_table(clients.postgres)
-    sql = """
-    SELECT a.fragmento_id
-      FROM analisis_codigos_abiertos a
-      JOIN analisis_codigos_abiertos b
-        ON b.project_id = a.project_id
-       AND b.fragmento_id = a.fragmento_id
-      JOIN entrevista_fragmentos ef
-        ON ef.project_id = a.project_id
-       AND ef.id = a.fragmento_id
-     WHERE a.project_id = %s
-       AND a.codigo = %s
-       AND b.codigo = %s
-       AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
-     ORDER BY ef.archivo, ef.par_idx
-     LIMIT %s
-    """
-    with clients.postgres.cursor() as cur:
-        cur.execute(sql, (project_id, code_a, code_b, int(limit)))
-        return [str(r[0]) for r in (cur.fetchall() or []) if r and r[0]]
+    return fetch_pair_fragment_ids(clients.postgres, project_id, pairs, limit=limit, interviewee_only=True)
 
 
 def _single_code_fragment_ids_pg(
@@ -167,27 +137,41 @@ def _negative_case_fragment_ids_pg(
         return [str(r[0]) for r in (cur.fetchall() or []) if r and r[0]]
 
 
-def _fetch_fragment_snapshot(
+def _fetch_fragment_snapshots(
     clients: ServiceClients,
     *,
     project_id: str,
-    fragment_id: str,
+    fragment_ids: Sequence[str],
     excerpt_chars: int,
-) -> Optional[Dict[str, Any]]:
-    from app.postgres_block import fetch_fragment_by_id
-
-    frag = fetch_fragment_by_id(clients.postgres, fragment_id, project_id)
-    if not frag:
-        return None
-    if frag.get("speaker") == "interviewer":
-        return None
-    return {
-        "fragmento_id": str(frag.get("id")),
-        "archivo": frag.get("archivo"),
-        "par_idx": frag.get("par_idx"),
-        "speaker": frag.get("speaker"),
-        "fragmento": _truncate(str(frag.get("fragmento") or ""), excerpt_chars),
-    }
+    cache: Dict[str, Optional[Dict[str, Any]]],
+) -> None:
+    """Hidrata en `cache` los fragmentos aún no cargados (una consulta `ANY()`).
+
+    Los fragmentos inexistentes o del entrevistador quedan como None.
+    """
+    from app.postgres_block import fetch_fragment_excerpts
+
+    missing = [fid for fid in dict.fromkeys(str(x) for x in fragment_ids if x) if fid not in cache]
+    if not missing:
+        return
+    rows = fetch_fragment_excerpts(clients.postgres, missing, project=project_id)
+    for fid in missing:
+        frag = rows.get(fid)
+        if not frag or frag.get("speaker") == "interviewer":
+            cache[fid] = None
+            continue
+        cache[fid] = {
+            "fragmento_id": str(frag.get("id")),
+            "archivo": frag.get("archivo"),
+            "par_idx": frag.get("par_idx"),
+            "speaker": frag.get("speaker"),
+            "fragmento": _truncate(str(frag.get("fragmento") or ""), excerpt_chars),
+        }
+
+
+def _snapshot(cache: Dict[str, Optional[Dict[str, Any]]], fragment_id: str) -> Optional[Dict[str, Any]]:
+    snap = cache.get(fragment_id)
+    return dict(snap) if snap else None
 
 
 def build_link_prediction_evidence_pack(
@@ -259,6 +243,40 @@ def build_link_prediction_evidence_pack(
     used_negative: set[str] = set()
     method_counter: Counter[str] = Counter()
 
+    # Direct co-occurrence for every suggestion at once: one Neo4j UNWIND query,
+    # one Postgres query for the pairs Neo4j could not answer, and a single
+    # ANY() lookup to hydrate provided + co-occurrence fragments.
+    co_limits = {
+        (s["source"], s["target"]): max(int(q) * 3, 6)
+        for s, q in zip(normalized, pos_quotas)
+        if int(q) > 0
+    }
+    co_pairs = list(co_limits)
+    co_limit = max(co_limits.values()) if co_limits else 0
+    co_by_pair = _cooccurrence_fragment_ids_neo4j(
+        clients, settings, project_id=project_id, pairs=co_pairs, limit=co_limit
+    )
+    co_methods = {pair: "cooccurrence_neo4j" for pair in co_by_pair}
+    pg_pairs = [pair for pair in co_pairs if not co_by_pair.get(pair)]
+    for pair, ids in _cooccurrence_fragment_ids_pg(
+        clients, project_id=project_id, pairs=pg_pairs, limit=co_limit
+    ).items():
+        co_by_pair[pair] = ids
+        co_methods[pair] = "cooccurrence_pg"
+    co_by_pair = {pair: ids[: co_limits[pair]] for pair, ids in co_by_pair.items() if pair in co_limits}
+
+    snapshots: Dict[str, Optional[Dict[str, Any]]] = {}
+    prefetch: List[str] = []
+    for s, q in zip(normalized, pos_quotas):
+        if int(q) <= 0:
+            continue
+        if isinstance(s.get("evidence_ids"), list):
+            prefetch.extend(str(x) for x in s["evidence_ids"] if x)
+        prefetch.extend(co_by_pair.get((s["source"], s["target"]), []))
+    _fetch_fragment_snapshots(
+        clients, project_id=project_id, fragment_ids=prefetch, excerpt_chars=excerpt_chars, cache=snapshots
+    )
+
     suggestions_out: List[Dict[str, Any]] = []
     for idx, s in enumerate(normalized, 1):
         code_a = s["source"]
@@ -279,7 +297,7 @@ def build_link_prediction_evidence_pack(
                     break
                 if fid in used_positive:
                     continue
-                snap = _fetch_fragment_snapshot(clients, project_id=project_id, fragment_id=fid, excerpt_chars=excerpt_chars)
+                snap = _snapshot(snapshots, fid)
                 if not snap:
                     continue
                 snap["method"] = "provided_evidence_ids"
@@ -289,28 +307,15 @@ def build_link_prediction_evidence_pack(
 
         # 1) Direct co-occurrence (best evidence).
         if pos_budget > 0 and len(pos_items) < pos_budget:
-            co_ids: List[str] = []
-            co_ids = _cooccurrence_fragment_ids_neo4j(
-                clients,
-                settings,
-                project_id=project_id,
-                code_a=code_a,
-                code_b=code_b,
-                limit=max(pos_budget * 3, 6),
-            )
-            co_method = "cooccurrence_neo4j"
-            if not co_ids:
-                co_ids = _cooccurrence_fragment_ids_pg(
-                    clients, project_id=project_id, code_a=code_a, code_b=code_b, limit=max(pos_budget * 3, 6)
-                )
-                co_method = "cooccurrence_pg"
+            co_ids = co_by_pair.get((code_a, code_b), [])
+            co_method = co_methods.get((code_a, code_b), "cooccurrence_pg")
 
             for fid in co_ids:
                 if len(pos_items) >= pos_budget:
                     break
                 if fid in used_positive:
                     continue
-                snap = _fetch_fragment_snapshot(clients, project_id=project_id, fragment_id=fid, excerpt_chars=excerpt_chars)
+                snap = _snapshot(snapshots, fid)
                 if not snap:
                     continue
                 snap["method"] = co_method
@@ -330,12 +335,15 @@ def build_link_prediction_evidence_pack(
                 exclude_ids=list(used_negative) + list(used_positive),
                 limit=max(neg_budget * 3, 6),
             )
+            _fetch_fragment_snapshots(
+                clients, project_id=project_id, fragment_ids=neg_ids_a, excerpt_chars=excerpt_chars, cache=snapshots
+            )
             for fid in neg_ids_a:
                 if len(neg_items) >= neg_budget:
                     break
                 if fid in used_negative:
                     continue
-                snap = _fetch_fragment_snapshot(clients, project_id=project_id, fragment_id=fid, excerpt_chars=excerpt_chars)
+                snap = _snapshot(snapshots, fid)
                 if not snap:
                     continue
                 snap["method"] = "negative_case_pg"
@@ -354,14 +362,15 @@ def build_link_prediction_evidence_pack(
                     exclude_ids=list(used_negative) + list(used_positive),
                     limit=max(neg_budget * 3, 6),
                 )
+                _fetch_fragment_snapshots(
+                    clients, project_id=project_id, fragment_ids=neg_ids_b, excerpt_chars=excerpt_chars, cache=snapshots
+                )
                 for fid in neg_ids_b:
                     if len(neg_items) >= neg_budget:
                         break
                     if fid in used_negative:
                         continue
-                    snap = _fetch_fragment_snapshot(
-                        clients, project_id=project_id, fragment_id=fid, excerpt_chars=excerpt_chars
-                    )
+                    snap = _snapshot(snapshots, fid)
                     if not snap:
                         continue
                     snap["method"] = "negative_case_pg"
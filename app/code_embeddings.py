@@ -0,0 +1,312 @@
+"""
+Catálogo de códigos embebido (detección de duplicados semánticos).
+
+La detección pre-hoc (`code_normalization`) y post-hoc (Levenshtein/pg_trgm)
+sólo encuentra duplicados léxicos: "desconfianza institucional" y "falta de
+confianza en el municipio" nunca aparecen como candidatos. Este módulo
+embebe una vez cada código del catálogo ("codigo: definición") y:
+
+    - guarda los vectores en una colección Qdrant dedicada a códigos
+      (`<colección>_codes`, particionada por `project_id` como la de
+      fragmentos);
+    - materializa en PG (`code_semantic_pairs`) los top-K vecinos de cada
+      código embebido, de modo que la detección post-hoc es una lectura
+      indexada;
+    - sincroniza por diferencia: sólo se re-embeben los códigos nuevos o con
+      texto distinto (alta, renombre, cambio de memo) y se retiran los que
+      salieron del catálogo (fusión, rechazo).
+
+Funciones:
+    - code_embedding_text(): Plantilla "codigo: memo" (catálogo y pre-hoc)
+    - sync_code_embeddings(): Sincronización incremental del catálogo
+    - semantic_duplicate_pairs(): Pares post-hoc (lectura de los materializados)
+    - semantic_code_matches(): Vecinos semánticos de códigos propuestos (pre-hoc)
+    - refresh_code_embeddings_after_change(): Hook best-effort de escritura
+
+Example:
+    >>> from app.code_embeddings import sync_code_embeddings
+    >>> sync_code_embeddings(clients, settings, "mi_proyecto")
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PointIdsList,
+    PointStruct,
+    QueryRequest,
+)
+
+from .clients import ServiceClients
+from .embeddings import embed_batch
+from .postgres_block import (
+    apply_code_embedding_sync,
+    fetch_code_embedding_diff,
+    fetch_code_semantic_pairs,
+    has_code_embeddings,
+)
+from .qdrant_block import ensure_collection, upsert
+from .settings import AppSettings
+
+_logger = structlog.get_logger()
+
+# Similitud coseno mínima para proponer un duplicado semántico.
+DEFAULT_SEMANTIC_THRESHOLD = 0.85
+# Vecinos materializados por código y piso de similitud almacenado.
+_PAIR_NEIGHBORS = 10
+_PAIR_FLOOR = 0.75
+# Textos por llamada de embeddings y consultas por `query_batch_points`.
+_EMBED_CHUNK = 64
+_QUERY_BATCH = 64
+# Códigos re-embebidos como máximo por sincronización tras una escritura
+# (`task_sync_code_embeddings`); el resto queda para la siguiente (o para
+# `coding embed-codes`).
+_INLINE_SYNC_LIMIT = 200
+
+
+def code_collection_name(settings: AppSettings) -> str:
+    """Colección Qdrant de códigos (separada de la de fragmentos)."""
+    return f"{settings.qdrant.collection}_codes"
+
+
+def code_embedding_text(codigo: str, memo: Optional[str] = None) -> str:
+    """Texto embebido de un código: "codigo: memo", o sólo el nombre sin memo.
+
+    Es la plantilla de `_CODE_EMBEDDING_CATALOG_CTE` (catálogo), de modo que
+    los códigos propuestos (pre-hoc) se embeben igual que los almacenados.
+    """
+    name = str(codigo or "").strip()
+    note = str(memo or "").strip()
+    return f"{name}: {note}" if name and note else name
+
+
+def code_point_id(project_id: str, codigo: str) -> str:
+    """ID determinista del punto de un código en Qdrant."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"code|{project_id}|{codigo}"))
+
+
+def _project_filter(project_id: str) -> Filter:
+    return Filter(must=[FieldCondition(key="project_id", match=MatchValue(value=project_id))])
+
+
+def _ensure_code_collection(clients: ServiceClients, collection: str, dimensions: int) -> None:
+    ensure_collection(clients.qdrant, collection, dimensions)
+    for field_name in ("project_id", "codigo"):
+        try:
+            clients.qdrant.create_payload_index(
+                collection_name=collection,
+                field_name=field_name,
+                field_schema="keyword",
+            )
+        except Exception as exc:  # noqa: BLE001 - el índice puede existir
+            message = str(exc).lower()
+            if "already exists" not in message and "already has index" not in message:
+                raise
+
+
+def _embed_texts(clients: ServiceClients, settings: AppSettings, texts: Sequence[str]) -> List[List[float]]:
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), _EMBED_CHUNK):
+        vectors.extend(embed_batch(clients.aoai, settings.azure.deployment_embed, texts[start:start + _EMBED_CHUNK]))
+    return vectors
+
+
+def _query_neighbors(
+    clients: ServiceClients,
+    collection: str,
+    project_id: str,
+    vectors: Sequence[Sequence[float]],
+    *,
+    limit: int,
+    score_threshold: float,
+) -> List[List[Tuple[str, float]]]:
+    """Vecinos (codigo, score) de cada vector dentro del proyecto, en lotes."""
+    results: List[List[Tuple[str, float]]] = []
+    project_filter = _project_filter(project_id)
+    for start in range(0, len(vectors), _QUERY_BATCH):
+        requests = [
+            QueryRequest(
+                query=list(vector),
+                filter=project_filter,
+                limit=limit,
+                score_threshold=score_threshold,
+                with_payload=["codigo"],
+            )
+            for vector in vectors[start:start + _QUERY_BATCH]
+        ]
+        responses = clients.qdrant.query_batch_points(collection_name=collection, requests=requests)
+        for response in responses:
+            results.append(
+                [
+                    (str((point.payload or {}).get("codigo") or ""), float(point.score))
+                    for point in response.points
+                ]
+            )
+    return results
+
+
+def sync_code_embeddings(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: Optional[str] = None,
+    *,
+    max_codes: Optional[int] = None,
+    logger: Optional[structlog.BoundLogger] = None,
+) -> Dict[str, Any]:
+    """Embebe los códigos nuevos/modificados y retira los que salieron del catálogo.
+
+    Para cada código embebido recalcula sus top-K vecinos (coseno >=
+    `_PAIR_FLOOR`) y reemplaza sus pares en `code_semantic_pairs`.
+
+    Args:
+        max_codes: Máximo de códigos a embeber en esta pasada (None = todos);
+            el resto se informa en `pendientes`.
+    """
+    log = logger or _logger
+    project_id = project or "default"
+    collection = code_collection_name(settings)
+    changed, removed = fetch_code_embedding_diff(clients.postgres, project_id)
+    pending = 0
+    if max_codes is not None and len(changed) > max_codes:
+        pending = len(changed) - max_codes
+        changed = changed[:max_codes]
+
+    pairs: Dict[Tuple[str, str], float] = {}
+    embedded: List[Tuple[str, str, str]] = []
+    if changed:
+        vectors = _embed_texts(clients, settings, [row["texto"] for row in changed])
+        if len(vectors) != len(changed):
+            raise RuntimeError(f"Embeddings desalineados: {len(vectors)} de {len(changed)} códigos")
+        _ensure_code_collection(clients, collection, settings.embed_dims or len(vectors[0]))
+        ids = [code_point_id(project_id, row["codigo"]) for row in changed]
+        points = [
+            PointStruct(id=pid, vector=list(vector), payload={"project_id": project_id, "codigo": row["codigo"]})
+            for pid, row, vector in zip(ids, changed, vectors)
+        ]
+        upsert(clients.qdrant, collection, points, logger=log)
+
+        neighbors = _query_neighbors(
+            clients,
+            collection,
+            project_id,
+            vectors,
+            limit=_PAIR_NEIGHBORS + 1,
+            score_threshold=_PAIR_FLOOR,
+        )
+        retired = set(removed)
+        for row, items in zip(changed, neighbors):
+            codigo = row["codigo"]
+            for other, score in items:
+                if not other or other == codigo or other in retired:
+                    continue
+                key = (codigo, other) if codigo < other else (other, codigo)
+                pairs[key] = max(score, pairs.get(key, 0.0))
+        embedded = [(row["codigo"], row["text_hash"], pid) for row, pid in zip(changed, ids)]
+
+    if removed:
+        clients.qdrant.delete(
+            collection_name=collection,
+            points_selector=PointIdsList(points=[code_point_id(project_id, codigo) for codigo in removed]),
+        )
+
+    stored = 0
+    if embedded or removed:
+        stored = apply_code_embedding_sync(
+            clients.postgres,
+            project_id,
+            embedded=embedded,
+            pairs=[(a, b, score) for (a, b), score in pairs.items()],
+            removed=removed,
+        )
+    result = {
+        "project_id": project_id,
+        "embebidos": len(embedded),
+        "retirados": len(removed),
+        "pares": stored,
+        "pendientes": pending,
+    }
+    if embedded or removed:
+        log.info("code_embeddings.sync", **result)
+    return result
+
+
+def semantic_duplicate_pairs(
+    clients: ServiceClients,
+    project: Optional[str],
+    *,
+    threshold: float = DEFAULT_SEMANTIC_THRESHOLD,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Pares de códigos semánticamente cercanos (post-hoc).
+
+    Sólo lee los pares materializados: la sincronización corre en
+    `task_sync_code_embeddings` tras cada alta/renombre/fusión (o con
+    `coding embed-codes`), nunca dentro de la petición.
+    """
+    project_id = project or "default"
+    return fetch_code_semantic_pairs(clients.postgres, project_id, threshold=threshold, limit=limit)
+
+
+def semantic_code_matches(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: Optional[str],
+    codigos: Sequence[str],
+    *,
+    memos: Optional[Sequence[Optional[str]]] = None,
+    threshold: float = DEFAULT_SEMANTIC_THRESHOLD,
+    limit: int = 3,
+) -> List[List[Tuple[str, float]]]:
+    """Códigos existentes semánticamente cercanos a cada código propuesto (pre-hoc).
+
+    Cada propuesta se embebe con `code_embedding_text` (memo opcional, en el
+    mismo orden que `codigos`), igual que el catálogo. Una llamada de
+    embeddings para todo el batch y un `query_batch_points` por bloque;
+    devuelve una lista (codigo, similitud) por entrada, en orden. El propio
+    código (si ya existe en el catálogo) se excluye.
+    """
+    project_id = project or "default"
+    names = [str(c or "").strip() for c in codigos]
+    wanted = [i for i, name in enumerate(names) if name]
+    results: List[List[Tuple[str, float]]] = [[] for _ in codigos]
+    if not wanted or not has_code_embeddings(clients.postgres, project_id):
+        return results
+    texts = [code_embedding_text(names[i], memos[i] if memos else None) for i in wanted]
+    vectors = _embed_texts(clients, settings, texts)
+    neighbors = _query_neighbors(
+        clients,
+        code_collection_name(settings),
+        project_id,
+        vectors,
+        limit=limit + 1,
+        score_threshold=threshold,
+    )
+    for i, items in zip(wanted, neighbors):
+        results[i] = [(other, score) for other, score in items if other and other != names[i]][:limit]
+    return results
+
+
+def refresh_code_embeddings_after_change(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: Optional[str],
+    logger: Optional[structlog.BoundLogger] = None,
+) -> None:
+    """Hook best-effort tras alta/renombre/fusión: sólo si el proyecto ya está embebido."""
+    log = logger or _logger
+    project_id = project or "default"
+    try:
+        if has_code_embeddings(clients.postgres, project_id):
+            sync_code_embeddings(clients, settings, project_id, max_codes=_INLINE_SYNC_LIMIT, logger=log)
+    except Exception as exc:
+        log.warning("code_embeddings.refresh_failed", project_id=project_id, error=str(exc))
+        try:
+            clients.postgres.rollback()
+        except Exception:
+            pass
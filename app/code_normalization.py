@@ -7,6 +7,9 @@ y prevenir fragmentación del grafo de codificación.
 Funciones principales:
     - normalize_code(): Normaliza texto (tildes, espacios, etc.)
     - find_similar_codes(): Detecta códigos similares usando rapidfuzz
+    - CodeIndex: Catálogo pre-normalizado; compara un batch completo (cdist)
+    - get_code_index(): Índice cacheado por proyecto (por sello de versión del catálogo)
+    - find_similar_code_pairs(): Top-k pares similares del catálogo (bigramas + cdist)
     - suggest_code_merge(): Sugiere fusión de códigos duplicados
 
 Estrategia Pre-Hoc:
@@ -25,8 +28,10 @@ from __future__ import annotations
 
 import unicodedata
 import re
+import threading
 import time
-from typing import List, Tuple, Optional, Dict, Any
+from collections import OrderedDict
+from typing import List, Sequence, Tuple, Optional, Dict, Any
 
 import structlog
 
@@ -340,11 +345,396 @@ def find_similar_codes_with_stats(
     return results, stats
 
 
+# =============================================================================
+# ÍNDICE VECTORIZADO POR PROYECTO
+# =============================================================================
+
+# Proyectos con índice en memoria (LRU).
+_CODE_INDEX_CACHE_SIZE = 32
+_code_index_cache: "OrderedDict[str, CodeIndex]" = OrderedDict()
+_code_index_lock = threading.Lock()
+
+
+class CodeIndex:
+    """Catálogo de códigos con formas normalizadas y tokens precalculados.
+
+    `match_batch` aplica las mismas reglas que `find_similar_codes` (prefiltro
+    de longitud, max(Levenshtein, token_set_ratio), guardrail de tokens) a un
+    batch completo contra el catálogo:
+
+    - Blocking por tokens: el guardrail exige Jaccard >= 0.5, así que el
+      Jaccard se calcula primero sobre listas invertidas (NumPy) y sólo las
+      columnas que lo superan se puntúan.
+    - Puntuación con `rapidfuzz.process.cdist` (multi-hilo, `workers=-1`).
+    """
+
+    def __init__(self, existing_codes: Sequence[str]) -> None:
+        import numpy as np
+
+        self.codes: List[str] = []
+        self.norms: List[str] = []
+        self.tokens: List[frozenset] = []
+        self.skipped_empty = 0
+        postings: Dict[str, List[int]] = {}
+        for existing in existing_codes:
+            norm = normalize_code(existing) if existing else ""
+            if not norm:
+                self.skipped_empty += 1
+                continue
+            col = len(self.codes)
+            toks = frozenset(_tokenize_normalized(norm))
+            self.codes.append(existing)
+            self.norms.append(norm)
+            self.tokens.append(toks)
+            for tok in toks:
+                postings.setdefault(tok, []).append(col)
+        self.postings = {tok: np.asarray(cols, dtype=np.int64) for tok, cols in postings.items()}
+        self.token_counts = np.asarray([len(t) for t in self.tokens], dtype=np.int64)
+        self.lengths = np.asarray([len(n) for n in self.norms], dtype=np.int64)
+        self.signature = _catalog_signature(existing_codes)
+        # Sello de code_catalog_versions con que se construyó (ver get_code_index).
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def existing_count(self) -> int:
+        """Tamaño del catálogo leído, incluidos los códigos vacíos descartados."""
+        return len(self.codes) + self.skipped_empty
+
+    def _blocked_columns(self, query_tokens: frozenset) -> Any:
+        """Columnas con Jaccard de tokens >= 0.5 respecto de la consulta."""
+        import numpy as np
+
+        shared = np.zeros(len(self.codes), dtype=np.int64)
+        for tok in query_tokens:
+            cols = self.postings.get(tok)
+            if cols is not None:
+                shared[cols] += 1
+        cand = np.nonzero(shared)[0]
+        if cand.size == 0:
+            return cand
+        inter = shared[cand]
+        union = len(query_tokens) + self.token_counts[cand] - inter
+        return cand[inter / union >= 0.5]
+
+    def match_batch(
+        self,
+        codigos: Sequence[str],
+        threshold: float = SIMILARITY_THRESHOLD,
+        limit: int = 5,
+    ) -> Tuple[List[List[Tuple[str, float]]], Dict[str, Any]]:
+        """Similares para cada código del batch (mismo orden) + métricas agregadas."""
+        started = time.perf_counter()
+        results: List[List[Tuple[str, float]]] = [[] for _ in codigos]
+        stats: Dict[str, Any] = {
+            "rapidfuzz": RAPIDFUZZ_AVAILABLE,
+            "existing_count": self.existing_count,
+            "threshold": float(threshold),
+            "limit": int(limit),
+            "queries": 0,
+            "comparisons": 0,
+            "skipped_token_blocking": 0,
+            "skipped_len_prefilter": 0,
+            "skipped_similarity": 0,
+            "skipped_token_overlap": 0,
+            "kept": 0,
+        }
+        if not self.codes:
+            stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+            return results, stats
+
+        if not RAPIDFUZZ_AVAILABLE:
+            for i, codigo in enumerate(codigos):
+                if codigo:
+                    stats["queries"] += 1
+                    results[i], st = find_similar_codes_with_stats(
+                        codigo, self.codes, threshold=threshold, limit=limit
+                    )
+                    for key in ("skipped_len_prefilter", "skipped_similarity", "skipped_token_overlap"):
+                        stats[key] += int(st.get(key, 0))
+            stats["comparisons"] = stats["queries"] * len(self.codes)
+            stats["kept"] = stats["comparisons"] - (
+                stats["skipped_len_prefilter"] + stats["skipped_similarity"] + stats["skipped_token_overlap"]
+            )
+            stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+            return results, stats
+
+        import numpy as np
+
+        for i, codigo in enumerate(codigos):
+            norm = normalize_code(codigo) if codigo else ""
+            if not norm:
+                continue
+            stats["queries"] += 1
+            query_tokens = frozenset(_tokenize_normalized(norm))
+            cols = self._blocked_columns(query_tokens) if query_tokens else np.zeros(0, dtype=np.int64)
+            stats["skipped_token_blocking"] += len(self.codes) - int(cols.size)
+            if cols.size == 0:
+                continue
+            stats["comparisons"] += int(cols.size)
+
+            choices = [self.norms[j] for j in cols]
+            token_sim = fuzz_process.cdist(
+                [norm], choices, scorer=fuzz.token_set_ratio,
+                dtype=np.float64, workers=-1, score_cutoff=threshold * 100.0,
+            )[0] / 100.0
+            lev_sim = fuzz_process.cdist(
+                [norm], choices, scorer=Levenshtein.normalized_similarity,
+                dtype=np.float64, workers=-1, score_cutoff=threshold,
+            )[0]
+            similarity = np.maximum(lev_sim, token_sim)
+
+            # Prefiltro de longitud (sólo si token_set_ratio no es alto), igual que find_similar_codes.
+            lengths = self.lengths[cols]
+            max_len = np.maximum(lengths, len(norm))
+            len_ok = np.abs(lengths - len(norm)) <= ((1 - threshold) * max_len).astype(np.int64)
+            prefilter_ok = (token_sim >= threshold) | len_ok
+            passed = np.nonzero((similarity >= threshold) & prefilter_ok)[0]
+            len_skipped = int(cols.size - np.count_nonzero(prefilter_ok))
+            stats["skipped_len_prefilter"] += len_skipped
+            stats["skipped_similarity"] += int(cols.size - passed.size) - len_skipped
+
+            ranked: List[Tuple[str, float]] = []
+            for k in passed:
+                col = int(cols[k])
+                if not _token_sets_overlap_ok(query_tokens, self.tokens[col]):
+                    stats["skipped_token_overlap"] += 1
+                    continue
+                ranked.append((self.codes[col], float(similarity[k])))
+            ranked.sort(key=lambda x: x[1], reverse=True)
+            stats["kept"] += len(ranked)
+            results[i] = ranked[:limit]
+
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+        return results, stats
+
+
+def _catalog_signature(codes: Sequence[str]) -> int:
+    return hash(tuple(codes))
+
+
+def _token_sets_overlap_ok(ta: frozenset, tb: frozenset, min_jaccard: float = 0.5) -> bool:
+    """`_token_overlap_ok` sobre conjuntos de tokens ya calculados."""
+    if not ta or not tb:
+        return False
+    if len(ta & tb) / len(ta | tb) < min_jaccard:
+        return False
+    diff_a = ta - tb
+    diff_b = tb - ta
+    if len(diff_a) == 1 and len(diff_b) == 1:
+        (tok_a,), (tok_b,) = diff_a, diff_b
+        if RAPIDFUZZ_AVAILABLE:
+            distance = Levenshtein.distance(tok_a, tok_b)
+            return 1.0 - (distance / max(len(tok_a), len(tok_b))) >= 0.8
+        return SequenceMatcher(None, tok_a, tok_b).ratio() >= 0.8
+    return True
+
+
+def get_code_index(pg_conn, project_id: str) -> CodeIndex:
+    """Índice del proyecto; se reconstruye sólo si cambió el catálogo.
+
+    La validez se comprueba con el sello de `code_catalog_versions`, que
+    incrementan los triggers de códigos asignados y candidatos: un acierto no
+    lee el catálogo. Sin versionado disponible, se lee el catálogo y se
+    compara su firma.
+    """
+    from .postgres_block import get_code_catalog_version
+
+    try:
+        version = get_code_catalog_version(pg_conn, project_id)
+    except Exception as e:
+        _logger.warning("code_normalization.catalog_version_failed", error=str(e))
+        pg_conn.rollback()
+        version = None
+    if version is not None:
+        with _code_index_lock:
+            index = _code_index_cache.get(project_id)
+            if index is not None and index.version == version:
+                _code_index_cache.move_to_end(project_id)
+                return index
+
+    existing_codes = get_existing_codes_for_project(pg_conn, project_id)
+    signature = _catalog_signature(existing_codes)
+    with _code_index_lock:
+        index = _code_index_cache.get(project_id)
+        if index is not None and index.signature == signature:
+            index.version = version
+            _code_index_cache.move_to_end(project_id)
+            return index
+    index = CodeIndex(existing_codes)
+    index.version = version
+    with _code_index_lock:
+        _code_index_cache[project_id] = index
+        _code_index_cache.move_to_end(project_id)
+        while len(_code_index_cache) > _CODE_INDEX_CACHE_SIZE:
+            _code_index_cache.popitem(last=False)
+    return index
+
+
+def invalidate_code_index(project_id: Optional[str] = None) -> None:
+    """Descarta el índice de un proyecto (o todos)."""
+    with _code_index_lock:
+        if project_id is None:
+            _code_index_cache.clear()
+        else:
+            _code_index_cache.pop(project_id, None)
+
+
+_PAIR_QGRAM = 2
+
+
+def _levenshtein_distance(a: str, b: str) -> int:
+    """Levenshtein en Python puro (fallback sin rapidfuzz)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _padded_qgrams(norm: str) -> List[Tuple[str, int]]:
+    """Q-gramas con relleno (`#`/`$`) como conjunto de (q-grama, ocurrencia).
+
+    Numerar las repeticiones convierte la intersección de multiconjuntos en
+    una intersección de conjuntos (conteo directo sobre listas invertidas).
+    """
+    padded = "#" * (_PAIR_QGRAM - 1) + norm + "$" * (_PAIR_QGRAM - 1)
+    seen: Dict[str, int] = {}
+    features: List[Tuple[str, int]] = []
+    for i in range(len(padded) - _PAIR_QGRAM + 1):
+        gram = padded[i:i + _PAIR_QGRAM]
+        seen[gram] = seen.get(gram, 0) + 1
+        features.append((gram, seen[gram]))
+    return features
+
+
+def find_similar_code_pairs(
+    norms: Sequence[str],
+    threshold: float = 0.80,
+    limit: int = 50,
+    require_token_overlap: bool = True,
+) -> Tuple[List[Tuple[str, str, int, float]], Dict[str, Any]]:
+    """Top `limit` pares de códigos normalizados por similitud Levenshtein.
+
+    Similitud = 1 - distancia / max(len). Devuelve el mismo conjunto que un
+    barrido exhaustivo de todos los pares, ordenado por (-similitud, code1,
+    code2) con code1 < code2, sin compararlos todos:
+
+    - Ventana de longitud: con los códigos ordenados por longitud, cada uno
+      sólo se compara con los siguientes cuya diferencia de longitud cabe en
+      la distancia máxima permitida `k = floor((1 - threshold) * max_len)`.
+    - Índice invertido de bigramas con relleno: dos cadenas a distancia <= k
+      comparten al menos `max_len + 1 - 2k` bigramas (lema de q-gramas), así
+      que los pares por debajo de ese conteo se descartan sin puntuar.
+    - Los supervivientes se puntúan en bloque con `rapidfuzz.process.cdist`
+      y un heap acotado conserva los `limit` mejores pares globales.
+
+    Args:
+        norms: Códigos ya normalizados (se deduplican).
+        require_token_overlap: Aplica el guardrail de tokens (`_token_overlap_ok`).
+
+    Sin rapidfuzz los candidatos se puntúan con Levenshtein en Python puro.
+
+    Returns:
+        (pares, stats) con pares `(code1, code2, distancia, similitud)`.
+    """
+    import heapq
+
+    import numpy as np
+
+    started = time.perf_counter()
+    unique = sorted({n for n in norms if n}, key=lambda n: (len(n), n))
+    count = len(unique)
+    stats: Dict[str, Any] = {
+        "codes": count,
+        "threshold": float(threshold),
+        "limit": int(limit),
+        "pairs_total": count * (count - 1) // 2,
+        "pairs_in_length_window": 0,
+        "comparisons": 0,
+        "skipped_token_overlap": 0,
+        "kept": 0,
+    }
+    if count < 2 or limit <= 0:
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+        return [], stats
+
+    slack = 1.0 - float(threshold)
+    lengths = np.asarray([len(n) for n in unique], dtype=np.int64)
+    # Distancia máxima admitida según la longitud del código más largo del par
+    # (epsilon: nunca subestimar k por redondeo de coma flotante).
+    max_dist = np.floor(slack * lengths + 1e-9).astype(np.int64)
+    tokens = [frozenset(_tokenize_normalized(n)) for n in unique]
+
+    gram_rows: List[List[Tuple[str, int]]] = []
+    raw_postings: Dict[Tuple[str, int], List[int]] = {}
+    for idx, norm in enumerate(unique):
+        features = _padded_qgrams(norm)
+        gram_rows.append(features)
+        for feature in features:
+            raw_postings.setdefault(feature, []).append(idx)
+    postings = {feature: np.asarray(cols, dtype=np.int64) for feature, cols in raw_postings.items()}
+
+    def accepted():
+        for i in range(count - 1):
+            len_i = int(lengths[i])
+            # len_j >= len_i; el par cabe si len_j - len_i <= floor(slack * len_j).
+            hi = int(np.searchsorted(lengths, int(len_i / max(float(threshold), 1e-9)) + 1, side="right"))
+            lo = i + 1
+            if hi <= lo:
+                continue
+            window_len = lengths[lo:hi]
+            window_k = max_dist[lo:hi]
+            in_window = (window_len - len_i) <= window_k
+            stats["pairs_in_length_window"] += int(in_window.sum())
+
+            ids = np.concatenate([postings[feature] for feature in gram_rows[i]])
+            ids = ids[(ids >= lo) & (ids < hi)]
+            shared = np.bincount(ids - lo, minlength=hi - lo)
+            need = window_len + 1 - 2 * window_k
+            cand = np.nonzero(in_window & (shared >= need))[0]
+            if cand.size == 0:
+                continue
+            stats["comparisons"] += int(cand.size)
+
+            choices = [unique[lo + c] for c in cand]
+            if RAPIDFUZZ_AVAILABLE:
+                distances = fuzz_process.cdist(
+                    [unique[i]], choices, scorer=Levenshtein.distance,
+                    dtype=np.int32, workers=-1, score_cutoff=int(window_k[cand].max()),
+                )[0]
+            else:
+                distances = [_levenshtein_distance(unique[i], choice) for choice in choices]
+            for c, distance in zip(cand, distances):
+                j = lo + int(c)
+                distance = int(distance)
+                similarity = 1 - (distance / int(lengths[j]))
+                if distance == 0 or similarity < threshold:
+                    continue
+                if require_token_overlap and not _token_sets_overlap_ok(tokens[i], tokens[j]):
+                    stats["skipped_token_overlap"] += 1
+                    continue
+                code1, code2 = sorted((unique[i], unique[j]))
+                stats["kept"] += 1
+                yield (code1, code2, distance, similarity)
+
+    pairs = heapq.nsmallest(limit, accepted(), key=lambda p: (-p[3], p[0], p[1]))
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+    return pairs, stats
+
+
 def suggest_code_merge(
     new_codes: List[Dict[str, Any]],
     existing_codes: List[str],
     threshold: float = SIMILARITY_THRESHOLD,
     deduplicate_batch: bool = True,
+    code_index: Optional[CodeIndex] = None,
 ) -> List[Dict[str, Any]]:
     """
     Procesa códigos nuevos y marca los que tienen similares existentes.
@@ -360,6 +750,8 @@ def suggest_code_merge(
         existing_codes: Lista de nombres de códigos existentes
         threshold: Umbral de similitud
         deduplicate_batch: Si True, elimina duplicados dentro del batch
+        code_index: Índice ya construido de existing_codes (ver `get_code_index`);
+            si se omite, se construye uno sin cachear
         
     Returns:
         Lista de códigos con campo 'similar_existing' añadido si hay duplicados
@@ -468,18 +860,22 @@ def suggest_code_merge(
     # PASO 2: Comparar contra códigos existentes en BD
     # =========================================================================
     
-    if not existing_codes:
+    index = code_index if code_index is not None else CodeIndex(existing_codes)
+    if not len(index):
         return new_codes
     
+    similar_batch, _stats = index.match_batch(
+        [code_dict.get('codigo', '') for code_dict in new_codes],
+        threshold=threshold,
+    )
+
     result = []
-    for code_dict in new_codes:
+    for code_dict, similar in zip(new_codes, similar_batch):
         codigo = code_dict.get('codigo', '')
         if not codigo:
             result.append(code_dict)
             continue
         
-        similar = find_similar_codes(codigo, existing_codes, threshold)
-        
         if similar:
             # Clonar dict y agregar info de similares
             updated = dict(code_dict)
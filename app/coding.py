@@ -10,6 +10,7 @@ comparan fragmentos nuevos con los ya codificados para refinar los códigos.
 Funciones principales:
     - assign_open_code(): Asigna un código a un fragmento
     - suggest_similar_fragments(): Sugiere fragmentos similares no codificados
+    - sync_fragment_coded_state(): Mantiene el flag `coded` en Qdrant
     - citations_for_code(): Obtiene citas para un código específico
     - coding_statistics(): Estadísticas de codificación del proyecto
     - list_open_codes(): Lista códigos con frecuencias
@@ -42,7 +43,7 @@ from typing import Any, Dict, List, Optional, Tuple, cast
 
 import structlog
 from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.models import FieldCondition, Filter, MatchValue
+from qdrant_client.models import FieldCondition, Filter, HasIdCondition, MatchValue
 from openai.types.chat import (
     ChatCompletionMessageParam,
     ChatCompletionSystemMessageParam,
@@ -52,6 +53,7 @@ from openai.types.chat import (
 from .clients import ServiceClients
 from .postgres_block import (
     coding_stats,
+    count_codes_by_fragment,
     cumulative_code_curve,
     delete_open_code,
     ensure_axial_table,
@@ -63,13 +65,15 @@ from .postgres_block import (
     get_code_history,
     get_fragment_context,
     insert_candidate_codes,
-    list_coded_fragment_ids,
     list_codes_summary,
     list_fragments_for_file,
     list_interviews_summary,
+    load_interview_sampling_features,
     log_code_version,
     log_constant_comparison,
 )
+from .fragment_neighbors import nearest_fragments
+from .qdrant_block import set_fragment_coded_state
 from .neo4j_block import delete_fragment_code, ensure_code_constraints, merge_fragment_code
 from .prompts.loader import get_system_prompt
 from .settings import AppSettings, EpistemicMode
@@ -169,6 +173,8 @@ def unassign_open_code(
     
     # 1. Eliminar de PostgreSQL
     pg_deleted = delete_open_code(clients.postgres, project_id, fragment_id, codigo)
+    if pg_deleted:
+        sync_fragment_coded_state(clients, settings, [fragment_id], project_id, logger=log)
     
     # 2. Eliminar relación de Neo4j
     neo4j_deleted = delete_fragment_code(
@@ -209,11 +215,59 @@ def unassign_open_code(
     return payload
 
 
-def _build_qdrant_filter(filters: Optional[Dict[str, Any]], project_id: str) -> Optional[Filter]:
+def sync_fragment_coded_state(
+    clients: ServiceClients,
+    settings: AppSettings,
+    fragment_ids: List[str],
+    project: Optional[str] = None,
+    logger: Optional[structlog.BoundLogger] = None,
+) -> int:
+    """Refleja en Qdrant (`coded` / `code_count`) el estado de codificación actual.
+
+    Se invoca desde los write paths de códigos definitivos (promoción, fusión,
+    desvinculación). Es best-effort: un fallo en Qdrant no revierte la escritura
+    en PostgreSQL; `backfill_fragment_coded_state()` permite reconciliar.
+    """
+    log = logger or _logger
+    ids = [str(fid) for fid in dict.fromkeys(fragment_ids or []) if fid]
+    if not ids:
+        return 0
+    project_id = project or "default"
+    try:
+        counts = count_codes_by_fragment(clients.postgres, project_id, ids)
+        return set_fragment_coded_state(clients.qdrant, settings.qdrant.collection, counts, logger=log)
+    except Exception as exc:
+        log.warning("coding.coded_state.sync_error", project_id=project_id, fragments=len(ids), error=str(exc))
+        return 0
+
+
+def backfill_fragment_coded_state(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project: Optional[str] = None,
+    logger: Optional[structlog.BoundLogger] = None,
+) -> Dict[str, Any]:
+    """Recalcula `coded` / `code_count` para todos los fragmentos del proyecto."""
+    log = logger or _logger
+    project_id = project or "default"
+    counts = count_codes_by_fragment(clients.postgres, project_id)
+    updated = set_fragment_coded_state(clients.qdrant, settings.qdrant.collection, counts, logger=log)
+    coded = sum(1 for count in counts.values() if count > 0)
+    log.info("coding.coded_state.backfill", project_id=project_id, fragments=updated, coded=coded)
+    return {"project_id": project_id, "fragmentos": updated, "codificados": coded}
+
+
+def _build_qdrant_filter(
+    filters: Optional[Dict[str, Any]],
+    project_id: str,
+    *,
+    exclude_coded: bool = False,
+    exclude_ids: Optional[List[str]] = None,
+) -> Optional[Filter]:
     if not filters:
         filters = {}
     must_conditions: List[FieldCondition] = []
-    must_not: List[FieldCondition] = []
+    must_not: List[Any] = []
     must_conditions.append(FieldCondition(key="project_id", match=MatchValue(value=project_id)))
     if filters.get("archivo"):
         must_conditions.append(
@@ -244,11 +298,73 @@ def _build_qdrant_filter(filters: Optional[Dict[str, Any]], project_id: str) ->
         must_conditions.append(FieldCondition(key="speaker", match=MatchValue(value=speaker_value)))
     else:
         must_not.append(FieldCondition(key="speaker", match=MatchValue(value="interviewer")))
+    if exclude_coded:
+        # Payload mantenido por sync_fragment_coded_state(); los puntos sin el
+        # campo (no sincronizados aún) se consideran no codificados.
+        must_not.append(FieldCondition(key="coded", match=MatchValue(value=True)))
+    if exclude_ids:
+        must_not.append(HasIdCondition(has_id=[str(fid) for fid in exclude_ids]))
     if not must_conditions:
         return None
     return Filter(must=cast(List[Any], must_conditions), must_not=cast(List[Any], must_not) or None)
 
 
+def _suggest_from_qdrant(
+    clients: ServiceClients,
+    settings: AppSettings,
+    vector: Any,
+    *,
+    fragment_id: str,
+    project_id: str,
+    top_k: int,
+    filters: Optional[Dict[str, Any]],
+    exclude_coded: bool,
+) -> List[Dict[str, Any]]:
+    # La exclusión de codificados y de la semilla ocurre dentro del filtro de
+    # Qdrant, así una sola consulta devuelve top_k candidatos válidos.
+    q_filter = _build_qdrant_filter(
+        filters,
+        project_id,
+        exclude_coded=exclude_coded,
+        exclude_ids=[fragment_id],
+    )
+
+    try:
+        response = clients.qdrant.query_points(
+            collection_name=settings.qdrant.collection,
+            query=vector,
+            limit=top_k,
+            with_payload=True,
+            query_filter=q_filter,
+        )
+    except UnexpectedResponse as exc:
+        error_message = str(exc)
+        if "Index required" in error_message:
+            raise CodingError(
+                "Qdrant requiere un indice para los filtros aplicados. Ejecuta `python scripts/healthcheck.py` "
+                "o reejecuta la ingesta para reconstruir los indices (archivo, area tematica, actor principal)."
+            ) from exc
+        raise CodingError(f"No se pudo consultar Qdrant ({error_message})") from exc
+
+    suggestions: List[Dict[str, Any]] = []
+    for point in response.points or []:
+        payload = point.payload or {}
+        suggestions.append(
+            {
+                "fragmento_id": str(point.id),
+                "score": point.score,
+                "archivo": payload.get("archivo"),
+                "par_idx": payload.get("par_idx"),
+                "fragmento": payload.get("fragmento"),
+                "area_tematica": payload.get("area_tematica"),
+                "actor_principal": payload.get("actor_principal"),
+                "requiere_protocolo_lluvia": payload.get("requiere_protocolo_lluvia"),
+                "speaker": payload.get("speaker"),
+            }
+        )
+    return suggestions
+
+
 def suggest_similar_fragments(
     clients: ServiceClients,
     settings: AppSettings,
@@ -274,65 +390,29 @@ def suggest_similar_fragments(
     if not vector:
         raise CodingError(f"Fragmento '{fragment_id}' no tiene embedding almacenado")
 
-    q_filter = _build_qdrant_filter(filters, project_id)
-    exclusions = set()
-    if exclude_coded:
-        exclusions.update(list_coded_fragment_ids(clients.postgres, project_id))
-    exclusions.add(fragment_id)
-
-    suggestions: List[Dict[str, Any]] = []
-    page_size = min(max(20, top_k * 2), 40)
-    max_candidates = 100
-    max_pages = max(1, max_candidates // page_size)
-    offset = 0
-
-    for _ in range(max_pages):
-        try:
-            response = clients.qdrant.query_points(
-                collection_name=settings.qdrant.collection,
-                query=vector,
-                limit=page_size,
-                offset=offset,
-                with_payload=True,
-                query_filter=q_filter,
-            )
-        except UnexpectedResponse as exc:
-            error_message = str(exc)
-            if "Index required" in error_message:
-                raise CodingError(
-                    "Qdrant requiere un indice para los filtros aplicados. Ejecuta `python scripts/healthcheck.py` "
-                    "o reejecuta la ingesta para reconstruir los indices (archivo, area tematica, actor principal)."
-                ) from exc
-            raise CodingError(f"No se pudo consultar Qdrant ({error_message})") from exc
-
-        points = list(response.points or [])
-        if not points:
-            break
-        offset += len(points)
-
-        for point in points:
-            point_id = str(point.id)
-            if point_id in exclusions:
-                continue
-            payload = point.payload or {}
-            suggestions.append(
-                {
-                    "fragmento_id": point_id,
-                    "score": point.score,
-                    "archivo": payload.get("archivo"),
-                    "par_idx": payload.get("par_idx"),
-                    "fragmento": payload.get("fragmento"),
-                    "area_tematica": payload.get("area_tematica"),
-                    "actor_principal": payload.get("actor_principal"),
-                    "requiere_protocolo_lluvia": payload.get("requiere_protocolo_lluvia"),
-                    "speaker": payload.get("speaker"),
-                }
-            )
-            if len(suggestions) >= top_k:
-                break
-
-        if len(suggestions) >= top_k or len(points) < page_size:
-            break
+    # Grafo k-NN materializado primero (lectura indexada en PG); si no existe
+    # o no alcanza top_k tras filtrar, se consulta Qdrant.
+    cached = nearest_fragments(
+        clients,
+        project_id,
+        fragment_id,
+        top_k=top_k,
+        filters=filters,
+        exclude_coded=exclude_coded,
+    )
+    if cached is not None:
+        suggestions = cached
+    else:
+        suggestions = _suggest_from_qdrant(
+            clients,
+            settings,
+            vector,
+            fragment_id=fragment_id,
+            project_id=project_id,
+            top_k=top_k,
+            filters=filters,
+            exclude_coded=exclude_coded,
+        )
 
     llm_summary: Optional[str] = None
     llm_model_resolved: Optional[str] = None
@@ -685,14 +765,17 @@ def _order_interviews_theoretical_sampling_with_debug(
     focus_codes: Optional[str],
     recent_window: int,
     saturation_new_codes_threshold: int,
+    features: Optional[List[Dict[str, Any]]] = None,
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """Como `_order_interviews_theoretical_sampling`, pero retorna `ranking_debug`.
 
     `ranking_debug` está pensado para auditoría/UX:
     - explica por entrevista: segment_key, gap_norm, richness_norm, recency_norm, score
     - incluye contexto global: saturated, new_codes_recent, threshold, pesos
+
+    `features` son las filas de `load_interview_sampling_features`; si no se
+    entregan se leen aquí (una consulta indexada).
     """
-    import json
     import math
     from datetime import datetime
 
@@ -722,65 +805,38 @@ def _order_interviews_theoretical_sampling_with_debug(
             str(it.get("actor_principal") or ""),
         )
 
-    # 1) Detectar cuáles entrevistas ya tienen report.
-    reports_by_archivo: Dict[str, Dict[str, Any]] = {}
-    try:
-        with pg_conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT archivo, report_json
-                  FROM interview_reports
-                 WHERE project_id = %s
-                """,
-                (project_id,),
-            )
-            for archivo, report_json in cur.fetchall():
-                try:
-                    if isinstance(report_json, dict):
-                        data = report_json
-                    else:
-                        data = json.loads(report_json)
-                    reports_by_archivo[str(archivo)] = data
-                except Exception:
-                    continue
-    except Exception:
-        # Tabla inexistente o sin permisos: degradar a orden operacional.
-        ordered = _order_interviews_summary(interviews, order="ingest-desc")
-        return ordered, [
-            {
-                "archivo": str(it.get("archivo") or ""),
-                "reason": "degraded_to_ingest_desc",
-                "error": "interview_reports_unavailable",
-            }
-            for it in ordered
-        ]
+    # 1) Features por entrevista (informe, codigos_nuevos, códigos) precalculadas.
+    if features is None:
+        try:
+            features = load_interview_sampling_features(pg_conn, project_id)
+        except Exception:
+            try:
+                pg_conn.rollback()
+            except Exception:
+                pass
+            # Tabla inexistente o sin permisos: degradar a orden operacional.
+            ordered = _order_interviews_summary(interviews, order="ingest-desc")
+            return ordered, [
+                {
+                    "archivo": str(it.get("archivo") or ""),
+                    "reason": "degraded_to_ingest_desc",
+                    "error": "interview_reports_unavailable",
+                }
+                for it in ordered
+            ]
+    features_by_archivo = {str(f["archivo"]): f for f in features}
+    reported_archivos = {archivo for archivo, f in features_by_archivo.items() if f.get("has_report")}
 
     # 2) Señal de saturación (CDR en ventana reciente).
     recent_window = max(1, int(recent_window or 3))
     threshold = max(0, int(saturation_new_codes_threshold or 2))
 
-    new_codes_recent = 0
-    try:
-        with pg_conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT report_json
-                  FROM interview_reports
-                 WHERE project_id = %s
-                 ORDER BY fecha_analisis DESC
-                 LIMIT %s
-                """,
-                (project_id, recent_window),
-            )
-            rows = cur.fetchall()
-        for (report_json,) in rows:
-            try:
-                data = report_json if isinstance(report_json, dict) else json.loads(report_json)
-                new_codes_recent += int(data.get("codigos_nuevos") or 0)
-            except Exception:
-                continue
-    except Exception:
-        new_codes_recent = 0
+    recent_reports = sorted(
+        (f for f in features if f.get("has_report")),
+        key=lambda f: (f.get("fecha_analisis") is not None, f.get("fecha_analisis") or datetime.min),
+        reverse=True,
+    )[:recent_window]
+    new_codes_recent = sum(int(f.get("codigos_nuevos") or 0) for f in recent_reports)
 
     saturated = new_codes_recent < threshold
 
@@ -814,7 +870,7 @@ def _order_interviews_theoretical_sampling_with_debug(
     segment_analyzed_counts: Dict[Tuple[str, str], int] = {}
     for it in interviews:
         archivo = _archivo(it)
-        if archivo and archivo in reports_by_archivo:
+        if archivo and archivo in reported_archivos:
             key = _segment_key(it)
             segment_analyzed_counts[key] = segment_analyzed_counts.get(key, 0) + 1
 
@@ -856,7 +912,7 @@ def _order_interviews_theoretical_sampling_with_debug(
     debug_by_archivo: Dict[str, Dict[str, Any]] = {}
     for it in interviews:
         archivo = _archivo(it)
-        has_report = bool(archivo and archivo in reports_by_archivo)
+        has_report = bool(archivo and archivo in reported_archivos)
 
         debug_entry: Dict[str, Any] = {
             "archivo": archivo,
@@ -867,6 +923,7 @@ def _order_interviews_theoretical_sampling_with_debug(
             },
             "segment_analyzed_count": int(segment_analyzed_counts.get(_segment_key(it), 0)),
             "fragmentos": _fragmentos(it),
+            "codigos": int((features_by_archivo.get(archivo) or {}).get("codigos") or 0),
             "actualizado": it.get("actualizado"),
             "signals": {
                 "saturated": bool(saturated),
@@ -947,19 +1004,39 @@ def list_available_interviews_with_ranking_debug(
     recent_window: int = 3,
     saturation_new_codes_threshold: int = 2,
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    interviews = list_interviews_summary(clients.postgres, project or "default", limit=limit)
     normalized = (order or "").strip().lower()
     if normalized == "theoretical-sampling":
+        project_id = str(project or "default")
+        features: Optional[List[Dict[str, Any]]] = None
+        try:
+            features = load_interview_sampling_features(clients.postgres, project_id)
+        except Exception as exc:
+            _logger.warning("coding.sampling_features.unavailable", project=project_id, error=str(exc))
+            try:
+                clients.postgres.rollback()
+            except Exception:
+                pass
+        if features is not None:
+            # Mismo listado que list_interviews_summary, servido desde las features.
+            interviews = [
+                {key: f[key] for key in ("archivo", "fragmentos", "actor_principal", "area_tematica", "blob_url", "actualizado")}
+                for f in features
+                if f["fragmentos"] > 0
+            ][: max(limit, 1)]
+        else:
+            interviews = list_interviews_summary(clients.postgres, project_id, limit=limit)
         return _order_interviews_theoretical_sampling_with_debug(
             pg_conn=clients.postgres,
-            project_id=str(project or "default"),
+            project_id=project_id,
             interviews=interviews,
             include_analyzed=bool(include_analyzed),
             focus_codes=focus_codes,
             recent_window=int(recent_window or 3),
             saturation_new_codes_threshold=int(saturation_new_codes_threshold or 2),
+            features=features,
         )
 
+    interviews = list_interviews_summary(clients.postgres, project or "default", limit=limit)
     ordered = _order_interviews_summary(interviews, order=order)
     return ordered, []
 
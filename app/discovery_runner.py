@@ -4,13 +4,20 @@ MVP pensado para cerrar el flujo end-to-end:
 - Itera conceptos × entrevistas (fase per_interview) y luego fase global.
 - Ejecuta KNN en Qdrant por query de concepto (sin dependencias adicionales).
 - Calcula overlap simple (Jaccard) entre sets de fragmento_id por iteración.
-- Calcula landing_rate REAL contra códigos axiales (analisis_codigos_abiertos).
-- Persiste cada iteración en discovery_runs vía insert_discovery_run.
+- Calcula landing_rate REAL contra códigos axiales (analisis_codigos_abiertos),
+  en memoria sobre el índice de fragmentos codificados cargado una vez por run.
+- Persiste las iteraciones en discovery_runs al cerrar cada fase (un INSERT multi-fila por fase).
 
 Sprint 29 - Enero 2026
-- Conectado a calculate_landing_rate (validación axial real)
+- Conectado a landing rate real (validación axial)
 - Retry con backoff en embeddings/search
 - Límites configurables (max_interviews, iterations per interview)
+
+Ejecución concurrente:
+- Embeddings de todas las variantes de `_iter_patterns` en un solo lote.
+- Una búsqueda batch (`query_batch_points`) por concepto × entrevista con
+  `AsyncQdrantClient`, en paralelo bajo un semáforo.
+- Lecturas/escrituras en PG fuera del event loop (`asyncio.to_thread`).
 """
 
 from __future__ import annotations
@@ -19,14 +26,15 @@ import asyncio
 from typing import Dict, List, Optional, Sequence, Tuple, Any
 
 import structlog
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue, QueryRequest
 
 from .clients import ServiceClients
+from .embeddings import embed_batch
 from .postgres_block import (
-    insert_discovery_run,
+    fetch_project_fragment_codes,
+    insert_discovery_runs,
     list_interviews_summary,
-    calculate_landing_rate,  # NUEVO: Landing rate real
 )
 from .settings import AppSettings
 
@@ -45,10 +53,13 @@ DEFAULT_MAX_INTERVIEWS = 10
 DEFAULT_PER_INTERVIEW_ITERS = 4
 DEFAULT_GLOBAL_ITERS = 3
 
+# Búsquedas batch simultáneas contra Qdrant
+DEFAULT_SEARCH_CONCURRENCY = 8
+
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_BACKOFF_BASE = 1.5
-TIMEOUT_EMBEDDING = 30.0
+TIMEOUT_SEARCH = 30
 
 
 # ============================================================================
@@ -66,27 +77,75 @@ def _compute_overlap(prev_ids: List[str], current_ids: List[str]) -> float:
     return round(inter / union, 4) if union else 0.0
 
 
-async def _embed_query_with_retry(
+class LandingRateIndex:
+    """
+    Fragmentos codificados de un proyecto, cargados una vez por run.
+
+    Responde el landing rate de cada iteración en memoria, con la misma
+    forma que `calculate_landing_rate` de postgres_block.
+    """
+
+    def __init__(self, codes_by_fragment: Dict[str, List[str]], total_rows: int) -> None:
+        self.codes_by_fragment = codes_by_fragment
+        self.total_rows = total_rows
+
+    @classmethod
+    def load(cls, pg: Any, project: str) -> "LandingRateIndex":
+        codes, total_rows = fetch_project_fragment_codes(pg, project)
+        return cls(codes, total_rows)
+
+    def rate(self, fragment_ids: Sequence[str]) -> Dict[str, Any]:
+        if not fragment_ids:
+            return {
+                "landing_rate": 0.0,
+                "matched_count": 0,
+                "total_count": 0,
+                "matched_codes": [],
+                "reason": "no_fragments",
+            }
+        matched = {str(fid) for fid in fragment_ids if str(fid) in self.codes_by_fragment}
+        matched_codes = sorted({code for fid in matched for code in self.codes_by_fragment[fid]})
+        if self.total_rows == 0:
+            reason = "no_definitive_codes"
+        elif not matched:
+            reason = "no_overlap_with_definitive_codes"
+        else:
+            reason = "ok"
+        return {
+            "landing_rate": round(len(matched) / len(fragment_ids) * 100, 1),  # Porcentaje
+            "matched_count": len(matched),
+            "total_count": len(fragment_ids),
+            "matched_codes": matched_codes[:10],  # Top 10 códigos
+            "project_open_code_rows": self.total_rows,
+            "reason": reason,
+        }
+
+
+def _open_async_qdrant(settings: AppSettings) -> AsyncQdrantClient:
+    return AsyncQdrantClient(url=settings.qdrant.uri, api_key=settings.qdrant.api_key)
+
+
+async def _embed_queries_with_retry(
     clients: ServiceClients,
     settings: AppSettings,
-    text: str,
+    texts: Sequence[str],
     max_retries: int = MAX_RETRIES,
-) -> Tuple[bool, List[float]]:
+) -> Dict[str, List[float]]:
     """
-    Embedding con retry y manejo de errores.
-    
+    Embeddings de todos los textos distintos en una sola llamada (con retry).
+
     Returns:
-        (success, embedding_vector_or_empty)
+        Dict texto -> vector (vacío si el lote falla tras los reintentos)
     """
+    unique = list(dict.fromkeys(t for t in texts if t))
+    if not unique:
+        return {}
     for attempt in range(max_retries + 1):
         try:
-            response = clients.aoai.embeddings.create(
-                model=settings.azure.deployment_embed,
-                input=text,
-                timeout=TIMEOUT_EMBEDDING,
+            vectors = await asyncio.to_thread(
+                embed_batch, clients.aoai, settings.azure.deployment_embed, unique
             )
-            return (True, list(response.data[0].embedding))
-        
+            return {text: list(vec) for text, vec in zip(unique, vectors) if vec}
         except Exception as e:
             _logger.warning(
                 "discovery.embed.retry",
@@ -97,63 +156,210 @@ async def _embed_query_with_retry(
                 await asyncio.sleep(RETRY_BACKOFF_BASE * (2 ** attempt))
             else:
                 _logger.error("discovery.embed.failed", error=str(e))
-                return (False, [])
-    
-    return (False, [])
+    return {}
 
 
-async def _search_qdrant_with_retry(
-    client: QdrantClient,
+async def _search_batch_with_retry(
+    client: AsyncQdrantClient,
     collection: str,
-    vector: Sequence[float],
+    vectors: Sequence[Sequence[float]],
     project_id: str,
     archivo: Optional[str],
+    semaphore: asyncio.Semaphore,
     limit: int = DEFAULT_TOP_K,
     max_retries: int = MAX_RETRIES,
-) -> Tuple[bool, List[Tuple[str, float, Dict]]]:
+) -> Tuple[bool, List[List[Tuple[str, float, Dict]]]]:
     """
-    KNN en Qdrant con retry y manejo de errores.
+    KNN en Qdrant para varios vectores (mismo filtro) en una llamada batch.
     
     Returns:
-        (success, list_of_hits)
+        (success, hits por vector)
     """
+    if not vectors:
+        return (True, [])
     must: List[FieldCondition] = [FieldCondition(key="project_id", match=MatchValue(value=project_id))]
     if archivo:
         must.append(FieldCondition(key="archivo", match=MatchValue(value=archivo)))
     query_filter = Filter(must=must)  # type: ignore[arg-type]
-    
+    requests = [
+        QueryRequest(
+            query=list(vector),
+            filter=query_filter,
+            limit=limit,
+            score_threshold=SCORE_THRESHOLD,
+            with_payload=True,
+        )
+        for vector in vectors
+    ]
+
     for attempt in range(max_retries + 1):
         try:
-            results = client.search(
-                collection_name=collection,
-                query_vector=list(vector),
-                limit=limit,
-                score_threshold=SCORE_THRESHOLD,
-                query_filter=query_filter,
-                timeout=30,
-            )
-            parsed: List[Tuple[str, float, Dict]] = []
-            for hit in results:
-                frag_id = getattr(hit, "id", None)
-                payload = getattr(hit, "payload", {}) or {}
-                parsed.append((str(frag_id), float(hit.score or 0.0), payload))
+            async with semaphore:
+                responses = await client.query_batch_points(
+                    collection_name=collection,
+                    requests=requests,
+                    timeout=TIMEOUT_SEARCH,
+                )
+            parsed: List[List[Tuple[str, float, Dict]]] = []
+            for response in responses:
+                parsed.append(
+                    [
+                        (str(hit.id), float(hit.score or 0.0), hit.payload or {})
+                        for hit in response.points
+                    ]
+                )
             return (True, parsed)
         
         except Exception as e:
             _logger.warning(
                 "discovery.search.retry",
                 attempt=attempt,
+                archivo=archivo,
                 error=str(e),
             )
             if attempt < max_retries:
                 await asyncio.sleep(RETRY_BACKOFF_BASE * (2 ** attempt))
             else:
-                _logger.error("discovery.search.failed", error=str(e))
+                _logger.error("discovery.search.failed", archivo=archivo, error=str(e))
                 return (False, [])
     
     return (False, [])
 
 
+async def _search_scope(
+    client: AsyncQdrantClient,
+    settings: AppSettings,
+    *,
+    project_id: str,
+    concepto: str,
+    archivo: Optional[str],
+    iters: int,
+    vectors: Dict[str, List[float]],
+    semaphore: asyncio.Semaphore,
+    top_k: int,
+) -> List[Tuple[int, str, List[str], List[str], Optional[List[Tuple[str, float, Dict]]], Optional[str]]]:
+    """
+    Todas las iteraciones de un concepto en un scope (entrevista o global).
+
+    Returns:
+        Lista por iteración: (iter, query, positivos, negativos, hits|None, error|None)
+    """
+    patterns = [_iter_patterns(concepto, iter_idx) for iter_idx in range(iters)]
+    embedded = [idx for idx, (query_text, _, _) in enumerate(patterns) if query_text in vectors]
+    success, batches = await _search_batch_with_retry(
+        client,
+        settings.qdrant.collection,
+        [vectors[patterns[idx][0]] for idx in embedded],
+        project_id,
+        archivo,
+        semaphore,
+        limit=top_k,
+    )
+    hits_by_iter = dict(zip(embedded, batches)) if success else {}
+    label = archivo or "global"
+
+    outcome = []
+    for iter_idx, (query_text, pos, neg) in enumerate(patterns):
+        error = None
+        if iter_idx not in embedded:
+            error = f"Embedding failed: {concepto}/{label}/iter{iter_idx}"
+        elif not success:
+            error = f"Search failed: {concepto}/{label}/iter{iter_idx}"
+        outcome.append((iter_idx, query_text, pos, neg, hits_by_iter.get(iter_idx), error))
+    return outcome
+
+
+def _collect_phase_records(
+    *,
+    scope: str,
+    scopes: Sequence[Tuple[str, Optional[str], List[Any]]],
+    landing_index: Optional[LandingRateIndex],
+    best_fragments: Dict[str, Dict[str, Any]],
+    total_fragments_found: List[str],
+    errors: List[str],
+) -> List[Dict[str, Any]]:
+    """Overlap y landing rate por iteración (en orden) para una fase completa."""
+    records: List[Dict[str, Any]] = []
+    for concepto, archivo, outcome in scopes:
+        prev_ids: List[str] = []
+        for iter_idx, query_text, pos, neg, hits, error in outcome:
+            if error:
+                errors.append(error)
+                continue
+            hits = hits or []
+            frag_ids = [h[0] for h in hits]
+            total_fragments_found.extend(frag_ids)
+            # Acumular mejores fragmentos por score
+            for frag_id, score, payload in hits:
+                existing = best_fragments.get(frag_id)
+                if (existing is None) or (float(score) > float(existing.get("score", 0.0))):
+                    best_fragments[frag_id] = {
+                        "fragmento_id": str(frag_id),
+                        "score": float(score),
+                        "archivo": payload.get("archivo"),
+                        "fragmento": (payload.get("fragmento") or "")[:600],
+                    }
+            overlap = _compute_overlap(prev_ids, frag_ids)
+
+            # LANDING RATE REAL vs PROXY
+            if landing_index is not None and frag_ids:
+                lr_result = landing_index.rate(frag_ids)
+                landing_rate = lr_result["landing_rate"] / 100.0  # Normalizar a 0-1
+            else:
+                # Proxy: porcentaje de hits que ya aparecieron
+                prev_set = set(prev_ids)
+                hits_count = len([fid for fid in frag_ids if fid in prev_set])
+                landing_rate = round(hits_count / len(frag_ids), 4) if frag_ids else 0.0
+
+            prev_ids = frag_ids
+            label = archivo or "global"
+            records.append({
+                "concepto": concepto,
+                "scope": scope,
+                "iter_index": iter_idx,
+                "archivo": archivo,
+                "query": query_text,
+                "positivos": pos,
+                "negativos": neg,
+                "overlap": overlap,
+                "landing_rate": landing_rate,
+                "top_fragments": [
+                    {
+                        "fragmento_id": h[0],
+                        "score": h[1],
+                        "archivo": h[2].get("archivo"),
+                        "fragmento": (h[2].get("fragmento") or "")[:200],
+                    }
+                    for h in hits
+                ],
+                "memo": f"Iter {iter_idx} {concepto} {label} overlap={overlap:.2f} landing={landing_rate:.2f}",
+                "fragments_count": len(frag_ids),
+            })
+    return records
+
+
+async def _persist_records(
+    clients: ServiceClients,
+    project_id: str,
+    records: List[Dict[str, Any]],
+    runs: List[Dict[str, Any]],
+) -> None:
+    stored = await asyncio.to_thread(
+        insert_discovery_runs, clients.postgres, project=project_id, records=records
+    )
+    for record, row in zip(records, stored):
+        runs.append({
+            "id": row.get("id"),
+            "overlap": record["overlap"],
+            "landing_rate": record["landing_rate"],
+            "scope": record["scope"],
+            "concepto": record["concepto"],
+            "iter": record["iter_index"],
+            "archivo": record["archivo"],
+            "fragments_count": record["fragments_count"],
+        })
+
+
 def _iter_patterns(concepto: str, iter_index: int) -> Tuple[str, List[str], List[str]]:
     """Devuelve (query_text, positivos, negativos) según patrón de refinamiento."""
     if iter_index == 0:
@@ -180,6 +386,7 @@ async def run_discovery_iterations(
     global_iters: int = DEFAULT_GLOBAL_ITERS,
     top_k: int = DEFAULT_TOP_K,
     use_real_landing_rate: bool = True,  # NUEVO: usar validación axial real
+    max_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
 ) -> Dict[str, Any]:
     """
     Ejecuta discovery iterativo y persiste métricas en discovery_runs.
@@ -194,6 +401,7 @@ async def run_discovery_iterations(
         global_iters: Iteraciones globales
         top_k: Número de resultados por búsqueda
         use_real_landing_rate: Si True, calcula landing rate contra códigos axiales reales
+        max_concurrency: Búsquedas batch simultáneas contra Qdrant
     
     Returns:
         Dict con runs registrados, métricas, y errores
@@ -213,8 +421,9 @@ async def run_discovery_iterations(
         global_iters=global_iters,
     )
 
-    # Fase 1: por entrevista (respeta límite)
-    all_interviews = list_interviews_summary(clients.postgres, project_id, limit=200)
+    all_interviews = await asyncio.to_thread(
+        list_interviews_summary, clients.postgres, project_id, limit=200
+    )
     interviews = all_interviews[:max_interviews]  # Aplicar límite
     
     _logger.info(
@@ -222,191 +431,86 @@ async def run_discovery_iterations(
         total_available=len(all_interviews),
         processing=len(interviews),
     )
-    
-    for concepto in concepts:
-        for interview in interviews:
-            archivo = interview.get("archivo")
-            prev_ids: List[str] = []
-            
-            for iter_idx in range(per_interview_iters):
-                query_text, pos, neg = _iter_patterns(concepto, iter_idx)
-                
-                # Embedding con retry
-                embed_success, query_vec = await _embed_query_with_retry(
-                    clients, settings, query_text
-                )
-                if not embed_success:
-                    errors.append(f"Embedding failed: {concepto}/{archivo}/iter{iter_idx}")
-                    continue
-                
-                # Search con retry
-                search_success, hits = await _search_qdrant_with_retry(
-                    clients.qdrant,
-                    settings.qdrant.collection,
-                    query_vec,
-                    project_id,
-                    archivo,
-                    limit=top_k,
-                )
-                if not search_success:
-                    errors.append(f"Search failed: {concepto}/{archivo}/iter{iter_idx}")
-                    continue
-                
-                frag_ids = [h[0] for h in hits]
-                total_fragments_found.extend(frag_ids)
-                # Acumular mejores fragmentos por score
-                for frag_id, score, payload in hits:
-                    existing = best_fragments.get(frag_id)
-                    if (existing is None) or (float(score) > float(existing.get("score", 0.0))):
-                        best_fragments[frag_id] = {
-                            "fragmento_id": str(frag_id),
-                            "score": float(score),
-                            "archivo": payload.get("archivo"),
-                            "fragmento": (payload.get("fragmento") or "")[:600],
-                        }
-                overlap = _compute_overlap(prev_ids, frag_ids)
-                
-                # LANDING RATE REAL vs PROXY
-                if use_real_landing_rate and frag_ids:
-                    lr_result = calculate_landing_rate(
-                        clients.postgres, project_id, frag_ids
-                    )
-                    landing_rate = lr_result["landing_rate"] / 100.0  # Normalizar a 0-1
-                else:
-                    # Proxy: porcentaje de hits que ya aparecieron
-                    prev_set = set(prev_ids)
-                    hits_count = len([fid for fid in frag_ids if fid in prev_set])
-                    landing_rate = round(hits_count / len(frag_ids), 4) if frag_ids else 0.0
-                
-                prev_ids = frag_ids
-
-                record = insert_discovery_run(
-                    clients.postgres,
-                    project=project_id,
-                    concepto=concepto,
-                    scope="per_interview",
-                    iter_index=iter_idx,
-                    archivo=archivo,
-                    query=query_text,
-                    positivos=pos,
-                    negativos=neg,
-                    overlap=overlap,
-                    landing_rate=landing_rate,
-                    top_fragments=[
-                        {
-                            "fragmento_id": h[0],
-                            "score": h[1],
-                            "archivo": h[2].get("archivo"),
-                            "fragmento": (h[2].get("fragmento") or "")[:200],
-                        }
-                        for h in hits
-                    ],
-                    memo=f"Iter {iter_idx} {concepto} {archivo} overlap={overlap:.2f} landing={landing_rate:.2f}",
-                )
-                runs.append({
-                    "id": record.get("id"),
-                    "overlap": overlap,
-                    "landing_rate": landing_rate,
-                    "scope": "per_interview",
-                    "concepto": concepto,
-                    "iter": iter_idx,
-                    "archivo": archivo,
-                    "fragments_count": len(frag_ids),
-                })
-
-    # Fase 2: global
-    for concepto in concepts:
-        prev_ids: List[str] = []
-        for iter_idx in range(global_iters):
-            query_text, pos, neg = _iter_patterns(concepto, iter_idx)
-            
-            embed_success, query_vec = await _embed_query_with_retry(
-                clients, settings, query_text
-            )
-            if not embed_success:
-                errors.append(f"Embedding failed: {concepto}/global/iter{iter_idx}")
-                continue
-            
-            search_success, hits = await _search_qdrant_with_retry(
-                clients.qdrant,
-                settings.qdrant.collection,
-                query_vec,
-                project_id,
-                archivo=None,
-                limit=top_k,
+
+    # Embeddings de todas las variantes de query en un solo lote
+    max_iters = max(per_interview_iters, global_iters)
+    vectors = await _embed_queries_with_retry(
+        clients,
+        settings,
+        [_iter_patterns(concepto, i)[0] for concepto in concepts for i in range(max_iters)],
+    )
+
+    landing_index: Optional[LandingRateIndex] = None
+    if use_real_landing_rate:
+        landing_index = await asyncio.to_thread(LandingRateIndex.load, clients.postgres, project_id)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    qdrant = _open_async_qdrant(settings)
+    try:
+        # Fase 1: por entrevista (búsquedas concurrentes)
+        jobs = [
+            (concepto, interview.get("archivo"))
+            for concepto in concepts
+            for interview in interviews
+        ]
+        outcomes = await asyncio.gather(*[
+            _search_scope(
+                qdrant,
+                settings,
+                project_id=project_id,
+                concepto=concepto,
+                archivo=archivo,
+                iters=per_interview_iters,
+                vectors=vectors,
+                semaphore=semaphore,
+                top_k=top_k,
             )
-            if not search_success:
-                errors.append(f"Search failed: {concepto}/global/iter{iter_idx}")
-                continue
-            
-            frag_ids = [h[0] for h in hits]
-            total_fragments_found.extend(frag_ids)
-            for frag_id, score, payload in hits:
-                existing = best_fragments.get(frag_id)
-                if (existing is None) or (float(score) > float(existing.get("score", 0.0))):
-                    best_fragments[frag_id] = {
-                        "fragmento_id": str(frag_id),
-                        "score": float(score),
-                        "archivo": payload.get("archivo"),
-                        "fragmento": (payload.get("fragmento") or "")[:600],
-                    }
-            overlap = _compute_overlap(prev_ids, frag_ids)
-            
-            # LANDING RATE REAL
-            if use_real_landing_rate and frag_ids:
-                lr_result = calculate_landing_rate(
-                    clients.postgres, project_id, frag_ids
-                )
-                landing_rate = lr_result["landing_rate"] / 100.0
-            else:
-                prev_set = set(prev_ids)
-                hits_count = len([fid for fid in frag_ids if fid in prev_set])
-                landing_rate = round(hits_count / len(frag_ids), 4) if frag_ids else 0.0
-            
-            prev_ids = frag_ids
+            for concepto, archivo in jobs
+        ])
+        records = _collect_phase_records(
+            scope="per_interview",
+            scopes=[(c, a, o) for (c, a), o in zip(jobs, outcomes)],
+            landing_index=landing_index,
+            best_fragments=best_fragments,
+            total_fragments_found=total_fragments_found,
+            errors=errors,
+        )
+        # Cada fase se persiste al terminar (un INSERT multi-fila por fase): un
+        # fallo en la fase global no descarta las iteraciones por entrevista.
+        await _persist_records(clients, project_id, records, runs)
 
-            record = insert_discovery_run(
-                clients.postgres,
-                project=project_id,
+        # Fase 2: global
+        outcomes = await asyncio.gather(*[
+            _search_scope(
+                qdrant,
+                settings,
+                project_id=project_id,
                 concepto=concepto,
-                scope="global",
-                iter_index=iter_idx,
                 archivo=None,
-                query=query_text,
-                positivos=pos,
-                negativos=neg,
-                overlap=overlap,
-                landing_rate=landing_rate,
-                top_fragments=[
-                    {
-                        "fragmento_id": h[0],
-                        "score": h[1],
-                        "archivo": h[2].get("archivo"),
-                        "fragmento": (h[2].get("fragmento") or "")[:200],
-                    }
-                    for h in hits
-                ],
-                memo=f"Iter {iter_idx} {concepto} global overlap={overlap:.2f} landing={landing_rate:.2f}",
+                iters=global_iters,
+                vectors=vectors,
+                semaphore=semaphore,
+                top_k=top_k,
             )
-            runs.append({
-                "id": record.get("id"),
-                "overlap": overlap,
-                "landing_rate": landing_rate,
-                "scope": "global",
-                "concepto": concepto,
-                "iter": iter_idx,
-                "archivo": None,
-                "fragments_count": len(frag_ids),
-            })
-    
+            for concepto in concepts
+        ])
+        records = _collect_phase_records(
+            scope="global",
+            scopes=[(c, None, o) for c, o in zip(concepts, outcomes)],
+            landing_index=landing_index,
+            best_fragments=best_fragments,
+            total_fragments_found=total_fragments_found,
+            errors=errors,
+        )
+        await _persist_records(clients, project_id, records, runs)
+    finally:
+        await qdrant.close()
+
     # Calcular landing rate final sobre todos los fragmentos únicos
     unique_fragments = list(set(total_fragments_found))
     final_landing_rate = None
-    if use_real_landing_rate and unique_fragments:
-        lr_final = calculate_landing_rate(
-            clients.postgres, project_id, unique_fragments
-        )
-        final_landing_rate = lr_final
+    if landing_index is not None and unique_fragments:
+        final_landing_rate = landing_index.rate(unique_fragments)
     
     _logger.info(
         "discovery.complete",
@@ -429,6 +533,7 @@ async def run_discovery_iterations(
             "global_iters": global_iters,
             "top_k": top_k,
             "score_threshold": SCORE_THRESHOLD,
+            "max_concurrency": max_concurrency,
         },
         "sample_fragments": sorted(
             best_fragments.values(),
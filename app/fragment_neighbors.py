@@ -0,0 +1,285 @@
+"""
+Grafo k-NN materializado de fragmentos.
+
+Comparación constante, el runner de sugerencias y los outliers semánticos
+preguntan repetidamente "¿qué fragmentos son los más cercanos a X?" sobre
+embeddings que no cambian. Este módulo calcula una vez los top-K vecinos
+(similitud coseno) de cada fragmento y los guarda en `fragment_neighbors`,
+de modo que esas consultas se resuelven con una lectura indexada en PG.
+
+Funciones:
+    - exact_neighbors(): k-NN exacto en memoria (NumPy, por bloques)
+    - build_fragment_neighbors(): Reconstrucción completa del grafo de un proyecto
+    - update_fragment_neighbors(): Actualización incremental tras una ingesta
+    - nearest_fragments(): Vecinos filtrados servidos desde la tabla
+
+El pool de vecinos son los fragmentos no-entrevistador con embedding, igual
+que las búsquedas en Qdrant. Los filtros (archivo, speaker, codificados...)
+se aplican sobre la lista top-K almacenada; si tras filtrar quedan menos de
+los pedidos, `nearest_fragments()` devuelve None y el llamador recurre a
+Qdrant.
+
+Example:
+    >>> from app.fragment_neighbors import build_fragment_neighbors
+    >>> build_fragment_neighbors(clients, project="mi_proyecto", k=20)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+
+from .clients import ServiceClients
+from .postgres_block import (
+    fetch_fragment_neighbors,
+    fetch_neighbor_floor,
+    fetch_neighbor_lists,
+    fetch_neighbor_referrers,
+    fetch_project_fragment_embeddings,
+    has_fragment_neighbors,
+    replace_fragment_neighbors,
+)
+
+_logger = structlog.get_logger()
+
+# Vecinos almacenados por fragmento.
+DEFAULT_NEIGHBOR_K = 20
+# Filas de la matriz de similitud por bloque (acota memoria a block x N).
+_EXACT_BLOCK_SIZE = 512
+
+
+def coerce_embedding(value: Any) -> Optional[List[float]]:
+    """Normaliza un embedding leído de PG (lista, tupla o texto pgvector '[...]')."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        text = value.strip().strip("[]")
+        if not text:
+            return None
+        return [float(x) for x in text.split(",")]
+    try:
+        return [float(x) for x in value]
+    except TypeError:
+        return None
+
+
+def _normalized_matrix(items: Sequence[Dict[str, Any]]) -> Any:
+    import numpy as np
+
+    matrix = np.asarray([item["embedding"] for item in items], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def exact_neighbors(
+    queries: Sequence[Dict[str, Any]],
+    pool: Sequence[Dict[str, Any]],
+    *,
+    neighbor_k: int,
+    block_size: int = _EXACT_BLOCK_SIZE,
+) -> List[List[Dict[str, Any]]]:
+    """Vecinos exactos por similitud coseno en memoria (NumPy).
+
+    Cada elemento de `queries`/`pool` requiere `fragmento_id` y `embedding`.
+    El propio fragmento se excluye de sus vecinos. Procesa las consultas en
+    bloques de `block_size` filas para acotar la memoria.
+    """
+    import numpy as np
+
+    if not queries or not pool or neighbor_k <= 0:
+        return [[] for _ in queries]
+
+    query_matrix = _normalized_matrix(queries)
+    pool_matrix = _normalized_matrix(pool)
+    pool_ids = [str(item["fragmento_id"]) for item in pool]
+    pool_index = {fid: idx for idx, fid in enumerate(pool_ids)}
+    k = min(neighbor_k, len(pool))
+
+    results: List[List[Dict[str, Any]]] = []
+    for start in range(0, len(queries), max(1, block_size)):
+        block = query_matrix[start:start + block_size]
+        sims = block @ pool_matrix.T
+        for offset in range(block.shape[0]):
+            self_idx = pool_index.get(str(queries[start + offset]["fragmento_id"]))
+            if self_idx is not None:
+                sims[offset, self_idx] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        for offset in range(block.shape[0]):
+            row_idx = top[offset]
+            order = row_idx[np.argsort(-sims[offset, row_idx], kind="stable")]
+            results.append(
+                [
+                    {
+                        "fragmento_id": pool_ids[j],
+                        "score": float(sims[offset, j]),
+                        "archivo": pool[j].get("archivo"),
+                    }
+                    for j in order
+                    if np.isfinite(sims[offset, j])
+                ]
+            )
+    return results
+
+
+def _load_pool(clients: ServiceClients, project_id: str) -> List[Dict[str, Any]]:
+    pool: List[Dict[str, Any]] = []
+    for row in fetch_project_fragment_embeddings(clients.postgres, project=project_id):
+        row["embedding"] = coerce_embedding(row.get("embedding"))
+        if row["embedding"]:
+            pool.append(row)
+    return pool
+
+
+def build_fragment_neighbors(
+    clients: ServiceClients,
+    project: Optional[str] = None,
+    *,
+    k: int = DEFAULT_NEIGHBOR_K,
+    logger: Optional[structlog.BoundLogger] = None,
+) -> Dict[str, Any]:
+    """Recalcula y reemplaza el grafo k-NN completo del proyecto."""
+    log = logger or _logger
+    project_id = project or "default"
+    pool = _load_pool(clients, project_id)
+    lists = exact_neighbors(pool, pool, neighbor_k=k)
+    neighbors = {
+        str(row["fragmento_id"]): [(n["fragmento_id"], n["score"]) for n in items]
+        for row, items in zip(pool, lists)
+    }
+    stored = replace_fragment_neighbors(clients.postgres, project_id, neighbors, full_rebuild=True)
+    log.info("fragment_neighbors.build", project_id=project_id, fragments=len(pool), k=k, rows=stored)
+    return {"project_id": project_id, "fragmentos": len(pool), "k": k, "filas": stored}
+
+
+def update_fragment_neighbors(
+    clients: ServiceClients,
+    project: Optional[str],
+    fragment_ids: Sequence[str],
+    *,
+    k: int = DEFAULT_NEIGHBOR_K,
+    logger: Optional[structlog.BoundLogger] = None,
+) -> Dict[str, Any]:
+    """Incorpora fragmentos nuevos/re-ingestados al grafo k-NN existente.
+
+    - Calcula la lista completa de los fragmentos nuevos contra todo el pool.
+    - Para los fragmentos existentes sólo reescribe las listas donde algún
+      fragmento nuevo supera el score mínimo almacenado (o la lista está
+      incompleta), fusionando y recortando a `k`.
+    - Las listas que ya referencian un fragmento re-ingestado se recalculan
+      completas: su score anterior ya no vale y, si bajó, otro fragmento
+      fuera de la lista puede ocupar su lugar.
+    """
+    import numpy as np
+
+    log = logger or _logger
+    project_id = project or "default"
+    wanted = {str(fid) for fid in fragment_ids if fid}
+    pool = _load_pool(clients, project_id)
+    new_rows = [row for row in pool if str(row["fragmento_id"]) in wanted]
+    if not new_rows:
+        return {"project_id": project_id, "nuevos": 0, "actualizados": 0}
+
+    updates: Dict[str, List[Tuple[str, float]]] = {}
+    for row, items in zip(new_rows, exact_neighbors(new_rows, pool, neighbor_k=k)):
+        updates[str(row["fragmento_id"])] = [(n["fragmento_id"], n["score"]) for n in items]
+
+    # Columnas = fragmentos existentes; filas = fragmentos nuevos.
+    pool_ids = [str(row["fragmento_id"]) for row in pool]
+    new_ids = [str(row["fragmento_id"]) for row in new_rows]
+    sims = _normalized_matrix(new_rows) @ _normalized_matrix(pool).T
+    best = sims.max(axis=0)
+    floor = fetch_neighbor_floor(clients.postgres, project_id)
+    # Fragmentos sin lista previa (nunca materializados) o que referencian un
+    # fragmento re-ingestado: lista completa exacta.
+    referrers = fetch_neighbor_referrers(clients.postgres, project_id, sorted(wanted))
+    missing = [
+        row
+        for row in pool
+        if str(row["fragmento_id"]) not in wanted
+        and (str(row["fragmento_id"]) not in floor or str(row["fragmento_id"]) in referrers)
+    ]
+    for row, items in zip(missing, exact_neighbors(missing, pool, neighbor_k=k)):
+        updates[str(row["fragmento_id"])] = [(n["fragmento_id"], n["score"]) for n in items]
+
+    affected = [
+        j
+        for j, fid in enumerate(pool_ids)
+        if fid not in wanted
+        and fid in floor
+        and fid not in referrers
+        and (floor[fid][0] < k or best[j] > floor[fid][1])
+    ]
+    current = fetch_neighbor_lists(clients.postgres, project_id, [pool_ids[j] for j in affected])
+    for j in affected:
+        fid = pool_ids[j]
+        merged = {
+            n["fragmento_id"]: n["score"]
+            for n in current.get(fid, [])
+            if n["fragmento_id"] not in wanted
+        }
+        for i in np.nonzero(np.isfinite(sims[:, j]))[0]:
+            merged[new_ids[i]] = float(sims[i, j])
+        ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:k]
+        updates[fid] = ranked
+
+    replace_fragment_neighbors(clients.postgres, project_id, updates)
+    log.info(
+        "fragment_neighbors.update",
+        project_id=project_id,
+        new=len(new_rows),
+        updated=len(affected) + len(missing),
+        k=k,
+    )
+    return {"project_id": project_id, "nuevos": len(new_rows), "actualizados": len(affected) + len(missing)}
+
+
+def refresh_neighbors_after_ingest(
+    clients: ServiceClients,
+    project: Optional[str],
+    fragment_ids: Sequence[str],
+    logger: Optional[structlog.BoundLogger] = None,
+) -> None:
+    """Hook best-effort de ingesta: sólo actúa si el proyecto ya tiene grafo materializado."""
+    log = logger or _logger
+    try:
+        if fragment_ids and has_fragment_neighbors(clients.postgres, project):
+            update_fragment_neighbors(clients, project, fragment_ids, logger=log)
+    except Exception as exc:
+        log.warning("fragment_neighbors.update_failed", project_id=project, error=str(exc))
+
+
+def nearest_fragments(
+    clients: ServiceClients,
+    project: Optional[str],
+    fragment_id: str,
+    *,
+    top_k: int,
+    filters: Optional[Dict[str, Any]] = None,
+    exclude_coded: bool = False,
+) -> Optional[List[Dict[str, Any]]]:
+    """Top-k vecinos filtrados desde la tabla, o None si no alcanzan `top_k`.
+
+    None significa "no materializado o insuficiente tras filtrar": el
+    llamador debe recurrir a la búsqueda vectorial.
+    """
+    try:
+        rows = fetch_fragment_neighbors(
+            clients.postgres,
+            project,
+            fragment_id,
+            limit=top_k,
+            filters=filters,
+            exclude_coded=exclude_coded,
+        )
+    except Exception as exc:
+        _logger.warning("fragment_neighbors.read_failed", project_id=project, error=str(exc))
+        try:
+            clients.postgres.rollback()
+        except Exception:
+            pass
+        return None
+    if len(rows) < top_k:
+        return None
+    return rows
@@ -21,17 +21,40 @@ Uso:
     # Ejecutar algoritmos
     louvain_result = ga.louvain(project_id="mi_proyecto")
     pagerank_result = ga.pagerank(project_id="mi_proyecto", persist=True)
+
+    # Varias métricas sobre una sola extracción del grafo
+    metrics = ga.run_many("mi_proyecto", algorithms=["pagerank", "louvain", "betweenness"])
+
+Las implementaciones NetworkX comparten un snapshot en memoria del grafo
+(`GraphSnapshot`), cacheado por proyecto y por el sello `graph_versions` de
+PostgreSQL, que los triggers incrementan en cada escritura axial, de
+codificación abierta o de fusión de códigos. Louvain/Leiden recuerdan la
+última partición de cada proyecto para conservar los ids de comunidad y, en
+Leiden, arrancar en caliente desde ella.
 """
 
 from __future__ import annotations
 
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 import structlog
 
 import networkx as nx
+import numpy as np
 from networkx.algorithms.community import louvain_communities
 
+try:
+    from scipy import sparse as sp_sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 _logger = structlog.get_logger(__name__)
 
 
@@ -47,6 +70,450 @@ class GraphAlgorithmError(Exception):
     pass
 
 
+# Snapshots cacheados por proceso (LRU) y antigüedad máxima: acota el desfase
+# con escrituras que sólo llegan a Neo4j y no pasan por los triggers de PG.
+_SNAPSHOT_CACHE_SIZE = 16
+_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_MAX_AGE_SECONDS", "600"))
+
+# Betweenness aproximada: error absoluto objetivo (scores normalizados), nivel
+# de confianza (1 - delta) y pivotes por lote de BFS vectorizado.
+DEFAULT_BETWEENNESS_EPSILON = 0.05
+DEFAULT_BETWEENNESS_DELTA = 0.1
+_BETWEENNESS_BATCH = 64
+
+# Comunidades en el motor Python: semilla fija (resultados reproducibles) y
+# particiones previas por proyecto para arrancar en caliente y conservar ids.
+DEFAULT_COMMUNITY_SEED = 42
+_PARTITION_CACHE_SIZE = 64
+
+# Escritura de métricas por clave: filas por UNWIND y etiquetas que se
+# pueden interpolar en Cypher (las etiquetas no admiten parámetros).
+_METRIC_WRITE_CHUNK = 1000
+_CYPHER_LABEL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Algoritmos admitidos por `run_many` (los que leen el grafo del proyecto).
+RUN_MANY_ALGORITHMS = ("pagerank", "louvain", "leiden", "betweenness", "eigenvector", "degree")
+
+
+class GraphSnapshot:
+    """
+    Grafo de un proyecto extraído una vez y compartido entre algoritmos.
+
+    Guarda el DiGraph de NetworkX (sólo lectura) y una adyacencia CSR compacta
+    de salida (`indptr`, `indices`, `weights`) con arrays paralelos de
+    propiedades (`node_ids`, `names`, `labels`) en el orden de nodos del grafo.
+    El peso de una arista es su atributo `count` (co-ocurrencias; 1 si falta).
+    """
+
+    def __init__(
+        self,
+        graph: nx.DiGraph,
+        node_props: Dict[str, Dict],
+        *,
+        project_id: str,
+        version: Optional[int],
+    ):
+        self.graph = graph
+        self.node_props = node_props
+        self.project_id = project_id
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self.node_ids: List[str] = list(graph.nodes())
+        self.index: Dict[str, int] = {nid: i for i, nid in enumerate(self.node_ids)}
+        self.names: List[Optional[str]] = [node_props.get(nid, {}).get("nombre") for nid in self.node_ids]
+        self.labels: List[List[str]] = [list(node_props.get(nid, {}).get("etiquetas") or []) for nid in self.node_ids]
+
+        n = len(self.node_ids)
+        m = graph.number_of_edges()
+        edges = np.fromiter(
+            (i for u, v in graph.edges() for i in (self.index[u], self.index[v])),
+            dtype=np.int64,
+            count=2 * m,
+        ).reshape(-1, 2)
+        weights = np.fromiter(
+            (float(data.get("count", 1.0)) for _, _, data in graph.edges(data=True)),
+            dtype=np.float64,
+            count=m,
+        )
+        order = np.lexsort((edges[:, 1], edges[:, 0]))
+        edges = edges[order]
+        self.indices = edges[:, 1].astype(np.int32)
+        self.weights = weights[order]
+        self.indptr = np.searchsorted(edges[:, 0], np.arange(n + 1)).astype(np.int64)
+        self._transposed: Dict[bool, Any] = {}
+        self._forward: Optional[Any] = None
+        self._node_keys: Optional[List[str]] = None
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.indices.shape[0])
+
+    def out_degree(self) -> np.ndarray:
+        """Grado de salida por índice de nodo."""
+        return np.diff(self.indptr)
+
+    def sources(self) -> np.ndarray:
+        """Nodo de origen de cada arista (paralelo a `indices`)."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), self.out_degree())
+
+    def propagate(self, values: np.ndarray, weighted: bool = False) -> np.ndarray:
+        """Producto A^T·values: cada nodo suma `values` de sus predecesores.
+
+        Usa una matriz `scipy.sparse` (construida una vez por snapshot) y, sin
+        SciPy, un `bincount` sobre el CSR. `values` puede ser (n,) o (n, b).
+        """
+        if values.ndim == 2 and not SCIPY_AVAILABLE:
+            return np.column_stack(
+                [self.propagate(values[:, j], weighted) for j in range(values.shape[1])]
+            ).reshape(self.num_nodes, values.shape[1])
+        if SCIPY_AVAILABLE:
+            matrix = self._transposed.get(weighted)
+            if matrix is None:
+                data = self.weights if weighted else np.ones(self.num_edges, dtype=np.float64)
+                matrix = sp_sparse.csr_matrix(
+                    (data, self.indices, self.indptr),
+                    shape=(self.num_nodes, self.num_nodes),
+                ).T.tocsr()
+                self._transposed[weighted] = matrix
+            return matrix @ values
+        contrib = np.repeat(values, self.out_degree())
+        if weighted:
+            contrib = contrib * self.weights
+        return np.bincount(self.indices, weights=contrib, minlength=self.num_nodes)
+
+    def gather(self, values: np.ndarray) -> np.ndarray:
+        """Producto A·values (sin pesos): cada nodo suma `values` de sus sucesores."""
+        if SCIPY_AVAILABLE:
+            if self._forward is None:
+                self._forward = sp_sparse.csr_matrix(
+                    (np.ones(self.num_edges, dtype=np.float64), self.indices, self.indptr),
+                    shape=(self.num_nodes, self.num_nodes),
+                )
+            return self._forward @ values
+        contrib = values[self.indices]
+        cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(contrib, axis=0)])
+        return cumulative[self.indptr[1:]] - cumulative[self.indptr[:-1]]
+
+    @property
+    def node_keys(self) -> List[str]:
+        """Claves estables "Etiqueta|nombre" (los ids de nodo cambian entre extracciones PG)."""
+        if self._node_keys is None:
+            self._node_keys = [
+                f"{labels[0] if labels else ''}|{name or nid}"
+                for nid, name, labels in zip(self.node_ids, self.names, self.labels)
+            ]
+        return self._node_keys
+
+    def undirected_edges(self) -> np.ndarray:
+        """Aristas (origen, destino) por índice como array (m, 2), para igraph."""
+        return np.column_stack((self.sources(), self.indices.astype(np.int64)))
+
+    def is_fresh(self, version: Optional[int]) -> bool:
+        """Vigente si el sello coincide y no superó la antigüedad máxima."""
+        return (
+            version is not None
+            and self.version == version
+            and time.monotonic() - self.built_at < _SNAPSHOT_MAX_AGE_SECONDS
+        )
+
+
+def sparse_pagerank(
+    snapshot: GraphSnapshot,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1.0e-6,
+    weighted: bool = False,
+    personalization: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, bool]:
+    """
+    PageRank por iteración de potencias vectorizada sobre el snapshot.
+
+    Misma formulación que `nx.pagerank`: la masa de los nodos colgantes se
+    reparte según el vector de personalización (uniforme si no se indica) y
+    el criterio de convergencia es sum|x - x_prev| < N·tol.
+
+    Returns:
+        (scores por índice de nodo, convergió)
+    """
+    n = snapshot.num_nodes
+    if n == 0:
+        return np.zeros(0), True
+    if weighted:
+        out_weight = np.bincount(snapshot.sources(), weights=snapshot.weights, minlength=n)
+    else:
+        out_weight = snapshot.out_degree().astype(np.float64)
+    dangling = out_weight == 0
+    inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+
+    p = np.full(n, 1.0 / n)
+    if personalization is not None:
+        total = float(np.sum(personalization))
+        if total > 0:
+            p = np.asarray(personalization, dtype=np.float64) / total
+
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_prev = x
+        x = alpha * (snapshot.propagate(x_prev * inv_out, weighted) + x_prev[dangling].sum() * p) + (1.0 - alpha) * p
+        if np.abs(x - x_prev).sum() < n * tol:
+            return x, True
+    return x, False
+
+
+def sparse_eigenvector(
+    snapshot: GraphSnapshot,
+    max_iter: int = 100,
+    tol: float = 1.0e-6,
+    weighted: bool = False,
+) -> Tuple[np.ndarray, bool]:
+    """
+    Centralidad de vector propio (de entrada) como en `nx.eigenvector_centrality`.
+
+    Itera con (A + I)^T y normaliza en L2; converge cuando
+    sum|x - x_prev| < N·tol.
+
+    Returns:
+        (scores por índice de nodo, convergió)
+    """
+    n = snapshot.num_nodes
+    if n == 0:
+        return np.zeros(0), True
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        x_prev = x
+        x = x_prev + snapshot.propagate(x_prev, weighted)
+        norm = float(np.linalg.norm(x)) or 1.0
+        x = x / norm
+        if np.abs(x - x_prev).sum() < n * tol:
+            return x, True
+    return x, False
+
+
+def betweenness_sample_size(num_nodes: int, epsilon: float, delta: float) -> int:
+    """Pivotes para error <= epsilon en todos los nodos con prob. >= 1 - delta.
+
+    Cota de Hoeffding + unión sobre los N nodos: la contribución escalada de
+    cada pivote al score normalizado está acotada en [0, ~1].
+    """
+    if num_nodes <= 0:
+        return 0
+    if epsilon <= 0:
+        return num_nodes
+    k = math.ceil(math.log(2.0 * num_nodes / delta) / (2.0 * epsilon * epsilon))
+    return max(1, min(num_nodes, k))
+
+
+def _brandes_dependencies(snapshot: GraphSnapshot, sources: np.ndarray) -> np.ndarray:
+    """Suma de dependencias de Brandes desde un lote de fuentes (BFS por niveles).
+
+    Cada columna es una fuente: el conteo de caminos mínimos avanza con A^T
+    y la acumulación de dependencias retrocede con A, un producto disperso
+    por nivel para todo el lote.
+    """
+    n, b = snapshot.num_nodes, len(sources)
+    cols = np.arange(b)
+    sigma = np.zeros((n, b))
+    sigma[sources, cols] = 1.0
+    dist = np.full((n, b), -1, dtype=np.int32)
+    dist[sources, cols] = 0
+    frontier = sigma.copy()
+    depth = 0
+    while True:
+        reach = snapshot.propagate(frontier)
+        new = (reach > 0) & (dist < 0)
+        if not new.any():
+            break
+        depth += 1
+        dist[new] = depth
+        sigma[new] = reach[new]
+        frontier = np.where(new, reach, 0.0)
+
+    dependency = np.zeros((n, b))
+    safe_sigma = np.where(sigma > 0, sigma, 1.0)
+    for level in range(depth, 0, -1):
+        coef = np.where(dist == level, (1.0 + dependency) / safe_sigma, 0.0)
+        dependency += np.where(dist == level - 1, sigma * snapshot.gather(coef), 0.0)
+    dependency[sources, cols] = 0.0
+    return dependency.sum(axis=1)
+
+
+def approximate_betweenness(
+    snapshot: GraphSnapshot,
+    epsilon: float = DEFAULT_BETWEENNESS_EPSILON,
+    delta: float = DEFAULT_BETWEENNESS_DELTA,
+    time_budget: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Betweenness normalizada (dirigida) por muestreo de pivotes.
+
+    Con `betweenness_sample_size` pivotes (todos los nodos en grafos chicos,
+    resultado exacto igual a `nx.betweenness_centrality`) y escalado N/k. Con
+    `time_budget` (segundos) se detiene entre lotes al agotarlo y reporta la
+    cota de error efectivamente alcanzada.
+
+    Returns:
+        (scores por índice de nodo, info de muestreo)
+    """
+    n = snapshot.num_nodes
+    info: Dict[str, Any] = {"nodes": n, "epsilon": epsilon, "delta": delta}
+    if n < 3:
+        info.update(sample_size=n, target_sample_size=n, exact=True, error_bound=0.0, budget_exhausted=False)
+        return np.zeros(n), info
+
+    target = betweenness_sample_size(n, epsilon, delta)
+    pivots = np.random.default_rng(seed).permutation(n)[:target]
+    started = time.monotonic()
+    total = np.zeros(n)
+    processed = 0
+    for start in range(0, target, _BETWEENNESS_BATCH):
+        if time_budget is not None and processed and time.monotonic() - started >= time_budget:
+            break
+        batch = pivots[start:start + _BETWEENNESS_BATCH]
+        total += _brandes_dependencies(snapshot, batch)
+        processed += len(batch)
+
+    exact = processed == n
+    scores = total * (n / processed) / ((n - 1) * (n - 2))
+    info.update(
+        sample_size=processed,
+        target_sample_size=target,
+        exact=exact,
+        error_bound=0.0 if exact else math.sqrt(math.log(2.0 * n / delta) / (2.0 * processed)),
+        budget_exhausted=processed < target,
+        elapsed_seconds=round(time.monotonic() - started, 3),
+    )
+    return scores, info
+
+
+def degree_metrics(snapshot: GraphSnapshot) -> Dict[str, np.ndarray]:
+    """Grados de entrada/salida, simples y ponderados, por índice de nodo."""
+    n = snapshot.num_nodes
+    return {
+        "in_degree": np.bincount(snapshot.indices, minlength=n),
+        "out_degree": snapshot.out_degree(),
+        "weighted_in_degree": np.bincount(snapshot.indices, weights=snapshot.weights, minlength=n),
+        "weighted_out_degree": np.bincount(snapshot.sources(), weights=snapshot.weights, minlength=n),
+    }
+
+
+class CommunityPartition:
+    """Última partición de un proyecto: comunidad por clave de nodo y parámetros."""
+
+    def __init__(
+        self,
+        membership: Dict[str, int],
+        *,
+        version: Optional[int],
+        resolution: float,
+        seed: Optional[int],
+    ):
+        self.membership = membership
+        self.version = version
+        self.resolution = resolution
+        self.seed = seed
+
+    def reusable_for(self, snapshot: GraphSnapshot, resolution: float, seed: Optional[int]) -> bool:
+        """Misma versión del grafo y mismos parámetros: se puede servir tal cual."""
+        return (
+            self.version is not None
+            and self.version == snapshot.version
+            and self.resolution == resolution
+            and self.seed == seed
+            and all(key in self.membership for key in snapshot.node_keys)
+        )
+
+
+def initial_membership(keys: Sequence[str], previous: Dict[str, int]) -> List[int]:
+    """Membresía inicial 0..k-1: comunidad previa si el nodo existía, singleton si es nuevo."""
+    compact: Dict[Any, int] = {}
+    membership = []
+    for i, key in enumerate(keys):
+        label = ("prev", previous[key]) if key in previous else ("new", i)
+        membership.append(compact.setdefault(label, len(compact)))
+    return membership
+
+
+def stable_community_ids(
+    keys: Sequence[str],
+    membership: Sequence[int],
+    previous: Optional[Dict[str, int]],
+) -> List[int]:
+    """
+    Renumera `membership` para conservar los ids de la partición previa.
+
+    Cada comunidad hereda el id previo con el que comparte más nodos
+    (emparejamiento voraz por solapamiento); las demás reciben ids nuevos por
+    encima del máximo previo. Sin partición previa se devuelve tal cual.
+    """
+    if not previous:
+        return [int(c) for c in membership]
+    overlap: Dict[Tuple[int, int], int] = {}
+    for key, community in zip(keys, membership):
+        if key in previous:
+            pair = (int(community), previous[key])
+            overlap[pair] = overlap.get(pair, 0) + 1
+
+    mapping: Dict[int, int] = {}
+    used = set()
+    for (community, old_id), _ in sorted(overlap.items(), key=lambda item: (-item[1], item[0])):
+        if community not in mapping and old_id not in used:
+            mapping[community] = old_id
+            used.add(old_id)
+    next_id = max(previous.values()) + 1
+    for community in membership:
+        community = int(community)
+        if community not in mapping:
+            mapping[community] = next_id
+            next_id += 1
+    return [mapping[int(c)] for c in membership]
+
+
+_partition_cache: "OrderedDict[Tuple[str, str], CommunityPartition]" = OrderedDict()
+_partition_cache_lock = threading.Lock()
+
+
+def _cached_partition(project_id: str, algorithm: str) -> Optional[CommunityPartition]:
+    with _partition_cache_lock:
+        return _partition_cache.get((project_id, algorithm))
+
+
+def _remember_partition(project_id: str, algorithm: str, partition: CommunityPartition) -> None:
+    with _partition_cache_lock:
+        _partition_cache[(project_id, algorithm)] = partition
+        _partition_cache.move_to_end((project_id, algorithm))
+        while len(_partition_cache) > _PARTITION_CACHE_SIZE:
+            _partition_cache.popitem(last=False)
+
+
+def forget_community_partitions(project_id: Optional[str] = None) -> None:
+    """Descarta las particiones previas (de un proyecto o todas): el siguiente cálculo es en frío."""
+    with _partition_cache_lock:
+        if project_id is None:
+            _partition_cache.clear()
+        else:
+            for key in [k for k in _partition_cache if k[0] == project_id]:
+                _partition_cache.pop(key, None)
+
+
+_snapshot_cache: "OrderedDict[str, GraphSnapshot]" = OrderedDict()
+_snapshot_cache_lock = threading.Lock()
+
+
+def invalidate_graph_snapshots(project_id: Optional[str] = None) -> None:
+    """Descarta los snapshots cacheados (de un proyecto o todos)."""
+    with _snapshot_cache_lock:
+        if project_id is None:
+            _snapshot_cache.clear()
+        else:
+            _snapshot_cache.pop(project_id, None)
+
+
 class GraphAlgorithms:
     """
     Wrapper unificado para algoritmos de grafos con fallback automático.
@@ -66,6 +533,12 @@ class GraphAlgorithms:
         """
         self.clients = clients
         self.settings = settings
+        # Snapshots fijados durante `run_many` (aunque no sean cacheables).
+        self._pinned_snapshots: Dict[str, Optional[GraphSnapshot]] = {}
+        # Detalle de la última ejecución en el motor Python, por algoritmo.
+        self.last_run_info: Dict[str, Dict[str, Any]] = {}
+        # Métricas a persistir acumuladas durante `run_many` (una sola escritura).
+        self._metric_buffers: Dict[str, Dict[str, Dict[str, List[Tuple[str, str, Any]]]]] = {}
         self._engine = force_engine or self._detect_engine()
         _logger.info("graph_algorithms.initialized", engine=self._engine.value)
 
@@ -111,21 +584,36 @@ class GraphAlgorithms:
     def louvain(
         self, 
         project_id: str, 
-        persist: bool = False
+        persist: bool = False,
+        resolution: float = 1.0,
+        seed: Optional[int] = DEFAULT_COMMUNITY_SEED,
+        warm_start: bool = True,
     ) -> List[Dict[str, Any]]:
         """
         Detecta comunidades usando algoritmo Louvain.
+
+        En el motor Python los ids de comunidad se alinean con la partición
+        previa del proyecto, y si el grafo no cambió se reutiliza tal cual.
         
         Args:
             project_id: ID del proyecto para aislamiento
             persist: Si True, guarda community_id en los nodos
+            resolution: Resolución de la modularidad (motor Python; >1 = comunidades más chicas)
+            seed: Semilla del motor Python (None = aleatoria)
+            warm_start: Si False, ignora la partición previa del proyecto
             
         Returns:
             Lista de {nombre, etiquetas, community_id}
         """
+        python_kwargs = {"resolution": resolution, "seed": seed, "warm_start": warm_start}
         if self._engine == GraphEngine.NEO4J_GDS:
             try:
-                return self._louvain_neo4j(project_id, persist)
+                return self._mirrored(
+                    project_id,
+                    "community_id",
+                    self._louvain_neo4j(project_id, persist),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -135,11 +623,16 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                # Persist is not safe in fallback because NetworkX node IDs are not Neo4j IDs.
-                return self._louvain_networkx(project_id, persist=False)
+                # La persistencia del fallback es por (project_id, label, nombre), no por id(n).
+                return self._louvain_networkx(project_id, persist=persist, **python_kwargs)
         elif self._engine == GraphEngine.MEMGRAPH_MAGE:
             try:
-                return self._louvain_memgraph(project_id, persist)
+                return self._mirrored(
+                    project_id,
+                    "community_id",
+                    self._louvain_memgraph(project_id, persist),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -149,9 +642,9 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                return self._louvain_networkx(project_id, persist=False)
+                return self._louvain_networkx(project_id, persist=persist, **python_kwargs)
         else:
-            return self._louvain_networkx(project_id, persist)
+            return self._louvain_networkx(project_id, persist, **python_kwargs)
 
     def pagerank(
         self, 
@@ -159,6 +652,8 @@ class GraphAlgorithms:
         persist: bool = False,
         damping_factor: float = 0.85,
         max_iterations: int = 20,
+        weighted: bool = False,
+        personalization: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Calcula PageRank de nodos.
@@ -168,13 +663,30 @@ class GraphAlgorithms:
             persist: Si True, guarda score_centralidad en los nodos
             damping_factor: Factor de damping (default 0.85)
             max_iterations: Máximo de iteraciones
+            weighted: Ponderar aristas por co-ocurrencias (sólo motor Python)
+            personalization: {nombre: peso} para PageRank personalizado (sólo motor Python)
             
         Returns:
             Lista de {nombre, etiquetas, score} ordenada por score DESC
         """
+        if weighted or personalization:
+            # GDS/MAGE se invocan sin pesos ni personalización: se calcula en Python.
+            return self._pagerank_networkx(
+                project_id,
+                persist=persist,
+                damping_factor=damping_factor,
+                max_iterations=max_iterations,
+                weighted=weighted,
+                personalization=personalization,
+            )
         if self._engine == GraphEngine.NEO4J_GDS:
             try:
-                return self._pagerank_neo4j(project_id, persist, damping_factor, max_iterations)
+                return self._mirrored(
+                    project_id,
+                    "score_centralidad",
+                    self._pagerank_neo4j(project_id, persist, damping_factor, max_iterations),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -184,10 +696,15 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                return self._pagerank_networkx(project_id, persist=False, damping_factor=damping_factor, max_iterations=max_iterations)
+                return self._pagerank_networkx(project_id, persist=persist, damping_factor=damping_factor, max_iterations=max_iterations)
         elif self._engine == GraphEngine.MEMGRAPH_MAGE:
             try:
-                return self._pagerank_memgraph(project_id, persist, damping_factor, max_iterations)
+                return self._mirrored(
+                    project_id,
+                    "score_centralidad",
+                    self._pagerank_memgraph(project_id, persist, damping_factor, max_iterations),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -197,28 +714,42 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                return self._pagerank_networkx(project_id, persist=False, damping_factor=damping_factor, max_iterations=max_iterations)
+                return self._pagerank_networkx(project_id, persist=persist, damping_factor=damping_factor, max_iterations=max_iterations)
         else:
             return self._pagerank_networkx(project_id, persist, damping_factor, max_iterations)
 
     def betweenness(
         self, 
         project_id: str, 
-        persist: bool = False
+        persist: bool = False,
+        epsilon: float = DEFAULT_BETWEENNESS_EPSILON,
+        time_budget: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         Calcula Betweenness Centrality de nodos.
+
+        En el motor Python es aproximada por muestreo de pivotes (exacta en
+        grafos chicos); el detalle del muestreo queda en
+        `last_run_info["betweenness"]`.
         
         Args:
             project_id: ID del proyecto para aislamiento
             persist: Si True, guarda score_intermediacion en los nodos
+            epsilon: Error absoluto objetivo del motor Python (0 = exacta)
+            time_budget: Segundos máximos del motor Python (None = sin límite)
             
         Returns:
             Lista de {nombre, etiquetas, score} ordenada por score DESC
         """
+        python_kwargs = {"epsilon": epsilon, "time_budget": time_budget}
         if self._engine == GraphEngine.NEO4J_GDS:
             try:
-                return self._betweenness_neo4j(project_id, persist)
+                return self._mirrored(
+                    project_id,
+                    "score_intermediacion",
+                    self._betweenness_neo4j(project_id, persist),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -228,10 +759,15 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                return self._betweenness_networkx(project_id, persist=False)
+                return self._betweenness_networkx(project_id, persist=persist, **python_kwargs)
         elif self._engine == GraphEngine.MEMGRAPH_MAGE:
             try:
-                return self._betweenness_memgraph(project_id, persist)
+                return self._mirrored(
+                    project_id,
+                    "score_intermediacion",
+                    self._betweenness_memgraph(project_id, persist),
+                    persist,
+                )
             except Exception as e:
                 _logger.warning(
                     "graph_algorithms.engine_failed.fallback",
@@ -241,33 +777,126 @@ class GraphAlgorithms:
                     project_id=project_id,
                     error=str(e)[:200],
                 )
-                return self._betweenness_networkx(project_id, persist=False)
+                return self._betweenness_networkx(project_id, persist=persist, **python_kwargs)
         else:
-            return self._betweenness_networkx(project_id, persist)
+            return self._betweenness_networkx(project_id, persist, **python_kwargs)
 
     def leiden(
         self, 
         project_id: str, 
-        persist: bool = False
+        persist: bool = False,
+        resolution: float = 1.0,
+        seed: Optional[int] = DEFAULT_COMMUNITY_SEED,
+        warm_start: bool = True,
     ) -> List[Dict[str, Any]]:
         """
         Detecta comunidades usando algoritmo Leiden (mejor que Louvain).
         
         NOTA: Solo disponible en Neo4j GDS o Python (igraph).
         Memgraph no soporta Leiden nativo.
+
+        En Python arranca desde la partición previa del proyecto
+        (`initial_membership`), de modo que tras pocos cambios converge en
+        una fracción del cálculo en frío y conserva los ids de comunidad.
         
         Args:
             project_id: ID del proyecto
             persist: Si True, guarda community_id en los nodos
+            resolution: Resolución (motor Python; 1.0 = modularidad clásica)
+            seed: Semilla del motor Python (None = aleatoria)
+            warm_start: Si False, calcula en frío ignorando la partición previa
             
         Returns:
             Lista de {nombre, etiquetas, community_id}
         """
         if self._engine == GraphEngine.NEO4J_GDS:
-            return self._leiden_neo4j(project_id, persist)
+            return self._mirrored(
+                project_id,
+                "community_id",
+                self._leiden_neo4j(project_id, persist),
+                persist,
+            )
         else:
             # Memgraph no soporta Leiden, usar Python
-            return self._leiden_python(project_id, persist)
+            return self._leiden_python(
+                project_id,
+                persist,
+                resolution=resolution,
+                seed=seed,
+                warm_start=warm_start,
+            )
+
+    def eigenvector(
+        self,
+        project_id: str,
+        persist: bool = False,
+        weighted: bool = False,
+        max_iterations: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Calcula Eigenvector Centrality (de entrada) de nodos.
+
+        NOTA: Calculado en Python (iteración dispersa sobre el snapshot) con
+        cualquier motor.
+
+        Args:
+            project_id: ID del proyecto
+            persist: Si True, guarda score_eigenvector en los nodos
+            weighted: Ponderar aristas por co-ocurrencias
+            max_iterations: Máximo de iteraciones
+
+        Returns:
+            Lista de {nombre, etiquetas, score} ordenada por score DESC
+        """
+        _logger.info("graph_algorithms.eigenvector", engine="python", project_id=project_id)
+
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
+            return []
+
+        scores, converged = sparse_eigenvector(snapshot, max_iter=max_iterations, weighted=weighted)
+        if not converged:
+            _logger.warning(
+                "graph_algorithms.eigenvector_not_converged",
+                project_id=project_id,
+                max_iterations=max_iterations,
+            )
+        return self._scored_results(
+            snapshot,
+            scores,
+            persist=persist,
+            property_name="score_eigenvector",
+        )
+
+    def degree(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        Grados de entrada/salida (simples y ponderados por co-ocurrencias).
+
+        NOTA: Calculado en Python sobre el snapshot con cualquier motor.
+
+        Returns:
+            Lista de {nombre, etiquetas, in_degree, out_degree,
+            weighted_in_degree, weighted_out_degree} ordenada por grado total DESC
+        """
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
+            return []
+
+        metrics = degree_metrics(snapshot)
+        total = metrics["in_degree"] + metrics["out_degree"]
+        results = []
+        for i in np.argsort(-total, kind="stable"):
+            nid = snapshot.node_ids[i]
+            if nid not in snapshot.node_props:
+                continue
+            entry: Dict[str, Any] = {
+                "nombre": snapshot.names[i],
+                "etiquetas": snapshot.labels[i],
+            }
+            for key, values in metrics.items():
+                entry[key] = values[i].item()
+            results.append(entry)
+        return results
 
     def hdbscan(
         self, 
@@ -392,11 +1021,132 @@ class GraphAlgorithms:
         
         return results
 
+    def run_many(
+        self,
+        project_id: str,
+        algorithms: Sequence[str] = ("pagerank", "louvain"),
+        persist: bool = False,
+        damping_factor: float = 0.85,
+        max_iterations: int = 20,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Calcula varias métricas del proyecto a partir de una sola extracción.
+
+        Los algoritmos que corren en NetworkX (motor detectado o fallback)
+        leen el mismo `GraphSnapshot`, fijado durante la llamada aunque no se
+        pueda cachear; con GDS/MAGE cada uno usa su motor como en las
+        llamadas individuales. Con `persist`, las métricas del motor Python
+        se escriben al final en una sola pasada UNWIND (y un solo reemplazo
+        en el espejo `graph_node_metrics`).
+
+        Args:
+            project_id: ID del proyecto
+            algorithms: Subconjunto de RUN_MANY_ALGORITHMS (se respeta el orden)
+            persist: Si True, cada algoritmo persiste su propiedad en los nodos
+            damping_factor, max_iterations: Parámetros de PageRank
+
+        Returns:
+            Dict algoritmo -> resultados (mismo formato que el método individual)
+        """
+        names = [str(a).strip().lower() for a in algorithms]
+        unknown = [a for a in names if a not in RUN_MANY_ALGORITHMS]
+        if unknown:
+            raise GraphAlgorithmError(
+                f"Algoritmos no soportados: {', '.join(unknown)}. Use: {', '.join(RUN_MANY_ALGORITHMS)}"
+            )
+        _logger.info(
+            "graph_algorithms.run_many",
+            project_id=project_id,
+            algorithms=names,
+            engine=self._engine.value,
+        )
+        self._pinned_snapshots[project_id] = None
+        if persist:
+            self._metric_buffers[project_id] = {"graph": {}, "mirror": {}}
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            for name in dict.fromkeys(names):
+                if name == "pagerank":
+                    results[name] = self.pagerank(
+                        project_id,
+                        persist=persist,
+                        damping_factor=damping_factor,
+                        max_iterations=max_iterations,
+                    )
+                elif name == "degree":
+                    results[name] = self.degree(project_id)
+                else:
+                    results[name] = getattr(self, name)(project_id, persist=persist)
+        finally:
+            self._pinned_snapshots.pop(project_id, None)
+            buffer = self._metric_buffers.pop(project_id, None)
+        if buffer is not None:
+            self._flush_metrics(project_id, buffer["graph"], buffer["mirror"])
+        return results
+
     # =========================================================================
     # HELPERS: Extracción de grafo
     # =========================================================================
 
+    def _graph_version(self, project_id: str) -> Optional[int]:
+        """Sello `graph_versions` del proyecto; None si no se puede leer."""
+        try:
+            from app.postgres_block import get_graph_version
+
+            return get_graph_version(self.clients.postgres, project_id)
+        except Exception as e:
+            _logger.debug("graph_algorithms.graph_version_unavailable", error=str(e)[:100])
+            try:
+                self.clients.postgres.rollback()
+            except Exception:
+                pass
+            return None
+
+    def snapshot(self, project_id: str, refresh: bool = False) -> GraphSnapshot:
+        """
+        Snapshot del grafo del proyecto, reutilizado mientras su versión siga vigente.
+
+        Cuesta una lectura por PK de `graph_versions` cuando hay caché; si el
+        sello no está disponible (o la extracción quedó vacía) no se cachea.
+        """
+        version = self._graph_version(project_id)
+        if not refresh:
+            with _snapshot_cache_lock:
+                cached = _snapshot_cache.get(project_id)
+                if cached is not None and cached.is_fresh(version):
+                    _snapshot_cache.move_to_end(project_id)
+                    return cached
+
+        G, node_props = self._load_graph_data(project_id)
+        snapshot = GraphSnapshot(G, node_props, project_id=project_id, version=version)
+        if version is not None and snapshot.num_nodes:
+            with _snapshot_cache_lock:
+                _snapshot_cache[project_id] = snapshot
+                _snapshot_cache.move_to_end(project_id)
+                while len(_snapshot_cache) > _SNAPSHOT_CACHE_SIZE:
+                    _snapshot_cache.popitem(last=False)
+        return snapshot
+
     def _extract_graph_data(self, project_id: str) -> Tuple[nx.DiGraph, Dict[str, Dict]]:
+        """
+        Grafo y propiedades de nodos desde el snapshot compartido del proyecto.
+
+        El grafo devuelto es compartido: los algoritmos no deben mutarlo.
+        """
+        snapshot = self._current_snapshot(project_id)
+        return snapshot.graph, snapshot.node_props
+
+    def _current_snapshot(self, project_id: str) -> GraphSnapshot:
+        """Snapshot fijado por `run_many` o, si no hay, el del caché."""
+        snapshot = self._pinned_snapshots.get(project_id)
+        if snapshot is None:
+            snapshot = self.snapshot(project_id)
+            if project_id in self._pinned_snapshots:
+                self._pinned_snapshots[project_id] = snapshot
+        return snapshot
+
+    def _load_graph_data(self, project_id: str) -> Tuple[nx.DiGraph, Dict[str, Dict]]:
         """
         Extrae datos del grafo con fallback a PostgreSQL.
         
@@ -455,7 +1205,7 @@ class GraphAlgorithms:
         """
         Construye grafo desde PostgreSQL como fallback.
         
-        Fuentes: analisis_axial (relaciones) + analisis_codigos_abiertos (co-ocurrencias)
+        Fuentes: analisis_axial (relaciones) + code_cooccurrence (co-ocurrencias)
         """
         G = nx.DiGraph()
         node_props = {}
@@ -502,20 +1252,11 @@ class GraphAlgorithms:
             cod_id = get_or_create_id(cod_c, "Codigo")
             G.add_edge(cat_id, cod_id)
         
-        # 2. Co-ocurrencias de códigos (para Louvain/comunidades)
-        with self.clients.postgres.cursor() as cur:
-            cur.execute("""
-                SELECT a.codigo, b.codigo, COUNT(*) as cnt
-                FROM analisis_codigos_abiertos a
-                JOIN analisis_codigos_abiertos b 
-                  ON a.fragmento_id = b.fragmento_id 
-                  AND a.project_id = b.project_id
-                  AND a.codigo < b.codigo
-                WHERE a.project_id = %s
-                GROUP BY a.codigo, b.codigo
-                HAVING COUNT(*) >= 2
-            """, (project_id,))
-            co_rows = cur.fetchall() or []
+        # 2. Co-ocurrencias de códigos (para Louvain/comunidades), desde la
+        #    tabla mantenida `code_cooccurrence`.
+        from app.postgres_block import fetch_code_cooccurrences
+
+        co_rows = fetch_code_cooccurrences(self.clients.postgres, project_id, min_fragments=2)
 
         canon_map2 = {}
         if resolve_canonical_codigos_bulk is not None and co_rows:
@@ -532,7 +1273,11 @@ class GraphAlgorithms:
                 continue
             id1 = get_or_create_id(c1, "Codigo")
             id2 = get_or_create_id(c2, "Codigo")
-            G.add_edge(id1, id2)
+            # `count` (no `weight`): sólo lo usan las métricas ponderadas explícitas.
+            if G.has_edge(id1, id2):
+                G[id1][id2]["count"] = G[id1][id2].get("count", 1) + int(cnt or 0)
+            else:
+                G.add_edge(id1, id2, count=int(cnt or 1))
         
         _logger.info(
             "graph_algorithms.postgres_graph",
@@ -542,181 +1287,289 @@ class GraphAlgorithms:
         
         return G, node_props
 
-    def _persist_property(
-        self, 
-        session, 
-        updates: List[Dict[str, Any]], 
-        property_name: str
+    # =========================================================================
+    # HELPERS: Persistencia de métricas
+    # =========================================================================
+
+    def _persist_metrics(
+        self,
+        project_id: str,
+        metrics: Dict[str, List[Tuple[str, str, Any]]],
+        write_graph: bool = True,
     ) -> None:
-        """Persiste propiedades en nodos Neo4j/Memgraph."""
-        if not updates:
+        """
+        Persiste métricas {propiedad: [(label, nombre, valor)]} por clave de nodo.
+
+        Dentro de `run_many(persist=True)` sólo se acumulan; se escriben todas
+        juntas al terminar. Con `write_graph=False` (el motor GDS/MAGE ya las
+        escribió) sólo se replican en PostgreSQL.
+        """
+        buffer = self._metric_buffers.get(project_id)
+        if buffer is not None:
+            buffer["graph" if write_graph else "mirror"].update(metrics)
             return
-            
-        batch_query = """
-        UNWIND $batch as row 
-        MATCH (n) WHERE id(n) = toInteger(row.id)
-        SET n[$prop_name] = row.val
+        if write_graph:
+            self._flush_metrics(project_id, metrics, {})
+        else:
+            self._flush_metrics(project_id, {}, metrics)
+
+    def _flush_metrics(
+        self,
+        project_id: str,
+        graph_metrics: Dict[str, List[Tuple[str, str, Any]]],
+        mirror_metrics: Dict[str, List[Tuple[str, str, Any]]],
+    ) -> None:
+        if graph_metrics:
+            self._write_graph_metrics(project_id, graph_metrics)
+        self._mirror_metrics(project_id, {**mirror_metrics, **graph_metrics})
+
+    def _write_graph_metrics(self, project_id: str, metrics: Dict[str, List[Tuple[str, str, Any]]]) -> int:
         """
-        
-        # Batch en chunks de 1000
-        chunk_size = 1000
-        for i in range(0, len(updates), chunk_size):
-            batch = updates[i:i + chunk_size]
-            session.run(batch_query, batch=batch, prop_name=property_name).consume()
+        Escribe varias propiedades por nodo en una pasada UNWIND por etiqueta.
+
+        Empareja por (etiqueta, nombre, project_id), cubierto por las
+        constraints de unicidad de Codigo/Categoria, así que sirve para
+        snapshots extraídos de Neo4j o de PostgreSQL (ids sintéticos).
+        """
+        by_label: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for prop, rows in metrics.items():
+            for label, nombre, value in rows:
+                if nombre is None or not _CYPHER_LABEL_RE.match(label or ""):
+                    continue
+                by_label.setdefault(label, {}).setdefault(nombre, {})[prop] = value
+
+        written = 0
+        with self.clients.neo4j.session(database=self.settings.neo4j.database) as session:
+            for label, nodes in by_label.items():
+                query = f"""
+                UNWIND $rows AS row
+                MATCH (n:`{label}` {{nombre: row.nombre, project_id: $project_id}})
+                SET n += row.props
+                """
+                rows = [{"nombre": nombre, "props": props} for nombre, props in nodes.items()]
+                for i in range(0, len(rows), _METRIC_WRITE_CHUNK):
+                    session.run(query, rows=rows[i:i + _METRIC_WRITE_CHUNK], project_id=project_id).consume()
+                written += len(rows)
+        _logger.info(
+            "graph_algorithms.metrics_written",
+            project_id=project_id,
+            properties=sorted(metrics),
+            nodes=written,
+        )
+        return written
+
+    def _mirror_metrics(self, project_id: str, metrics: Dict[str, List[Tuple[str, str, Any]]]) -> None:
+        """Réplica best-effort en `graph_node_metrics` para dashboards."""
+        rows = [
+            (label, nombre, prop, None if value is None else float(value))
+            for prop, entries in metrics.items()
+            for label, nombre, value in entries
+            if nombre is not None
+        ]
+        if not rows:
+            return
+        try:
+            from app.postgres_block import replace_graph_node_metrics
+
+            replace_graph_node_metrics(self.clients.postgres, project_id, rows)
+        except Exception as e:
+            _logger.warning("graph_algorithms.metrics_mirror_failed", project_id=project_id, error=str(e)[:200])
+            try:
+                self.clients.postgres.rollback()
+            except Exception:
+                pass
+
+    def _mirrored(
+        self,
+        project_id: str,
+        property_name: str,
+        results: List[Dict[str, Any]],
+        persist: bool,
+    ) -> List[Dict[str, Any]]:
+        """Replica en PG los resultados que GDS/MAGE ya escribieron en el grafo."""
+        if persist and results:
+            value_key = "community_id" if property_name == "community_id" else "score"
+            rows = [
+                ((r.get("etiquetas") or [""])[0], r.get("nombre"), r.get(value_key))
+                for r in results
+            ]
+            self._persist_metrics(project_id, {property_name: rows}, write_graph=False)
+        return results
 
     # =========================================================================
     # IMPLEMENTACIONES: NetworkX (fallback universal)
     # =========================================================================
 
-    def _louvain_networkx(self, project_id: str, persist: bool) -> List[Dict[str, Any]]:
-        """Louvain con NetworkX."""
+    def _louvain_networkx(
+        self,
+        project_id: str,
+        persist: bool,
+        resolution: float = 1.0,
+        seed: Optional[int] = DEFAULT_COMMUNITY_SEED,
+        warm_start: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Louvain con NetworkX sobre el snapshot, con ids estables entre corridas."""
         _logger.info("graph_algorithms.louvain", engine="networkx", project_id=project_id)
         
-        G, node_props = self._extract_graph_data(project_id)
-        if not G.nodes():
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
             return []
-        
-        # Convertir a no dirigido para Louvain
-        GU = G.to_undirected()
-        communities = louvain_communities(GU)
-        
+
+        previous = _cached_partition(project_id, "louvain") if warm_start else None
+        if previous is not None and previous.reusable_for(snapshot, resolution, seed):
+            membership = [previous.membership[key] for key in snapshot.node_keys]
+        else:
+            # Convertir a no dirigido para Louvain
+            communities = louvain_communities(snapshot.graph.to_undirected(), resolution=resolution, seed=seed)
+            membership = [0] * snapshot.num_nodes
+            for idx, comm in enumerate(communities):
+                for nid in comm:
+                    membership[snapshot.index[nid]] = idx
+            membership = stable_community_ids(
+                snapshot.node_keys,
+                membership,
+                previous.membership if previous is not None else None,
+            )
+            _remember_partition(
+                project_id,
+                "louvain",
+                CommunityPartition(
+                    dict(zip(snapshot.node_keys, membership)),
+                    version=snapshot.version,
+                    resolution=resolution,
+                    seed=seed,
+                ),
+            )
+        return self._community_results(snapshot, membership, persist)
+
+    def _community_results(
+        self,
+        snapshot: GraphSnapshot,
+        membership: Sequence[int],
+        persist: bool,
+    ) -> List[Dict[str, Any]]:
+        """Resultados {nombre, etiquetas, community_id} ordenados y persistencia opcional."""
         results = []
-        updates = []
-        
-        for idx, comm in enumerate(communities):
-            for nid in comm:
-                if nid in node_props:
-                    results.append({
-                        "nombre": node_props[nid]["nombre"],
-                        "etiquetas": node_props[nid]["etiquetas"],
-                        "community_id": idx
-                    })
-                    updates.append({"id": nid, "val": idx})
+        for nid, community in zip(snapshot.node_ids, membership):
+            if nid in snapshot.node_props:
+                results.append({
+                    "nombre": snapshot.node_props[nid]["nombre"],
+                    "etiquetas": snapshot.node_props[nid]["etiquetas"],
+                    "community_id": int(community),
+                })
         
         results.sort(key=lambda x: (x["community_id"], x["nombre"]))
         
         if persist:
-            with self.clients.neo4j.session(database=self.settings.neo4j.database) as session:
-                self._persist_property(session, updates, "community_id")
+            self._persist_metrics(
+                snapshot.project_id,
+                {"community_id": self._metric_rows(snapshot, [int(c) for c in membership])},
+            )
         
         return results
 
+    @staticmethod
+    def _metric_rows(snapshot: GraphSnapshot, values: Sequence[Any]) -> List[Tuple[str, str, Any]]:
+        """(label, nombre, valor) por nodo del snapshot, en orden de índice."""
+        return [
+            (labels[0] if labels else "", name, value)
+            for name, labels, value in zip(snapshot.names, snapshot.labels, values)
+        ]
+
     def _pagerank_networkx(
         self, 
         project_id: str, 
         persist: bool,
         damping_factor: float,
-        max_iterations: int
+        max_iterations: int,
+        weighted: bool = False,
+        personalization: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
-        """PageRank con NetworkX."""
+        """PageRank por iteración dispersa sobre el snapshot (motor Python)."""
         _logger.info("graph_algorithms.pagerank", engine="networkx", project_id=project_id)
         
-        G, node_props = self._extract_graph_data(project_id)
-        if not G.nodes():
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
             return []
 
-        def _pagerank_power_iteration(
-            graph: nx.DiGraph,
-            alpha: float,
-            max_iter: int,
-            tol: float = 1.0e-6,
-        ) -> Dict[str, float]:
-            nodes = list(graph.nodes())
-            n = len(nodes)
-            if n == 0:
-                return {}
-            idx = {node: i for i, node in enumerate(nodes)}
-
-            # Initialize uniformly.
-            r = [1.0 / n] * n
-
-            out_degree = [0] * n
-            incoming = [[] for _ in range(n)]
-
-            for u in nodes:
-                ui = idx[u]
-                out_degree[ui] = int(graph.out_degree(u))
-            for u, v in graph.edges():
-                vi = idx[v]
-                incoming[vi].append(idx[u])
-
-            teleport = (1.0 - alpha) / n
-
-            for _ in range(max_iter):
-                # Distribute dangling mass.
-                dangling_sum = sum(r[i] for i in range(n) if out_degree[i] == 0)
-                dangling_contrib = alpha * dangling_sum / n
-
-                new_r = [0.0] * n
-                for i in range(n):
-                    rank_sum = 0.0
-                    for j in incoming[i]:
-                        if out_degree[j] > 0:
-                            rank_sum += r[j] / out_degree[j]
-                    new_r[i] = teleport + dangling_contrib + alpha * rank_sum
-
-                err = sum(abs(new_r[i] - r[i]) for i in range(n))
-                r = new_r
-                if err < tol:
-                    break
-
-            return {nodes[i]: float(r[i]) for i in range(n)}
+        p_vector = None
+        if personalization:
+            wanted = {str(name).strip().lower(): float(w) for name, w in personalization.items()}
+            p_vector = np.array(
+                [max(wanted.get(str(name or "").strip().lower(), 0.0), 0.0) for name in snapshot.names]
+            )
 
-        try:
-            scores = nx.pagerank(G, alpha=damping_factor, max_iter=max_iterations)
-        except ModuleNotFoundError as e:
-            # Newer NetworkX versions may rely on SciPy for pagerank; keep a no-deps fallback.
-            if getattr(e, "name", None) == "scipy":
-                scores = _pagerank_power_iteration(G, alpha=damping_factor, max_iter=max_iterations)
-            else:
-                raise
-        sorted_nodes = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
+        scores, converged = sparse_pagerank(
+            snapshot,
+            alpha=damping_factor,
+            max_iter=max_iterations,
+            weighted=weighted,
+            personalization=p_vector,
+        )
+        if not converged:
+            _logger.info(
+                "graph_algorithms.pagerank_not_converged",
+                project_id=project_id,
+                max_iterations=max_iterations,
+            )
+        return self._scored_results(snapshot, scores, persist=persist, property_name="score_centralidad")
+
+    def _scored_results(
+        self,
+        snapshot: GraphSnapshot,
+        scores: np.ndarray,
+        persist: bool,
+        property_name: str,
+    ) -> List[Dict[str, Any]]:
+        """Resultados {nombre, etiquetas, score} ordenados DESC y persistencia opcional."""
+        order = np.argsort(-scores, kind="stable")
         results = [
             {
-                "nombre": node_props[nid]["nombre"],
-                "etiquetas": node_props[nid]["etiquetas"],
-                "score": score
+                "nombre": snapshot.names[i],
+                "etiquetas": snapshot.labels[i],
+                "score": float(scores[i]),
             }
-            for nid, score in sorted_nodes if nid in node_props
+            for i in order
+            if snapshot.node_ids[i] in snapshot.node_props
         ]
-        
+
         if persist:
-            updates = [{"id": nid, "val": score} for nid, score in scores.items()]
-            with self.clients.neo4j.session(database=self.settings.neo4j.database) as session:
-                self._persist_property(session, updates, "score_centralidad")
-        
+            self._persist_metrics(
+                snapshot.project_id,
+                {property_name: self._metric_rows(snapshot, [float(score) for score in scores])},
+            )
+
         return results
 
-    def _betweenness_networkx(self, project_id: str, persist: bool) -> List[Dict[str, Any]]:
-        """Betweenness Centrality con NetworkX."""
+    def _betweenness_networkx(
+        self,
+        project_id: str,
+        persist: bool,
+        epsilon: float = DEFAULT_BETWEENNESS_EPSILON,
+        time_budget: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Betweenness por muestreo de pivotes sobre el snapshot (motor Python)."""
         _logger.info("graph_algorithms.betweenness", engine="networkx", project_id=project_id)
         
-        G, node_props = self._extract_graph_data(project_id)
-        if not G.nodes():
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
             return []
         
-        scores = nx.betweenness_centrality(G)
-        sorted_nodes = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        results = [
-            {
-                "nombre": node_props[nid]["nombre"],
-                "etiquetas": node_props[nid]["etiquetas"],
-                "score": score
-            }
-            for nid, score in sorted_nodes if nid in node_props
-        ]
-        
-        if persist:
-            updates = [{"id": nid, "val": score} for nid, score in scores.items()]
-            with self.clients.neo4j.session(database=self.settings.neo4j.database) as session:
-                self._persist_property(session, updates, "score_intermediacion")
-        
-        return results
+        scores, info = approximate_betweenness(snapshot, epsilon=epsilon, time_budget=time_budget)
+        info["engine"] = GraphEngine.NETWORKX.value
+        self.last_run_info["betweenness"] = info
+        _logger.info("graph_algorithms.betweenness_sampled", project_id=project_id, **info)
+        return self._scored_results(snapshot, scores, persist=persist, property_name="score_intermediacion")
 
-    def _leiden_python(self, project_id: str, persist: bool) -> List[Dict[str, Any]]:
-        """Leiden con igraph + leidenalg (fallback Python)."""
+    def _leiden_python(
+        self,
+        project_id: str,
+        persist: bool,
+        resolution: float = 1.0,
+        seed: Optional[int] = DEFAULT_COMMUNITY_SEED,
+        warm_start: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Leiden con igraph + leidenalg (fallback Python), en caliente desde la partición previa."""
         _logger.info("graph_algorithms.leiden", engine="python", project_id=project_id)
         
         try:
@@ -725,43 +1578,60 @@ class GraphAlgorithms:
         except ImportError:
             _logger.warning("graph_algorithms.leiden_fallback_to_louvain", 
                            reason="igraph/leidenalg not installed")
-            return self._louvain_networkx(project_id, persist)
+            return self._louvain_networkx(
+                project_id,
+                persist,
+                resolution=resolution,
+                seed=seed,
+                warm_start=warm_start,
+            )
         
-        G, node_props = self._extract_graph_data(project_id)
-        if not G.nodes():
+        snapshot = self._current_snapshot(project_id)
+        if not snapshot.num_nodes:
             return []
-        
-        # Convertir NetworkX a igraph
-        edges = list(G.edges())
-        nodes = list(G.nodes())
-        node_to_idx = {n: i for i, n in enumerate(nodes)}
-        
-        ig_edges = [(node_to_idx[s], node_to_idx[t]) for s, t in edges if s in node_to_idx and t in node_to_idx]
-        ig_graph = ig.Graph(n=len(nodes), edges=ig_edges, directed=False)
-        
-        # Ejecutar Leiden
-        partition = leidenalg.find_partition(ig_graph, leidenalg.ModularityVertexPartition)
-        
-        results = []
-        updates = []
-        
-        for idx, nid in enumerate(nodes):
-            if nid in node_props:
-                community = partition.membership[idx]
-                results.append({
-                    "nombre": node_props[nid]["nombre"],
-                    "etiquetas": node_props[nid]["etiquetas"],
-                    "community_id": community
-                })
-                updates.append({"id": nid, "val": community})
-        
-        results.sort(key=lambda x: (x["community_id"], x["nombre"]))
-        
-        if persist:
-            with self.clients.neo4j.session(database=self.settings.neo4j.database) as session:
-                self._persist_property(session, updates, "community_id")
-        
-        return results
+
+        previous = _cached_partition(project_id, "leiden") if warm_start else None
+        if previous is not None and previous.reusable_for(snapshot, resolution, seed):
+            membership = [previous.membership[key] for key in snapshot.node_keys]
+            return self._community_results(snapshot, membership, persist)
+
+        # igraph directamente desde los arrays CSR del snapshot.
+        ig_graph = ig.Graph(n=snapshot.num_nodes, edges=snapshot.undirected_edges().tolist(), directed=False)
+        kwargs: Dict[str, Any] = {"seed": seed}
+        if previous is not None:
+            # Desde una partición casi óptima basta una iteración (en frío: 2).
+            kwargs["initial_membership"] = initial_membership(snapshot.node_keys, previous.membership)
+            kwargs["n_iterations"] = 1
+        if resolution == 1.0:
+            partition_type = leidenalg.ModularityVertexPartition
+        else:
+            partition_type = leidenalg.RBConfigurationVertexPartition
+            kwargs["resolution_parameter"] = resolution
+        partition = leidenalg.find_partition(ig_graph, partition_type, **kwargs)
+
+        membership = stable_community_ids(
+            snapshot.node_keys,
+            partition.membership,
+            previous.membership if previous is not None else None,
+        )
+        _remember_partition(
+            project_id,
+            "leiden",
+            CommunityPartition(
+                dict(zip(snapshot.node_keys, membership)),
+                version=snapshot.version,
+                resolution=resolution,
+                seed=seed,
+            ),
+        )
+        _logger.info(
+            "graph_algorithms.leiden_partition",
+            project_id=project_id,
+            warm_start=previous is not None,
+            communities=len(set(membership)),
+            quality=round(float(partition.quality()), 6),
+        )
+        return self._community_results(snapshot, membership, persist)
 
     # =========================================================================
     # IMPLEMENTACIONES: Neo4j GDS
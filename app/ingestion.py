@@ -51,7 +51,7 @@ import json
 from collections import Counter
 from math import ceil
 from pathlib import Path
-from typing import Any, Dict, Mapping, Optional, Sequence
+from typing import Any, Dict, List, Mapping, Optional, Sequence
 
 import structlog
 from tqdm import tqdm
@@ -59,8 +59,10 @@ from tqdm import tqdm
 from .clients import ServiceClients
 from .coherence import analyze_fragment, summarize_issue_counts
 from .documents import batched, load_fragment_records, make_fragment_id
+from .coding import sync_fragment_coded_state
 from .embeddings import embed_batch
 from .neo4j_block import ensure_constraints as ensure_neo4j_constraints, merge_fragments
+from .fragment_neighbors import refresh_neighbors_after_ingest
 from .postgres_block import ensure_fragment_table, insert_fragments
 from .qdrant_block import build_points, ensure_collection, ensure_payload_indexes, upsert
 from .settings import AppSettings
@@ -170,6 +172,7 @@ def ingest_documents(
         "fragments_discarded_low_interviewee": 0,
     }
     global_hashes: set[str] = set()
+    ingested_ids: List[str] = []
 
     for file_path in files:
         path = Path(file_path)
@@ -441,6 +444,8 @@ def ingest_documents(
                 duplicates_in_batch=len(batch) - len({item["sha"] for item in batch}),
             )
 
+        ingested_ids.extend(item["id"] for item in entries)
+
         file_issue_counts = summarize_issue_counts(flagged_issue_lists)
         issue_counter.update(file_issue_counts)
 
@@ -472,6 +477,13 @@ def ingest_documents(
 
         log.info("ingest.file.end", **summary)
 
+    # Grafo k-NN materializado (si el proyecto lo usa): incorporar los fragmentos
+    # nuevos de todos los archivos con una sola carga del pool.
+    refresh_neighbors_after_ingest(clients, project_id, ingested_ids, logger=log)
+    # El upsert reemplaza el payload completo de cada punto: restaurar `coded` /
+    # `code_count` para que una re-ingesta no deje fragmentos codificados como pendientes.
+    sync_fragment_coded_state(clients, settings, ingested_ids, project_id, logger=log)
+
     if totals["fragments"]:
         totals["char_len_zero_pct"] = totals["char_len_zero"] / totals["fragments"]
         totals["duplicate_ratio"] = totals["duplicate_fragments"] / totals["fragments"]
@@ -10,6 +10,10 @@ Algoritmos implementados:
     - adamic_adar: Indice de Adamic-Adar (vecinos ponderados)
     - preferential_attachment: Producto de grados
 
+Con scipy disponible el ranking se calcula con productos dispersos de la
+matriz de adyacencia y selección top-k (`np.partition`) en lugar de
+enumerar pares en Python; el resultado es el mismo.
+
 Casos de uso:
     - Sugerir que Codigo A deberia relacionarse con Codigo B (axial entre códigos)
     - (Opcional) Sugerir Categoria -> Codigo cuando existe codificación axial
@@ -32,8 +36,15 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional, Tuple
 from collections import defaultdict
 
+import numpy as np
 import structlog
 
+try:
+    from scipy import sparse as sp_sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 from .clients import ServiceClients
 from .settings import AppSettings
 
@@ -119,7 +130,7 @@ def _get_graph_data_from_postgres(
     
     Fuentes de datos:
     1. analisis_axial: Relaciones Categoria -> Codigo
-    2. analisis_codigos_abiertos: Co-ocurrencias de códigos en fragmentos
+    2. code_cooccurrence: Co-ocurrencias de códigos en fragmentos
     """
     adjacency = defaultdict(set)
     node_types = {}
@@ -157,20 +168,10 @@ def _get_graph_data_from_postgres(
         node_types[cat] = "Categoria"
         node_types[cod_c] = "Codigo"
     
-    # 2. Obtener co-ocurrencias de códigos en fragmentos (códigos relacionados)
-    with pg.cursor() as cur:
-        cur.execute("""
-            SELECT a.codigo, b.codigo, COUNT(*) as cooccurrences
-            FROM analisis_codigos_abiertos a
-            JOIN analisis_codigos_abiertos b 
-              ON a.fragmento_id = b.fragmento_id 
-              AND a.project_id = b.project_id
-              AND a.codigo < b.codigo
-            WHERE a.project_id = %s
-            GROUP BY a.codigo, b.codigo
-            HAVING COUNT(*) >= 2
-        """, (project_id,))
-        co_rows = cur.fetchall() or []
+    # 2. Obtener co-ocurrencias de códigos en fragmentos (tabla mantenida)
+    from app.postgres_block import fetch_code_cooccurrences
+
+    co_rows = fetch_code_cooccurrences(pg, project_id, min_fragments=2)
 
     if resolve_canonical_codigos_bulk is not None and co_rows:
         unique_codes2 = {str(c).strip() for r in co_rows for c in r[:2] if c}
@@ -314,14 +315,59 @@ def suggest_links(
         except Exception:
             closed_pairs = set()
     
-    # Seleccionar funcion de scoring
-    score_funcs = {
-        "common_neighbors": common_neighbors,
-        "jaccard": jaccard_coefficient,
-        "adamic_adar": adamic_adar,
-        "preferential_attachment": preferential_attachment,
-    }
-    score_func = score_funcs.get(algorithm, common_neighbors)
+    if SCIPY_AVAILABLE:
+        ranked, total_candidates = _rank_pairs_sparse(
+            adjacency, node_types, source_type, target_type, algorithm, top_k, min_score, closed_pairs
+        )
+    else:
+        ranked, total_candidates = _rank_pairs_python(
+            adjacency, node_types, source_type, target_type, algorithm, top_k, min_score, closed_pairs
+        )
+    suggestions = [
+        {
+            "source": source,
+            "source_type": source_type,
+            "target": target,
+            "target_type": target_type,
+            "score": score,
+            "algorithm": algorithm,
+        }
+        for source, target, score in ranked
+    ]
+
+    _logger.info(
+        "link_prediction.complete",
+        total_candidates=total_candidates,
+        returned=len(suggestions),
+    )
+    
+    return suggestions
+
+
+_SCORE_FUNCS = {
+    "common_neighbors": common_neighbors,
+    "jaccard": jaccard_coefficient,
+    "adamic_adar": adamic_adar,
+    "preferential_attachment": preferential_attachment,
+}
+
+
+def _rank_pairs_python(
+    adjacency: Dict[str, set],
+    node_types: Dict[str, str],
+    source_type: str,
+    target_type: str,
+    algorithm: str,
+    top_k: int,
+    min_score: float,
+    closed_pairs: set[tuple[str, str]],
+) -> Tuple[List[Tuple[str, str, float]], int]:
+    """Ranking par a par sobre sets (fallback sin SciPy).
+
+    Returns:
+        (top_k de (source, target, score), total de candidatos con score > min_score)
+    """
+    score_func = _SCORE_FUNCS.get(algorithm, common_neighbors)
     
     # Obtener nodos por tipo
     sources = [n for n, t in node_types.items() if t == source_type]
@@ -344,16 +390,7 @@ def suggest_links(
                         continue
                 score = score_func(adjacency, source, target)
                 if score > min_score:
-                    candidates.append(
-                        {
-                            "source": source,
-                            "source_type": source_type,
-                            "target": target,
-                            "target_type": target_type,
-                            "score": score,
-                            "algorithm": algorithm,
-                        }
-                    )
+                    candidates.append((source, target, score))
     else:
         for source in sources:
             source_neighbors = adjacency.get(source, set())
@@ -362,28 +399,200 @@ def suggest_links(
                 if target not in source_neighbors and source != target:
                     score = score_func(adjacency, source, target)
                     if score > min_score:
-                        candidates.append(
-                            {
-                                "source": source,
-                                "source_type": source_type,
-                                "target": target,
-                                "target_type": target_type,
-                                "score": score,
-                                "algorithm": algorithm,
-                            }
-                        )
+                        candidates.append((source, target, score))
     
     # Ordenar por score y retornar top_k
-    candidates.sort(key=lambda x: x["score"], reverse=True)
-    suggestions = candidates[:top_k]
-    
-    _logger.info(
-        "link_prediction.complete",
-        total_candidates=len(candidates),
-        returned=len(suggestions),
+    candidates.sort(key=lambda x: x[2], reverse=True)
+    return candidates[:top_k], len(candidates)
+
+
+def _sparse_adjacency(
+    adjacency: Dict[str, set],
+    node_types: Dict[str, str],
+) -> Tuple[Dict[str, int], Any, Any]:
+    """Índice de nodos, matriz de adyacencia CSR (filas = vecinos de cada nodo) y grados."""
+    names = list(
+        dict.fromkeys(
+            [*node_types, *adjacency, *(m for neighbors in adjacency.values() for m in neighbors)]
+        )
     )
-    
-    return suggestions
+    index = {name: i for i, name in enumerate(names)}
+    counts = np.fromiter((len(neighbors) for neighbors in adjacency.values()), dtype=np.int64, count=len(adjacency))
+    rows = np.repeat(np.fromiter((index[n] for n in adjacency), dtype=np.int64, count=len(adjacency)), counts)
+    cols = np.fromiter(
+        (index[m] for neighbors in adjacency.values() for m in neighbors), dtype=np.int64, count=int(counts.sum())
+    )
+    size = len(names)
+    matrix = sp_sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=(size, size)
+    )
+    matrix.data[:] = 1.0  # duplicados (no debería haberlos en sets) cuentan una vez
+    matrix.sort_indices()
+    degree = np.diff(matrix.indptr).astype(np.float64)
+    return index, matrix, degree
+
+
+def _sorted_keys_contain(keys: Any, query: Any) -> Any:
+    """Pertenencia vectorizada de `query` en el array ordenado `keys`."""
+    if len(keys) == 0:
+        return np.zeros(len(query), dtype=bool)
+    pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return keys[pos] == query
+
+
+def _top_k_indices(rank: Any, order: Any, top_k: int) -> Any:
+    """Top-k por score DESC y, en empate, por orden de enumeración ASC.
+
+    Selecciona con `np.partition` (el k-ésimo score como umbral, incluidos
+    los empates en el borde) y sólo ordena esos candidatos.
+    """
+    if top_k <= 0 or len(rank) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if len(rank) > top_k:
+        threshold = np.partition(rank, len(rank) - top_k)[len(rank) - top_k]
+        candidates = np.nonzero(rank >= threshold)[0]
+    else:
+        candidates = np.arange(len(rank))
+    ordered = candidates[np.lexsort((order[candidates], -rank[candidates]))]
+    return ordered[:top_k]
+
+
+# Sugerencias por comunidad devueltas (se corta la enumeración al llegar).
+_COMMUNITY_SUGGESTION_LIMIT = 20
+
+# Filas de pares por bloque en el cálculo denso (preferential attachment).
+_DENSE_BLOCK_ROWS = 256
+
+
+def _rank_pairs_sparse(
+    adjacency: Dict[str, set],
+    node_types: Dict[str, str],
+    source_type: str,
+    target_type: str,
+    algorithm: str,
+    top_k: int,
+    min_score: float,
+    closed_pairs: set[tuple[str, str]],
+) -> Tuple[List[Tuple[str, str, float]], int]:
+    """Mismo ranking que `_rank_pairs_python` a partir de productos dispersos.
+
+    Vecinos comunes = A·Aᵀ, Adamic-Adar = A·D⁻¹·Aᵀ (D = log del grado) y
+    Jaccard desde los mismos productos; se enmascaran aristas existentes,
+    pares cerrados y (mismo tipo) la mitad inferior. Con min_score >= 0 sólo
+    se recorren los pares con vecinos en común; preferential attachment (o
+    min_score < 0) se evalúa en bloques densos conservando el top-k por bloque.
+    """
+    algo = algorithm if algorithm in _SCORE_FUNCS else "common_neighbors"
+    index, matrix, degree = _sparse_adjacency(adjacency, node_types)
+
+    if source_type == target_type:
+        src_names = sorted({n for n, t in node_types.items() if t == source_type})
+        tgt_names = src_names
+    else:
+        src_names = [n for n, t in node_types.items() if t == source_type]
+        tgt_names = [n for n, t in node_types.items() if t == target_type]
+    if not src_names or not tgt_names:
+        return [], 0
+    same_type = source_type == target_type
+    src = np.array([index[n] for n in src_names], dtype=np.int64)
+    tgt = np.array([index[n] for n in tgt_names], dtype=np.int64)
+    n_tgt = len(tgt)
+
+    closed_keys = np.zeros(0, dtype=np.int64)
+    if closed_pairs and same_type:
+        position = {name: i for i, name in enumerate(src_names)}
+        closed_keys = np.array(
+            sorted(
+                position[a] * n_tgt + position[b]
+                for a, b in closed_pairs
+                if a in position and b in position
+            ),
+            dtype=np.int64,
+        )
+
+    inverse_log = np.zeros_like(degree)
+    np.divide(1.0, np.log(degree, where=degree > 1, out=np.ones_like(degree)), out=inverse_log, where=degree > 1)
+    size = matrix.shape[0]
+    # Claves (i * size + j) de las aristas existentes, ya ordenadas por fila/columna.
+    edge_keys = np.repeat(np.arange(size, dtype=np.int64), np.diff(matrix.indptr)) * size + matrix.indices
+
+    def _scores(row_pos: Any, col_pos: Any, overlap: Any) -> Any:
+        if algo == "preferential_attachment":
+            return degree[src[row_pos]] * degree[tgt[col_pos]]
+        if algo == "jaccard":
+            union = degree[src[row_pos]] + degree[tgt[col_pos]] - overlap
+            return np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+        return overlap
+
+    def _valid(row_pos: Any, col_pos: Any, scores: Any, check_edges: bool = True) -> Any:
+        # Filtros baratos primero; la búsqueda de aristas sólo sobre lo que queda.
+        keep = scores > min_score
+        if same_type:
+            keep &= col_pos > row_pos
+        keep &= src[row_pos] != tgt[col_pos]
+        if check_edges:
+            alive = np.nonzero(keep)[0]
+            keep[alive] = ~_sorted_keys_contain(edge_keys, src[row_pos[alive]] * size + tgt[col_pos[alive]])
+        if len(closed_keys):
+            alive = np.nonzero(keep)[0]
+            keep[alive] = ~_sorted_keys_contain(closed_keys, row_pos[alive] * n_tgt + col_pos[alive])
+        return keep
+
+    product = None
+    if algo != "preferential_attachment":
+        tgt_rows_t = matrix[tgt].T.tocsc()
+        if algo == "adamic_adar":
+            product = (matrix[src] @ sp_sparse.diags(inverse_log) @ tgt_rows_t).tocsr()
+        else:
+            product = (matrix[src] @ tgt_rows_t).tocsr()
+
+    if product is not None and min_score >= 0:
+        # Aristas existentes fuera del producto antes de extraer los pares.
+        product = product - product.multiply(matrix[src][:, tgt])
+        product.eliminate_zeros()
+        row_pos = np.repeat(np.arange(len(src), dtype=np.int64), np.diff(product.indptr))
+        col_pos = product.indices.astype(np.int64)
+        scores = _scores(row_pos, col_pos, product.data)
+        keep = _valid(row_pos, col_pos, scores, check_edges=False)
+        row_pos, col_pos, scores = row_pos[keep], col_pos[keep], scores[keep]
+        total = int(len(scores))
+    else:
+        kept_rows, kept_cols, kept_scores = [], [], []
+        total = 0
+        all_cols = np.arange(n_tgt, dtype=np.int64)
+        for start in range(0, len(src), _DENSE_BLOCK_ROWS):
+            block = np.arange(start, min(start + _DENSE_BLOCK_ROWS, len(src)), dtype=np.int64)
+            row_pos = np.repeat(block, n_tgt)
+            col_pos = np.tile(all_cols, len(block))
+            if product is not None:
+                overlap = product[block].toarray().ravel()
+            else:
+                overlap = np.zeros(len(row_pos))
+            scores = _scores(row_pos, col_pos, overlap)
+            keep = _valid(row_pos, col_pos, scores)
+            total += int(keep.sum())
+            row_pos, col_pos, scores = row_pos[keep], col_pos[keep], scores[keep]
+            best = _top_k_indices(np.round(scores, 12), row_pos * n_tgt + col_pos, top_k)
+            kept_rows.append(row_pos[best])
+            kept_cols.append(col_pos[best])
+            kept_scores.append(scores[best])
+        row_pos = np.concatenate(kept_rows)
+        col_pos = np.concatenate(kept_cols)
+        scores = np.concatenate(kept_scores)
+
+    # Redondeo sólo para desempatar: las sumas vectorizadas difieren en el
+    # último bit de las hechas par a par.
+    best = _top_k_indices(np.round(scores, 12), row_pos * n_tgt + col_pos, top_k)
+    as_int = algo in ("common_neighbors", "preferential_attachment")
+    ranked = [
+        (
+            src_names[row_pos[i]],
+            tgt_names[col_pos[i]],
+            int(round(scores[i])) if as_int else float(scores[i]),
+        )
+        for i in best
+    ]
+    return ranked, total
 
 
 def suggest_axial_relations(
@@ -526,8 +735,83 @@ def detect_missing_links_by_community(
                         "community_id": comm_id,
                         "reason": "same_community",
                     })
+                    if len(suggestions) >= _COMMUNITY_SUGGESTION_LIMIT:
+                        return suggestions
     
-    return suggestions[:20]  # Limitar resultados
+    return suggestions
+
+
+# Fragmentos de evidencia por sugerencia: directos (par) y de apoyo (por código).
+_DIRECT_EVIDENCE_LIMIT = 3
+_SUPPORTING_EVIDENCE_LIMIT = 2
+
+
+def _cooccurrence_evidence(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project_id: str,
+    pairs: List[Tuple[str, str]],
+    *,
+    limit: int,
+) -> Dict[Tuple[str, str], List[str]]:
+    """Fragmentos donde co-ocurre cada par: una consulta Neo4j (UNWIND) y una PG para los faltantes."""
+    from .neo4j_block import fetch_pair_fragment_ids as neo4j_pair_fragment_ids
+    from .postgres_block import fetch_pair_fragment_ids as pg_pair_fragment_ids
+
+    wanted = list(dict.fromkeys(pairs))
+    if not wanted:
+        return {}
+    found: Dict[Tuple[str, str], List[str]] = {}
+    try:
+        found = neo4j_pair_fragment_ids(
+            clients.neo4j, settings.neo4j.database, project_id, wanted, limit=limit
+        )
+    except Exception:
+        pass
+    missing = [pair for pair in wanted if not found.get(pair)]
+    if missing:
+        try:
+            found.update(pg_pair_fragment_ids(clients.postgres, project_id, missing, limit=limit))
+        except Exception:
+            try:
+                clients.postgres.rollback()
+            except Exception:
+                pass
+    return found
+
+
+def _code_evidence(
+    clients: ServiceClients,
+    settings: AppSettings,
+    project_id: str,
+    codes: List[str],
+    *,
+    limit: int,
+) -> Dict[str, List[str]]:
+    """Fragmentos por código (evidencia de apoyo), con el mismo esquema Neo4j -> PG."""
+    from .neo4j_block import fetch_code_fragment_ids as neo4j_code_fragment_ids
+    from .postgres_block import fetch_code_fragment_ids as pg_code_fragment_ids
+
+    wanted = list(dict.fromkeys(codes))
+    if not wanted:
+        return {}
+    found: Dict[str, List[str]] = {}
+    try:
+        found = neo4j_code_fragment_ids(
+            clients.neo4j, settings.neo4j.database, project_id, wanted, limit=limit
+        )
+    except Exception:
+        pass
+    missing = [code for code in wanted if not found.get(code)]
+    if missing:
+        try:
+            found.update(pg_code_fragment_ids(clients.postgres, project_id, missing, limit=limit))
+        except Exception:
+            try:
+                clients.postgres.rollback()
+            except Exception:
+                pass
+    return found
 
 
 def discover_hidden_relationships(
@@ -558,82 +842,6 @@ def discover_hidden_relationships(
     
     _logger.info("hidden_relationships.start", project=project_id)
     
-    def _get_direct_cooccurrence_fragment_ids(code_a: str, code_b: str, limit: int = 3) -> List[str]:
-        """Return fragment IDs where both codes co-occur in the same fragment."""
-        # 1) Prefer Neo4j graph evidence if available.
-        try:
-            with clients.neo4j.session(database=settings.neo4j.database) as session:
-                cypher = """
-                MATCH (f:Fragmento {project_id: $project_id})-[:TIENE_CODIGO]->(c1:Codigo {nombre: $code_a, project_id: $project_id})
-                MATCH (f)-[:TIENE_CODIGO]->(c2:Codigo {nombre: $code_b, project_id: $project_id})
-                RETURN f.id AS fragmento_id
-                LIMIT $limit
-                """
-                result = session.run(
-                    cypher,
-                    project_id=project_id,
-                    code_a=code_a,
-                    code_b=code_b,
-                    limit=int(limit),
-                )
-                ids = [str(r["fragmento_id"]) for r in result if r and r.get("fragmento_id")]
-                if ids:
-                    return ids
-        except Exception:
-            pass
-
-        # 2) Fallback: PostgreSQL co-occurrence (analisis_codigos_abiertos)
-        try:
-            with clients.postgres.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT a.fragmento_id
-                    FROM analisis_codigos_abiertos a
-                    JOIN analisis_codigos_abiertos b
-                      ON a.fragmento_id = b.fragmento_id
-                     AND a.project_id = b.project_id
-                    WHERE a.project_id = %s
-                      AND a.codigo = %s
-                      AND b.codigo = %s
-                    LIMIT %s
-                    """,
-                    (project_id, code_a, code_b, int(limit)),
-                )
-                return [str(r[0]) for r in cur.fetchall() if r and r[0]]
-        except Exception:
-            return []
-
-    def _get_single_code_fragment_ids(code: str, limit: int = 2) -> List[str]:
-        """Return fragment IDs that contain a given code (supporting/indirect evidence)."""
-        try:
-            with clients.neo4j.session(database=settings.neo4j.database) as session:
-                cypher = """
-                MATCH (f:Fragmento {project_id: $project_id})-[:TIENE_CODIGO]->(c:Codigo {nombre: $code, project_id: $project_id})
-                RETURN f.id AS fragmento_id
-                LIMIT $limit
-                """
-                result = session.run(cypher, project_id=project_id, code=code, limit=int(limit))
-                ids = [str(r["fragmento_id"]) for r in result if r and r.get("fragmento_id")]
-                if ids:
-                    return ids
-        except Exception:
-            pass
-
-        try:
-            with clients.postgres.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT fragmento_id
-                    FROM analisis_codigos_abiertos
-                    WHERE project_id = %s AND codigo = %s
-                    LIMIT %s
-                    """,
-                    (project_id, code, int(limit)),
-                )
-                return [str(r[0]) for r in cur.fetchall() if r and r[0]]
-        except Exception:
-            return []
-
     try:
         with clients.neo4j.session(database=settings.neo4j.database) as session:
             # 1. CO-OCURRENCIA: Códigos que aparecen juntos en fragmentos
@@ -661,7 +869,7 @@ def discover_hidden_relationships(
                 cooccurrence_query,
                 project_id=project_id,
                 limit=top_k,
-                evidence_limit=3,
+                evidence_limit=_DIRECT_EVIDENCE_LIMIT,
             )
             for record in result:
                 hidden_rels.append({
@@ -742,37 +950,24 @@ def discover_hidden_relationships(
         # Fallback: compute suggestions from PostgreSQL tables.
         # This is less expressive than Neo4j (no communities), but keeps the feature usable.
         try:
-            # 1) Co-occurrence from analisis_codigos_abiertos
-            with clients.postgres.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT a.codigo AS source, b.codigo AS target, COUNT(*) as cooccurrences
-                    FROM analisis_codigos_abiertos a
-                    JOIN analisis_codigos_abiertos b
-                      ON a.fragmento_id = b.fragmento_id
-                     AND a.project_id = b.project_id
-                     AND a.codigo < b.codigo
-                    WHERE a.project_id = %s
-                    GROUP BY a.codigo, b.codigo
-                    HAVING COUNT(*) >= 2
-                    ORDER BY cooccurrences DESC
-                    LIMIT %s
-                    """,
-                    (project_id, int(top_k)),
-                )
-                for source, target, count in cur.fetchall():
-                    if not source or not target:
-                        continue
-                    hidden_rels.append({
-                        "source": str(source),
-                        "source_type": "Codigo",
-                        "target": str(target),
-                        "target_type": "Codigo",
-                        "score": int(count) if count is not None else 0,
-                        "reason": "co-ocurrencia en fragmentos (PG)",
-                        "method": "cooccurrence",
-                        "confidence": "high" if (count or 0) >= 3 else "medium",
-                    })
+            # 1) Co-occurrence from the maintained code_cooccurrence table
+            from .postgres_block import fetch_code_cooccurrences
+
+            for source, target, count in fetch_code_cooccurrences(
+                clients.postgres, project_id, min_fragments=2, limit=int(top_k)
+            ):
+                if not source or not target:
+                    continue
+                hidden_rels.append({
+                    "source": str(source),
+                    "source_type": "Codigo",
+                    "target": str(target),
+                    "target_type": "Codigo",
+                    "score": int(count) if count is not None else 0,
+                    "reason": "co-ocurrencia en fragmentos (PG)",
+                    "method": "cooccurrence",
+                    "confidence": "high" if (count or 0) >= 3 else "medium",
+                })
 
             # 2) Shared category from analisis_axial (Categoria -> Codigo)
             with clients.postgres.cursor() as cur:
@@ -826,65 +1021,83 @@ def discover_hidden_relationships(
         key = tuple(sorted([rel["source"], rel["target"]]))
         if key not in seen:
             seen.add(key)
-            # Evidence backfill layer:
-            # - direct evidence: same-fragment co-occurrence
-            # - supporting evidence: best fragments for each code (indirect)
-            direct_evidence_ids: List[str] = []
-            supporting_ids: List[str] = []
-            evidence_kind = "none"
-            gap_reason: Optional[str] = None
-
-            # Prefer any evidence_ids already returned by the query
-            raw_existing = rel.get("evidence_ids") or []
-            if isinstance(raw_existing, list):
-                direct_evidence_ids = [str(v) for v in raw_existing if v]
-
-            if (
-                not direct_evidence_ids
-                and rel.get("source_type") == "Codigo"
-                and rel.get("target_type") == "Codigo"
-            ):
-                direct_evidence_ids = _get_direct_cooccurrence_fragment_ids(rel["source"], rel["target"], limit=3)
+            unique_rels.append(rel)
+    unique_rels = unique_rels[:top_k]
+
+    # Evidence backfill layer, batched over all suggestions:
+    # - direct evidence: same-fragment co-occurrence
+    # - supporting evidence: best fragments for each code (indirect)
+    def _is_code_pair(rel: Dict[str, Any]) -> bool:
+        return rel.get("source_type") == "Codigo" and rel.get("target_type") == "Codigo"
+
+    for rel in unique_rels:
+        raw_existing = rel.get("evidence_ids") or []
+        rel["evidence_ids"] = [str(v) for v in raw_existing if v] if isinstance(raw_existing, list) else []
+
+    direct_by_pair = _cooccurrence_evidence(
+        clients,
+        settings,
+        project_id,
+        [(rel["source"], rel["target"]) for rel in unique_rels if not rel["evidence_ids"] and _is_code_pair(rel)],
+        limit=_DIRECT_EVIDENCE_LIMIT,
+    )
+    for rel in unique_rels:
+        if not rel["evidence_ids"] and _is_code_pair(rel):
+            rel["evidence_ids"] = direct_by_pair.get((rel["source"], rel["target"]), [])
+
+    supporting_by_code = _code_evidence(
+        clients,
+        settings,
+        project_id,
+        [
+            code
+            for rel in unique_rels
+            if not rel["evidence_ids"] and _is_code_pair(rel)
+            for code in (rel["source"], rel["target"])
+        ],
+        limit=_SUPPORTING_EVIDENCE_LIMIT,
+    )
 
-            if direct_evidence_ids:
-                evidence_kind = "direct"
+    for rel in unique_rels:
+        direct_evidence_ids: List[str] = rel["evidence_ids"]
+        supporting_ids: List[str] = []
+        evidence_kind = "none"
+        gap_reason: Optional[str] = None
+
+        if direct_evidence_ids:
+            evidence_kind = "direct"
+        else:
+            # Structural methods can be valid hypotheses without direct co-occurrence.
+            method = str(rel.get("method") or "unknown")
+            if method in {"shared_category", "community"}:
+                gap_reason = "structural_method_no_direct_cooccurrence"
+            elif method == "cooccurrence":
+                gap_reason = "cooccurrence_score_without_retrieved_fragments"
             else:
-                # Structural methods can be valid hypotheses without direct co-occurrence.
-                method = str(rel.get("method") or "unknown")
-                if method in {"shared_category", "community"}:
-                    gap_reason = "structural_method_no_direct_cooccurrence"
-                elif method == "cooccurrence":
-                    gap_reason = "cooccurrence_score_without_retrieved_fragments"
-                else:
-                    gap_reason = "no_direct_evidence_found"
-
-                # Provide supporting evidence when possible (indirect)
-                if rel.get("source_type") == "Codigo" and rel.get("target_type") == "Codigo":
-                    a_ids = _get_single_code_fragment_ids(rel["source"], limit=2)
-                    b_ids = _get_single_code_fragment_ids(rel["target"], limit=2)
-                    # Keep order stable: a then b, unique
-                    seen_ids = set()
-                    for v in (a_ids + b_ids):
-                        if v and v not in seen_ids:
-                            supporting_ids.append(v)
-                            seen_ids.add(v)
-                    if a_ids and b_ids:
-                        evidence_kind = "indirect"
-
-            rel["evidence_ids"] = direct_evidence_ids
-            rel["supporting_evidence_ids"] = supporting_ids
-            rel["evidence_kind"] = evidence_kind
-            rel["evidence_gap_reason"] = gap_reason
-            rel["evidence_count"] = len(direct_evidence_ids)
-            rel["supporting_evidence_count"] = len(supporting_ids)
-            rel["epistemic_status"] = "hipotesis"
-            rel["origin"] = "descubrimiento"
-            rel["evidence_required"] = evidence_kind != "direct"
-            unique_rels.append(rel)
-    
+                gap_reason = "no_direct_evidence_found"
+
+            # Provide supporting evidence when possible (indirect)
+            if _is_code_pair(rel):
+                a_ids = supporting_by_code.get(rel["source"], [])
+                b_ids = supporting_by_code.get(rel["target"], [])
+                # Keep order stable: a then b, unique
+                supporting_ids = list(dict.fromkeys(v for v in (a_ids + b_ids) if v))
+                if a_ids and b_ids:
+                    evidence_kind = "indirect"
+
+        rel["evidence_ids"] = direct_evidence_ids
+        rel["supporting_evidence_ids"] = supporting_ids
+        rel["evidence_kind"] = evidence_kind
+        rel["evidence_gap_reason"] = gap_reason
+        rel["evidence_count"] = len(direct_evidence_ids)
+        rel["supporting_evidence_count"] = len(supporting_ids)
+        rel["epistemic_status"] = "hipotesis"
+        rel["origin"] = "descubrimiento"
+        rel["evidence_required"] = evidence_kind != "direct"
+
     _logger.info("hidden_relationships.complete", total=len(unique_rels))
     
-    return unique_rels[:top_k]
+    return unique_rels
 
 
 def confirm_hidden_relationship(
@@ -26,7 +26,7 @@ Funciones principales:
 
 from __future__ import annotations
 
-from typing import Iterable, Mapping, Sequence
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
 
 from neo4j import Driver
 
@@ -244,6 +244,72 @@ def merge_fragment_codes_bulk(
     }
 
 
+def fetch_pair_fragment_ids(
+    driver: Driver,
+    database: str,
+    project_id: str,
+    pairs: Sequence[Tuple[str, str]],
+    *,
+    limit: int,
+) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Fragmentos donde co-ocurren ambos códigos de cada par, en una consulta (UNWIND).
+
+    Returns:
+        Dict (code_a, code_b) -> hasta `limit` IDs; los pares sin fragmentos
+        compartidos no aparecen.
+    """
+    if not pairs:
+        return {}
+    cypher = """
+    UNWIND $pairs AS pair
+    MATCH (f:Fragmento {project_id: $project_id})-[:TIENE_CODIGO]->(:Codigo {nombre: pair[0], project_id: $project_id})
+    MATCH (f)-[:TIENE_CODIGO]->(:Codigo {nombre: pair[1], project_id: $project_id})
+    WITH pair, collect(DISTINCT f.id)[0..$limit] AS ids
+    RETURN pair[0] AS code_a, pair[1] AS code_b, ids
+    """
+    result: Dict[Tuple[str, str], List[str]] = {}
+    with driver.session(database=database) as session:
+        records = session.run(
+            cypher,
+            pairs=[[a, b] for a, b in pairs],
+            project_id=project_id,
+            limit=int(limit),
+        )
+        for record in records:
+            ids = [str(v) for v in (record["ids"] or []) if v]
+            if ids:
+                result[(record["code_a"], record["code_b"])] = ids
+    return result
+
+
+def fetch_code_fragment_ids(
+    driver: Driver,
+    database: str,
+    project_id: str,
+    codes: Sequence[str],
+    *,
+    limit: int,
+) -> Dict[str, List[str]]:
+    """Hasta `limit` fragmentos por código, en una consulta (UNWIND)."""
+    if not codes:
+        return {}
+    cypher = """
+    UNWIND $codes AS code
+    MATCH (f:Fragmento {project_id: $project_id})-[:TIENE_CODIGO]->(:Codigo {nombre: code, project_id: $project_id})
+    WITH code, collect(DISTINCT f.id)[0..$limit] AS ids
+    RETURN code, ids
+    """
+    result: Dict[str, List[str]] = {}
+    with driver.session(database=database) as session:
+        records = session.run(cypher, codes=list(codes), project_id=project_id, limit=int(limit))
+        for record in records:
+            ids = [str(v) for v in (record["ids"] or []) if v]
+            if ids:
+                result[record["code"]] = ids
+    return result
+
+
 def delete_fragment_code(driver: Driver, database: str, fragment_id: str, codigo: str, project_id: str) -> int:
     """
     Elimina la relación TIENE_CODIGO entre un fragmento y un código en Neo4j.
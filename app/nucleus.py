@@ -14,6 +14,7 @@ Funciones principales:
     - centrality_overview(): Ranking de categorías por centralidad
     - coverage_report(): Cobertura de categoría (entrevistas, roles, citas)
     - probe_semantics(): Búsqueda semántica con filtros
+    - probe_semantics_batch(): Varias probes en un solo lote
     - nucleus_report(): Reporte completo para evaluar candidato a núcleo
 
 Criterios de núcleo selectivo (en nucleus_report):
@@ -45,7 +46,6 @@ from typing import Any, Dict, List, Optional, cast, Tuple
 from datetime import datetime
 
 import structlog
-from qdrant_client.models import Condition, FieldCondition, Filter, MatchValue
 
 from .clients import ServiceClients
 from .postgres_block import (
@@ -56,7 +56,7 @@ from .postgres_block import (
 )
 from .settings import AppSettings
 from .qdrant_block import ensure_payload_indexes
-from .queries import _build_project_filter
+from .queries import multi_search
 
 _logger = structlog.get_logger()
 
@@ -137,72 +137,42 @@ def probe_semantics(
     filters: Optional[Dict[str, Any]] = None,
     project: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
-    # ensure payload indexes exist prior to probing
-    ensure_payload_indexes(clients.qdrant, settings.qdrant.collection)
-
-    vector = clients.aoai.embeddings.create(
-        model=settings.azure.deployment_embed,
-        input=prompt,
-    ).data[0].embedding
-
-    project_id = project or "default"
-
-    def build_filter(speaker_value: Optional[str]) -> Filter:
-        base = _build_project_filter(project_id, speaker_value)
-        must: List[Condition] = cast(List[Condition], list(base.must)) if base.must else []
-        must_not: List[Condition] = cast(List[Condition], list(base.must_not)) if base.must_not else []
-        if filters:
-            if filters.get("archivo"):
-                must.append(FieldCondition(key="archivo", match=MatchValue(value=filters["archivo"])))
-            if filters.get("area_tematica"):
-                must.append(FieldCondition(key="area_tematica", match=MatchValue(value=filters["area_tematica"])))
-            if filters.get("actor_principal"):
-                must.append(FieldCondition(key="actor_principal", match=MatchValue(value=filters["actor_principal"])))
-            if filters.get("requiere_protocolo_lluvia") is not None:
-                must.append(
-                    FieldCondition(
-                        key="requiere_protocolo_lluvia",
-                        match=MatchValue(value=bool(filters["requiere_protocolo_lluvia"])),
-                    )
-                )
-        return Filter(must=must, must_not=must_not or None)
-
-    speaker_filter = (filters or {}).get("speaker") or "interviewee"
-    q_filter = build_filter(speaker_filter)
+    return probe_semantics_batch(clients, settings, [prompt], top_k=top_k, filters=[filters], project=project)[0]
+
+
+def _probe_suggestion(hit: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "fragmento_id": hit["fragmento_id"],
+        "score": hit["score"],
+        "archivo": hit.get("archivo"),
+        "par_idx": hit.get("par_idx"),
+        "fragmento": hit.get("fragmento"),
+        "area_tematica": hit.get("area_tematica"),
+        "actor_principal": hit.get("actor_principal"),
+        "requiere_protocolo_lluvia": hit.get("requiere_protocolo_lluvia"),
+    }
 
-    response = clients.qdrant.query_points(
-        collection_name=settings.qdrant.collection,
-        query=vector,
-        limit=top_k,
-        with_payload=True,
-        query_filter=q_filter,
-    )
-    if speaker_filter and not response.points:
-        q_filter = build_filter(None)
-        response = clients.qdrant.query_points(
-            collection_name=settings.qdrant.collection,
-            query=vector,
-            limit=top_k,
-            with_payload=True,
-            query_filter=q_filter,
-        )
 
-    suggestions: List[Dict[str, Any]] = []
-    for point in response.points:
-        payload = point.payload or {}
-        suggestions.append(
-            {
-                "fragmento_id": str(point.id),
-                "score": point.score,
-                "archivo": payload.get("archivo"),
-                "par_idx": payload.get("par_idx"),
-                "fragmento": payload.get("fragmento"),
-                "area_tematica": payload.get("area_tematica"),
-                "actor_principal": payload.get("actor_principal"),
-                "requiere_protocolo_lluvia": payload.get("requiere_protocolo_lluvia"),
-            }
-        )
-    return suggestions
+def probe_semantics_batch(
+    clients: ServiceClients,
+    settings: AppSettings,
+    prompts: List[str],
+    *,
+    top_k: int = 10,
+    filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+    project: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Varias probes semánticas (prompt i con filtros i) en un solo lote `multi_search`."""
+    # ensure payload indexes exist prior to probing
+    ensure_payload_indexes(clients.qdrant, settings.qdrant.collection)
+    filter_list = list(filters or [None] * len(prompts))
+    specs = []
+    for prompt, item_filters in zip(prompts, filter_list):
+        spec_filters = dict(item_filters or {})
+        spec_filters["speaker"] = spec_filters.get("speaker") or "interviewee"
+        specs.append({"query": prompt, "filters": spec_filters, "top_k": top_k})
+    results = multi_search(clients, settings, specs, project=project or "default")
+    return [[_probe_suggestion(hit) for hit in hits] for hits in results]
 
 
 def nucleus_report(
@@ -44,7 +44,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 import threading
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from psycopg2.extensions import connection as PGConnection
 from psycopg2.extras import execute_values, Json
@@ -78,6 +78,9 @@ _open_coding_table_lock = threading.Lock()
 _codes_catalog_table_ready = False
 _codes_catalog_table_lock = threading.Lock()
 
+_fragment_neighbors_table_ready = False
+_fragment_neighbors_table_lock = threading.Lock()
+
 Row = Tuple[
     str,  # project_id
     str,  # id
@@ -368,6 +371,143 @@ def list_report_jobs(
     return items
 
 
+# =============================================================================
+# Runner Tasks - Estado compartido de runners/agentes (ver app.task_registry)
+# =============================================================================
+
+_runner_tasks_table_ready = False
+_runner_tasks_table_lock = threading.Lock()
+
+
+def ensure_runner_tasks_table(pg: PGConnection) -> None:
+    """Tabla de estado de tareas en curso (runner de codificación, agente).
+
+    `data` guarda el estado completo como JSONB; las actualizaciones se
+    fusionan en una sola sentencia (`data || patch`) para que cualquier
+    worker de la API pueda escribir o leer el progreso.
+    """
+    global _runner_tasks_table_ready
+    if _runner_tasks_table_ready:
+        return
+    with _runner_tasks_table_lock:
+        if _runner_tasks_table_ready:
+            return
+        sql = """
+        CREATE TABLE IF NOT EXISTS runner_tasks (
+            task_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            project_id TEXT,
+            data JSONB NOT NULL DEFAULT '{}'::jsonb,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS ix_runner_tasks_kind ON runner_tasks(kind, updated_at DESC);
+        """
+        with pg.cursor() as cur:
+            cur.execute(sql)
+        pg.commit()
+        _runner_tasks_table_ready = True
+
+
+def create_runner_task(
+    pg: PGConnection,
+    *,
+    task_id: str,
+    kind: str,
+    project_id: Optional[str],
+    data: Dict[str, Any],
+) -> None:
+    ensure_runner_tasks_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO runner_tasks (task_id, kind, project_id, data)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (task_id) DO UPDATE
+               SET data = EXCLUDED.data, kind = EXCLUDED.kind,
+                   project_id = EXCLUDED.project_id, updated_at = NOW()
+            """,
+            (task_id, kind, project_id, Json(data)),
+        )
+    pg.commit()
+
+
+def get_runner_task(pg: PGConnection, task_id: str) -> Optional[Dict[str, Any]]:
+    ensure_runner_tasks_table(pg)
+    with pg.cursor() as cur:
+        cur.execute("SELECT data FROM runner_tasks WHERE task_id = %s", (task_id,))
+        row = cur.fetchone()
+    return dict(row[0] or {}) if row else None
+
+
+def merge_runner_task(pg: PGConnection, task_id: str, patch: Dict[str, Any]) -> None:
+    """Fusiona `patch` en el estado de la tarea (claves de primer nivel)."""
+    if not patch:
+        return
+    ensure_runner_tasks_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            "UPDATE runner_tasks SET data = data || %s, updated_at = NOW() WHERE task_id = %s",
+            (Json(patch), task_id),
+        )
+    pg.commit()
+
+
+def increment_runner_task_field(pg: PGConnection, task_id: str, field: str, amount: int = 1) -> int:
+    """Incrementa atómicamente un contador entero del estado y retorna el nuevo valor."""
+    ensure_runner_tasks_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE runner_tasks
+               SET data = jsonb_set(
+                       data, ARRAY[%s],
+                       to_jsonb(COALESCE((data->>%s)::bigint, 0) + %s)
+                   ),
+                   updated_at = NOW()
+             WHERE task_id = %s
+            RETURNING (data->>%s)::bigint
+            """,
+            (field, field, int(amount), task_id, field),
+        )
+        row = cur.fetchone()
+    pg.commit()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def append_runner_task_error(pg: PGConnection, task_id: str, message: str) -> None:
+    ensure_runner_tasks_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE runner_tasks
+               SET data = jsonb_set(
+                       data, '{errors}',
+                       COALESCE(data->'errors', '[]'::jsonb) || jsonb_build_array(%s::text)
+                   ),
+                   updated_at = NOW()
+             WHERE task_id = %s
+            """,
+            (message, task_id),
+        )
+    pg.commit()
+
+
+def list_runner_tasks(pg: PGConnection, *, kind: Optional[str] = None, limit: int = 200) -> Dict[str, Dict[str, Any]]:
+    ensure_runner_tasks_table(pg)
+    sql = "SELECT task_id, data FROM runner_tasks"
+    params: List[Any] = []
+    if kind:
+        sql += " WHERE kind = %s"
+        params.append(kind)
+    sql += " ORDER BY updated_at DESC LIMIT %s"
+    params.append(max(1, int(limit)))
+    with pg.cursor() as cur:
+        cur.execute(sql, tuple(params))
+        rows = cur.fetchall() or []
+    return {row[0]: dict(row[1] or {}) for row in rows}
+
+
 def ensure_comparison_table(pg: PGConnection) -> None:
     sql = """
     CREATE TABLE IF NOT EXISTS analisis_comparacion_constante (
@@ -711,6 +851,61 @@ def insert_discovery_run(
     }
 
 
+def insert_discovery_runs(
+    pg: PGConnection,
+    *,
+    project: str,
+    records: Sequence[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Inserta varias iteraciones de Discovery con un único INSERT multi-fila.
+
+    Cada record usa las mismas claves que `insert_discovery_run` (concepto,
+    scope, iter_index, archivo, query, positivos, negativos, overlap,
+    landing_rate, top_fragments, memo). Retorna id/created_at alineados con
+    `records`.
+    """
+    if not records:
+        return []
+    ensure_discovery_runs_table(pg)
+
+    rows = [
+        (
+            project,
+            rec["concepto"],
+            rec["scope"],
+            rec["iter_index"],
+            rec.get("archivo"),
+            rec.get("query"),
+            rec.get("positivos") or [],
+            rec.get("negativos") or [],
+            rec.get("overlap"),
+            rec.get("landing_rate"),
+            Json(rec["top_fragments"]) if rec.get("top_fragments") else None,
+            rec.get("memo"),
+        )
+        for rec in records
+    ]
+    sql = """
+    INSERT INTO discovery_runs (
+        project_id, concepto, scope, iter, archivo, query, positivos, negativos,
+        overlap, landing_rate, top_fragments, memo
+    ) VALUES %s
+    RETURNING id, created_at
+    """
+    with pg.cursor() as cur:
+        # page_size >= len(rows): una sola sentencia, RETURNING en orden de VALUES.
+        returned = execute_values(cur, sql, rows, page_size=len(rows), fetch=True)
+    pg.commit()
+    return [
+        {
+            "id": row[0],
+            "created_at": row[1].isoformat().replace("+00:00", "Z") if row[1] else None,
+        }
+        for row in returned
+    ]
+
+
 def get_discovery_runs(
     pg: PGConnection,
     *,
@@ -835,6 +1030,26 @@ def calculate_landing_rate(
     }
 
 
+def fetch_project_fragment_codes(pg: PGConnection, project: str) -> Tuple[Dict[str, List[str]], int]:
+    """
+    Carga en una consulta los códigos abiertos de cada fragmento del proyecto.
+
+    Returns:
+        ({fragmento_id: [codigos]}, total de filas en analisis_codigos_abiertos)
+    """
+    sql = """
+    SELECT fragmento_id, array_agg(DISTINCT codigo), COUNT(*)
+    FROM analisis_codigos_abiertos
+    WHERE project_id = %s
+    GROUP BY fragmento_id
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project,))
+        rows = cur.fetchall()
+    codes = {str(r[0]): list(r[1] or []) for r in rows}
+    return codes, sum(int(r[2] or 0) for r in rows)
+
+
 def get_project_axial_codes(pg: PGConnection, project: str, limit: int = 100) -> List[str]:
     """
     Obtiene lista de códigos axiales únicos para un proyecto.
@@ -1783,6 +1998,238 @@ def ensure_code_catalog_entry(
     return get_code_id_for_codigo(pg, project_id, codigo_clean)
 
 
+
+# -----------------------------------------------------------------------------
+# Cierre de alias (código -> canónico final), versionado por proyecto
+# -----------------------------------------------------------------------------
+
+# Saltos seguidos al materializar el cierre (mismo default que la resolución por saltos).
+_ALIAS_CLOSURE_MAX_HOPS = 10
+
+_code_alias_closure_ready: Optional[bool] = None
+_code_alias_closure_lock = threading.Lock()
+# project_id -> (versión del catálogo, {codigo: canónico}) sólo para códigos fusionados.
+_alias_closure_cache: Dict[str, Tuple[int, Dict[str, str]]] = {}
+_alias_closure_cache_lock = threading.Lock()
+
+_CODE_ALIAS_CLOSURE_DDL = """
+CREATE TABLE IF NOT EXISTS code_catalog_versions (
+    project_id TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    closure_version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS code_alias_closure (
+    project_id TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    PRIMARY KEY (project_id, codigo)
+);
+
+CREATE OR REPLACE FUNCTION cac_bump() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        p := OLD.project_id;
+    ELSE
+        p := NEW.project_id;
+    END IF;
+    INSERT INTO code_catalog_versions (project_id, version, closure_version)
+    VALUES (p, 1, 0)
+    ON CONFLICT (project_id) DO UPDATE
+       SET version = code_catalog_versions.version + 1;
+    IF TG_OP = 'UPDATE' AND OLD.project_id IS DISTINCT FROM NEW.project_id THEN
+        INSERT INTO code_catalog_versions (project_id, version, closure_version)
+        VALUES (OLD.project_id, 1, 0)
+        ON CONFLICT (project_id) DO UPDATE
+           SET version = code_catalog_versions.version + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_cac_insert') THEN
+        CREATE TRIGGER trg_cac_insert
+            AFTER INSERT ON catalogo_codigos
+            FOR EACH ROW WHEN (NEW.status = 'merged')
+            EXECUTE FUNCTION cac_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_cac_delete') THEN
+        CREATE TRIGGER trg_cac_delete
+            AFTER DELETE ON catalogo_codigos
+            FOR EACH ROW WHEN (OLD.status = 'merged')
+            EXECUTE FUNCTION cac_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_cac_update') THEN
+        CREATE TRIGGER trg_cac_update
+            AFTER UPDATE OF project_id, codigo, status, canonical_codigo ON catalogo_codigos
+            FOR EACH ROW WHEN (
+                OLD.project_id IS DISTINCT FROM NEW.project_id
+                OR OLD.codigo IS DISTINCT FROM NEW.codigo
+                OR OLD.status IS DISTINCT FROM NEW.status
+                OR OLD.canonical_codigo IS DISTINCT FROM NEW.canonical_codigo
+            )
+            EXECUTE FUNCTION cac_bump();
+    END IF;
+END $$;
+"""
+
+# Mismo recorrido que la resolución por saltos: se sigue `canonical_codigo`
+# mientras el código esté 'merged', como máximo `max_hops` saltos.
+_CODE_ALIAS_CLOSURE_FILL_SQL = """
+DELETE FROM code_alias_closure WHERE project_id = %(project)s;
+INSERT INTO code_alias_closure (project_id, codigo, canonical)
+WITH RECURSIVE walk (origin, cur, depth) AS (
+    SELECT codigo, codigo, 0
+      FROM catalogo_codigos
+     WHERE project_id = %(project)s
+       AND status = 'merged'
+       AND NULLIF(btrim(canonical_codigo), '') IS NOT NULL
+    UNION ALL
+    SELECT w.origin, btrim(c.canonical_codigo), w.depth + 1
+      FROM walk w
+      JOIN catalogo_codigos c
+        ON c.project_id = %(project)s AND c.codigo = w.cur
+     WHERE w.depth < %(max_hops)s
+       AND c.status = 'merged'
+       AND NULLIF(btrim(c.canonical_codigo), '') IS NOT NULL
+       AND btrim(c.canonical_codigo) <> w.cur
+)
+SELECT %(project)s, origin, cur
+  FROM (
+        SELECT DISTINCT ON (origin) origin, cur
+          FROM walk
+         ORDER BY origin, depth DESC
+       ) final
+ WHERE cur <> origin;
+"""
+
+
+def ensure_code_alias_closure(pg: PGConnection) -> bool:
+    """Tablas del cierre de alias y triggers que versionan el catálogo.
+
+    Cualquier cambio de `catalogo_codigos` que afecte fusiones (fila 'merged',
+    cambio de estado o de `canonical_codigo`) incrementa
+    `code_catalog_versions.version`; el cierre se recalcula al leerlo si su
+    `closure_version` quedó atrás.
+
+    Returns:
+        False si no se pudo crear (p.ej. permisos); se usa la resolución por saltos.
+    """
+    global _code_alias_closure_ready
+    if _code_alias_closure_ready is not None:
+        return _code_alias_closure_ready
+    with _code_alias_closure_lock:
+        if _code_alias_closure_ready is not None:
+            return _code_alias_closure_ready
+        ensure_codes_catalog_table(pg)
+        try:
+            with pg.cursor() as cur:
+                cur.execute(_CODE_ALIAS_CLOSURE_DDL)
+            pg.commit()
+            _code_alias_closure_ready = True
+        except Exception as exc:
+            _logger.warning("code_alias_closure.not_available", extra={"error": str(exc)})
+            try:
+                pg.rollback()
+            except Exception:
+                pass
+            _code_alias_closure_ready = False
+        return _code_alias_closure_ready
+
+
+def refresh_code_alias_closure(pg: PGConnection, project_id: str) -> int:
+    """Recalcula el cierre de alias del proyecto si su versión quedó atrás.
+
+    Bloquea la fila de versión (FOR UPDATE) para que una fusión concurrente
+    espere y vuelva a invalidar tras el commit.
+
+    Returns:
+        Versión del catálogo a la que corresponde el cierre.
+    """
+    ensure_code_alias_closure(pg)
+    try:
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO code_catalog_versions (project_id) VALUES (%s)
+                ON CONFLICT (project_id) DO NOTHING
+                """,
+                (project_id,),
+            )
+            cur.execute(
+                """
+                SELECT version, closure_version
+                  FROM code_catalog_versions
+                 WHERE project_id = %s
+                   FOR UPDATE
+                """,
+                (project_id,),
+            )
+            version, closure_version = cur.fetchone()
+            if closure_version != version:
+                cur.execute(
+                    _CODE_ALIAS_CLOSURE_FILL_SQL,
+                    {"project": project_id, "max_hops": _ALIAS_CLOSURE_MAX_HOPS},
+                )
+                cur.execute(
+                    "UPDATE code_catalog_versions SET closure_version = %s WHERE project_id = %s",
+                    (version, project_id),
+                )
+        pg.commit()
+    except Exception:
+        pg.rollback()
+        raise
+    return int(version)
+
+
+def get_code_alias_closure(pg: PGConnection, project_id: str) -> Dict[str, str]:
+    """Mapa codigo -> canónico final de los códigos fusionados del proyecto.
+
+    Cacheado en el proceso por versión del catálogo: con caché vigente cuesta
+    una lectura por PK de `code_catalog_versions`. Los códigos ausentes del
+    mapa son su propio canónico.
+    """
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT version, closure_version FROM code_catalog_versions WHERE project_id = %s",
+            (project_id,),
+        )
+        row = cur.fetchone()
+
+    with _alias_closure_cache_lock:
+        cached = _alias_closure_cache.get(project_id)
+    if row and cached and row[0] == row[1] == cached[0]:
+        return cached[1]
+
+    if row and row[0] == row[1]:
+        version = int(row[0])
+    else:
+        version = refresh_code_alias_closure(pg, project_id)
+
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT codigo, canonical FROM code_alias_closure WHERE project_id = %s",
+            (project_id,),
+        )
+        closure = {str(r[0]): str(r[1]) for r in cur.fetchall()}
+    with _alias_closure_cache_lock:
+        _alias_closure_cache[project_id] = (version, closure)
+    return closure
+
+
+def invalidate_code_alias_closure(project_id: Optional[str] = None) -> None:
+    """Descarta el cierre cacheado en este proceso (o todos)."""
+    with _alias_closure_cache_lock:
+        if project_id is None:
+            _alias_closure_cache.clear()
+        else:
+            _alias_closure_cache.pop(project_id, None)
+
+
 def resolve_canonical_codigo(
     pg: PGConnection,
     project_id: str,
@@ -1839,7 +2286,12 @@ def resolve_canonical_codigos_bulk(
     *,
     max_hops: int = 10,
 ) -> Dict[str, str]:
-    """Resuelve múltiples códigos a su canónico (mejor performance que per-row)."""
+    """Resuelve múltiples códigos a su canónico (mejor performance que per-row).
+
+    Con el `max_hops` por defecto se sirve desde el cierre de alias cacheado
+    (`get_code_alias_closure`); si no está disponible, sigue las cadenas con
+    una consulta por salto.
+    """
     ensure_codes_catalog_table(pg)
 
     origins: List[str] = []
@@ -1853,6 +2305,17 @@ def resolve_canonical_codigos_bulk(
     if not origins:
         return {}
 
+    if max_hops == _ALIAS_CLOSURE_MAX_HOPS and ensure_code_alias_closure(pg):
+        try:
+            closure = get_code_alias_closure(pg, project_id)
+            return {o: closure.get(o, o) for o in origins}
+        except Exception as exc:
+            _logger.warning("code_alias_closure.read_failed", extra={"error": str(exc)})
+            try:
+                pg.rollback()
+            except Exception:
+                pass
+
     # Track current canonical candidate per origin.
     current: Dict[str, str] = {o: o for o in origins}
 
@@ -2961,6 +3424,57 @@ def list_coded_fragment_ids(pg: PGConnection, project: Optional[str] = None) ->
         return [row[0] for row in cur.fetchall()]
 
 
+def count_codes_by_fragment(
+    pg: PGConnection,
+    project: Optional[str] = None,
+    fragment_ids: Optional[Sequence[str]] = None,
+) -> Dict[str, int]:
+    """Cantidad de códigos definitivos por fragmento.
+
+    Con `fragment_ids` devuelve una entrada (posiblemente 0) por cada ID pedido;
+    sin ellos recorre todos los fragmentos del proyecto (backfill).
+    """
+    project_id = project or "default"
+    if fragment_ids is not None:
+        ids = [str(fid) for fid in fragment_ids if fid]
+        if not ids:
+            return {}
+        sql = """
+            SELECT fragmento_id, COUNT(*)::INT
+              FROM analisis_codigos_abiertos
+             WHERE project_id = %s AND fragmento_id = ANY(%s)
+             GROUP BY fragmento_id
+        """
+        with pg.cursor() as cur:
+            cur.execute(sql, (project_id, ids))
+            found = {str(row[0]): int(row[1]) for row in cur.fetchall()}
+        return {fid: found.get(fid, 0) for fid in ids}
+
+    sql = """
+        SELECT ef.id, COUNT(aca.codigo)::INT
+          FROM entrevista_fragmentos ef
+          LEFT JOIN analisis_codigos_abiertos aca
+            ON aca.project_id = ef.project_id AND aca.fragmento_id = ef.id
+         WHERE ef.project_id = %s
+         GROUP BY ef.id
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project_id,))
+        return {str(row[0]): int(row[1]) for row in cur.fetchall()}
+
+
+def list_fragment_ids_for_code(pg: PGConnection, project: Optional[str], codigo: str) -> List[str]:
+    """IDs de fragmentos con evidencia definitiva para `codigo`."""
+    sql = """
+        SELECT DISTINCT fragmento_id
+          FROM analisis_codigos_abiertos
+         WHERE project_id = %s AND codigo = %s
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", codigo))
+        return [str(row[0]) for row in cur.fetchall()]
+
+
 def coding_stats(pg: PGConnection, project: Optional[str] = None) -> Dict[str, Any]:
     stats: Dict[str, Any] = {}
     with pg.cursor() as cur:
@@ -2994,11 +3508,482 @@ def coding_stats(pg: PGConnection, project: Optional[str] = None) -> Dict[str, A
     return stats
 
 
+# =============================================================================
+# Contadores del dashboard (project_dashboard_counters)
+# =============================================================================
+#
+# Conteos por proyecto mantenidos por triggers por sentencia sobre las tablas de origen
+# (ingesta, familiarización, codificación abierta, axial y candidatos), de modo
+# que el dashboard lee una fila por métrica en lugar de agregar tablas enteras.
+# Los conteos distintos (archivos, códigos, categorías...) llevan un contador
+# de referencias por miembro en project_dashboard_members. La reconciliación
+# (`reconcile_dashboard_counters`, periódica vía Celery beat o CLI) recalcula
+# desde las tablas de origen y corrige cualquier desvío.
+
+_dashboard_counters_ready = False
+_dashboard_counters_lock = threading.Lock()
+
+_DASHBOARD_COUNTERS_DDL = """
+CREATE TABLE IF NOT EXISTS project_dashboard_counters (
+    project_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, metric)
+);
+
+CREATE TABLE IF NOT EXISTS project_dashboard_members (
+    project_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    member TEXT NOT NULL,
+    refs INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, metric, member)
+);
+
+-- Aplica los eventos de una sentencia: (proyecto, métrica, miembro, delta),
+-- con miembro NULL para contadores simples. Agrega por clave y escribe en
+-- orden fijo (un upsert por tabla), de modo que escrituras masivas o
+-- concurrentes no serializan fila a fila sobre los contadores del proyecto.
+CREATE OR REPLACE FUNCTION pdc_apply(projects TEXT[], metrics TEXT[], members TEXT[], deltas BIGINT[]) RETURNS VOID AS $$
+BEGIN
+    WITH e AS (
+        SELECT * FROM unnest(projects, metrics, members, deltas) AS u(project_id, metric, member, d)
+    ),
+    md AS (
+        SELECT project_id, metric, member, SUM(d)::INT AS d
+          FROM e
+         WHERE member IS NOT NULL
+         GROUP BY project_id, metric, member
+        HAVING SUM(d) <> 0
+    ),
+    up AS (
+        INSERT INTO project_dashboard_members AS pm (project_id, metric, member, refs)
+        SELECT project_id, metric, member, d FROM md ORDER BY project_id, metric, member
+        ON CONFLICT (project_id, metric, member) DO UPDATE
+           SET refs = pm.refs + EXCLUDED.refs
+        RETURNING pm.project_id, pm.metric, pm.member, pm.refs
+    ),
+    -- Un miembro distinto suma 1 al aparecer y resta 1 al quedarse sin referencias.
+    flips AS (
+        SELECT up.project_id, up.metric,
+               CASE
+                   WHEN up.refs > 0 AND up.refs - md.d <= 0 THEN 1
+                   WHEN up.refs <= 0 AND up.refs - md.d > 0 THEN -1
+                   ELSE 0
+               END AS d
+          FROM up
+          JOIN md ON md.project_id = up.project_id AND md.metric = up.metric AND md.member = up.member
+    ),
+    cd AS (
+        SELECT project_id, metric, d FROM e WHERE member IS NULL
+        UNION ALL
+        SELECT project_id, metric, d FROM flips
+    )
+    INSERT INTO project_dashboard_counters AS pc (project_id, metric, value)
+    SELECT project_id, metric, SUM(d)::BIGINT
+      FROM cd
+     GROUP BY project_id, metric
+    HAVING SUM(d) <> 0
+     ORDER BY project_id, metric
+    ON CONFLICT (project_id, metric) DO UPDATE
+       SET value = pc.value + EXCLUDED.value;
+
+    DELETE FROM project_dashboard_members pm
+     USING (
+            SELECT DISTINCT project_id, metric, member
+              FROM unnest(projects, metrics, members) AS u(project_id, metric, member)
+             WHERE member IS NOT NULL
+     ) t
+     WHERE pm.project_id = t.project_id
+       AND pm.metric = t.metric
+       AND pm.member = t.member
+       AND pm.refs <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pdc_speaker_metric(s TEXT) RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN s = 'interviewer' THEN 'fragmentos_entrevistador'
+        WHEN s = 'interviewee' THEN 'fragmentos_entrevistado'
+        ELSE 'fragmentos_otros'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Triggers por sentencia: en UPDATE sólo cuentan las filas cuyas columnas
+-- relevantes cambiaron (diferencia EXCEPT ALL entre tablas de transición).
+CREATE OR REPLACE FUNCTION pdc_sync_fragments() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT[]; a TEXT[]; sp TEXT[]; sg BIGINT[];
+    ep TEXT[]; em TEXT[]; ek TEXT[]; ed BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(speaker), array_agg(1::BIGINT)
+          INTO p, a, sp, sg FROM pdc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(speaker), array_agg(-1::BIGINT)
+          INTO p, a, sp, sg FROM pdc_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(speaker), array_agg(s)
+          INTO p, a, sp, sg
+          FROM (
+                SELECT *, -1::BIGINT AS s FROM (
+                    SELECT project_id, archivo, speaker FROM pdc_old
+                    EXCEPT ALL
+                    SELECT project_id, archivo, speaker FROM pdc_new) o
+                UNION ALL
+                SELECT *, 1::BIGINT FROM (
+                    SELECT project_id, archivo, speaker FROM pdc_new
+                    EXCEPT ALL
+                    SELECT project_id, archivo, speaker FROM pdc_old) n
+          ) d;
+    END IF;
+    IF p IS NULL THEN
+        RETURN NULL;
+    END IF;
+    SELECT array_agg(project_id), array_agg(metric), array_agg(member), array_agg(d)
+      INTO ep, em, ek, ed
+      FROM (
+            SELECT project_id, 'fragmentos_totales' AS metric, NULL::TEXT AS member, s AS d
+              FROM unnest(p, a, sp, sg) AS u(project_id, archivo, speaker, s)
+            UNION ALL
+            SELECT project_id, pdc_speaker_metric(speaker), NULL, s
+              FROM unnest(p, a, sp, sg) AS u(project_id, archivo, speaker, s)
+            UNION ALL
+            SELECT project_id, 'archivos', archivo, s
+              FROM unnest(p, a, sp, sg) AS u(project_id, archivo, speaker, s)
+             WHERE archivo IS NOT NULL
+      ) e;
+    PERFORM pdc_apply(ep, em, ek, ed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pdc_sync_reviews() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT[]; sg BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(1::BIGINT) INTO p, sg FROM pdc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(-1::BIGINT) INTO p, sg FROM pdc_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(s) INTO p, sg
+          FROM (
+                SELECT project_id, -1::BIGINT AS s FROM (
+                    SELECT project_id FROM pdc_old EXCEPT ALL SELECT project_id FROM pdc_new) o
+                UNION ALL
+                SELECT project_id, 1::BIGINT FROM (
+                    SELECT project_id FROM pdc_new EXCEPT ALL SELECT project_id FROM pdc_old) n
+          ) d;
+    END IF;
+    IF p IS NOT NULL THEN
+        PERFORM pdc_apply(
+            p,
+            array_fill('entrevistas_revisadas'::TEXT, ARRAY[cardinality(p)]),
+            array_fill(NULL::TEXT, ARRAY[cardinality(p)]),
+            sg
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pdc_sync_open_codes() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT[]; c TEXT[]; f TEXT[]; sg BIGINT[];
+    ep TEXT[]; em TEXT[]; ek TEXT[]; ed BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(codigo), array_agg(fragmento_id), array_agg(1::BIGINT)
+          INTO p, c, f, sg FROM pdc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(codigo), array_agg(fragmento_id), array_agg(-1::BIGINT)
+          INTO p, c, f, sg FROM pdc_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(codigo), array_agg(fragmento_id), array_agg(s)
+          INTO p, c, f, sg
+          FROM (
+                SELECT *, -1::BIGINT AS s FROM (
+                    SELECT project_id, codigo, fragmento_id FROM pdc_old
+                    EXCEPT ALL
+                    SELECT project_id, codigo, fragmento_id FROM pdc_new) o
+                UNION ALL
+                SELECT *, 1::BIGINT FROM (
+                    SELECT project_id, codigo, fragmento_id FROM pdc_new
+                    EXCEPT ALL
+                    SELECT project_id, codigo, fragmento_id FROM pdc_old) n
+          ) d;
+    END IF;
+    IF p IS NULL THEN
+        RETURN NULL;
+    END IF;
+    SELECT array_agg(project_id), array_agg(metric), array_agg(member), array_agg(d)
+      INTO ep, em, ek, ed
+      FROM (
+            SELECT project_id, 'citas' AS metric, NULL::TEXT AS member, s AS d
+              FROM unnest(p, c, f, sg) AS u(project_id, codigo, fragmento_id, s)
+            UNION ALL
+            SELECT project_id, 'codigos_unicos', codigo, s
+              FROM unnest(p, c, f, sg) AS u(project_id, codigo, fragmento_id, s)
+             WHERE codigo IS NOT NULL
+            UNION ALL
+            SELECT project_id, 'fragmentos_codificados', fragmento_id, s
+              FROM unnest(p, c, f, sg) AS u(project_id, codigo, fragmento_id, s)
+             WHERE fragmento_id IS NOT NULL
+      ) e;
+    PERFORM pdc_apply(ep, em, ek, ed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pdc_sync_axial() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT[]; cat TEXT[]; c TEXT[]; sg BIGINT[];
+    ep TEXT[]; em TEXT[]; ek TEXT[]; ed BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(categoria), array_agg(codigo), array_agg(1::BIGINT)
+          INTO p, cat, c, sg FROM pdc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(categoria), array_agg(codigo), array_agg(-1::BIGINT)
+          INTO p, cat, c, sg FROM pdc_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(categoria), array_agg(codigo), array_agg(s)
+          INTO p, cat, c, sg
+          FROM (
+                SELECT *, -1::BIGINT AS s FROM (
+                    SELECT project_id, categoria, codigo FROM pdc_old
+                    EXCEPT ALL
+                    SELECT project_id, categoria, codigo FROM pdc_new) o
+                UNION ALL
+                SELECT *, 1::BIGINT FROM (
+                    SELECT project_id, categoria, codigo FROM pdc_new
+                    EXCEPT ALL
+                    SELECT project_id, categoria, codigo FROM pdc_old) n
+          ) d;
+    END IF;
+    IF p IS NULL THEN
+        RETURN NULL;
+    END IF;
+    SELECT array_agg(project_id), array_agg(metric), array_agg(member), array_agg(d)
+      INTO ep, em, ek, ed
+      FROM (
+            SELECT project_id, 'relaciones' AS metric, NULL::TEXT AS member, s AS d
+              FROM unnest(p, cat, c, sg) AS u(project_id, categoria, codigo, s)
+            UNION ALL
+            SELECT project_id, 'categorias', categoria, s
+              FROM unnest(p, cat, c, sg) AS u(project_id, categoria, codigo, s)
+             WHERE categoria IS NOT NULL
+            UNION ALL
+            SELECT project_id, 'codigos_relacionados', codigo, s
+              FROM unnest(p, cat, c, sg) AS u(project_id, categoria, codigo, s)
+             WHERE codigo IS NOT NULL
+      ) e;
+    PERFORM pdc_apply(ep, em, ek, ed);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pdc_sync_candidates() RETURNS TRIGGER AS $$
+DECLARE
+    p TEXT[]; m TEXT[]; sg BIGINT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg('candidatos:' || COALESCE(estado, 'pendiente')), array_agg(1::BIGINT)
+          INTO p, m, sg FROM pdc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg('candidatos:' || COALESCE(estado, 'pendiente')), array_agg(-1::BIGINT)
+          INTO p, m, sg FROM pdc_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg('candidatos:' || COALESCE(estado, 'pendiente')), array_agg(s)
+          INTO p, m, sg
+          FROM (
+                SELECT *, -1::BIGINT AS s FROM (
+                    SELECT project_id, estado FROM pdc_old EXCEPT ALL SELECT project_id, estado FROM pdc_new) o
+                UNION ALL
+                SELECT *, 1::BIGINT FROM (
+                    SELECT project_id, estado FROM pdc_new EXCEPT ALL SELECT project_id, estado FROM pdc_old) n
+          ) d;
+    END IF;
+    IF p IS NOT NULL THEN
+        PERFORM pdc_apply(p, m, array_fill(NULL::TEXT, ARRAY[cardinality(p)]), sg);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    spec TEXT[];
+BEGIN
+    -- Triggers por fila de versiones anteriores; los nuevos son por sentencia.
+    FOREACH spec SLICE 1 IN ARRAY ARRAY[
+        ['trg_pdc_fragments', 'entrevista_fragmentos', 'pdc_sync_fragments'],
+        ['trg_pdc_reviews', 'familiarization_reviews', 'pdc_sync_reviews'],
+        ['trg_pdc_open_codes', 'analisis_codigos_abiertos', 'pdc_sync_open_codes'],
+        ['trg_pdc_axial', 'analisis_axial', 'pdc_sync_axial'],
+        ['trg_pdc_candidates', 'codigos_candidatos', 'pdc_sync_candidates']
+    ] LOOP
+        IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_insert_delete') THEN
+            EXECUTE format('DROP TRIGGER %I ON %I', spec[1] || '_insert_delete', spec[2]);
+        END IF;
+        IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_update' AND (tgtype & 1) = 1) THEN
+            EXECUTE format('DROP TRIGGER %I ON %I', spec[1] || '_update', spec[2]);
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_insert') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS pdc_new '
+                'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+                spec[1] || '_insert', spec[2], spec[3]
+            );
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_delete') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS pdc_old '
+                'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+                spec[1] || '_delete', spec[2], spec[3]
+            );
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_update') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS pdc_old NEW TABLE AS pdc_new '
+                'FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+                spec[1] || '_update', spec[2], spec[3]
+            );
+        END IF;
+    END LOOP;
+END $$;
+"""
+
+_DASHBOARD_MEMBERS_FILL_SQL = """
+INSERT INTO project_dashboard_members (project_id, metric, member, refs)
+SELECT project_id, 'archivos', archivo, COUNT(*)
+  FROM entrevista_fragmentos WHERE archivo IS NOT NULL {and_project} GROUP BY project_id, archivo
+UNION ALL
+SELECT project_id, 'codigos_unicos', codigo, COUNT(*)
+  FROM analisis_codigos_abiertos WHERE codigo IS NOT NULL {and_project} GROUP BY project_id, codigo
+UNION ALL
+SELECT project_id, 'fragmentos_codificados', fragmento_id, COUNT(*)
+  FROM analisis_codigos_abiertos WHERE fragmento_id IS NOT NULL {and_project} GROUP BY project_id, fragmento_id
+UNION ALL
+SELECT project_id, 'categorias', categoria, COUNT(*)
+  FROM analisis_axial WHERE categoria IS NOT NULL {and_project} GROUP BY project_id, categoria
+UNION ALL
+SELECT project_id, 'codigos_relacionados', codigo, COUNT(*)
+  FROM analisis_axial WHERE codigo IS NOT NULL {and_project} GROUP BY project_id, codigo
+"""
+
+_DASHBOARD_COUNTERS_FILL_SQL = """
+INSERT INTO project_dashboard_counters (project_id, metric, value)
+SELECT project_id, metric, COUNT(*)
+  FROM project_dashboard_members WHERE TRUE {and_project} GROUP BY project_id, metric
+UNION ALL
+SELECT project_id, 'fragmentos_totales', COUNT(*)
+  FROM entrevista_fragmentos WHERE TRUE {and_project} GROUP BY project_id
+UNION ALL
+SELECT project_id, pdc_speaker_metric(speaker), COUNT(*)
+  FROM entrevista_fragmentos WHERE TRUE {and_project} GROUP BY project_id, pdc_speaker_metric(speaker)
+UNION ALL
+SELECT project_id, 'entrevistas_revisadas', COUNT(*)
+  FROM familiarization_reviews WHERE TRUE {and_project} GROUP BY project_id
+UNION ALL
+SELECT project_id, 'citas', COUNT(*)
+  FROM analisis_codigos_abiertos WHERE TRUE {and_project} GROUP BY project_id
+UNION ALL
+SELECT project_id, 'relaciones', COUNT(*)
+  FROM analisis_axial WHERE TRUE {and_project} GROUP BY project_id
+UNION ALL
+SELECT project_id, 'candidatos:' || COALESCE(estado, 'pendiente'), COUNT(*)
+  FROM codigos_candidatos WHERE TRUE {and_project} GROUP BY project_id, COALESCE(estado, 'pendiente')
+"""
+
+
+def _fill_dashboard_counters(cur: Any, project_id: Optional[str]) -> None:
+    if project_id is None:
+        cur.execute(_DASHBOARD_MEMBERS_FILL_SQL.format(and_project=""))
+        cur.execute(_DASHBOARD_COUNTERS_FILL_SQL.format(and_project=""))
+        return
+    cur.execute(_DASHBOARD_MEMBERS_FILL_SQL.format(and_project="AND project_id = %s"), (project_id,) * 5)
+    cur.execute(_DASHBOARD_COUNTERS_FILL_SQL.format(and_project="AND project_id = %s"), (project_id,) * 7)
+
+
+def ensure_dashboard_counters(pg: PGConnection) -> None:
+    """Crea los contadores del dashboard (tablas, funciones y triggers).
+
+    La primera vez (tabla vacía) los puebla desde las tablas de origen; los
+    triggers se crean en la misma transacción, así que no se pierden escrituras.
+    """
+    global _dashboard_counters_ready
+    if _dashboard_counters_ready:
+        return
+    with _dashboard_counters_lock:
+        if _dashboard_counters_ready:
+            return
+        ensure_fragment_table(pg)
+        ensure_open_coding_table(pg)
+        ensure_axial_table(pg)
+        ensure_candidate_codes_table(pg)
+        ensure_familiarization_reviews_table(pg)
+        with pg.cursor() as cur:
+            cur.execute(_DASHBOARD_COUNTERS_DDL)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM project_dashboard_counters)")
+            row = cur.fetchone()
+            if not (row and row[0]):
+                _fill_dashboard_counters(cur, None)
+        pg.commit()
+        _dashboard_counters_ready = True
+
+
+def _read_dashboard_counters(cur: Any, project_id: Optional[str]) -> Dict[Tuple[str, str], int]:
+    if project_id is None:
+        cur.execute("SELECT project_id, metric, value FROM project_dashboard_counters")
+    else:
+        cur.execute(
+            "SELECT project_id, metric, value FROM project_dashboard_counters WHERE project_id = %s",
+            (project_id,),
+        )
+    return {(r[0], r[1]): int(r[2] or 0) for r in cur.fetchall() or []}
+
+
+def reconcile_dashboard_counters(pg: PGConnection, project_id: Optional[str] = None) -> Dict[str, Any]:
+    """Recalcula los contadores desde las tablas de origen y reporta desvíos.
+
+    Con `project_id=None` reconcilia todos los proyectos. Escrituras
+    concurrentes con la reconciliación pueden dejar un desvío puntual que
+    corrige la siguiente ejecución.
+    """
+    ensure_dashboard_counters(pg)
+    with pg.cursor() as cur:
+        before = _read_dashboard_counters(cur, project_id)
+        if project_id is None:
+            cur.execute("DELETE FROM project_dashboard_members")
+            cur.execute("DELETE FROM project_dashboard_counters")
+        else:
+            cur.execute("DELETE FROM project_dashboard_members WHERE project_id = %s", (project_id,))
+            cur.execute("DELETE FROM project_dashboard_counters WHERE project_id = %s", (project_id,))
+        _fill_dashboard_counters(cur, project_id)
+        after = _read_dashboard_counters(cur, project_id)
+    pg.commit()
+
+    drift = {
+        f"{project}:{metric}": after.get((project, metric), 0) - before.get((project, metric), 0)
+        for project, metric in set(before) | set(after)
+        if after.get((project, metric), 0) != before.get((project, metric), 0)
+    }
+    return {
+        "proyectos": len({project for project, _ in after}),
+        "contadores": len(after),
+        "desvios": drift,
+    }
+
+
 def get_dashboard_counts(pg: PGConnection, project: Optional[str] = None) -> Dict[str, Any]:
     """
     Obtiene conteos en tiempo real para el dashboard de todas las etapas.
     
     Esta función resuelve el Bug E1.1: "0 fragmentos" en Etapa 2.
+
+    Lee los contadores mantenidos por triggers (project_dashboard_counters):
+    una lectura indexada por proyecto, sin agregar las tablas de origen.
     
     Returns:
         Dict con conteos por etapa:
@@ -3010,139 +3995,994 @@ def get_dashboard_counts(pg: PGConnection, project: Optional[str] = None) -> Dic
     project_id = project or "default"
     counts: Dict[str, Any] = {}
 
-    # Ensure required tables exist so the dashboard never 500s just because a
-    # project hasn't reached later stages yet.
-    ensure_open_coding_table(pg)
-    ensure_axial_table(pg)
-    ensure_candidate_codes_table(pg)
-    ensure_familiarization_reviews_table(pg)
+    # Crea tablas de origen y contadores una sola vez por proceso, de modo que
+    # el dashboard no falla en proyectos que aún no llegan a etapas posteriores.
+    ensure_dashboard_counters(pg)
+
+    with pg.cursor() as cur:
+        values = {metric: value for (_, metric), value in _read_dashboard_counters(cur, project_id).items()}
+
+    def _get(metric: str) -> int:
+        return max(values.get(metric, 0), 0)
+
+    # =====================================================================
+    # ETAPA 1 & 2: INGESTA - Fragmentos totales
+    # =====================================================================
+    counts["ingesta"] = {
+        "fragmentos_totales": _get("fragmentos_totales"),
+        "archivos": _get("archivos"),
+        "fragmentos_entrevistador": _get("fragmentos_entrevistador"),
+        "fragmentos_entrevistado": _get("fragmentos_entrevistado"),
+        "fragmentos_otros": _get("fragmentos_otros"),
+        # Fragmentos "útiles" para análisis (sin entrevistador)
+        "fragmentos_analizables": _get("fragmentos_entrevistado") + _get("fragmentos_otros"),
+    }
+
+    # =====================================================================
+    # ETAPA 2: FAMILIARIZACIÓN - Entrevistas revisadas
+    # =====================================================================
+    entrevistas_revisadas = _get("entrevistas_revisadas")
+    entrevistas_totales = counts["ingesta"]["archivos"]
+    porcentaje = (
+        round((entrevistas_revisadas / entrevistas_totales) * 100, 1)
+        if entrevistas_totales > 0
+        else 0
+    )
+    counts["familiarizacion"] = {
+        "entrevistas_revisadas": entrevistas_revisadas,
+        "entrevistas_totales": entrevistas_totales,
+        "porcentaje": porcentaje,
+    }
+
+    # =====================================================================
+    # ETAPA 3: CODIFICACIÓN ABIERTA
+    # =====================================================================
+    codificacion = {
+        "citas": _get("citas"),
+        "codigos_unicos": _get("codigos_unicos"),
+        "fragmentos_codificados": _get("fragmentos_codificados"),
+    }
+
+    # Calcular cobertura
+    total_analizables = counts["ingesta"]["fragmentos_analizables"]
+    codificacion["fragmentos_sin_codigo"] = max(total_analizables - codificacion["fragmentos_codificados"], 0)
+    codificacion["porcentaje_cobertura"] = round(
+        codificacion["fragmentos_codificados"] / total_analizables * 100, 1
+    ) if total_analizables > 0 else 0
+
+    counts["codificacion"] = codificacion
+
+    # =====================================================================
+    # ETAPA 4: CODIFICACIÓN AXIAL
+    # =====================================================================
+    counts["axial"] = {
+        "relaciones": _get("relaciones"),
+        "categorias": _get("categorias"),
+        "codigos_relacionados": _get("codigos_relacionados"),
+    }
+
+    # =====================================================================
+    # BANDEJA DE CANDIDATOS (Modelo Híbrido)
+    # =====================================================================
+    candidatos = {"pendientes": 0, "validados": 0, "rechazados": 0, "fusionados": 0}
+    for metric in sorted(values):
+        if metric.startswith("candidatos:") and values[metric] > 0:
+            candidatos[metric.split(":", 1)[1]] = values[metric]
+    candidatos["total"] = sum(candidatos.values())
+    counts["candidatos"] = candidatos
+    
+    # Añadir timestamp
+    from datetime import datetime
+    counts["timestamp"] = datetime.utcnow().isoformat() + "Z"
+    counts["project_id"] = project_id
     
+    return counts
+
+
+# =============================================================================
+# Versión del grafo por proyecto (graph_versions)
+# =============================================================================
+#
+# El grafo que analizan `GraphAlgorithms` (relaciones axiales + co-ocurrencia
+# de códigos, canonicalizados) sólo cambia con escrituras axiales, de
+# codificación abierta o fusiones del catálogo. Triggers por sentencia (con
+# tablas de transición) incrementan un sello una vez por proyecto tocado, de
+# modo que un snapshot en memoria del grafo se reutiliza mientras el sello no
+# cambie y una escritura masiva no serializa sobre la fila del proyecto.
+
+_graph_versions_ready: Optional[bool] = None
+_graph_versions_lock = threading.Lock()
+
+_GRAPH_VERSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS graph_versions (
+    project_id TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION gv_bump_projects(projects TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO graph_versions AS gv (project_id, version, updated_at)
+    SELECT p, 1, NOW()
+      FROM (SELECT DISTINCT COALESCE(u.p, 'default') AS p FROM unnest(projects) AS u(p)) d
+     ORDER BY p
+    ON CONFLICT (project_id) DO UPDATE
+       SET version = gv.version + 1,
+           updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Por sentencia: un incremento por proyecto tocado. En UPDATE, los argumentos
+-- del trigger listan las columnas que cuentan (sin argumentos, cualquiera).
+CREATE OR REPLACE FUNCTION gv_bump() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[];
+    cols TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id) INTO projects FROM gv_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id) INTO projects FROM gv_old;
+    ELSIF TG_NARGS = 0 THEN
+        SELECT array_agg(project_id) INTO projects
+          FROM (SELECT project_id FROM gv_old UNION SELECT project_id FROM gv_new) u;
+    ELSE
+        SELECT string_agg(quote_ident(c), ', ') INTO cols FROM unnest(TG_ARGV) AS a(c);
+        EXECUTE format(
+            'SELECT array_agg(project_id) FROM ('
+            '(SELECT %1$s FROM gv_old EXCEPT ALL SELECT %1$s FROM gv_new) UNION ALL '
+            '(SELECT %1$s FROM gv_new EXCEPT ALL SELECT %1$s FROM gv_old)) d',
+            cols
+        ) INTO projects;
+    END IF;
+    IF projects IS NOT NULL THEN
+        PERFORM gv_bump_projects(projects);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    -- Triggers por fila de versiones anteriores.
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_axial') THEN
+        DROP TRIGGER trg_gv_axial ON analisis_axial;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_open_coding') THEN
+        DROP TRIGGER trg_gv_open_coding ON analisis_codigos_abiertos;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_catalog') THEN
+        DROP TRIGGER trg_gv_catalog ON catalogo_codigos;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_axial_insert') THEN
+        CREATE TRIGGER trg_gv_axial_insert
+            AFTER INSERT ON analisis_axial
+            REFERENCING NEW TABLE AS gv_new
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_axial_delete') THEN
+        CREATE TRIGGER trg_gv_axial_delete
+            AFTER DELETE ON analisis_axial
+            REFERENCING OLD TABLE AS gv_old
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_axial_update') THEN
+        CREATE TRIGGER trg_gv_axial_update
+            AFTER UPDATE ON analisis_axial
+            REFERENCING OLD TABLE AS gv_old NEW TABLE AS gv_new
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_open_coding_insert') THEN
+        CREATE TRIGGER trg_gv_open_coding_insert
+            AFTER INSERT ON analisis_codigos_abiertos
+            REFERENCING NEW TABLE AS gv_new
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_open_coding_delete') THEN
+        CREATE TRIGGER trg_gv_open_coding_delete
+            AFTER DELETE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS gv_old
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_open_coding_update') THEN
+        CREATE TRIGGER trg_gv_open_coding_update
+            AFTER UPDATE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS gv_old NEW TABLE AS gv_new
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump('project_id', 'codigo', 'fragmento_id');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_gv_catalog_update') THEN
+        CREATE TRIGGER trg_gv_catalog_update
+            AFTER UPDATE ON catalogo_codigos
+            REFERENCING OLD TABLE AS gv_old NEW TABLE AS gv_new
+            FOR EACH STATEMENT EXECUTE FUNCTION gv_bump('project_id', 'codigo', 'status', 'canonical_codigo');
+    END IF;
+END $$;
+"""
+
+
+def ensure_graph_versions(pg: PGConnection) -> bool:
+    """Tabla `graph_versions` y triggers sobre axial, codificación abierta y catálogo.
+
+    Reemplaza los triggers por fila de versiones anteriores.
+
+    Returns:
+        False si no se pudo crear (p.ej. permisos o PostgreSQL < 10); los
+        snapshots del grafo no se cachean entonces.
+    """
+    global _graph_versions_ready
+    if _graph_versions_ready is not None:
+        return _graph_versions_ready
+    with _graph_versions_lock:
+        if _graph_versions_ready is not None:
+            return _graph_versions_ready
+        ensure_open_coding_table(pg)
+        ensure_codes_catalog_table(pg)
+        ensure_axial_table(pg)
+        try:
+            with pg.cursor() as cur:
+                cur.execute(_GRAPH_VERSIONS_DDL)
+            pg.commit()
+            _graph_versions_ready = True
+        except Exception as exc:
+            _logger.warning("graph_versions.not_available", extra={"error": str(exc)})
+            try:
+                pg.rollback()
+            except Exception:
+                pass
+            _graph_versions_ready = False
+        return _graph_versions_ready
+
+
+def get_graph_version(pg: PGConnection, project_id: str) -> Optional[int]:
+    """Sello de versión del grafo del proyecto (0 si nunca se escribió).
+
+    None si el versionado no está disponible: el llamador no debe cachear.
+    """
+    if not ensure_graph_versions(pg):
+        return None
     with pg.cursor() as cur:
-        # =====================================================================
-        # ETAPA 1 & 2: INGESTA - Fragmentos totales
-        # =====================================================================
-        cur.execute("""
-            SELECT 
-                COUNT(*) AS total,
-                COUNT(DISTINCT archivo) AS archivos,
-                COUNT(*) FILTER (WHERE speaker = 'interviewer') AS interviewer_frags,
-                COUNT(*) FILTER (WHERE speaker = 'interviewee') AS interviewee_frags,
-                COUNT(*) FILTER (WHERE speaker IS NULL OR speaker NOT IN ('interviewer','interviewee')) AS other_frags
-            FROM entrevista_fragmentos
-            WHERE project_id = %s
-        """, (project_id,))
+        cur.execute("SELECT version FROM graph_versions WHERE project_id = %s", (project_id,))
         row = cur.fetchone()
-        ingesta_row = row if row is not None else (0, 0, 0, 0, 0)
-        counts["ingesta"] = {
-            "fragmentos_totales": ingesta_row[0],
-            "archivos": ingesta_row[1],
-            "fragmentos_entrevistador": ingesta_row[2],
-            "fragmentos_entrevistado": ingesta_row[3],
-            "fragmentos_otros": ingesta_row[4],
-            # Fragmentos "útiles" para análisis (sin entrevistador)
-            "fragmentos_analizables": ingesta_row[3] + ingesta_row[4],
-        }
+    return int(row[0]) if row else 0
 
-        # =====================================================================
-        # ETAPA 2: FAMILIARIZACIÓN - Entrevistas revisadas
-        # =====================================================================
+
+# =============================================================================
+# Versión del catálogo de códigos por proyecto (code_catalog_versions)
+# =============================================================================
+#
+# El índice de similitud Pre-Hoc (`code_normalization.get_code_index`) compara
+# contra los códigos asignados y los candidatos pendientes/validados. Igual
+# que graph_versions, triggers por sentencia incrementan un sello por
+# proyecto tocado; mientras no cambie, el índice en memoria se reutiliza sin
+# volver a leer el catálogo.
+
+_code_catalog_versions_ready: Optional[bool] = None
+_code_catalog_versions_lock = threading.Lock()
+
+_CODE_CATALOG_VERSIONS_DDL = """
+CREATE TABLE IF NOT EXISTS code_catalog_versions (
+    project_id TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Por sentencia: un incremento por proyecto tocado. En UPDATE, los argumentos
+-- del trigger listan las columnas que cuentan.
+CREATE OR REPLACE FUNCTION ccv_bump() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[];
+    cols TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id) INTO projects FROM ccv_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id) INTO projects FROM ccv_old;
+    ELSE
+        SELECT string_agg(quote_ident(c), ', ') INTO cols FROM unnest(TG_ARGV) AS a(c);
+        EXECUTE format(
+            'SELECT array_agg(project_id) FROM ('
+            '(SELECT %1$s FROM ccv_old EXCEPT ALL SELECT %1$s FROM ccv_new) UNION ALL '
+            '(SELECT %1$s FROM ccv_new EXCEPT ALL SELECT %1$s FROM ccv_old)) d',
+            cols
+        ) INTO projects;
+    END IF;
+    IF projects IS NOT NULL THEN
+        INSERT INTO code_catalog_versions AS ccv (project_id, version, updated_at)
+        SELECT p, 1, NOW()
+          FROM (SELECT DISTINCT COALESCE(u.p, 'default') AS p FROM unnest(projects) AS u(p)) d
+         ORDER BY p
+        ON CONFLICT (project_id) DO UPDATE
+           SET version = ccv.version + 1,
+               updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un trigger por operación y tabla: [prefijo, tabla, columnas que cuentan en UPDATE].
+DO $$
+DECLARE
+    spec TEXT[];
+BEGIN
+    FOREACH spec SLICE 1 IN ARRAY ARRAY[
+        ['trg_ccv_open_codes', 'analisis_codigos_abiertos', 'project_id,codigo'],
+        ['trg_ccv_candidates', 'codigos_candidatos', 'project_id,codigo,estado']
+    ] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_insert') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS ccv_new '
+                'FOR EACH STATEMENT EXECUTE FUNCTION ccv_bump()',
+                spec[1] || '_insert', spec[2]
+            );
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_delete') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS ccv_old '
+                'FOR EACH STATEMENT EXECUTE FUNCTION ccv_bump()',
+                spec[1] || '_delete', spec[2]
+            );
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = spec[1] || '_update') THEN
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS ccv_old NEW TABLE AS ccv_new '
+                'FOR EACH STATEMENT EXECUTE FUNCTION ccv_bump(%s)',
+                spec[1] || '_update', spec[2],
+                (SELECT string_agg(quote_literal(c), ', ') FROM unnest(string_to_array(spec[3], ',')) AS a(c))
+            );
+        END IF;
+    END LOOP;
+END $$;
+"""
+
+
+def ensure_code_catalog_versions(pg: PGConnection) -> bool:
+    """Tabla `code_catalog_versions` y triggers sobre códigos asignados y candidatos.
+
+    Returns:
+        False si no se pudo crear; el índice de similitud compara entonces la
+        firma del catálogo leído.
+    """
+    global _code_catalog_versions_ready
+    if _code_catalog_versions_ready is not None:
+        return _code_catalog_versions_ready
+    with _code_catalog_versions_lock:
+        if _code_catalog_versions_ready is not None:
+            return _code_catalog_versions_ready
+        ensure_open_coding_table(pg)
+        ensure_candidate_codes_table(pg)
+        try:
+            with pg.cursor() as cur:
+                cur.execute(_CODE_CATALOG_VERSIONS_DDL)
+            pg.commit()
+            _code_catalog_versions_ready = True
+        except Exception as exc:
+            _logger.warning("code_catalog_versions.not_available", extra={"error": str(exc)})
+            try:
+                pg.rollback()
+            except Exception:
+                pass
+            _code_catalog_versions_ready = False
+        return _code_catalog_versions_ready
+
+
+def get_code_catalog_version(pg: PGConnection, project_id: str) -> Optional[int]:
+    """Sello de versión del catálogo de códigos del proyecto (0 si nunca se escribió).
+
+    None si el versionado no está disponible: el llamador no debe cachear.
+    """
+    if not ensure_code_catalog_versions(pg):
+        return None
+    with pg.cursor() as cur:
+        cur.execute("SELECT version FROM code_catalog_versions WHERE project_id = %s", (project_id,))
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+# =============================================================================
+# Métricas de grafo persistidas (graph_metric_cache)
+# =============================================================================
+#
+# Las métricas caras (betweenness) se guardan con el sello `graph_versions`
+# con que se calcularon: el endpoint sirve el último resultado aunque el
+# grafo haya cambiado y encola un recálculo, reclamado por fila para que
+# sólo un worker lo ejecute a la vez.
+
+_graph_metric_cache_ready = False
+_graph_metric_cache_lock = threading.Lock()
+
+
+def ensure_graph_metric_cache_table(pg: PGConnection) -> None:
+    global _graph_metric_cache_ready
+    if _graph_metric_cache_ready:
+        return
+    with _graph_metric_cache_lock:
+        if _graph_metric_cache_ready:
+            return
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS graph_metric_cache (
+                    project_id TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    graph_version BIGINT,
+                    params JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    results JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    refreshing_since TIMESTAMPTZ,
+                    PRIMARY KEY (project_id, metric)
+                );
+                """
+            )
+        pg.commit()
+        _graph_metric_cache_ready = True
+
+
+def fetch_graph_metric(pg: PGConnection, project_id: str, metric: str) -> Optional[Dict[str, Any]]:
+    """Último resultado persistido de la métrica, o None."""
+    ensure_graph_metric_cache_table(pg)
+    with pg.cursor() as cur:
         cur.execute(
             """
-            SELECT COUNT(*)
-            FROM familiarization_reviews
-            WHERE project_id = %s
+            SELECT graph_version, params, results, computed_at, refreshing_since
+              FROM graph_metric_cache
+             WHERE project_id = %s AND metric = %s
             """,
-            (project_id,),
-        )
-        reviewed_row = cur.fetchone()
-        entrevistas_revisadas = (reviewed_row[0] if reviewed_row else 0) or 0
-        entrevistas_totales = counts["ingesta"]["archivos"]
-        porcentaje = (
-            round((entrevistas_revisadas / entrevistas_totales) * 100, 1)
-            if entrevistas_totales > 0
-            else 0
+            (project_id, metric),
         )
-        counts["familiarizacion"] = {
-            "entrevistas_revisadas": entrevistas_revisadas,
-            "entrevistas_totales": entrevistas_totales,
-            "porcentaje": porcentaje,
-        }
-        
-        # =====================================================================
-        # ETAPA 3: CODIFICACIÓN ABIERTA
-        # =====================================================================
-        cur.execute("""
-            SELECT 
-                COUNT(*) AS total_citas,
-                COUNT(DISTINCT codigo) AS codigos_unicos,
-                COUNT(DISTINCT fragmento_id) AS fragmentos_codificados
-            FROM analisis_codigos_abiertos
-            WHERE project_id = %s
-        """, (project_id,))
         row = cur.fetchone()
-        codificacion_row = row if row is not None else (0, 0, 0)
-        codificacion = {
-            "citas": codificacion_row[0],
-            "codigos_unicos": codificacion_row[1],
-            "fragmentos_codificados": codificacion_row[2],
+    if not row:
+        return None
+    return {
+        "graph_version": row[0],
+        "params": row[1] or {},
+        "results": row[2] or [],
+        "computed_at": row[3].isoformat() if row[3] else None,
+        "refreshing": row[4] is not None,
+    }
+
+
+def store_graph_metric(
+    pg: PGConnection,
+    project_id: str,
+    metric: str,
+    *,
+    graph_version: Optional[int],
+    params: Dict[str, Any],
+    results: List[Dict[str, Any]],
+) -> None:
+    """Reemplaza el resultado de la métrica y libera el reclamo de recálculo."""
+    ensure_graph_metric_cache_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO graph_metric_cache
+                (project_id, metric, graph_version, params, results, computed_at, refreshing_since)
+            VALUES (%s, %s, %s, %s, %s, NOW(), NULL)
+            ON CONFLICT (project_id, metric) DO UPDATE
+               SET graph_version = EXCLUDED.graph_version,
+                   params = EXCLUDED.params,
+                   results = EXCLUDED.results,
+                   computed_at = EXCLUDED.computed_at,
+                   refreshing_since = NULL
+            """,
+            (project_id, metric, graph_version, Json(params), Json(results)),
+        )
+    pg.commit()
+
+
+def claim_graph_metric_refresh(
+    pg: PGConnection,
+    project_id: str,
+    metric: str,
+    *,
+    lease_seconds: int = 600,
+) -> bool:
+    """Reclama el recálculo de la métrica; False si otro lo tiene en curso (lease vigente)."""
+    ensure_graph_metric_cache_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE graph_metric_cache
+               SET refreshing_since = NOW()
+             WHERE project_id = %s
+               AND metric = %s
+               AND (refreshing_since IS NULL
+                    OR refreshing_since < NOW() - make_interval(secs => %s))
+            RETURNING 1
+            """,
+            (project_id, metric, lease_seconds),
+        )
+        claimed = cur.fetchone() is not None
+    pg.commit()
+    return claimed
+
+
+# =============================================================================
+# Espejo de métricas por nodo (graph_node_metrics)
+# =============================================================================
+#
+# Cada escritura de métricas en el grafo (community_id, score_centralidad,
+# score_intermediacion, ...) se replica aquí por (label, nombre), de modo que
+# los dashboards leen los scores sin consultar la base de grafos.
+
+_graph_node_metrics_ready = False
+_graph_node_metrics_lock = threading.Lock()
+
+
+def ensure_graph_node_metrics_table(pg: PGConnection) -> None:
+    global _graph_node_metrics_ready
+    if _graph_node_metrics_ready:
+        return
+    with _graph_node_metrics_lock:
+        if _graph_node_metrics_ready:
+            return
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS graph_node_metrics (
+                    project_id TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    nombre TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    value DOUBLE PRECISION,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (project_id, metric, label, nombre)
+                );
+                CREATE INDEX IF NOT EXISTS ix_graph_node_metrics_value
+                    ON graph_node_metrics (project_id, metric, value DESC);
+                """
+            )
+        pg.commit()
+        _graph_node_metrics_ready = True
+
+
+def replace_graph_node_metrics(
+    pg: PGConnection,
+    project_id: str,
+    rows: Sequence[Tuple[str, str, str, Optional[float]]],
+) -> int:
+    """Reemplaza, en una transacción, las métricas presentes en `rows`.
+
+    `rows` son (label, nombre, metric, value); las filas previas de esas
+    métricas que no vienen (nodos que salieron del grafo) se borran.
+    """
+    ensure_graph_node_metrics_table(pg)
+    metrics = sorted({row[2] for row in rows})
+    if not metrics:
+        return 0
+    with pg.cursor() as cur:
+        cur.execute(
+            "DELETE FROM graph_node_metrics WHERE project_id = %s AND metric = ANY(%s)",
+            (project_id, metrics),
+        )
+        execute_values(
+            cur,
+            """
+            INSERT INTO graph_node_metrics (project_id, label, nombre, metric, value)
+            VALUES %s
+            ON CONFLICT (project_id, metric, label, nombre) DO UPDATE
+               SET value = EXCLUDED.value, updated_at = NOW()
+            """,
+            [(project_id, label, nombre, metric, value) for label, nombre, metric, value in rows],
+            page_size=1000,
+        )
+    pg.commit()
+    return len(rows)
+
+
+def fetch_graph_node_metrics(
+    pg: PGConnection,
+    project_id: str,
+    *,
+    metric: Optional[str] = None,
+    label: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Métricas espejadas del proyecto, por valor DESC (opcionalmente de una métrica/label)."""
+    ensure_graph_node_metrics_table(pg)
+    clauses = ["project_id = %s"]
+    params: List[Any] = [project_id]
+    if metric:
+        clauses.append("metric = %s")
+        params.append(metric)
+    if label:
+        clauses.append("label = %s")
+        params.append(label)
+    params.append(limit)
+    with pg.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT label, nombre, metric, value, updated_at
+              FROM graph_node_metrics
+             WHERE {' AND '.join(clauses)}
+             ORDER BY metric, value DESC NULLS LAST, nombre
+             LIMIT %s
+            """,
+            params,
+        )
+        rows = cur.fetchall() or []
+    return [
+        {
+            "label": row[0],
+            "nombre": row[1],
+            "metric": row[2],
+            "value": row[3],
+            "updated_at": row[4].isoformat() if row[4] else None,
         }
-        
-        # Calcular cobertura
-        total_analizables = counts["ingesta"]["fragmentos_analizables"]
-        codificacion["fragmentos_sin_codigo"] = max(total_analizables - codificacion["fragmentos_codificados"], 0)
-        codificacion["porcentaje_cobertura"] = round(
-            codificacion["fragmentos_codificados"] / total_analizables * 100, 1
-        ) if total_analizables > 0 else 0
-        
-        counts["codificacion"] = codificacion
-        
-        # =====================================================================
-        # ETAPA 4: CODIFICACIÓN AXIAL
-        # =====================================================================
-        cur.execute("""
-            SELECT 
-                COUNT(*) AS total_relaciones,
-                COUNT(DISTINCT categoria) AS categorias,
-                COUNT(DISTINCT codigo) AS codigos_relacionados
-            FROM analisis_axial
-            WHERE project_id = %s
-        """, (project_id,))
+        for row in rows
+    ]
+
+
+# =============================================================================
+# Co-ocurrencia de códigos mantenida (code_cooccurrence)
+# =============================================================================
+#
+# Aristas código-código del grafo: por par (code_a < code_b) el número de
+# fragmentos donde ambos están asignados (`fragments`) y su peso (`weight`,
+# hoy igual a `fragments`). La mantienen triggers por sentencia sobre
+# analisis_codigos_abiertos (asignación, unassign y fusión, que reescribe o
+# borra filas), con tablas de transición para contar una sola vez los pares
+# insertados en la misma sentencia y un advisory lock por fragmento para que
+# escrituras concurrentes (READ COMMITTED) sobre el mismo fragmento no se
+# pierdan los pares de la otra. Los códigos se guardan tal cual; los
+# lectores canonicalizan alias como antes. `rebuild_code_cooccurrence`
+# recalcula un proyecto desde cero (backfill / reparación).
+
+_code_cooccurrence_ready: Optional[bool] = None
+_code_cooccurrence_lock = threading.Lock()
+
+_CODE_COOCCURRENCE_DDL = """
+CREATE TABLE IF NOT EXISTS code_cooccurrence (
+    project_id TEXT NOT NULL,
+    code_a TEXT NOT NULL,
+    code_b TEXT NOT NULL,
+    weight DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fragments INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (project_id, code_a, code_b),
+    CHECK (code_a < code_b)
+);
+CREATE INDEX IF NOT EXISTS ix_cooc_project_code_b ON code_cooccurrence(project_id, code_b);
+CREATE INDEX IF NOT EXISTS ix_cooc_project_fragments ON code_cooccurrence(project_id, fragments DESC);
+
+CREATE OR REPLACE FUNCTION cooc_apply(
+    gone_project TEXT[], gone_fragment TEXT[], gone_code TEXT[],
+    came_project TEXT[], came_fragment TEXT[], came_code TEXT[]
+) RETURNS VOID AS $$
+BEGIN
+    -- Serializa por fragmento: la consulta siguiente toma un snapshot nuevo
+    -- tras el lock, así que ve las citas que otra transacción confirmó sobre
+    -- el mismo fragmento. Orden fijo para no producir deadlocks.
+    PERFORM pg_advisory_xact_lock(hashtext(t.project_id || '|' || t.fragmento_id))
+       FROM (
+            SELECT DISTINCT project_id, fragmento_id
+              FROM unnest(gone_project || came_project, gone_fragment || came_fragment) AS u(project_id, fragmento_id)
+             ORDER BY project_id, fragmento_id
+       ) t;
+
+    WITH gone AS (
+        SELECT * FROM unnest(gone_project, gone_fragment, gone_code) AS g(project_id, fragmento_id, codigo)
+    ),
+    came AS (
+        SELECT * FROM unnest(came_project, came_fragment, came_code) AS c(project_id, fragmento_id, codigo)
+    ),
+    touched AS (
+        SELECT project_id, fragmento_id FROM gone
+        UNION
+        SELECT project_id, fragmento_id FROM came
+    ),
+    stayed AS (
+        SELECT a.project_id, a.fragmento_id, a.codigo
+          FROM analisis_codigos_abiertos a
+          JOIN touched t ON t.project_id = a.project_id AND t.fragmento_id = a.fragmento_id
+         WHERE NOT EXISTS (
+               SELECT 1 FROM came c
+                WHERE c.project_id = a.project_id
+                  AND c.fragmento_id = a.fragmento_id
+                  AND c.codigo = a.codigo
+         )
+    ),
+    delta AS (
+        SELECT g.project_id, LEAST(g.codigo, s.codigo) AS code_a, GREATEST(g.codigo, s.codigo) AS code_b, -1 AS d
+          FROM gone g
+          JOIN stayed s ON s.project_id = g.project_id AND s.fragmento_id = g.fragmento_id AND s.codigo <> g.codigo
+        UNION ALL
+        SELECT g.project_id, g.codigo, h.codigo, -1
+          FROM gone g
+          JOIN gone h ON h.project_id = g.project_id AND h.fragmento_id = g.fragmento_id AND g.codigo < h.codigo
+        UNION ALL
+        SELECT c.project_id, LEAST(c.codigo, s.codigo), GREATEST(c.codigo, s.codigo), 1
+          FROM came c
+          JOIN stayed s ON s.project_id = c.project_id AND s.fragmento_id = c.fragmento_id AND s.codigo <> c.codigo
+        UNION ALL
+        SELECT c.project_id, c.codigo, h.codigo, 1
+          FROM came c
+          JOIN came h ON h.project_id = c.project_id AND h.fragmento_id = c.fragmento_id AND c.codigo < h.codigo
+    ),
+    net AS (
+        SELECT project_id, code_a, code_b, SUM(d)::INT AS d
+          FROM delta
+         GROUP BY project_id, code_a, code_b
+        HAVING SUM(d) <> 0
+    )
+    INSERT INTO code_cooccurrence AS cc (project_id, code_a, code_b, weight, fragments)
+    SELECT project_id, code_a, code_b, d, d FROM net
+    ON CONFLICT (project_id, code_a, code_b) DO UPDATE
+       SET weight = cc.weight + EXCLUDED.weight,
+           fragments = cc.fragments + EXCLUDED.fragments,
+           updated_at = NOW();
+
+    DELETE FROM code_cooccurrence
+     WHERE project_id IN (SELECT DISTINCT unnest(gone_project))
+       AND fragments <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cooc_sync() RETURNS TRIGGER AS $$
+DECLARE
+    gp TEXT[]; gf TEXT[]; gc TEXT[];
+    cp TEXT[]; cf TEXT[]; cc TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(fragmento_id), array_agg(codigo)
+          INTO cp, cf, cc
+          FROM cooc_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(fragmento_id), array_agg(codigo)
+          INTO gp, gf, gc
+          FROM cooc_old;
+    ELSE
+        -- Sólo cuentan las filas cuya clave cambió (no las ediciones de memo/cita).
+        SELECT array_agg(o.project_id), array_agg(o.fragmento_id), array_agg(o.codigo)
+          INTO gp, gf, gc
+          FROM cooc_old o
+         WHERE NOT EXISTS (
+               SELECT 1 FROM cooc_new n
+                WHERE n.project_id = o.project_id AND n.fragmento_id = o.fragmento_id AND n.codigo = o.codigo);
+        SELECT array_agg(n.project_id), array_agg(n.fragmento_id), array_agg(n.codigo)
+          INTO cp, cf, cc
+          FROM cooc_new n
+         WHERE NOT EXISTS (
+               SELECT 1 FROM cooc_old o
+                WHERE o.project_id = n.project_id AND o.fragmento_id = n.fragmento_id AND o.codigo = n.codigo);
+    END IF;
+    IF gp IS NOT NULL OR cp IS NOT NULL THEN
+        PERFORM cooc_apply(
+            COALESCE(gp, '{}'), COALESCE(gf, '{}'), COALESCE(gc, '{}'),
+            COALESCE(cp, '{}'), COALESCE(cf, '{}'), COALESCE(cc, '{}')
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_cooc_insert') THEN
+        CREATE TRIGGER trg_aca_cooc_insert
+            AFTER INSERT ON analisis_codigos_abiertos
+            REFERENCING NEW TABLE AS cooc_new
+            FOR EACH STATEMENT EXECUTE FUNCTION cooc_sync();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_cooc_delete') THEN
+        CREATE TRIGGER trg_aca_cooc_delete
+            AFTER DELETE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS cooc_old
+            FOR EACH STATEMENT EXECUTE FUNCTION cooc_sync();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_cooc_update') THEN
+        CREATE TRIGGER trg_aca_cooc_update
+            AFTER UPDATE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS cooc_old NEW TABLE AS cooc_new
+            FOR EACH STATEMENT EXECUTE FUNCTION cooc_sync();
+    END IF;
+END $$;
+"""
+
+_CODE_COOCCURRENCE_FILL_SQL = """
+INSERT INTO code_cooccurrence (project_id, code_a, code_b, weight, fragments)
+SELECT a.project_id, a.codigo, b.codigo, COUNT(*), COUNT(*)
+  FROM analisis_codigos_abiertos a
+  JOIN analisis_codigos_abiertos b
+    ON b.project_id = a.project_id
+   AND b.fragmento_id = a.fragmento_id
+   AND a.codigo < b.codigo
+ {where}
+ GROUP BY a.project_id, a.codigo, b.codigo
+"""
+
+
+def ensure_code_cooccurrence(pg: PGConnection) -> bool:
+    """Tabla `code_cooccurrence` y sus triggers; la primera vez la puebla entera.
+
+    Returns:
+        False si no se pudo crear (p.ej. permisos o PostgreSQL < 10): los
+        lectores recurren entonces al self-join sobre las citas.
+    """
+    global _code_cooccurrence_ready
+    if _code_cooccurrence_ready is not None:
+        return _code_cooccurrence_ready
+    with _code_cooccurrence_lock:
+        if _code_cooccurrence_ready is not None:
+            return _code_cooccurrence_ready
+        ensure_open_coding_table(pg)
+        try:
+            with pg.cursor() as cur:
+                cur.execute("SELECT to_regclass('code_cooccurrence') IS NULL")
+                row = cur.fetchone()
+                created = bool(row and row[0])
+                cur.execute(_CODE_COOCCURRENCE_DDL)
+                if created:
+                    cur.execute(_CODE_COOCCURRENCE_FILL_SQL.format(where=""))
+            pg.commit()
+            _code_cooccurrence_ready = True
+        except Exception as exc:
+            _logger.warning("code_cooccurrence.not_available", extra={"error": str(exc)})
+            try:
+                pg.rollback()
+            except Exception:
+                pass
+            _code_cooccurrence_ready = False
+        return _code_cooccurrence_ready
+
+
+def rebuild_code_cooccurrence(pg: PGConnection, project_id: str) -> Dict[str, int]:
+    """Recalcula la co-ocurrencia de un proyecto desde analisis_codigos_abiertos."""
+    if not ensure_code_cooccurrence(pg):
+        raise RuntimeError("code_cooccurrence no disponible en esta base de datos")
+    with pg.cursor() as cur:
+        cur.execute("DELETE FROM code_cooccurrence WHERE project_id = %s", (project_id,))
+        cur.execute(
+            _CODE_COOCCURRENCE_FILL_SQL.format(where="WHERE a.project_id = %(project)s"),
+            {"project": project_id},
+        )
+        cur.execute(
+            "SELECT COUNT(*), COALESCE(SUM(fragments), 0) FROM code_cooccurrence WHERE project_id = %s",
+            (project_id,),
+        )
         row = cur.fetchone()
-        axial_row = row if row is not None else (0, 0, 0)
-        counts["axial"] = {
-            "relaciones": axial_row[0],
-            "categorias": axial_row[1],
-            "codigos_relacionados": axial_row[2],
-        }
-        
-        # =====================================================================
-        # BANDEJA DE CANDIDATOS (Modelo Híbrido)
-        # =====================================================================
-        cur.execute("""
-            SELECT 
-                estado,
-                COUNT(*) AS total
-            FROM codigos_candidatos
-            WHERE project_id = %s
-            GROUP BY estado
-        """, (project_id,))
-        rows = cur.fetchall()
-        candidatos = {"pendientes": 0, "validados": 0, "rechazados": 0, "fusionados": 0}
-        for row in rows:
-            estado = row[0] or "pendiente"
-            if estado in candidatos:
-                candidatos[estado] = row[1]
-            else:
-                candidatos[estado] = row[1]
-        candidatos["total"] = sum(candidatos.values())
-        counts["candidatos"] = candidatos
-    
-    # Añadir timestamp
-    from datetime import datetime
-    counts["timestamp"] = datetime.utcnow().isoformat() + "Z"
-    counts["project_id"] = project_id
-    
-    return counts
+    pg.commit()
+    return {"pares": int(row[0] or 0), "coocurrencias": int(row[1] or 0)}
+
+
+def fetch_code_cooccurrences(
+    pg: PGConnection,
+    project_id: str,
+    *,
+    min_fragments: int = 1,
+    limit: Optional[int] = None,
+) -> List[Tuple[str, str, int]]:
+    """Pares (code_a, code_b, fragmentos compartidos) por fragmentos DESC.
+
+    Lee `code_cooccurrence`; si no está disponible, calcula el self-join.
+    """
+    limit_sql = "LIMIT %(limit)s" if limit is not None else ""
+    params = {"project": project_id, "min": int(min_fragments), "limit": limit}
+    if ensure_code_cooccurrence(pg):
+        sql = f"""
+        SELECT code_a, code_b, fragments
+          FROM code_cooccurrence
+         WHERE project_id = %(project)s AND fragments >= %(min)s
+         ORDER BY fragments DESC, code_a, code_b
+         {limit_sql}
+        """
+    else:
+        sql = f"""
+        SELECT a.codigo, b.codigo, COUNT(*)::INT AS fragments
+          FROM analisis_codigos_abiertos a
+          JOIN analisis_codigos_abiertos b
+            ON a.fragmento_id = b.fragmento_id
+           AND a.project_id = b.project_id
+           AND a.codigo < b.codigo
+         WHERE a.project_id = %(project)s
+         GROUP BY a.codigo, b.codigo
+        HAVING COUNT(*) >= %(min)s
+         ORDER BY fragments DESC, a.codigo, b.codigo
+         {limit_sql}
+        """
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall() or []
+    return [(str(a), str(b), int(n or 0)) for a, b, n in rows]
+
+
+def fetch_pair_fragment_ids(
+    pg: PGConnection,
+    project_id: str,
+    pairs: Sequence[Tuple[str, str]],
+    *,
+    limit: int,
+    interviewee_only: bool = False,
+) -> Dict[Tuple[str, str], List[str]]:
+    """Fragmentos compartidos por cada par de códigos, en una sola consulta.
+
+    La lista de pares se cruza con analisis_codigos_abiertos (unnest) y
+    `ROW_NUMBER()` acota a `limit` fragmentos por par. Con
+    `interviewee_only` se descartan los turnos del entrevistador y se ordena
+    por (archivo, par_idx); si no, por fragmento_id.
+    """
+    wanted = list(dict.fromkeys((str(a), str(b)) for a, b in pairs if a and b))
+    if not wanted:
+        return {}
+    if interviewee_only:
+        join_sql = """
+          JOIN entrevista_fragmentos ef
+            ON ef.project_id = a.project_id
+           AND ef.id = a.fragmento_id
+           AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')"""
+        order_sql = "ef.archivo, ef.par_idx"
+    else:
+        join_sql = ""
+        order_sql = "a.fragmento_id"
+    sql = f"""
+    WITH pairs AS (
+        SELECT * FROM unnest(%(codes_a)s::text[], %(codes_b)s::text[]) AS p(code_a, code_b)
+    ),
+    ranked AS (
+        SELECT p.code_a, p.code_b, a.fragmento_id,
+               ROW_NUMBER() OVER (PARTITION BY p.code_a, p.code_b ORDER BY {order_sql}) AS rn
+          FROM pairs p
+          JOIN analisis_codigos_abiertos a
+            ON a.project_id = %(project)s
+           AND a.codigo = p.code_a
+          JOIN analisis_codigos_abiertos b
+            ON b.project_id = a.project_id
+           AND b.fragmento_id = a.fragmento_id
+           AND b.codigo = p.code_b{join_sql}
+    )
+    SELECT code_a, code_b, fragmento_id
+      FROM ranked
+     WHERE rn <= %(limit)s
+     ORDER BY code_a, code_b, rn
+    """
+    params = {
+        "project": project_id,
+        "codes_a": [a for a, _ in wanted],
+        "codes_b": [b for _, b in wanted],
+        "limit": int(limit),
+    }
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall() or []
+    result: Dict[Tuple[str, str], List[str]] = {}
+    for code_a, code_b, fragmento_id in rows:
+        if fragmento_id:
+            result.setdefault((code_a, code_b), []).append(str(fragmento_id))
+    return result
+
+
+def fetch_code_fragment_ids(
+    pg: PGConnection,
+    project_id: str,
+    codes: Sequence[str],
+    *,
+    limit: int,
+) -> Dict[str, List[str]]:
+    """Hasta `limit` fragmentos por código (orden por fragmento_id), en una consulta."""
+    wanted = list(dict.fromkeys(str(c) for c in codes if c))
+    if not wanted:
+        return {}
+    sql = """
+    SELECT codigo, fragmento_id
+      FROM (
+        SELECT codigo, fragmento_id,
+               ROW_NUMBER() OVER (PARTITION BY codigo ORDER BY fragmento_id) AS rn
+          FROM analisis_codigos_abiertos
+         WHERE project_id = %s
+           AND codigo = ANY(%s)
+      ) ranked
+     WHERE rn <= %s
+     ORDER BY codigo, rn
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project_id, wanted, int(limit)))
+        rows = cur.fetchall() or []
+    result: Dict[str, List[str]] = {}
+    for codigo, fragmento_id in rows:
+        if fragmento_id:
+            result.setdefault(codigo, []).append(str(fragmento_id))
+    return result
 
 
 def ensure_familiarization_reviews_table(pg: PGConnection) -> None:
@@ -3246,6 +5086,56 @@ def list_interviews_summary(pg: PGConnection, project: Optional[str] = None, lim
     ]
 
 
+def fetch_interviews_context(
+    pg: PGConnection,
+    project: Optional[str],
+    archivos: Sequence[str],
+) -> Dict[str, Dict[str, Any]]:
+    """Resumen por entrevista (como list_interviews_summary) para varios archivos en una consulta.
+
+    Incluye la cantidad de códigos definitivos distintos por archivo; se usa
+    para hidratar grupos de búsquedas agrupadas por `archivo`.
+    """
+    names = [str(a) for a in dict.fromkeys(archivos) if a]
+    if not names:
+        return {}
+    sql = """
+    SELECT ef.archivo,
+           COUNT(*) AS fragmentos,
+           COALESCE(MAX(ef.actor_principal) FILTER (WHERE ef.actor_principal IS NOT NULL), '') AS actor_principal,
+           COALESCE(MAX(ef.area_tematica) FILTER (WHERE ef.area_tematica IS NOT NULL), '') AS area_tematica,
+           COALESCE(MAX(ef.metadata->>'genero') FILTER (WHERE ef.metadata ? 'genero'), '') AS genero,
+           COALESCE(MAX(ef.metadata->>'periodo') FILTER (WHERE ef.metadata ? 'periodo'), '') AS periodo,
+           MAX(ef.updated_at) AS actualizado,
+           (
+               SELECT COUNT(DISTINCT aca.codigo)
+                 FROM analisis_codigos_abiertos aca
+                WHERE aca.project_id = ef.project_id AND aca.archivo = ef.archivo
+           ) AS codigos
+      FROM entrevista_fragmentos ef
+     WHERE ef.project_id = %s
+       AND ef.archivo = ANY(%s)
+       AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
+     GROUP BY ef.project_id, ef.archivo
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", names))
+        rows = cur.fetchall()
+    return {
+        row[0]: {
+            "archivo": row[0],
+            "fragmentos": row[1],
+            "actor_principal": row[2] or None,
+            "area_tematica": row[3] or None,
+            "genero": row[4] or None,
+            "periodo": row[5] or None,
+            "actualizado": row[6].isoformat().replace("+00:00", "Z") if row[6] else None,
+            "codigos": int(row[7] or 0),
+        }
+        for row in rows
+    }
+
+
 def list_codes_summary(pg: PGConnection, project: Optional[str] = None, limit: int = 50, search: Optional[str] = None, archivo: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Lista códigos con estadísticas agregadas.
@@ -3428,6 +5318,667 @@ def get_top_open_codes(
     return [{"codigo": r[0], "citas": int(r[1] or 0)} for r in rows]
 
 
+# =============================================================================
+# Features de muestreo teórico (interview_sampling_features)
+# =============================================================================
+#
+# Una fila por entrevista con las entradas del ranking de muestreo teórico:
+# segmento (area_tematica, actor_principal), fragmentos, recencia, informe
+# (fecha y codigos_nuevos) y códigos distintos. Triggers por sentencia sobre
+# entrevista_fragmentos, analisis_codigos_abiertos e interview_reports marcan
+# la fila como `stale`. El worker (`task_refresh_sampling_features`) recalcula
+# sólo las filas marcadas (índice parcial), reclamándolas con SKIP LOCKED; la
+# lectura devuelve lo almacenado sin escribir ni leer report_json.
+
+_sampling_features_ready = False
+_sampling_features_lock = threading.Lock()
+
+_SAMPLING_FEATURES_DDL = """
+CREATE TABLE IF NOT EXISTS interview_sampling_features (
+    project_id TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    area_tematica TEXT,
+    actor_principal TEXT,
+    blob_url TEXT,
+    fragmentos INT NOT NULL DEFAULT 0,
+    actualizado TIMESTAMPTZ,
+    has_report BOOLEAN NOT NULL DEFAULT FALSE,
+    fecha_analisis TIMESTAMP,
+    codigos_nuevos INT NOT NULL DEFAULT 0,
+    codigos INT NOT NULL DEFAULT 0,
+    stale BOOLEAN NOT NULL DEFAULT TRUE,
+    refreshed_at TIMESTAMPTZ,
+    PRIMARY KEY (project_id, archivo)
+);
+CREATE INDEX IF NOT EXISTS ix_isf_stale
+    ON interview_sampling_features(project_id) WHERE stale;
+
+CREATE OR REPLACE FUNCTION isf_mark(projects TEXT[], archivos TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO interview_sampling_features AS isf (project_id, archivo, stale)
+    SELECT DISTINCT project_id, archivo, TRUE
+      FROM unnest(projects, archivos) AS u(project_id, archivo)
+     WHERE project_id IS NOT NULL AND archivo IS NOT NULL
+     ORDER BY project_id, archivo
+    ON CONFLICT (project_id, archivo) DO UPDATE
+       SET stale = TRUE
+     WHERE NOT isf.stale;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Por sentencia: marca una vez cada entrevista tocada. En UPDATE, los
+-- argumentos del trigger listan las columnas que cuentan (sin argumentos,
+-- cualquiera); sólo las filas que cambiaron en ellas marcan su entrevista.
+CREATE OR REPLACE FUNCTION isf_touch() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[];
+    archivos TEXT[];
+    cols TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(archivo) INTO projects, archivos FROM isf_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(archivo) INTO projects, archivos FROM isf_old;
+    ELSIF TG_NARGS = 0 THEN
+        SELECT array_agg(project_id), array_agg(archivo) INTO projects, archivos
+          FROM (SELECT project_id, archivo FROM isf_old UNION SELECT project_id, archivo FROM isf_new) u;
+    ELSE
+        SELECT string_agg(quote_ident(c), ', ') INTO cols FROM unnest(TG_ARGV) AS a(c);
+        EXECUTE format(
+            'SELECT array_agg(project_id), array_agg(archivo) FROM ('
+            '(SELECT %1$s FROM isf_old EXCEPT ALL SELECT %1$s FROM isf_new) UNION ALL '
+            '(SELECT %1$s FROM isf_new EXCEPT ALL SELECT %1$s FROM isf_old)) d',
+            cols
+        ) INTO projects, archivos;
+    END IF;
+    IF projects IS NOT NULL THEN
+        PERFORM isf_mark(projects, archivos);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    -- Triggers por fila de versiones anteriores.
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_fragments') THEN
+        DROP TRIGGER trg_isf_fragments ON entrevista_fragmentos;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_open_codes') THEN
+        DROP TRIGGER trg_isf_open_codes ON analisis_codigos_abiertos;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_reports') THEN
+        DROP TRIGGER trg_isf_reports ON interview_reports;
+    END IF;
+    DROP FUNCTION IF EXISTS isf_mark(TEXT, TEXT);
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_fragments_insert') THEN
+        CREATE TRIGGER trg_isf_fragments_insert
+            AFTER INSERT ON entrevista_fragmentos
+            REFERENCING NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_fragments_delete') THEN
+        CREATE TRIGGER trg_isf_fragments_delete
+            AFTER DELETE ON entrevista_fragmentos
+            REFERENCING OLD TABLE AS isf_old
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_fragments_update') THEN
+        CREATE TRIGGER trg_isf_fragments_update
+            AFTER UPDATE ON entrevista_fragmentos
+            REFERENCING OLD TABLE AS isf_old NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch(
+                'project_id', 'archivo', 'speaker', 'actor_principal', 'area_tematica', 'metadata', 'updated_at'
+            );
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_open_codes_insert') THEN
+        CREATE TRIGGER trg_isf_open_codes_insert
+            AFTER INSERT ON analisis_codigos_abiertos
+            REFERENCING NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_open_codes_delete') THEN
+        CREATE TRIGGER trg_isf_open_codes_delete
+            AFTER DELETE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS isf_old
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_open_codes_update') THEN
+        CREATE TRIGGER trg_isf_open_codes_update
+            AFTER UPDATE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS isf_old NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch('project_id', 'archivo', 'codigo');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_reports_insert') THEN
+        CREATE TRIGGER trg_isf_reports_insert
+            AFTER INSERT ON interview_reports
+            REFERENCING NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_reports_delete') THEN
+        CREATE TRIGGER trg_isf_reports_delete
+            AFTER DELETE ON interview_reports
+            REFERENCING OLD TABLE AS isf_old
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_isf_reports_update') THEN
+        CREATE TRIGGER trg_isf_reports_update
+            AFTER UPDATE ON interview_reports
+            REFERENCING OLD TABLE AS isf_old NEW TABLE AS isf_new
+            FOR EACH STATEMENT EXECUTE FUNCTION isf_touch();
+    END IF;
+END $$;
+"""
+
+_SAMPLING_FEATURES_SEED_SQL = """
+INSERT INTO interview_sampling_features (project_id, archivo)
+SELECT DISTINCT project_id, archivo FROM entrevista_fragmentos
+UNION
+SELECT DISTINCT project_id, archivo FROM interview_reports
+ON CONFLICT (project_id, archivo) DO NOTHING
+"""
+
+_SAMPLING_FEATURES_FILL_SQL = """
+INSERT INTO interview_sampling_features (
+    project_id, archivo, area_tematica, actor_principal, blob_url, fragmentos, actualizado,
+    has_report, fecha_analisis, codigos_nuevos, codigos, stale, refreshed_at
+)
+SELECT %(project)s,
+       COALESCE(f.archivo, r.archivo),
+       f.area_tematica,
+       f.actor_principal,
+       f.blob_url,
+       COALESCE(f.fragmentos, 0),
+       f.actualizado,
+       r.archivo IS NOT NULL,
+       r.fecha_analisis,
+       COALESCE(r.codigos_nuevos, 0),
+       COALESCE(c.codigos, 0),
+       FALSE,
+       NOW()
+  FROM (
+        SELECT archivo,
+               COUNT(*) AS fragmentos,
+               MAX(area_tematica) FILTER (WHERE area_tematica IS NOT NULL) AS area_tematica,
+               MAX(actor_principal) FILTER (WHERE actor_principal IS NOT NULL) AS actor_principal,
+               MAX(metadata->>'blob_url') FILTER (WHERE metadata IS NOT NULL AND (metadata ? 'blob_url')) AS blob_url,
+               MAX(updated_at) AS actualizado
+          FROM entrevista_fragmentos
+         WHERE project_id = %(project)s
+           AND (speaker IS NULL OR speaker <> 'interviewer')
+           AND archivo = ANY(%(archivos)s)
+         GROUP BY archivo
+  ) f
+  FULL OUTER JOIN (
+        SELECT archivo::text AS archivo,
+               fecha_analisis,
+               CASE WHEN (report_json->>'codigos_nuevos') ~ '^-?[0-9]+$'
+                    THEN (report_json->>'codigos_nuevos')::int ELSE 0 END AS codigos_nuevos
+          FROM interview_reports
+         WHERE project_id = %(project)s
+           AND archivo = ANY(%(archivos)s)
+  ) r ON r.archivo = f.archivo
+  LEFT JOIN (
+        SELECT archivo, COUNT(DISTINCT codigo) AS codigos
+          FROM analisis_codigos_abiertos
+         WHERE project_id = %(project)s
+           AND archivo = ANY(%(archivos)s)
+         GROUP BY archivo
+  ) c ON c.archivo = COALESCE(f.archivo, r.archivo)
+ON CONFLICT (project_id, archivo) DO UPDATE
+   SET area_tematica = EXCLUDED.area_tematica,
+       actor_principal = EXCLUDED.actor_principal,
+       blob_url = EXCLUDED.blob_url,
+       fragmentos = EXCLUDED.fragmentos,
+       actualizado = EXCLUDED.actualizado,
+       has_report = EXCLUDED.has_report,
+       fecha_analisis = EXCLUDED.fecha_analisis,
+       codigos_nuevos = EXCLUDED.codigos_nuevos,
+       codigos = EXCLUDED.codigos,
+       stale = FALSE,
+       refreshed_at = EXCLUDED.refreshed_at
+"""
+
+
+def ensure_interview_sampling_features(pg: PGConnection) -> None:
+    """Crea la tabla de features de muestreo teórico y sus triggers.
+
+    La primera vez (tabla vacía) siembra una fila `stale` por entrevista; el
+    worker calcula cada proyecto cuando la lectura detecta filas pendientes.
+    """
+    global _sampling_features_ready
+    if _sampling_features_ready:
+        return
+    with _sampling_features_lock:
+        if _sampling_features_ready:
+            return
+        from .reports import ensure_reports_table
+
+        ensure_fragment_table(pg)
+        ensure_open_coding_table(pg)
+        ensure_reports_table(pg)
+        with pg.cursor() as cur:
+            cur.execute(_SAMPLING_FEATURES_DDL)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM interview_sampling_features)")
+            row = cur.fetchone()
+            if not (row and row[0]):
+                cur.execute(_SAMPLING_FEATURES_SEED_SQL)
+        pg.commit()
+        _sampling_features_ready = True
+
+
+def refresh_interview_sampling_features(
+    pg: PGConnection,
+    project_id: str,
+    *,
+    full: bool = False,
+) -> int:
+    """Recalcula las filas `stale` del proyecto (o todas con `full=True`).
+
+    Las filas se reclaman con `FOR UPDATE SKIP LOCKED`: dos refrescos
+    concurrentes se reparten las entrevistas en lugar de duplicar el trabajo,
+    y un trigger que marca una fila reclamada espera al commit y la deja
+    `stale` de nuevo. Las entrevistas reclamadas que ya no tienen fragmentos
+    ni informe se eliminan.
+
+    Returns:
+        Número de entrevistas recalculadas.
+    """
+    ensure_interview_sampling_features(pg)
+    with pg.cursor() as cur:
+        if full:
+            cur.execute(
+                "UPDATE interview_sampling_features SET stale = TRUE WHERE project_id = %s AND NOT stale",
+                (project_id,),
+            )
+            cur.execute(
+                """
+                INSERT INTO interview_sampling_features (project_id, archivo)
+                SELECT DISTINCT project_id, archivo FROM entrevista_fragmentos WHERE project_id = %(project)s
+                UNION
+                SELECT DISTINCT project_id, archivo FROM interview_reports WHERE project_id = %(project)s
+                ON CONFLICT (project_id, archivo) DO NOTHING
+                """,
+                {"project": project_id},
+            )
+        cur.execute(
+            """
+            SELECT archivo FROM interview_sampling_features
+             WHERE project_id = %s AND stale
+             ORDER BY archivo
+               FOR UPDATE SKIP LOCKED
+            """,
+            (project_id,),
+        )
+        archivos = [str(r[0]) for r in cur.fetchall() or []]
+        if not archivos:
+            pg.commit()
+            return 0
+        cur.execute(_SAMPLING_FEATURES_FILL_SQL, {"project": project_id, "archivos": archivos})
+        cur.execute(
+            "DELETE FROM interview_sampling_features WHERE project_id = %s AND archivo = ANY(%s) AND stale",
+            (project_id, archivos),
+        )
+    pg.commit()
+    return len(archivos)
+
+
+def has_stale_sampling_features(pg: PGConnection, project_id: str) -> bool:
+    """True si el proyecto tiene entrevistas pendientes de recalcular (índice parcial)."""
+    ensure_interview_sampling_features(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT EXISTS (SELECT 1 FROM interview_sampling_features WHERE project_id = %s AND stale)",
+            (project_id,),
+        )
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def load_interview_sampling_features(pg: PGConnection, project_id: str) -> List[Dict[str, Any]]:
+    """Features por entrevista del proyecto, ordenadas como list_interviews_summary.
+
+    Sólo lectura: devuelve lo almacenado, aunque haya filas `stale` pendientes
+    del worker (`has_stale_sampling_features` permite encolarlo). Incluye
+    entrevistas sólo con informe (fragmentos = 0) para la ventana de
+    saturación; el llamador decide si listarlas.
+    """
+    ensure_interview_sampling_features(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            SELECT archivo, fragmentos, actor_principal, area_tematica, blob_url, actualizado,
+                   has_report, fecha_analisis, codigos_nuevos, codigos
+              FROM interview_sampling_features
+             WHERE project_id = %s
+             ORDER BY actualizado DESC, archivo ASC
+            """,
+            (project_id,),
+        )
+        rows = cur.fetchall() or []
+    return [
+        {
+            "archivo": row[0],
+            "fragmentos": int(row[1] or 0),
+            "actor_principal": row[2] or None,
+            "area_tematica": row[3] or None,
+            "blob_url": row[4] or None,
+            "actualizado": row[5].isoformat().replace("+00:00", "Z") if row[5] else None,
+            "has_report": bool(row[6]),
+            "fecha_analisis": row[7],
+            "codigos_nuevos": int(row[8] or 0),
+            "codigos": int(row[9] or 0),
+        }
+        for row in rows
+    ]
+
+
+# =============================================================================
+# Cola de codificación abierta (fragment_coding_state + coding_queue_counts)
+# =============================================================================
+#
+# Estado por fragmento (no-entrevistador) con su número de códigos abiertos y
+# contadores de pendientes por archivo. Lo mantienen triggers por sentencia
+# sobre entrevista_fragmentos y analisis_codigos_abiertos, de modo que cualquier
+# ruta de escritura (ingesta, asignación, merge, unassign, promoción) lo deja
+# al día. "Siguiente fragmento" y los conteos de pendientes son lecturas de
+# índices parciales (code_count = 0) y de una fila por archivo.
+
+_coding_queue_ready = False
+_coding_queue_lock = threading.Lock()
+
+_CODING_QUEUE_DDL = """
+CREATE TABLE IF NOT EXISTS fragment_coding_state (
+    project_id TEXT NOT NULL,
+    fragmento_id TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    par_idx INT,
+    frag_updated_at TIMESTAMPTZ,
+    code_count INT NOT NULL DEFAULT 0,
+    rand_key DOUBLE PRECISION NOT NULL DEFAULT random(),
+    PRIMARY KEY (project_id, fragmento_id)
+);
+CREATE INDEX IF NOT EXISTS ix_fcs_pending_recent
+    ON fragment_coding_state(project_id, frag_updated_at DESC, archivo, par_idx) WHERE code_count = 0;
+CREATE INDEX IF NOT EXISTS ix_fcs_pending_archivo
+    ON fragment_coding_state(project_id, archivo, frag_updated_at DESC, par_idx) WHERE code_count = 0;
+CREATE INDEX IF NOT EXISTS ix_fcs_pending_random
+    ON fragment_coding_state(project_id, rand_key) WHERE code_count = 0;
+
+CREATE TABLE IF NOT EXISTS coding_queue_counts (
+    project_id TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    pending INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, archivo)
+);
+
+-- Triggers por sentencia (tablas de transición): cada sentencia aplica sus
+-- deltas agregados en un solo upsert/update, ordenado por clave, en lugar de
+-- una escritura por fila sobre las mismas filas de contadores.
+CREATE OR REPLACE FUNCTION fcs_sync_counts() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[]; archivos TEXT[]; totals INT[]; pendings INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(1), array_agg((code_count = 0)::INT)
+          INTO projects, archivos, totals, pendings
+          FROM fcs_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(-1), array_agg(-(code_count = 0)::INT)
+          INTO projects, archivos, totals, pendings
+          FROM fcs_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(dt), array_agg(dp)
+          INTO projects, archivos, totals, pendings
+          FROM (
+                SELECT project_id, archivo, -1 AS dt, -(code_count = 0)::INT AS dp FROM fcs_old
+                UNION ALL
+                SELECT project_id, archivo, 1, (code_count = 0)::INT FROM fcs_new
+          ) d;
+    END IF;
+    IF projects IS NOT NULL THEN
+        INSERT INTO coding_queue_counts AS q (project_id, archivo, total, pending)
+        SELECT project_id, archivo, SUM(dt), SUM(dp)
+          FROM unnest(projects, archivos, totals, pendings) AS u(project_id, archivo, dt, dp)
+         GROUP BY project_id, archivo
+        HAVING SUM(dt) <> 0 OR SUM(dp) <> 0
+         ORDER BY project_id, archivo
+        ON CONFLICT (project_id, archivo) DO UPDATE
+           SET total = q.total + EXCLUDED.total,
+               pending = q.pending + EXCLUDED.pending;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fcs_sync_fragment() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[]; ids TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(id) INTO projects, ids FROM fcs_ef_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(id) INTO projects, ids FROM fcs_ef_old;
+    ELSE
+        -- Sólo las filas que cambiaron en las columnas de la cola (no embedding/metadata).
+        SELECT array_agg(project_id), array_agg(id) INTO projects, ids
+          FROM (
+                (SELECT project_id, id, archivo, par_idx, speaker, updated_at FROM fcs_ef_old
+                 EXCEPT ALL
+                 SELECT project_id, id, archivo, par_idx, speaker, updated_at FROM fcs_ef_new)
+                UNION
+                (SELECT project_id, id, archivo, par_idx, speaker, updated_at FROM fcs_ef_new
+                 EXCEPT ALL
+                 SELECT project_id, id, archivo, par_idx, speaker, updated_at FROM fcs_ef_old)
+          ) d;
+    END IF;
+    IF projects IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- El estado final de cada fragmento tocado se lee de la tabla (visible al
+    -- final de la sentencia): fuera de la cola si ya no existe o es del entrevistador.
+    DELETE FROM fragment_coding_state s
+     USING (SELECT DISTINCT * FROM unnest(projects, ids) AS u(project_id, id)) t
+     WHERE s.project_id = t.project_id
+       AND s.fragmento_id = t.id
+       AND NOT EXISTS (
+             SELECT 1 FROM entrevista_fragmentos ef
+              WHERE ef.project_id = t.project_id
+                AND ef.id = t.id
+                AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
+       );
+
+    INSERT INTO fragment_coding_state (project_id, fragmento_id, archivo, par_idx, frag_updated_at, code_count)
+    SELECT ef.project_id, ef.id, ef.archivo, ef.par_idx, ef.updated_at,
+           (SELECT COUNT(*) FROM analisis_codigos_abiertos aca
+             WHERE aca.project_id = ef.project_id AND aca.fragmento_id = ef.id)
+      FROM entrevista_fragmentos ef
+      JOIN (SELECT DISTINCT * FROM unnest(projects, ids) AS u(project_id, id)) t
+        ON t.project_id = ef.project_id AND t.id = ef.id
+     WHERE ef.speaker IS NULL OR ef.speaker <> 'interviewer'
+     ORDER BY ef.project_id, ef.id
+    ON CONFLICT (project_id, fragmento_id) DO UPDATE
+       SET archivo = EXCLUDED.archivo,
+           par_idx = EXCLUDED.par_idx,
+           frag_updated_at = EXCLUDED.frag_updated_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fcs_sync_codes() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[]; fragments TEXT[]; deltas INT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(fragmento_id), array_agg(1)
+          INTO projects, fragments, deltas
+          FROM fcs_aca_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(fragmento_id), array_agg(-1)
+          INTO projects, fragments, deltas
+          FROM fcs_aca_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(fragmento_id), array_agg(d)
+          INTO projects, fragments, deltas
+          FROM (
+                SELECT project_id, fragmento_id, -1 AS d FROM fcs_aca_old
+                UNION ALL
+                SELECT project_id, fragmento_id, 1 FROM fcs_aca_new
+          ) u;
+    END IF;
+    IF projects IS NOT NULL THEN
+        UPDATE fragment_coding_state s
+           SET code_count = GREATEST(s.code_count + n.d, 0)
+          FROM (
+                SELECT project_id, fragmento_id, SUM(d)::INT AS d
+                  FROM unnest(projects, fragments, deltas) AS u(project_id, fragmento_id, d)
+                 GROUP BY project_id, fragmento_id
+                HAVING SUM(d) <> 0
+          ) n
+         WHERE s.project_id = n.project_id AND s.fragmento_id = n.fragmento_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    -- Triggers por fila de versiones anteriores.
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_fcs_counts_insert_delete') THEN
+        DROP TRIGGER trg_fcs_counts_insert_delete ON fragment_coding_state;
+    END IF;
+    -- Mismo nombre que el nuevo trigger de UPDATE: sólo se borra la versión por fila.
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_fcs_counts_update' AND (tgtype & 1) = 1) THEN
+        DROP TRIGGER trg_fcs_counts_update ON fragment_coding_state;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_ef_coding_state') THEN
+        DROP TRIGGER trg_ef_coding_state ON entrevista_fragmentos;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_coding_state') THEN
+        DROP TRIGGER trg_aca_coding_state ON analisis_codigos_abiertos;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_fcs_counts_insert') THEN
+        CREATE TRIGGER trg_fcs_counts_insert
+            AFTER INSERT ON fragment_coding_state
+            REFERENCING NEW TABLE AS fcs_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_counts();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_fcs_counts_delete') THEN
+        CREATE TRIGGER trg_fcs_counts_delete
+            AFTER DELETE ON fragment_coding_state
+            REFERENCING OLD TABLE AS fcs_old
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_counts();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_fcs_counts_update') THEN
+        CREATE TRIGGER trg_fcs_counts_update
+            AFTER UPDATE ON fragment_coding_state
+            REFERENCING OLD TABLE AS fcs_old NEW TABLE AS fcs_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_counts();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_ef_coding_state_insert') THEN
+        CREATE TRIGGER trg_ef_coding_state_insert
+            AFTER INSERT ON entrevista_fragmentos
+            REFERENCING NEW TABLE AS fcs_ef_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_fragment();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_ef_coding_state_delete') THEN
+        CREATE TRIGGER trg_ef_coding_state_delete
+            AFTER DELETE ON entrevista_fragmentos
+            REFERENCING OLD TABLE AS fcs_ef_old
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_fragment();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_ef_coding_state_update') THEN
+        CREATE TRIGGER trg_ef_coding_state_update
+            AFTER UPDATE ON entrevista_fragmentos
+            REFERENCING OLD TABLE AS fcs_ef_old NEW TABLE AS fcs_ef_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_fragment();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_coding_state_insert') THEN
+        CREATE TRIGGER trg_aca_coding_state_insert
+            AFTER INSERT ON analisis_codigos_abiertos
+            REFERENCING NEW TABLE AS fcs_aca_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_codes();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_coding_state_delete') THEN
+        CREATE TRIGGER trg_aca_coding_state_delete
+            AFTER DELETE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS fcs_aca_old
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_codes();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_coding_state_update') THEN
+        CREATE TRIGGER trg_aca_coding_state_update
+            AFTER UPDATE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS fcs_aca_old NEW TABLE AS fcs_aca_new
+            FOR EACH STATEMENT EXECUTE FUNCTION fcs_sync_codes();
+    END IF;
+END $$;
+"""
+
+_CODING_QUEUE_FILL_SQL = """
+INSERT INTO fragment_coding_state (project_id, fragmento_id, archivo, par_idx, frag_updated_at, code_count)
+SELECT ef.project_id, ef.id, ef.archivo, ef.par_idx, ef.updated_at, COALESCE(c.n, 0)
+  FROM entrevista_fragmentos ef
+  LEFT JOIN (
+        SELECT project_id, fragmento_id, COUNT(*) AS n
+          FROM analisis_codigos_abiertos
+         {where_codes}
+         GROUP BY project_id, fragmento_id
+  ) c ON c.project_id = ef.project_id AND c.fragmento_id = ef.id
+ WHERE (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
+   {where_fragments}
+ON CONFLICT (project_id, fragmento_id) DO NOTHING
+"""
+
+
+def ensure_coding_queue(pg: PGConnection) -> None:
+    """Crea la cola de codificación (tablas, índices parciales y triggers).
+
+    La primera vez (tabla vacía) la puebla desde entrevista_fragmentos.
+    """
+    global _coding_queue_ready
+    if _coding_queue_ready:
+        return
+    with _coding_queue_lock:
+        if _coding_queue_ready:
+            return
+        ensure_fragment_table(pg)
+        ensure_open_coding_table(pg)
+        with pg.cursor() as cur:
+            cur.execute(_CODING_QUEUE_DDL)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM fragment_coding_state)")
+            row = cur.fetchone()
+            if not (row and row[0]):
+                cur.execute(_CODING_QUEUE_FILL_SQL.format(where_codes="", where_fragments=""))
+        pg.commit()
+        _coding_queue_ready = True
+
+
+def rebuild_coding_queue(pg: PGConnection, project_id: str) -> Dict[str, int]:
+    """Reconstruye el estado y los contadores de la cola para un proyecto."""
+    ensure_coding_queue(pg)
+    with pg.cursor() as cur:
+        cur.execute("DELETE FROM fragment_coding_state WHERE project_id = %s", (project_id,))
+        cur.execute("DELETE FROM coding_queue_counts WHERE project_id = %s", (project_id,))
+        cur.execute(
+            _CODING_QUEUE_FILL_SQL.format(
+                where_codes="WHERE project_id = %s",
+                where_fragments="AND ef.project_id = %s",
+            ),
+            (project_id, project_id),
+        )
+        cur.execute(
+            "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(pending), 0) FROM coding_queue_counts WHERE project_id = %s",
+            (project_id,),
+        )
+        row = cur.fetchone()
+    pg.commit()
+    return {"fragmentos": int(row[0] or 0), "pendientes": int(row[1] or 0)}
+
+
 def select_next_uncoded_fragment(
     pg: PGConnection,
     *,
@@ -3436,20 +5987,21 @@ def select_next_uncoded_fragment(
     exclude_fragment_ids: Optional[List[str]] = None,
     strategy: str = "recent",
 ) -> Optional[Dict[str, Any]]:
-    """Elige el próximo fragmento no codificado (heurística v1, Postgres-only)."""
-    ensure_fragment_table(pg)
-    ensure_open_coding_table(pg)
+    """Elige el próximo fragmento no codificado desde la cola (índices parciales)."""
+    import random
 
-    params: List[Any] = [project_id, project_id]
+    ensure_coding_queue(pg)
+
+    params: List[Any] = [project_id]
     archivo_filter = ""
     if archivo:
-        archivo_filter = "AND ef.archivo = %s"
+        archivo_filter = "AND s.archivo = %s"
         params.append(archivo)
 
     exclude_filter = ""
     exclude_ids = [str(x).strip() for x in (exclude_fragment_ids or []) if str(x).strip()]
     if exclude_ids:
-        exclude_filter = "AND NOT (ef.id = ANY(%s))"
+        exclude_filter = "AND NOT (s.fragmento_id = ANY(%s))"
         params.append(exclude_ids)
 
     strategy_key = (strategy or "recent").strip().lower()
@@ -3457,33 +6009,46 @@ def select_next_uncoded_fragment(
         strategy_key = "recent"
 
     if strategy_key == "oldest":
-        order_by = "ef.updated_at ASC, ef.archivo ASC, ef.par_idx ASC"
+        order_by = "s.frag_updated_at ASC, s.archivo ASC, s.par_idx ASC"
     elif strategy_key == "random":
-        order_by = "random()"
+        # Punto aleatorio sobre rand_key (índice parcial) en lugar de ORDER BY random().
+        order_by = "s.rand_key ASC"
     else:
         # Prefer fragments from recently updated interviews, then earliest par_idx.
-        order_by = "ef.updated_at DESC, ef.archivo ASC, ef.par_idx ASC"
+        order_by = "s.frag_updated_at DESC, s.archivo ASC, s.par_idx ASC"
 
-    sql = f"""
-    WITH coded AS (
-        SELECT DISTINCT fragmento_id
-          FROM analisis_codigos_abiertos
-         WHERE project_id = %s
-    )
+    sql = """
     SELECT ef.id, ef.archivo, ef.par_idx, ef.fragmento, ef.area_tematica, ef.actor_principal, ef.requiere_protocolo_lluvia
-      FROM entrevista_fragmentos ef
-      LEFT JOIN coded c ON c.fragmento_id = ef.id
-     WHERE ef.project_id = %s
-       AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
-       AND c.fragmento_id IS NULL
+      FROM fragment_coding_state s
+      JOIN entrevista_fragmentos ef ON ef.project_id = s.project_id AND ef.id = s.fragmento_id
+     WHERE s.project_id = %s
+       AND s.code_count = 0
        {archivo_filter}
-             {exclude_filter}
-         ORDER BY {order_by}
+       {exclude_filter}
+       {rand_filter}
+     ORDER BY {order_by}
      LIMIT 1
     """
+    attempts: List[Tuple[str, List[Any]]] = []
+    if strategy_key == "random":
+        attempts.append(("AND s.rand_key >= %s", params + [random.random()]))
+    attempts.append(("", params))
+
+    row = None
     with pg.cursor() as cur:
-        cur.execute(sql, tuple(params))
-        row = cur.fetchone()
+        for rand_filter, attempt_params in attempts:
+            cur.execute(
+                sql.format(
+                    archivo_filter=archivo_filter,
+                    exclude_filter=exclude_filter,
+                    rand_filter=rand_filter,
+                    order_by=order_by,
+                ),
+                tuple(attempt_params),
+            )
+            row = cur.fetchone()
+            if row:
+                break
 
     if not row:
         return None
@@ -3506,33 +6071,27 @@ def get_open_coding_pending_counts(
 ) -> Dict[str, Optional[int]]:
     """Cuenta fragmentos pendientes (sin código) para codificación abierta.
 
+    Lee los contadores por archivo de la cola de codificación.
+
     Returns:
         {
           "pending_total": int,
           "pending_in_archivo": Optional[int]
         }
     """
-    ensure_fragment_table(pg)
-    ensure_open_coding_table(pg)
+    ensure_coding_queue(pg)
 
     archivo_clean = (archivo or "").strip() or None
 
     sql = """
-    WITH coded AS (
-        SELECT DISTINCT fragmento_id
-          FROM analisis_codigos_abiertos
-         WHERE project_id = %s
-    )
     SELECT
-        COUNT(*) FILTER (WHERE c.fragmento_id IS NULL) AS pending_total,
-        COUNT(*) FILTER (WHERE c.fragmento_id IS NULL AND ef.archivo = %s) AS pending_in_archivo
-      FROM entrevista_fragmentos ef
-      LEFT JOIN coded c ON c.fragmento_id = ef.id
-     WHERE ef.project_id = %s
-       AND (ef.speaker IS NULL OR ef.speaker <> 'interviewer')
+        COALESCE(SUM(pending), 0) AS pending_total,
+        COALESCE(SUM(pending) FILTER (WHERE archivo = %s), 0) AS pending_in_archivo
+      FROM coding_queue_counts
+     WHERE project_id = %s
     """
     with pg.cursor() as cur:
-        cur.execute(sql, (project_id, archivo_clean, project_id))
+        cur.execute(sql, (archivo_clean, project_id))
         row = cur.fetchone()
 
     pending_total = int((row[0] if row else 0) or 0)
@@ -3764,130 +6323,1034 @@ def quotes_for_category(pg: PGConnection, categoria: str, project: Optional[str]
 
 
 
-def quote_count_for_category(pg: PGConnection, categoria: str, project: Optional[str] = None) -> int:
+def quote_count_for_category(pg: PGConnection, categoria: str, project: Optional[str] = None) -> int:
+    sql = """
+    SELECT COUNT(DISTINCT aca.fragmento_id)
+      FROM analisis_axial aa
+      CROSS JOIN LATERAL unnest(COALESCE(aa.evidencia, ARRAY[]::text[])) AS evid(fragmento_id)
+      JOIN analisis_codigos_abiertos aca
+        ON aca.fragmento_id = evid.fragmento_id
+       AND aca.codigo = aa.codigo
+     WHERE aa.categoria = %s
+       AND aa.project_id = %s
+       AND aa.estado = 'validado'
+       AND aca.project_id = aa.project_id
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (categoria, project or "default"))
+        row = cur.fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+# =============================================================================
+# Curva de saturación incremental (code_archivo_stats + interview_code_novelty)
+# =============================================================================
+#
+# code_archivo_stats guarda, por (archivo, código), el número de citas y la
+# primera aparición; lo mantienen triggers por sentencia sobre
+# analisis_codigos_abiertos (asignación, merge, unassign). Sólo cuando cambia
+# el conjunto de pares o una primera aparición, el proyecto queda marcado en
+# code_curve_state y un worker materializa code_first_seen e
+# interview_code_novelty desde esa tabla (mucho menor que la de citas),
+# reescribiendo sólo las filas que cambiaron. Las lecturas sirven siempre las
+# filas guardadas.
+
+_code_curve_ready = False
+_code_curve_lock = threading.Lock()
+
+_CODE_CURVE_DDL = """
+CREATE TABLE IF NOT EXISTS code_archivo_stats (
+    project_id TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    refs INT NOT NULL DEFAULT 0,
+    first_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (project_id, archivo, codigo)
+);
+CREATE INDEX IF NOT EXISTS ix_cas_project_codigo ON code_archivo_stats(project_id, codigo, first_at, archivo);
+
+CREATE TABLE IF NOT EXISTS code_first_seen (
+    project_id TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    first_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (project_id, codigo)
+);
+
+CREATE TABLE IF NOT EXISTS interview_code_novelty (
+    project_id TEXT NOT NULL,
+    interview_idx INT NOT NULL,
+    archivo TEXT NOT NULL,
+    first_seen TIMESTAMPTZ,
+    codigos_totales INT NOT NULL DEFAULT 0,
+    nuevos_codigos INT NOT NULL DEFAULT 0,
+    codigos_acumulados INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, interview_idx)
+);
+
+CREATE TABLE IF NOT EXISTS code_curve_state (
+    project_id TEXT PRIMARY KEY,
+    dirty BOOLEAN NOT NULL DEFAULT TRUE,
+    refreshed_at TIMESTAMPTZ
+);
+
+CREATE OR REPLACE FUNCTION ccs_mark(projects TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO code_curve_state AS ccs (project_id, dirty)
+    SELECT DISTINCT project_id, TRUE
+      FROM unnest(projects) AS u(project_id)
+     WHERE project_id IS NOT NULL
+     ORDER BY project_id
+    ON CONFLICT (project_id) DO UPDATE
+       SET dirty = TRUE
+     WHERE NOT ccs.dirty;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Por sentencia: suma las citas que aparecen (+1) y desaparecen (-1) por par
+-- (archivo, código) en un solo upsert ordenado. En UPDATE sólo cuentan las
+-- filas que cambiaron en project_id, archivo, codigo o created_at. Marca el
+-- proyecto cuando un par aparece o desaparece o cambia su primera aparición.
+CREATE OR REPLACE FUNCTION cas_sync() RETURNS TRIGGER AS $$
+DECLARE
+    projects TEXT[]; archivos TEXT[]; codigos TEXT[]; stamps TIMESTAMPTZ[]; deltas INT[];
+    dead_p TEXT[]; dead_a TEXT[]; dead_c TEXT[];
+    check_p TEXT[]; check_a TEXT[]; check_c TEXT[];
+    marked TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(codigo), array_agg(created_at), array_agg(1)
+          INTO projects, archivos, codigos, stamps, deltas
+          FROM cas_new;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(codigo), array_agg(created_at), array_agg(-1)
+          INTO projects, archivos, codigos, stamps, deltas
+          FROM cas_old;
+    ELSE
+        SELECT array_agg(project_id), array_agg(archivo), array_agg(codigo), array_agg(created_at), array_agg(d)
+          INTO projects, archivos, codigos, stamps, deltas
+          FROM (
+                SELECT g.*, -1 AS d FROM (
+                    SELECT project_id, archivo, codigo, created_at FROM cas_old
+                    EXCEPT ALL
+                    SELECT project_id, archivo, codigo, created_at FROM cas_new
+                ) g
+                UNION ALL
+                SELECT c.*, 1 FROM (
+                    SELECT project_id, archivo, codigo, created_at FROM cas_new
+                    EXCEPT ALL
+                    SELECT project_id, archivo, codigo, created_at FROM cas_old
+                ) c
+          ) u;
+    END IF;
+    IF projects IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    WITH delta AS (
+        SELECT project_id, archivo, codigo,
+               SUM(d)::INT AS d,
+               MIN(created_at) FILTER (WHERE d > 0) AS came_at,
+               MIN(created_at) FILTER (WHERE d < 0) AS gone_at
+          FROM unnest(projects, archivos, codigos, stamps, deltas) AS u(project_id, archivo, codigo, created_at, d)
+         GROUP BY project_id, archivo, codigo
+    ),
+    prior AS (
+        SELECT s.project_id, s.archivo, s.codigo, s.first_at
+          FROM code_archivo_stats s
+          JOIN delta n USING (project_id, archivo, codigo)
+    ),
+    up AS (
+        INSERT INTO code_archivo_stats AS s (project_id, archivo, codigo, refs, first_at)
+        SELECT project_id, archivo, codigo, d, COALESCE(came_at, gone_at)
+          FROM delta
+         ORDER BY project_id, archivo, codigo
+        ON CONFLICT (project_id, archivo, codigo) DO UPDATE
+           SET refs = s.refs + EXCLUDED.refs,
+               first_at = LEAST(s.first_at, EXCLUDED.first_at)
+        RETURNING s.project_id, s.archivo, s.codigo, s.refs, s.first_at
+    )
+    SELECT array_agg(up.project_id) FILTER (WHERE up.refs <= 0),
+           array_agg(up.archivo) FILTER (WHERE up.refs <= 0),
+           array_agg(up.codigo) FILTER (WHERE up.refs <= 0),
+           array_agg(up.project_id) FILTER (WHERE up.refs > 0 AND n.gone_at <= p.first_at),
+           array_agg(up.archivo) FILTER (WHERE up.refs > 0 AND n.gone_at <= p.first_at),
+           array_agg(up.codigo) FILTER (WHERE up.refs > 0 AND n.gone_at <= p.first_at),
+           array_agg(DISTINCT up.project_id) FILTER (
+               WHERE p.project_id IS NULL OR up.refs <= 0
+                  OR up.first_at <> p.first_at OR n.gone_at <= p.first_at
+           )
+      INTO dead_p, dead_a, dead_c, check_p, check_a, check_c, marked
+      FROM up
+      JOIN delta n USING (project_id, archivo, codigo)
+      LEFT JOIN prior p USING (project_id, archivo, codigo);
+
+    IF dead_p IS NOT NULL THEN
+        DELETE FROM code_archivo_stats s
+         USING unnest(dead_p, dead_a, dead_c) AS k(project_id, archivo, codigo)
+         WHERE s.project_id = k.project_id AND s.archivo = k.archivo AND s.codigo = k.codigo
+           AND s.refs <= 0;
+    END IF;
+    -- Se fue la cita más antigua de un par que sigue vivo: se recalcula desde las citas.
+    IF check_p IS NOT NULL THEN
+        UPDATE code_archivo_stats s
+           SET first_at = m.first_at
+          FROM (
+                SELECT aca.project_id, aca.archivo, aca.codigo, MIN(aca.created_at) AS first_at
+                  FROM analisis_codigos_abiertos aca
+                  JOIN unnest(check_p, check_a, check_c) AS k(project_id, archivo, codigo)
+                    ON aca.project_id = k.project_id AND aca.archivo = k.archivo AND aca.codigo = k.codigo
+                 GROUP BY aca.project_id, aca.archivo, aca.codigo
+          ) m
+         WHERE s.project_id = m.project_id AND s.archivo = m.archivo AND s.codigo = m.codigo
+           AND s.first_at IS DISTINCT FROM m.first_at;
+    END IF;
+    IF marked IS NOT NULL THEN
+        PERFORM ccs_mark(marked);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    -- Trigger por fila de versiones anteriores.
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_code_curve') THEN
+        DROP TRIGGER trg_aca_code_curve ON analisis_codigos_abiertos;
+    END IF;
+    DROP FUNCTION IF EXISTS ccs_mark(TEXT);
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_code_curve_insert') THEN
+        CREATE TRIGGER trg_aca_code_curve_insert
+            AFTER INSERT ON analisis_codigos_abiertos
+            REFERENCING NEW TABLE AS cas_new
+            FOR EACH STATEMENT EXECUTE FUNCTION cas_sync();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_code_curve_delete') THEN
+        CREATE TRIGGER trg_aca_code_curve_delete
+            AFTER DELETE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS cas_old
+            FOR EACH STATEMENT EXECUTE FUNCTION cas_sync();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_aca_code_curve_update') THEN
+        CREATE TRIGGER trg_aca_code_curve_update
+            AFTER UPDATE ON analisis_codigos_abiertos
+            REFERENCING OLD TABLE AS cas_old NEW TABLE AS cas_new
+            FOR EACH STATEMENT EXECUTE FUNCTION cas_sync();
+    END IF;
+END $$;
+"""
+
+_CODE_CURVE_FILL_SQL = """
+INSERT INTO code_archivo_stats (project_id, archivo, codigo, refs, first_at)
+SELECT project_id, archivo, codigo, COUNT(*), MIN(created_at)
+  FROM analisis_codigos_abiertos
+ {where}
+ GROUP BY project_id, archivo, codigo;
+INSERT INTO code_curve_state (project_id, dirty)
+SELECT DISTINCT project_id, TRUE FROM analisis_codigos_abiertos {where}
+ON CONFLICT (project_id) DO UPDATE SET dirty = TRUE
+"""
+
+# Materialización por diferencias: calcula la curva desde code_archivo_stats y
+# sólo escribe las filas de code_first_seen e interview_code_novelty que
+# cambiaron (un código nuevo al final de la última entrevista toca una fila).
+_CODE_CURVE_MATERIALIZE_SQL = """
+DELETE FROM code_first_seen f
+ WHERE f.project_id = %(project)s
+   AND NOT EXISTS (
+        SELECT 1 FROM code_archivo_stats s
+         WHERE s.project_id = f.project_id AND s.codigo = f.codigo
+   );
+INSERT INTO code_first_seen AS f (project_id, codigo, archivo, first_at)
+SELECT c.project_id, c.codigo, c.archivo, c.first_at
+  FROM (
+        SELECT DISTINCT ON (codigo) project_id, codigo, archivo, first_at
+          FROM code_archivo_stats
+         WHERE project_id = %(project)s
+         ORDER BY codigo, first_at, archivo
+  ) c
+  LEFT JOIN code_first_seen cur
+    ON cur.project_id = c.project_id AND cur.codigo = c.codigo
+ WHERE cur.codigo IS NULL OR cur.archivo <> c.archivo OR cur.first_at <> c.first_at
+ ORDER BY c.codigo
+ON CONFLICT (project_id, codigo) DO UPDATE
+   SET archivo = EXCLUDED.archivo, first_at = EXCLUDED.first_at;
+DELETE FROM interview_code_novelty
+ WHERE project_id = %(project)s
+   AND interview_idx > (
+        SELECT COUNT(DISTINCT archivo) FROM code_archivo_stats WHERE project_id = %(project)s
+   );
+INSERT INTO interview_code_novelty AS n (
+    project_id, interview_idx, archivo, first_seen, codigos_totales, nuevos_codigos, codigos_acumulados
+)
+WITH interview_order AS (
+    SELECT archivo,
+           MIN(first_at) AS first_seen,
+           ROW_NUMBER() OVER (ORDER BY MIN(first_at), archivo) AS interview_idx
+      FROM code_archivo_stats
+     WHERE project_id = %(project)s
+     GROUP BY archivo
+),
+per_interview AS (
+    SELECT io.interview_idx,
+           io.archivo,
+           io.first_seen,
+           COUNT(*) AS codigos_totales,
+           COUNT(*) FILTER (WHERE cfs.archivo = io.archivo) AS nuevos_codigos
+      FROM interview_order io
+      JOIN code_archivo_stats s
+        ON s.project_id = %(project)s AND s.archivo = io.archivo
+      LEFT JOIN code_first_seen cfs
+        ON cfs.project_id = %(project)s AND cfs.codigo = s.codigo
+     GROUP BY io.interview_idx, io.archivo, io.first_seen
+),
+fresh AS (
+    SELECT interview_idx, archivo, first_seen, codigos_totales, nuevos_codigos,
+           SUM(nuevos_codigos) OVER (ORDER BY interview_idx) AS codigos_acumulados
+      FROM per_interview
+)
+SELECT %(project)s, f.interview_idx, f.archivo, f.first_seen, f.codigos_totales, f.nuevos_codigos,
+       f.codigos_acumulados
+  FROM fresh f
+  LEFT JOIN interview_code_novelty cur
+    ON cur.project_id = %(project)s AND cur.interview_idx = f.interview_idx
+ WHERE cur.interview_idx IS NULL
+    OR (cur.archivo, cur.first_seen, cur.codigos_totales, cur.nuevos_codigos, cur.codigos_acumulados)
+       IS DISTINCT FROM
+       (f.archivo, f.first_seen, f.codigos_totales::INT, f.nuevos_codigos::INT, f.codigos_acumulados::INT)
+ ORDER BY f.interview_idx
+ON CONFLICT (project_id, interview_idx) DO UPDATE
+   SET archivo = EXCLUDED.archivo,
+       first_seen = EXCLUDED.first_seen,
+       codigos_totales = EXCLUDED.codigos_totales,
+       nuevos_codigos = EXCLUDED.nuevos_codigos,
+       codigos_acumulados = EXCLUDED.codigos_acumulados;
+UPDATE code_curve_state SET dirty = FALSE, refreshed_at = NOW() WHERE project_id = %(project)s
+"""
+
+
+def ensure_code_curve(pg: PGConnection) -> None:
+    """Crea las tablas de la curva de saturación y el trigger de mantenimiento.
+
+    La primera vez (tabla vacía) las puebla desde analisis_codigos_abiertos.
+    """
+    global _code_curve_ready
+    if _code_curve_ready:
+        return
+    with _code_curve_lock:
+        if _code_curve_ready:
+            return
+        ensure_open_coding_table(pg)
+        with pg.cursor() as cur:
+            cur.execute(_CODE_CURVE_DDL)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM code_archivo_stats)")
+            row = cur.fetchone()
+            if not (row and row[0]):
+                cur.execute(_CODE_CURVE_FILL_SQL.format(where=""))
+        pg.commit()
+        _code_curve_ready = True
+
+
+def refresh_code_curve(pg: PGConnection, project_id: str) -> bool:
+    """Materializa la curva del proyecto si está marcada; retorna True si recalculó.
+
+    La fila de code_curve_state se reclama con `FOR UPDATE SKIP LOCKED`: un
+    refresco concurrente no espera ni repite el trabajo, y un trigger que
+    marca el proyecto durante el refresco espera al commit y lo deja marcado
+    de nuevo. Lo llaman el worker y los reportes; las lecturas de la API no.
+    """
+    ensure_code_curve(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM code_curve_state WHERE project_id = %s AND dirty FOR UPDATE SKIP LOCKED",
+            (project_id,),
+        )
+        if cur.fetchone() is None:
+            pg.commit()
+            return False
+        cur.execute(_CODE_CURVE_MATERIALIZE_SQL, {"project": project_id})
+    pg.commit()
+    return True
+
+
+def has_dirty_code_curve(pg: PGConnection, project_id: str) -> bool:
+    """True si la curva materializada del proyecto está pendiente de recalcular."""
+    ensure_code_curve(pg)
+    with pg.cursor() as cur:
+        cur.execute("SELECT dirty FROM code_curve_state WHERE project_id = %s", (project_id,))
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def rebuild_code_curve(pg: PGConnection, project_id: str) -> Dict[str, int]:
+    """Reconstruye code_archivo_stats y la curva materializada de un proyecto."""
+    ensure_code_curve(pg)
+    with pg.cursor() as cur:
+        cur.execute("DELETE FROM code_archivo_stats WHERE project_id = %s", (project_id,))
+        cur.execute(_CODE_CURVE_FILL_SQL.format(where="WHERE project_id = %(project)s"), {"project": project_id})
+        cur.execute(
+            "INSERT INTO code_curve_state (project_id, dirty) VALUES (%s, TRUE) "
+            "ON CONFLICT (project_id) DO UPDATE SET dirty = TRUE",
+            (project_id,),
+        )
+    pg.commit()
+    refresh_code_curve(pg, project_id)
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*), COALESCE(MAX(codigos_acumulados), 0) FROM interview_code_novelty WHERE project_id = %s",
+            (project_id,),
+        )
+        row = cur.fetchone()
+    return {"entrevistas": int(row[0] or 0), "codigos": int(row[1] or 0)}
+
+
+def cumulative_code_curve(pg: PGConnection, project: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Curva de saturación: códigos nuevos y acumulados por entrevista.
+
+    Sólo lee interview_code_novelty: si la curva está marcada, quien llama
+    agenda `refresh_code_curve` (ver `has_dirty_code_curve`).
+    """
+    project_id = project or "default"
+    ensure_code_curve(pg)
+    sql = """
+    SELECT interview_idx, archivo, codigos_totales, nuevos_codigos, codigos_acumulados
+      FROM interview_code_novelty
+     WHERE project_id = %s
+     ORDER BY interview_idx
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project_id,))
+        rows = cur.fetchall()
+
+    keys = [
+        "interview_idx",
+        "archivo",
+        "codigos_totales",
+        "nuevos_codigos",
+        "codigos_acumulados",
+    ]
+    curve = [dict(zip(keys, row)) for row in rows]
+    total_codigos = curve[-1]["codigos_acumulados"] if curve else 0
+    for item in curve:
+        total = item.get("codigos_totales") or 0
+        nuevos = item.get("nuevos_codigos") or 0
+        acumulados = item.get("codigos_acumulados") or 0
+        item["porcentaje_nuevos"] = (nuevos / total) if total else 0.0
+        item["porcentaje_cobertura"] = (acumulados / total_codigos) if total_codigos else 0.0
+    return curve
+
+
+def evaluate_curve_plateau(
+    curve: List[Dict[str, Any]],
+    *,
+    window: int = 3,
+    threshold: int = 0,
+) -> Dict[str, Any]:
+    if not curve:
+        return {"window": window, "threshold": threshold, "plateau": False, "nuevos_codigos": []}
+    window = max(window, 1)
+    tail = curve[-window:]
+    nuevos = [item.get("nuevos_codigos", 0) for item in tail]
+    plateau = all(value <= threshold for value in nuevos) if len(tail) == window else False
+    return {
+        "window": window,
+        "threshold": threshold,
+        "plateau": plateau,
+        "nuevos_codigos": nuevos,
+    }
+
+
+def fetch_recent_fragments(
+    pg: PGConnection,
+    *,
+    project: Optional[str] = None,
+    archivo: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    sql = """
+        SELECT id, archivo, embedding, metadata, updated_at
+          FROM entrevista_fragmentos
+         WHERE project_id = %s
+           AND (%s IS NULL OR archivo = %s)
+           AND (speaker IS NULL OR speaker <> 'interviewer')
+         ORDER BY updated_at DESC
+         LIMIT %s
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", archivo, archivo, limit))
+        rows = cur.fetchall()
+    keys = ["fragmento_id", "archivo", "embedding", "metadata", "updated_at"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def fetch_fragments_by_ids(
+    pg: PGConnection,
+    fragment_ids: Sequence[str],
+    *,
+    project: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Carga varios fragmentos (con embedding) en una sola consulta `ANY()`.
+
+    Respeta el orden de `fragment_ids`; los IDs inexistentes se omiten.
+    """
+    ids = [str(fid) for fid in fragment_ids if fid]
+    if not ids:
+        return []
+    sql = """
+        SELECT id, archivo, embedding, metadata, updated_at
+          FROM entrevista_fragmentos
+         WHERE project_id = %s
+           AND id = ANY(%s)
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", ids))
+        rows = cur.fetchall()
+    keys = ["fragmento_id", "archivo", "embedding", "metadata", "updated_at"]
+    by_id = {str(row[0]): dict(zip(keys, row)) for row in rows}
+    return [by_id[fid] for fid in dict.fromkeys(ids) if fid in by_id]
+
+
+def fetch_fragment_excerpts(
+    pg: PGConnection,
+    fragment_ids: Sequence[str],
+    *,
+    project: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Texto y ubicación de varios fragmentos en una sola consulta `ANY()`.
+
+    Devuelve un dict por ID (id, archivo, par_idx, speaker, fragmento); los
+    IDs inexistentes se omiten.
+    """
+    ids = list(dict.fromkeys(str(fid) for fid in fragment_ids if fid))
+    if not ids:
+        return {}
+    sql = """
+        SELECT id, archivo, par_idx, speaker, fragmento
+          FROM entrevista_fragmentos
+         WHERE project_id = %s
+           AND id = ANY(%s)
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", ids))
+        rows = cur.fetchall()
+    keys = ["id", "archivo", "par_idx", "speaker", "fragmento"]
+    return {str(row[0]): dict(zip(keys, row)) for row in rows}
+
+
+def fetch_project_fragment_embeddings(
+    pg: PGConnection,
+    *,
+    project: Optional[str] = None,
+    include_embedding: bool = True,
+) -> List[Dict[str, Any]]:
+    """Lista todos los fragmentos no-entrevistador de un proyecto con su embedding.
+
+    Pensado para análisis de proyecto completo (p.ej. outliers semánticos en
+    memoria); no incluye el texto del fragmento para acotar la transferencia.
+    Con `include_embedding=False` devuelve sólo los metadatos (mismas filas).
+    """
+    embedding_col = "embedding" if include_embedding else "NULL"
+    sql = f"""
+        SELECT id, archivo, {embedding_col}, metadata, updated_at, speaker
+          FROM entrevista_fragmentos
+         WHERE project_id = %s
+           AND (speaker IS NULL OR speaker <> 'interviewer')
+           AND embedding IS NOT NULL
+         ORDER BY archivo, par_idx
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default",))
+        rows = cur.fetchall()
+    keys = ["fragmento_id", "archivo", "embedding", "metadata", "updated_at", "speaker"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# =============================================================================
+# Grafo k-NN materializado de fragmentos
+# =============================================================================
+
+
+def ensure_fragment_neighbors_table(pg: PGConnection) -> None:
+    """Tabla con los top-K vecinos (coseno) de cada fragmento del proyecto."""
+    global _fragment_neighbors_table_ready
+    if _fragment_neighbors_table_ready:
+        return
+
+    with _fragment_neighbors_table_lock:
+        if _fragment_neighbors_table_ready:
+            return
+
+        sql = """
+        CREATE TABLE IF NOT EXISTS fragment_neighbors (
+          project_id TEXT NOT NULL,
+          fragmento_id TEXT NOT NULL,
+          neighbor_id TEXT NOT NULL,
+          rank INT NOT NULL,
+          score REAL NOT NULL,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          PRIMARY KEY (project_id, fragmento_id, neighbor_id)
+        );
+        CREATE INDEX IF NOT EXISTS ix_fn_project_fragment_rank ON fragment_neighbors(project_id, fragmento_id, rank);
+        CREATE INDEX IF NOT EXISTS ix_fn_project_neighbor ON fragment_neighbors(project_id, neighbor_id);
+        """
+        with pg.cursor() as cur:
+            cur.execute(sql)
+        pg.commit()
+        _fragment_neighbors_table_ready = True
+
+
+def has_fragment_neighbors(pg: PGConnection, project: Optional[str] = None) -> bool:
+    """True si el proyecto ya tiene el grafo k-NN materializado."""
+    ensure_fragment_neighbors_table(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT EXISTS (SELECT 1 FROM fragment_neighbors WHERE project_id = %s)",
+            (project or "default",),
+        )
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def replace_fragment_neighbors(
+    pg: PGConnection,
+    project: Optional[str],
+    neighbors: Dict[str, Sequence[Tuple[str, float]]],
+    *,
+    full_rebuild: bool = False,
+) -> int:
+    """Reemplaza las listas de vecinos de los fragmentos indicados.
+
+    `neighbors` mapea fragmento_id -> [(neighbor_id, score), ...] ya ordenado.
+    Con `full_rebuild=True` borra antes todo el grafo del proyecto (elimina
+    también entradas de fragmentos que ya no existen).
+    """
+    ensure_fragment_neighbors_table(pg)
+    project_id = project or "default"
+    rows = [
+        (project_id, fid, nid, rank, float(score))
+        for fid, items in neighbors.items()
+        for rank, (nid, score) in enumerate(items, 1)
+    ]
+    try:
+        with pg.cursor() as cur:
+            if full_rebuild:
+                cur.execute("DELETE FROM fragment_neighbors WHERE project_id = %s", (project_id,))
+            elif neighbors:
+                cur.execute(
+                    "DELETE FROM fragment_neighbors WHERE project_id = %s AND fragmento_id = ANY(%s)",
+                    (project_id, list(neighbors.keys())),
+                )
+            if rows:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO fragment_neighbors (project_id, fragmento_id, neighbor_id, rank, score)
+                    VALUES %s
+                    """,
+                    rows,
+                    page_size=1000,
+                )
+        pg.commit()
+    except Exception:
+        pg.rollback()
+        raise
+    return len(rows)
+
+
+def fetch_neighbor_floor(pg: PGConnection, project: Optional[str] = None) -> Dict[str, Tuple[int, float]]:
+    """fragmento_id -> (vecinos almacenados, score mínimo) para updates incrementales."""
+    ensure_fragment_neighbors_table(pg)
+    sql = """
+        SELECT fragmento_id, COUNT(*)::INT, MIN(score)
+          FROM fragment_neighbors
+         WHERE project_id = %s
+         GROUP BY fragmento_id
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default",))
+        return {str(row[0]): (int(row[1]), float(row[2])) for row in cur.fetchall()}
+
+
+def fetch_neighbor_referrers(
+    pg: PGConnection,
+    project: Optional[str],
+    neighbor_ids: Sequence[str],
+) -> Set[str]:
+    """Fragmentos cuya lista materializada incluye alguno de `neighbor_ids`."""
+    ensure_fragment_neighbors_table(pg)
+    ids = [str(nid) for nid in neighbor_ids if nid]
+    if not ids:
+        return set()
+    sql = """
+        SELECT DISTINCT fragmento_id
+          FROM fragment_neighbors
+         WHERE project_id = %s
+           AND neighbor_id = ANY(%s)
+    """
+    with pg.cursor() as cur:
+        cur.execute(sql, (project or "default", ids))
+        return {str(row[0]) for row in cur.fetchall()}
+
+
+def fetch_exact_fragment_neighbors(
+    pg: PGConnection,
+    project: Optional[str],
+    fragment_ids: Sequence[str],
+    *,
+    limit: int,
+    speaker: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Vecinos exactos (coseno, pgvector) de varios fragmentos calculados en PG.
+
+    Misma semántica que `exact_neighbors()` sobre el pool no-entrevistador,
+    pero sin transferir embeddings: pensado para los pocos fragmentos que el
+    grafo materializado no cubre.
+    """
+    ids = [str(fid) for fid in fragment_ids if fid]
+    if not ids or limit <= 0:
+        return {}
     sql = """
-    SELECT COUNT(DISTINCT aca.fragmento_id)
-      FROM analisis_axial aa
-      CROSS JOIN LATERAL unnest(COALESCE(aa.evidencia, ARRAY[]::text[])) AS evid(fragmento_id)
-      JOIN analisis_codigos_abiertos aca
-        ON aca.fragmento_id = evid.fragmento_id
-       AND aca.codigo = aa.codigo
-     WHERE aa.categoria = %s
-       AND aa.project_id = %s
-       AND aa.estado = 'validado'
-       AND aca.project_id = aa.project_id
+        SELECT q.id, n.id, 1 - (n.embedding <=> q.embedding), n.archivo
+          FROM entrevista_fragmentos q
+          CROSS JOIN LATERAL (
+                SELECT c.id, c.archivo, c.embedding
+                  FROM entrevista_fragmentos c
+                 WHERE c.project_id = q.project_id
+                   AND c.id <> q.id
+                   AND c.embedding IS NOT NULL
+                   AND (c.speaker IS NULL OR c.speaker <> 'interviewer')
+                   AND (%s::TEXT IS NULL OR c.speaker = %s)
+                 ORDER BY c.embedding <=> q.embedding, c.id
+                 LIMIT %s
+          ) n
+         WHERE q.project_id = %s
+           AND q.id = ANY(%s)
+           AND q.embedding IS NOT NULL
+         ORDER BY q.id, 3 DESC, n.id
     """
     with pg.cursor() as cur:
-        cur.execute(sql, (categoria, project or "default"))
-        row = cur.fetchone()
-    return row[0] if row and row[0] is not None else 0
+        cur.execute(sql, (speaker, speaker, int(limit), project or "default", ids))
+        rows = cur.fetchall()
+    result: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for fid, nid, score, archivo in rows:
+        result[str(fid)].append({"fragmento_id": str(nid), "score": float(score), "archivo": archivo})
+    return dict(result)
 
 
-def cumulative_code_curve(pg: PGConnection, project: Optional[str] = None) -> List[Dict[str, Any]]:
+def fetch_neighbor_lists(
+    pg: PGConnection,
+    project: Optional[str],
+    fragment_ids: Sequence[str],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Listas de vecinos materializadas (por rank) para varios fragmentos en una consulta."""
+    ensure_fragment_neighbors_table(pg)
+    ids = [str(fid) for fid in fragment_ids if fid]
+    if not ids:
+        return {}
     sql = """
-    WITH interview_order AS (
-        SELECT
-            archivo,
-            MIN(created_at) AS first_seen,
-            ROW_NUMBER() OVER (ORDER BY MIN(created_at), archivo) AS interview_idx
-        FROM analisis_codigos_abiertos
-        WHERE project_id = %s
-        GROUP BY archivo
-    ),
-    first_code AS (
-        SELECT DISTINCT ON (codigo)
-            codigo,
-            archivo AS first_archivo
-        FROM analisis_codigos_abiertos
-        WHERE project_id = %s
-        ORDER BY codigo, created_at, archivo
-    ),
-    per_interview AS (
-        SELECT
-            io.interview_idx,
-            io.archivo,
-            COUNT(DISTINCT aca.codigo) AS codigos_totales,
-            COUNT(DISTINCT CASE WHEN fc.first_archivo = io.archivo THEN aca.codigo END) AS nuevos_codigos
-        FROM interview_order io
-        LEFT JOIN analisis_codigos_abiertos aca
-          ON aca.archivo = io.archivo
-         AND aca.project_id = %s
-        LEFT JOIN first_code fc
-          ON fc.codigo = aca.codigo
-        GROUP BY io.interview_idx, io.archivo
-    )
-    SELECT
-        interview_idx,
-        archivo,
-        codigos_totales,
-        nuevos_codigos,
-        SUM(nuevos_codigos) OVER (ORDER BY interview_idx) AS codigos_acumulados
-    FROM per_interview
-    ORDER BY interview_idx
+        SELECT n.fragmento_id, n.neighbor_id, n.score, ef.archivo, ef.speaker
+          FROM fragment_neighbors n
+          JOIN entrevista_fragmentos ef
+            ON ef.project_id = n.project_id AND ef.id = n.neighbor_id
+         WHERE n.project_id = %s
+           AND n.fragmento_id = ANY(%s)
+         ORDER BY n.fragmento_id, n.rank
     """
     with pg.cursor() as cur:
-        cur.execute(sql, (project or "default", project or "default", project or "default"))
+        cur.execute(sql, (project or "default", ids))
         rows = cur.fetchall()
+    result: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for fid, nid, score, archivo, speaker in rows:
+        result[str(fid)].append(
+            {"fragmento_id": str(nid), "score": float(score), "archivo": archivo, "speaker": speaker}
+        )
+    return dict(result)
+
 
+def fetch_fragment_neighbors(
+    pg: PGConnection,
+    project: Optional[str],
+    fragment_id: str,
+    *,
+    limit: int,
+    filters: Optional[Dict[str, Any]] = None,
+    exclude_coded: bool = False,
+) -> List[Dict[str, Any]]:
+    """Vecinos materializados de un fragmento con los mismos filtros que la búsqueda Qdrant.
+
+    Los filtros (archivo, área, actor, protocolo, speaker) y la exclusión de
+    fragmentos codificados se aplican en SQL sobre la lista top-K almacenada.
+    """
+    ensure_fragment_neighbors_table(pg)
+    filters = filters or {}
+    protocolo = filters.get("requiere_protocolo_lluvia")
+    speaker = filters.get("speaker") or None
+    sql = """
+        SELECT n.neighbor_id, n.score, ef.archivo, ef.par_idx, ef.fragmento,
+               ef.area_tematica, ef.actor_principal, ef.requiere_protocolo_lluvia, ef.speaker
+          FROM fragment_neighbors n
+          JOIN entrevista_fragmentos ef
+            ON ef.project_id = n.project_id AND ef.id = n.neighbor_id
+         WHERE n.project_id = %s
+           AND n.fragmento_id = %s
+           AND (%s::TEXT IS NULL OR ef.archivo = %s)
+           AND (%s::TEXT IS NULL OR ef.area_tematica = %s)
+           AND (%s::TEXT IS NULL OR ef.actor_principal = %s)
+           AND (%s::BOOLEAN IS NULL OR ef.requiere_protocolo_lluvia = %s)
+           AND (
+                (%s::TEXT IS NULL AND ef.speaker IS DISTINCT FROM 'interviewer')
+                OR ef.speaker = %s
+           )
+           AND (
+                NOT %s
+                OR NOT EXISTS (
+                    SELECT 1 FROM analisis_codigos_abiertos aca
+                     WHERE aca.project_id = n.project_id AND aca.fragmento_id = n.neighbor_id
+                )
+           )
+         ORDER BY n.rank
+         LIMIT %s
+    """
+    params = (
+        project or "default",
+        str(fragment_id),
+        filters.get("archivo") or None, filters.get("archivo") or None,
+        filters.get("area_tematica") or None, filters.get("area_tematica") or None,
+        filters.get("actor_principal") or None, filters.get("actor_principal") or None,
+        None if protocolo is None else bool(protocolo), None if protocolo is None else bool(protocolo),
+        speaker, speaker,
+        bool(exclude_coded),
+        int(limit),
+    )
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
     keys = [
-        "interview_idx",
+        "fragmento_id",
+        "score",
         "archivo",
-        "codigos_totales",
-        "nuevos_codigos",
-        "codigos_acumulados",
+        "par_idx",
+        "fragmento",
+        "area_tematica",
+        "actor_principal",
+        "requiere_protocolo_lluvia",
+        "speaker",
     ]
-    curve = [dict(zip(keys, row)) for row in rows]
-    total_codigos = curve[-1]["codigos_acumulados"] if curve else 0
-    for item in curve:
-        total = item.get("codigos_totales") or 0
-        nuevos = item.get("nuevos_codigos") or 0
-        acumulados = item.get("codigos_acumulados") or 0
-        item["porcentaje_nuevos"] = (nuevos / total) if total else 0.0
-        item["porcentaje_cobertura"] = (acumulados / total_codigos) if total_codigos else 0.0
-    return curve
+    return [dict(zip(keys, row)) for row in rows]
 
 
-def evaluate_curve_plateau(
-    curve: List[Dict[str, Any]],
+
+# =============================================================================
+# Embeddings de códigos (duplicados semánticos)
+# =============================================================================
+
+_code_embedding_tables_ready = False
+_code_embedding_tables_lock = threading.Lock()
+
+# Catálogo a embeber: códigos activos (con su memo como definición) y
+# candidatos vigentes. Texto embebido: misma plantilla que `code_embedding_text`.
+_CODE_EMBEDDING_CATALOG_CTE = """
+    WITH catalog AS (
+        SELECT btrim(codigo) AS codigo, memo
+          FROM catalogo_codigos
+         WHERE project_id = %(project)s AND status = 'active'
+        UNION ALL
+        SELECT btrim(codigo) AS codigo, NULL::text AS memo
+          FROM codigos_candidatos
+         WHERE project_id = %(project)s AND estado IN ('pendiente', 'validado', 'hipotesis')
+    ),
+    desired AS (
+        SELECT codigo,
+               codigo || COALESCE(': ' || NULLIF(btrim(MAX(memo)), ''), '') AS texto
+          FROM catalog
+         WHERE codigo <> ''
+         GROUP BY codigo
+    )
+"""
+
+
+def ensure_code_embedding_tables(pg: PGConnection) -> None:
+    """Estado de embeddings por código y pares semánticos materializados.
+
+    - `code_embedding_state`: hash del texto embebido por código (diff incremental).
+    - `code_semantic_pairs`: pares (code_a < code_b) con similitud coseno.
+    """
+    global _code_embedding_tables_ready
+    if _code_embedding_tables_ready:
+        return
+
+    with _code_embedding_tables_lock:
+        if _code_embedding_tables_ready:
+            return
+
+        ensure_codes_catalog_table(pg)
+        ensure_candidate_codes_table(pg)
+        sql = """
+        CREATE TABLE IF NOT EXISTS code_embedding_state (
+          project_id TEXT NOT NULL,
+          codigo TEXT NOT NULL,
+          text_hash TEXT NOT NULL,
+          point_id TEXT NOT NULL,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          PRIMARY KEY (project_id, codigo)
+        );
+        CREATE TABLE IF NOT EXISTS code_semantic_pairs (
+          project_id TEXT NOT NULL,
+          code_a TEXT NOT NULL,
+          code_b TEXT NOT NULL,
+          score REAL NOT NULL,
+          updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+          PRIMARY KEY (project_id, code_a, code_b)
+        );
+        CREATE INDEX IF NOT EXISTS ix_csp_project_score ON code_semantic_pairs(project_id, score DESC);
+        CREATE INDEX IF NOT EXISTS ix_csp_project_code_b ON code_semantic_pairs(project_id, code_b);
+        """
+        with pg.cursor() as cur:
+            cur.execute(sql)
+        pg.commit()
+        _code_embedding_tables_ready = True
+
+
+def has_code_embeddings(pg: PGConnection, project_id: str) -> bool:
+    """True si el proyecto ya tiene el catálogo de códigos embebido."""
+    ensure_code_embedding_tables(pg)
+    with pg.cursor() as cur:
+        cur.execute(
+            "SELECT EXISTS (SELECT 1 FROM code_embedding_state WHERE project_id = %s)",
+            (project_id,),
+        )
+        row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def fetch_code_embedding_diff(
+    pg: PGConnection,
+    project_id: str,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Códigos a (re)embeber y códigos a retirar respecto del estado almacenado.
+
+    Returns:
+        (cambiados, retirados): cambiados son dicts {codigo, texto, text_hash}
+        nuevos o con texto distinto; retirados son códigos embebidos que ya no
+        están en el catálogo (fusionados, renombrados, rechazados).
+    """
+    ensure_code_embedding_tables(pg)
+    params = {"project": project_id}
+    changed_sql = _CODE_EMBEDDING_CATALOG_CTE + """
+    SELECT d.codigo, d.texto, md5(d.texto)
+      FROM desired d
+      LEFT JOIN code_embedding_state s
+        ON s.project_id = %(project)s AND s.codigo = d.codigo
+     WHERE s.text_hash IS DISTINCT FROM md5(d.texto)
+     ORDER BY d.codigo
+    """
+    removed_sql = _CODE_EMBEDDING_CATALOG_CTE + """
+    SELECT s.codigo
+      FROM code_embedding_state s
+     WHERE s.project_id = %(project)s
+       AND NOT EXISTS (SELECT 1 FROM desired d WHERE d.codigo = s.codigo)
+     ORDER BY s.codigo
+    """
+    with pg.cursor() as cur:
+        cur.execute(changed_sql, params)
+        changed = [
+            {"codigo": row[0], "texto": row[1], "text_hash": row[2]}
+            for row in cur.fetchall()
+        ]
+        cur.execute(removed_sql, params)
+        removed = [row[0] for row in cur.fetchall()]
+    return changed, removed
+
+
+def apply_code_embedding_sync(
+    pg: PGConnection,
+    project_id: str,
     *,
-    window: int = 3,
-    threshold: int = 0,
-) -> Dict[str, Any]:
-    if not curve:
-        return {"window": window, "threshold": threshold, "plateau": False, "nuevos_codigos": []}
-    window = max(window, 1)
-    tail = curve[-window:]
-    nuevos = [item.get("nuevos_codigos", 0) for item in tail]
-    plateau = all(value <= threshold for value in nuevos) if len(tail) == window else False
-    return {
-        "window": window,
-        "threshold": threshold,
-        "plateau": plateau,
-        "nuevos_codigos": nuevos,
-    }
+    embedded: Sequence[Tuple[str, str, str]],
+    pairs: Sequence[Tuple[str, str, float]],
+    removed: Sequence[str] = (),
+) -> int:
+    """Registra una sincronización de embeddings en una transacción.
 
+    - `embedded`: (codigo, text_hash, point_id) recién embebidos.
+    - `pairs`: (code_a, code_b, score) con code_a < code_b; reemplazan los
+      pares existentes de los códigos embebidos o retirados.
+    - `removed`: códigos retirados del catálogo (estado y pares).
 
-def fetch_recent_fragments(
+    Returns:
+        Pares insertados.
+    """
+    ensure_code_embedding_tables(pg)
+    touched = sorted({row[0] for row in embedded} | set(removed))
+    try:
+        with pg.cursor() as cur:
+            if touched:
+                cur.execute(
+                    """
+                    DELETE FROM code_semantic_pairs
+                     WHERE project_id = %s AND (code_a = ANY(%s) OR code_b = ANY(%s))
+                    """,
+                    (project_id, touched, touched),
+                )
+            if removed:
+                cur.execute(
+                    "DELETE FROM code_embedding_state WHERE project_id = %s AND codigo = ANY(%s)",
+                    (project_id, list(removed)),
+                )
+            if embedded:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO code_embedding_state (project_id, codigo, text_hash, point_id)
+                    VALUES %s
+                    ON CONFLICT (project_id, codigo) DO UPDATE
+                       SET text_hash = EXCLUDED.text_hash,
+                           point_id = EXCLUDED.point_id,
+                           updated_at = NOW()
+                    """,
+                    [(project_id, codigo, text_hash, point_id) for codigo, text_hash, point_id in embedded],
+                    page_size=1000,
+                )
+            if pairs:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO code_semantic_pairs (project_id, code_a, code_b, score)
+                    VALUES %s
+                    ON CONFLICT (project_id, code_a, code_b) DO UPDATE
+                       SET score = EXCLUDED.score, updated_at = NOW()
+                    """,
+                    [(project_id, a, b, float(score)) for a, b, score in pairs],
+                    page_size=1000,
+                )
+        pg.commit()
+    except Exception:
+        pg.rollback()
+        raise
+    return len(pairs)
+
+
+def fetch_code_semantic_pairs(
     pg: PGConnection,
+    project_id: str,
     *,
-    project: Optional[str] = None,
-    archivo: Optional[str] = None,
+    threshold: float,
     limit: int = 50,
 ) -> List[Dict[str, Any]]:
+    """Pares semánticos materializados con similitud >= threshold (mayor primero)."""
+    ensure_code_embedding_tables(pg)
     sql = """
-        SELECT id, archivo, embedding, metadata, updated_at
-          FROM entrevista_fragmentos
-         WHERE project_id = %s
-           AND (%s IS NULL OR archivo = %s)
-           AND (speaker IS NULL OR speaker <> 'interviewer')
-         ORDER BY updated_at DESC
+        SELECT code_a, code_b, score
+          FROM code_semantic_pairs
+         WHERE project_id = %s AND score >= %s
+         ORDER BY score DESC, code_a, code_b
          LIMIT %s
     """
     with pg.cursor() as cur:
-        cur.execute(sql, (project or "default", archivo, archivo, limit))
+        cur.execute(sql, (project_id, float(threshold), int(limit)))
         rows = cur.fetchall()
-    keys = ["fragmento_id", "archivo", "embedding", "metadata", "updated_at"]
-    return [dict(zip(keys, row)) for row in rows]
+    return [{"code1": row[0], "code2": row[1], "score": float(row[2])} for row in rows]
 
 
 def member_checking_packets(
@@ -4867,6 +8330,137 @@ def ensure_candidate_codes_table(pg: PGConnection) -> None:
                 _candidate_codes_table_promote_migrated = True
 
 
+_candidate_codes_trgm_ready: Optional[bool] = None
+_candidate_codes_trgm_lock = threading.Lock()
+
+
+def _trgm_setup_failed(pg: PGConnection, step: str, exc: Exception) -> bool:
+    _logger.warning("pg_trgm.setup_failed", extra={"step": step, "error": str(exc)})
+    try:
+        pg.rollback()
+    except Exception:
+        pass
+    return False
+
+
+def setup_candidate_codes_trgm(pg: PGConnection) -> bool:
+    """Índice trigram sobre la forma normalizada de `codigos_candidatos.codigo`.
+
+    - `code_norm(text)`: lower(trim()) + unaccent si la extensión existe
+      (IMMUTABLE, requisito de columnas generadas; se define una sola vez).
+    - `codigo_norm`: columna generada STORED con `code_norm(codigo)`.
+    - GIN `gin_trgm_ops` sobre `codigo_norm` (operador `%`).
+
+    Añadir la columna reescribe la tabla bajo ACCESS EXCLUSIVE: se ejecuta
+    desde la CLI (`coding trgm-setup`), nunca en una petición.
+
+    Returns:
+        False si algún paso falla (p.ej. pg_trgm o fuzzystrmatch fuera de la
+        allow-list de Azure); cada paso se revierte y la API sigue usando el
+        motor RapidFuzz.
+    """
+    global _candidate_codes_trgm_ready
+    ensure_candidate_codes_table(pg)
+    try:
+        with pg.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            cur.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch;")
+        pg.commit()
+    except Exception as exc:
+        return _trgm_setup_failed(pg, "extensions", exc)
+
+    use_unaccent = ensure_unaccent(pg)
+    norm_body = (
+        "SELECT public.unaccent('public.unaccent'::regdictionary, lower(trim(t)))"
+        if use_unaccent
+        else "SELECT lower(trim(t))"
+    )
+    try:
+        with pg.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_proc WHERE proname = 'code_norm'")
+            if not cur.fetchone():
+                cur.execute(
+                    "CREATE FUNCTION code_norm(t TEXT) RETURNS TEXT "
+                    f"LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ {norm_body} $$"
+                )
+        pg.commit()
+    except Exception as exc:
+        return _trgm_setup_failed(pg, "code_norm", exc)
+
+    try:
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                ALTER TABLE codigos_candidatos
+                    ADD COLUMN IF NOT EXISTS codigo_norm TEXT GENERATED ALWAYS AS (code_norm(codigo)) STORED;
+                """
+            )
+        pg.commit()
+    except Exception as exc:
+        return _trgm_setup_failed(pg, "codigo_norm", exc)
+
+    try:
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                CREATE INDEX IF NOT EXISTS ix_cc_codigo_norm_trgm
+                    ON codigos_candidatos USING gin (codigo_norm gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS ix_cc_project_codigo_norm
+                    ON codigos_candidatos(project_id, codigo_norm);
+                """
+            )
+        pg.commit()
+    except Exception as exc:
+        return _trgm_setup_failed(pg, "indexes", exc)
+
+    with _candidate_codes_trgm_lock:
+        _candidate_codes_trgm_ready = True
+    return True
+
+
+def ensure_candidate_codes_trgm(pg: PGConnection) -> bool:
+    """True si el índice trigram de candidatos ya está creado.
+
+    No ejecuta DDL (ver `setup_candidate_codes_trgm`): sólo consulta el
+    catálogo. El resultado positivo se cachea; el negativo se vuelve a
+    comprobar, de modo que la API lo detecta cuando se ejecuta la CLI.
+
+    Returns:
+        False si falta la columna, el índice o fuzzystrmatch; el llamador
+        debe usar el motor RapidFuzz.
+    """
+    global _candidate_codes_trgm_ready
+    if _candidate_codes_trgm_ready:
+        return True
+    try:
+        with pg.cursor() as cur:
+            cur.execute(
+                """
+                SELECT to_regclass('ix_cc_codigo_norm_trgm') IS NOT NULL
+                   AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'fuzzystrmatch')
+                   AND EXISTS (
+                        SELECT 1 FROM pg_attribute
+                         WHERE attrelid = to_regclass('codigos_candidatos')
+                           AND attname = 'codigo_norm' AND NOT attisdropped
+                   )
+                """
+            )
+            row = cur.fetchone()
+        pg.commit()
+    except Exception as exc:
+        _logger.warning("pg_trgm.check_failed", extra={"error": str(exc)})
+        try:
+            pg.rollback()
+        except Exception:
+            pass
+        return False
+    ready = bool(row and row[0])
+    if ready:
+        with _candidate_codes_trgm_lock:
+            _candidate_codes_trgm_ready = True
+    return ready
+
+
 # =============================================================================
 # LINK PREDICTIONS TABLE (Codificación Axial)
 # =============================================================================
@@ -5890,17 +9484,18 @@ def insert_candidate_codes(
     processed_candidates = candidates
     if check_similar and candidates:
         try:
-            from .code_normalization import suggest_code_merge, get_existing_codes_for_project
+            from .code_normalization import get_code_index, suggest_code_merge
             
             # Obtener proyecto del primer candidato
             project_id = candidates[0].get("project_id", "default")
-            existing_codes = get_existing_codes_for_project(pg, project_id)
+            code_index = get_code_index(pg, project_id)
             
-            if existing_codes:
+            if len(code_index):
                 processed_candidates = suggest_code_merge(
                     candidates,
-                    existing_codes,
+                    code_index.codes,
                     threshold=similarity_threshold,
+                    code_index=code_index,
                 )
         except ImportError:
             # Si code_normalization no está disponible, continuar sin normalización
@@ -11,6 +11,7 @@ Funciones principales:
     - upsert(): Inserta puntos con retry automático y splitting
     - search_similar(): Búsqueda KNN básica
     - discover_search(): Búsqueda con contexto positivo/negativo
+    - set_fragment_coded_state(): Mantiene `coded`/`code_count` en el payload
 
 Campos de payload canónicos (CANONICAL_PAYLOAD_FIELDS):
     - project_id: Identificador del proyecto
@@ -21,6 +22,11 @@ Campos de payload canónicos (CANONICAL_PAYLOAD_FIELDS):
     - area_tematica, actor_principal: Metadatos de clasificación
     - codigos_ancla: Códigos iniciales asignados
 
+Campos de estado de codificación (mantenidos por el write path de códigos,
+no por build_points):
+    - coded: True si el fragmento tiene al menos un código definitivo
+    - code_count: Cantidad de códigos definitivos del fragmento
+
 Características de resiliencia:
     - Retry con exponential backoff (máx 3 intentos)
     - Splitting automático de batches en caso de timeout
@@ -68,6 +74,9 @@ CANONICAL_PAYLOAD_FIELDS = (
 
 _logger = structlog.get_logger()
 
+# Máximo de IDs por llamada a set_payload (backfills de proyecto completo).
+_SET_PAYLOAD_CHUNK = 500
+
 
 def ensure_collection(client: QdrantClient, name: str, dimensions: int, distance: Distance = Distance.COSINE) -> None:
     """Ensure the Qdrant collection exists with the expected vector size."""
@@ -98,6 +107,7 @@ def ensure_payload_indexes(client: QdrantClient, name: str) -> None:
         ("genero", "keyword"),
         ("periodo", "keyword"),
         ("codigos_ancla", "keyword"),
+        ("coded", "bool"),
         ("fragmento", "text"),
     )
     for field_name, schema in index_specs:
@@ -176,6 +186,46 @@ def upsert(
         upsert(client, collection, point_list[midpoint:], logger=log)
 
 
+def set_fragment_coded_state(
+    client: QdrantClient,
+    collection: str,
+    counts: Mapping[str, int],
+    logger: Optional[structlog.BoundLogger] = None,
+) -> int:
+    """
+    Actualiza `coded` / `code_count` en el payload de los fragmentos indicados.
+
+    Agrupa los puntos por cantidad de códigos para emitir un `set_payload`
+    por valor distinto en vez de uno por fragmento.
+
+    Args:
+        client: Cliente Qdrant
+        collection: Nombre de la colección
+        counts: fragmento_id -> cantidad de códigos definitivos
+
+    Returns:
+        Número de puntos actualizados
+    """
+    log = logger or _logger
+    by_count: dict = {}
+    for fragment_id, count in counts.items():
+        by_count.setdefault(int(count or 0), []).append(str(fragment_id))
+
+    updated = 0
+    for count, point_ids in by_count.items():
+        for start in range(0, len(point_ids), _SET_PAYLOAD_CHUNK):
+            chunk = point_ids[start:start + _SET_PAYLOAD_CHUNK]
+            client.set_payload(
+                collection_name=collection,
+                payload={"coded": count > 0, "code_count": count},
+                points=chunk,
+                wait=False,
+            )
+            updated += len(chunk)
+    log.info("qdrant.coded_state.updated", points=updated, groups=len(by_count))
+    return updated
+
+
 def search_similar(
     client: QdrantClient,
     collection: str,
@@ -324,12 +374,17 @@ def search_similar_grouped(
     area_tematica: str = None,
     periodo: str = None,
     archivo_filter: str = None,
+    exclude_groups: Optional[Sequence[str]] = None,
+    with_payload: Any = True,
     **kwargs: Any,
 ) -> List[Any]:
     """
     Búsqueda KNN con agrupación y filtros avanzados.
     
     Soporta filtrado demográfico para Comparación Constante entre grupos.
+    Usa `query_points_groups` (agrupación nativa en Qdrant). La paginación
+    por grupos se logra excluyendo en el filtro los grupos ya entregados
+    (`exclude_groups`), sin re-ejecutar las páginas anteriores.
     
     Args:
         client: Cliente Qdrant
@@ -346,7 +401,9 @@ def search_similar_grouped(
         area_tematica: Filtrar por área temática
         periodo: Filtrar por periodo temporal
         archivo_filter: Filtrar por archivo específico
-        **kwargs: Parámetros adicionales
+        exclude_groups: Valores de `group_by` ya entregados (páginas previas)
+        with_payload: True o lista de campos del payload a retornar
+        **kwargs: Parámetros adicionales (p.ej. `with_lookup`)
     
     Returns:
         Lista de grupos con resultados
@@ -358,7 +415,7 @@ def search_similar_grouped(
         ...     genero="mujer", actor_principal="dirigente"
         ... )
     """
-    from qdrant_client.models import Filter, FieldCondition, MatchValue
+    from qdrant_client.models import Filter, FieldCondition, MatchAny, MatchValue
     
     # Sanitize parameters
     safe_limit = min(max(1, limit), 50)
@@ -415,6 +472,10 @@ def search_similar_grouped(
         must_not_conditions.append(
             FieldCondition(key="speaker", match=MatchValue(value="interviewer"))
         )
+    if exclude_groups:
+        must_not_conditions.append(
+            FieldCondition(key=group_by, match=MatchAny(any=[str(g) for g in exclude_groups]))
+        )
     
     query_filter = Filter(
         must=must_conditions if must_conditions else None,
@@ -430,16 +491,17 @@ def search_similar_grouped(
         score_threshold=safe_threshold,
     )
     
-    # Use Qdrant's search_groups API
+    # Agrupación nativa de Qdrant (Query API)
     try:
-        result = client.search_groups(
+        result = client.query_points_groups(
             collection_name=collection,
-            query_vector=list(vector),
+            query=list(vector),
             group_by=group_by,
             limit=safe_limit,
             group_size=safe_group_size,
             score_threshold=safe_threshold,
             query_filter=query_filter,
+            with_payload=with_payload,
             **kwargs,
         )
         return result.groups
@@ -450,6 +512,7 @@ def search_similar_grouped(
             msg="Falling back to regular search",
         )
         # Fallback to regular search
+        kwargs.pop("with_lookup", None)
         return search_similar(
             client, collection, vector, 
             limit=safe_limit * safe_group_size,
@@ -7,9 +7,11 @@ Este módulo implementa el sistema de búsqueda híbrida que combina:
 
 Funciones principales:
     - semantic_search(): Búsqueda híbrida principal
+    - multi_search(): Varias búsquedas vectoriales en un solo lote
     - graph_counts(): Conteo de fragmentos por entrevista (Neo4j)
     - sample_postgres(): Muestreo de fragmentos recientes
     - run_cypher(): Ejecutar consultas Cypher arbitrarias
+    - grouped_search(): Búsqueda agrupada por entrevista con cursor de grupos
 
 Parámetros de búsqueda:
     - top_k: Número de resultados a retornar
@@ -74,48 +76,27 @@ def semantic_search(
     start = time.perf_counter()
     project_id = project or "default"
     
-    # Embedding creation with logging
-    embed_start = time.perf_counter()
-    vector = clients.aoai.embeddings.create(model=settings.azure.deployment_embed, input=query).data[0].embedding
-    _logger.info(
-        "embedding.create",
-        model=settings.azure.deployment_embed,
-        input_chars=len(query),
-        elapsed_ms=round((time.perf_counter() - embed_start) * 1000, 2),
-    )
-    q_filter = _build_project_filter(project_id, speaker)
     qdrant_limit = max(top_k * 3, 10)
-    response = clients.qdrant.query_points(
-        collection_name=settings.qdrant.collection,
-        query=vector,
-        limit=qdrant_limit,
-        with_payload=True,
-        query_filter=q_filter,
-    )
-    if speaker and not response.points:
-        q_filter = _build_project_filter(project_id, None)
-        response = clients.qdrant.query_points(
-            collection_name=settings.qdrant.collection,
-            query=vector,
-            limit=qdrant_limit,
-            with_payload=True,
-            query_filter=q_filter,
-        )
+    hits = multi_search(
+        clients,
+        settings,
+        [{"query": query, "filters": {"speaker": speaker}, "top_k": qdrant_limit}],
+        project=project_id,
+    )[0]
 
     combined: Dict[str, Dict[str, Any]] = {}
-    for point in response.points:
-        payload = point.payload or {}
-        fragment_id = str(point.id)
+    for hit in hits:
+        fragment_id = hit["fragmento_id"]
         combined[fragment_id] = {
             "fragmento_id": fragment_id,
-            "score": point.score,
-            "semantic_score": point.score,
+            "score": hit["score"],
+            "semantic_score": hit["score"],
             "bm25_score": 0.0,
-            "archivo": payload.get("archivo"),
-            "par_idx": payload.get("par_idx"),
-            "char_len": payload.get("char_len"),
-            "fragmento": payload.get("fragmento"),
-            "speaker": payload.get("speaker"),
+            "archivo": hit.get("archivo"),
+            "par_idx": hit.get("par_idx"),
+            "char_len": hit.get("char_len"),
+            "fragmento": hit.get("fragmento"),
+            "speaker": hit.get("speaker"),
         }
 
     if use_hybrid:
@@ -172,6 +153,146 @@ def _build_project_filter(project_id: str, speaker: Optional[str]) -> Filter:
     return Filter(must=cast(List[Any], must), must_not=cast(List[Any], must_not) or None)
 
 
+# Filtros de payload (match exacto) soportados por multi_search.
+_MULTI_SEARCH_FILTER_KEYS = ("archivo", "area_tematica", "actor_principal", "genero", "periodo")
+# Requests por llamada a query_batch_points.
+_MULTI_SEARCH_BATCH_SIZE = 64
+
+
+def _normalize_search_spec(spec: Any) -> Dict[str, Any]:
+    if isinstance(spec, dict):
+        query = spec.get("query")
+        filters = spec.get("filters")
+        top_k = spec.get("top_k", 10)
+        score_threshold = spec.get("score_threshold")
+    else:
+        query, filters, top_k = spec
+        score_threshold = None
+    return {
+        "query": str(query or "").strip(),
+        "filters": dict(filters or {}),
+        "top_k": max(1, int(top_k or 1)),
+        "score_threshold": score_threshold,
+    }
+
+
+def _build_search_filter(project_id: str, filters: Dict[str, Any], speaker: Optional[str]) -> Filter:
+    base = _build_project_filter(project_id, speaker)
+    must: List[Any] = list(base.must or [])
+    must_not: List[Any] = list(base.must_not or [])
+    for key in _MULTI_SEARCH_FILTER_KEYS:
+        if filters.get(key):
+            must.append(FieldCondition(key=key, match=MatchValue(value=filters[key])))
+    if filters.get("requiere_protocolo_lluvia") is not None:
+        must.append(
+            FieldCondition(
+                key="requiere_protocolo_lluvia",
+                match=MatchValue(value=bool(filters["requiere_protocolo_lluvia"])),
+            )
+        )
+    return Filter(must=must, must_not=must_not or None)
+
+
+def _run_query_batch(
+    clients: ServiceClients,
+    settings: AppSettings,
+    requests: Sequence[Any],
+) -> List[Any]:
+    responses: List[Any] = []
+    for start in range(0, len(requests), _MULTI_SEARCH_BATCH_SIZE):
+        responses.extend(
+            clients.qdrant.query_batch_points(
+                collection_name=settings.qdrant.collection,
+                requests=list(requests[start:start + _MULTI_SEARCH_BATCH_SIZE]),
+            )
+        )
+    return responses
+
+
+def multi_search(
+    clients: ServiceClients,
+    settings: AppSettings,
+    specs: Sequence[Any],
+    *,
+    project: Optional[str] = None,
+    default_speaker: Optional[str] = "interviewee",
+    speaker_fallback: bool = True,
+    with_payload: Any = True,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Ejecuta varias búsquedas vectoriales independientes de una vez.
+
+    Cada spec es un dict `{"query", "filters", "top_k", "score_threshold"}` o
+    una tupla `(query, filters, top_k)`. Los textos distintos se embeben en
+    una sola llamada (`embed_batch`) y las búsquedas se envían juntas con
+    `query_batch_points`.
+
+    `filters` admite `speaker` (None = todos menos el entrevistador; si se
+    omite se usa `default_speaker`), `archivo`, `area_tematica`,
+    `actor_principal`, `genero`, `periodo` y `requiere_protocolo_lluvia`.
+    Con `speaker_fallback`, las búsquedas con speaker sin resultados se
+    repiten sin ese filtro en un segundo lote.
+
+    Returns:
+        Lista alineada con `specs`; cada elemento es la lista de hits
+        (payload + `fragmento_id` y `score`).
+    """
+    from qdrant_client.models import QueryRequest
+
+    from .embeddings import embed_batch
+
+    start = time.perf_counter()
+    project_id = project or "default"
+    normalized = [_normalize_search_spec(spec) for spec in specs]
+    texts = list(dict.fromkeys(spec["query"] for spec in normalized if spec["query"]))
+    vectors: Dict[str, List[float]] = {}
+    if texts:
+        embeddings = embed_batch(clients.aoai, settings.azure.deployment_embed, texts)
+        vectors = {text: vector for text, vector in zip(texts, embeddings) if vector}
+
+    def build_request(spec: Dict[str, Any], speaker: Optional[str]) -> Any:
+        return QueryRequest(
+            query=list(vectors[spec["query"]]),
+            filter=_build_search_filter(project_id, spec["filters"], speaker),
+            limit=spec["top_k"],
+            score_threshold=spec["score_threshold"],
+            with_payload=with_payload,
+        )
+
+    def speaker_of(spec: Dict[str, Any]) -> Optional[str]:
+        return spec["filters"].get("speaker", default_speaker)
+
+    pending = [idx for idx, spec in enumerate(normalized) if spec["query"] in vectors]
+    results: List[List[Any]] = [[] for _ in normalized]
+    responses = _run_query_batch(
+        clients, settings, [build_request(normalized[idx], speaker_of(normalized[idx])) for idx in pending]
+    )
+    for idx, response in zip(pending, responses):
+        results[idx] = list(response.points)
+
+    retry = [idx for idx in pending if speaker_fallback and speaker_of(normalized[idx]) and not results[idx]]
+    if retry:
+        responses = _run_query_batch(clients, settings, [build_request(normalized[idx], None) for idx in retry])
+        for idx, response in zip(retry, responses):
+            results[idx] = list(response.points)
+
+    _logger.info(
+        "search.multi.complete",
+        project=project_id,
+        specs=len(normalized),
+        distinct_queries=len(texts),
+        speaker_retries=len(retry),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 2),
+    )
+    return [
+        [
+            {**(point.payload or {}), "fragmento_id": str(point.id), "score": point.score}
+            for point in points
+        ]
+        for points in results
+    ]
+
+
 def _bm25_search(pg_conn, query: str, project_id: str, speaker: Optional[str], limit: int) -> List[Dict[str, Any]]:
     sql = """
         SELECT id,
@@ -793,3 +914,151 @@ def discover_search(
     )
     
     return results
+
+
+# =============================================================================
+# Búsqueda agrupada paginada (Qdrant query_points_groups + hidratación PG)
+# =============================================================================
+
+_GROUPED_PAYLOAD_FIELDS = ["fragmento", "archivo", "speaker", "actor_principal"]
+_GROUPED_MAX_SEEN = 500
+
+
+def _encode_group_cursor(seen: Sequence[str]) -> str:
+    import base64
+    import json
+
+    raw = json.dumps({"seen": list(seen)}, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_group_cursor(cursor: Optional[str]) -> List[str]:
+    import base64
+    import json
+
+    if not cursor:
+        return []
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+    seen = data.get("seen") if isinstance(data, dict) else None
+    if not isinstance(seen, list):
+        raise ValueError("cursor inválido")
+    return [str(item) for item in seen]
+
+
+def grouped_search(
+    clients: ServiceClients,
+    settings: AppSettings,
+    query: str,
+    *,
+    project: Optional[str] = None,
+    group_by: str = "archivo",
+    limit: int = 10,
+    group_size: int = 2,
+    score_threshold: float = 0.3,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Búsqueda semántica agrupada con paginación por cursor sobre grupos.
+
+    - Agrupa en Qdrant (`query_points_groups`) pidiendo sólo los campos del
+      payload que se muestran.
+    - El cursor lista los grupos ya entregados; la página siguiente los
+      excluye en el filtro, sin re-ejecutar las páginas anteriores.
+    - Con `group_by="archivo"` hidrata el contexto de cada entrevista con una
+      sola consulta a PostgreSQL.
+
+    Returns:
+        Dict con results (group_key, hits, context), next_cursor y total_groups.
+    """
+    from .embeddings import embed_batch
+    from .postgres_block import fetch_interviews_context
+    from .qdrant_block import search_similar_grouped
+
+    project_id = project or "default"
+    filters = filters or {}
+    seen = _decode_group_cursor(cursor)
+    start = time.perf_counter()
+
+    embeddings = embed_batch(clients.aoai, settings.azure.deployment_embed, [query])
+    if not embeddings or not embeddings[0]:
+        raise ValueError("Error generando embedding")
+
+    groups = search_similar_grouped(
+        clients.qdrant,
+        settings.qdrant.collection,
+        embeddings[0],
+        limit=limit,
+        group_by=group_by,
+        group_size=group_size,
+        score_threshold=score_threshold,
+        project_id=project_id,
+        exclude_interviewer=True,
+        genero=filters.get("genero") or None,
+        actor_principal=filters.get("actor_principal") or None,
+        area_tematica=filters.get("area_tematica") or None,
+        periodo=filters.get("periodo") or None,
+        archivo_filter=filters.get("archivo") or None,
+        exclude_groups=seen,
+        with_payload=_GROUPED_PAYLOAD_FIELDS,
+    )
+
+    results: List[Dict[str, Any]] = []
+    index: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        if hasattr(group, "hits"):
+            key = str(group.id)
+            hits = list(group.hits or [])
+        else:
+            # Fallback de search_similar_grouped: puntos sin agrupar.
+            key = str((group.payload or {}).get(group_by))
+            hits = [group]
+        if key in seen:
+            continue
+        entry = index.get(key)
+        if entry is None:
+            entry = {"group_key": key, "hits": [], "context": None}
+            index[key] = entry
+            results.append(entry)
+        for hit in hits:
+            if len(entry["hits"]) >= group_size:
+                break
+            payload = hit.payload or {}
+            entry["hits"].append(
+                {
+                    "id": hit.id,
+                    "score": hit.score,
+                    "fragmento": (payload.get("fragmento") or "")[:200],
+                    "archivo": payload.get("archivo"),
+                    "speaker": payload.get("speaker"),
+                    "actor_principal": payload.get("actor_principal"),
+                }
+            )
+    results = results[:limit]
+
+    if group_by == "archivo" and results:
+        context = fetch_interviews_context(clients.postgres, project_id, [r["group_key"] for r in results])
+        for entry in results:
+            entry["context"] = context.get(entry["group_key"])
+
+    page_keys = [r["group_key"] for r in results]
+    next_cursor = None
+    if len(results) >= limit and len(seen) + len(page_keys) <= _GROUPED_MAX_SEEN:
+        next_cursor = _encode_group_cursor(seen + page_keys)
+
+    _logger.info(
+        "queries.grouped_search",
+        project=project_id,
+        group_by=group_by,
+        groups=len(results),
+        seen=len(seen),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 2),
+    )
+    return {
+        "results": results,
+        "total_groups": len(results),
+        "next_cursor": next_cursor,
+    }
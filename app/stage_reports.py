@@ -29,6 +29,7 @@ from app.postgres_block import (
     coding_stats,
     cumulative_code_curve,
     list_interviews_summary,
+    refresh_code_curve,
 )
 from app.settings import AppSettings
 from app.clients import ServiceClients
@@ -283,6 +284,7 @@ def _get_codes_list(pg, project: str, limit: int = 20) -> str:
 def _get_saturation_data(pg, project: str) -> str:
     """Obtiene datos de curva de saturación."""
     try:
+        refresh_code_curve(pg, project)
         curve = cumulative_code_curve(pg, project)
         if not curve or len(curve) < 2:
             return "(Datos insuficientes para análisis de saturación)"
@@ -0,0 +1,377 @@
+"""
+Registro de tareas en background (runner de codificación, agente).
+
+El estado de las tareas largas vivía en dicts a nivel de módulo dentro de
+cada router, por lo que sólo el worker de uvicorn que creaba la tarea podía
+responder su `/status`. Este módulo ofrece un registro compartido con
+backends intercambiables:
+
+    - memory: dict en proceso (tests y desarrollo con un solo worker)
+    - postgres: tabla `runner_tasks` (JSONB, merge atómico por sentencia)
+    - redis: un hash por tarea (HSET/HINCRBY atómicos) + lista de errores
+
+Backend por variable de entorno `TASK_REGISTRY_BACKEND` (default: postgres).
+`RUNNER_EXECUTOR=celery` envía la ejecución de los runners a los workers
+Celery (ver backend/celery_worker.py) en lugar de BackgroundTasks.
+
+`TaskState` es la vista que usan los runners: un dict que publica sus
+asignaciones en el registro, de modo que el código existente
+(`task["message"] = ...`, `task.setdefault("errors", []).append(...)`)
+publica su progreso sin cambios. Las asignaciones se acumulan y se escriben
+en un solo `update()` al cambiar `status`, al pasar `flush_interval`
+segundos desde la última escritura o al llamar `flush()` (checkpoints y
+final del runner); `increment()` y los errores se escriben al momento.
+
+Example:
+    >>> registry = get_task_registry()
+    >>> registry.create("t1", {"status": "pending"}, kind="agent", project_id="p1")
+    >>> task = registry.state("t1")
+    >>> task["status"] = "running"
+    >>> task.increment("memos_count")
+    1
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from .settings import AppSettings
+
+_logger = structlog.get_logger()
+
+DEFAULT_BACKEND = "postgres"
+_REDIS_PREFIX = "runner_task"
+# Máximo de segundos que una asignación de `TaskState` espera en el buffer.
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Campos cuya asignación publica el buffer de inmediato (transiciones de estado).
+_FLUSH_FIELDS = frozenset({"status"})
+
+
+class TaskRegistry(ABC):
+    """Interfaz común de los backends."""
+
+    @abstractmethod
+    def create(self, task_id: str, data: Dict[str, Any], *, kind: str, project_id: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, task_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def increment(self, task_id: str, field: str, amount: int = 1) -> int:
+        ...
+
+    @abstractmethod
+    def append_error(self, task_id: str, message: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    def state(self, task_id: str) -> Optional["TaskState"]:
+        data = self.get(task_id)
+        if data is None:
+            return None
+        return TaskState(self, task_id, data)
+
+
+class InMemoryTaskRegistry(TaskRegistry):
+    def __init__(self) -> None:
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._kinds: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str, data: Dict[str, Any], *, kind: str, project_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._tasks[task_id] = json.loads(json.dumps(data, default=str))
+            self._kinds[task_id] = kind
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._tasks.get(task_id)
+            return json.loads(json.dumps(data)) if data is not None else None
+
+    def update(self, task_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            if task_id in self._tasks:
+                self._tasks[task_id].update(json.loads(json.dumps(fields, default=str)))
+
+    def increment(self, task_id: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            data = self._tasks.get(task_id)
+            if data is None:
+                return 0
+            data[field] = int(data.get(field) or 0) + int(amount)
+            return data[field]
+
+    def append_error(self, task_id: str, message: str) -> None:
+        with self._lock:
+            if task_id in self._tasks:
+                self._tasks[task_id].setdefault("errors", []).append(str(message))
+
+    def list(self, kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            ids = [tid for tid in self._tasks if kind is None or self._kinds.get(tid) == kind]
+        return {tid: self.get(tid) or {} for tid in ids}
+
+
+class PostgresTaskRegistry(TaskRegistry):
+    """Backend sobre la tabla `runner_tasks` (una conexión del pool por operación)."""
+
+    def __init__(self, settings: AppSettings) -> None:
+        self._settings = settings
+
+    def _run(self, fn: Any, *args: Any, **kwargs: Any) -> Any:
+        from .clients import get_pg_connection, return_pg_connection
+
+        conn = get_pg_connection(self._settings)
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            return_pg_connection(conn)
+
+    def create(self, task_id: str, data: Dict[str, Any], *, kind: str, project_id: Optional[str] = None) -> None:
+        from .postgres_block import create_runner_task
+
+        self._run(create_runner_task, task_id=task_id, kind=kind, project_id=project_id, data=data)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        from .postgres_block import get_runner_task
+
+        return self._run(get_runner_task, task_id)
+
+    def update(self, task_id: str, fields: Dict[str, Any]) -> None:
+        from .postgres_block import merge_runner_task
+
+        self._run(merge_runner_task, task_id, json.loads(json.dumps(fields, default=str)))
+
+    def increment(self, task_id: str, field: str, amount: int = 1) -> int:
+        from .postgres_block import increment_runner_task_field
+
+        return self._run(increment_runner_task_field, task_id, field, amount)
+
+    def append_error(self, task_id: str, message: str) -> None:
+        from .postgres_block import append_runner_task_error
+
+        self._run(append_runner_task_error, task_id, str(message))
+
+    def list(self, kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        from .postgres_block import list_runner_tasks
+
+        return self._run(list_runner_tasks, kind=kind)
+
+
+class RedisTaskRegistry(TaskRegistry):
+    """Backend Redis: hash `runner_task:<id>` con valores JSON por campo."""
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, task_id: str) -> str:
+        return f"{_REDIS_PREFIX}:{task_id}"
+
+    def _errors_key(self, task_id: str) -> str:
+        return f"{_REDIS_PREFIX}:{task_id}:errors"
+
+    def _kind_key(self, kind: str) -> str:
+        return f"{_REDIS_PREFIX}s:{kind}"
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+        return {key: json.dumps(value, default=str) for key, value in fields.items() if key != "errors"}
+
+    def create(self, task_id: str, data: Dict[str, Any], *, kind: str, project_id: Optional[str] = None) -> None:
+        pipe = self._redis.pipeline()
+        pipe.delete(self._key(task_id), self._errors_key(task_id))
+        pipe.hset(self._key(task_id), mapping=self._encode(data) or {"status": json.dumps("pending")})
+        for message in data.get("errors") or []:
+            pipe.rpush(self._errors_key(task_id), str(message))
+        pipe.sadd(self._kind_key(kind), task_id)
+        pipe.execute()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raw = self._redis.hgetall(self._key(task_id))
+        if not raw:
+            return None
+        data = {key: json.loads(value) for key, value in raw.items()}
+        data["errors"] = list(self._redis.lrange(self._errors_key(task_id), 0, -1))
+        return data
+
+    def update(self, task_id: str, fields: Dict[str, Any]) -> None:
+        encoded = self._encode(fields)
+        pipe = self._redis.pipeline()
+        if encoded:
+            pipe.hset(self._key(task_id), mapping=encoded)
+        if "errors" in fields:
+            pipe.delete(self._errors_key(task_id))
+            for message in fields.get("errors") or []:
+                pipe.rpush(self._errors_key(task_id), str(message))
+        pipe.execute()
+
+    def increment(self, task_id: str, field: str, amount: int = 1) -> int:
+        return int(self._redis.hincrby(self._key(task_id), field, int(amount)))
+
+    def append_error(self, task_id: str, message: str) -> None:
+        self._redis.rpush(self._errors_key(task_id), str(message))
+
+    def list(self, kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        if kind:
+            ids = sorted(self._redis.smembers(self._kind_key(kind)))
+        else:
+            ids = sorted(
+                key.split(":", 1)[1]
+                for key in self._redis.scan_iter(f"{_REDIS_PREFIX}:*")
+                if not key.endswith(":errors")
+            )
+        result: Dict[str, Dict[str, Any]] = {}
+        for task_id in ids:
+            data = self.get(task_id)
+            if data is not None:
+                result[task_id] = data
+        return result
+
+
+class _ErrorLog(list):
+    """Lista de errores de una `TaskState`: cada append se publica en el registro."""
+
+    def __init__(self, state: "TaskState", items: List[Any]) -> None:
+        super().__init__(items)
+        self._state = state
+
+    def append(self, message: Any) -> None:
+        super().append(message)
+        self._state._registry.append_error(self._state.task_id, str(message))
+
+    def extend(self, messages: Any) -> None:
+        for message in messages:
+            self.append(message)
+
+
+class TaskState(dict):
+    """Estado local de una tarea que publica sus asignaciones en el registro.
+
+    Las asignaciones se acumulan y se escriben juntas (ver docstring del
+    módulo); `flush()` publica lo pendiente.
+    """
+
+    def __init__(
+        self,
+        registry: TaskRegistry,
+        task_id: str,
+        data: Dict[str, Any],
+        *,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        super().__init__(data)
+        self._registry = registry
+        self.task_id = task_id
+        self._flush_interval = flush_interval
+        self._pending: Dict[str, Any] = {}
+        self._last_flush = time.monotonic()
+        dict.__setitem__(self, "errors", _ErrorLog(self, list(data.get("errors") or [])))
+
+    def _stage(self, key: str, value: Any) -> Any:
+        if key == "errors":
+            value = _ErrorLog(self, list(value or []))
+        super().__setitem__(key, value)
+        self._pending[key] = list(value) if key == "errors" else value
+        return value
+
+    def _maybe_flush(self, keys: Any) -> None:
+        if _FLUSH_FIELDS.intersection(keys) or time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Escribe en el registro las asignaciones pendientes (un solo `update`)."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        fields, self._pending = self._pending, {}
+        if "errors" in fields:
+            # Incluye los errores añadidos después de la asignación en buffer.
+            fields["errors"] = list(dict.__getitem__(self, "errors"))
+        self._registry.update(self.task_id, fields)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._stage(key, value)
+        self._maybe_flush((key,))
+
+    def update(self, *args: Any, **kwargs: Any) -> None:  # type: ignore[override]
+        fields = dict(*args, **kwargs)
+        for key, value in fields.items():
+            self._stage(key, value)
+        self._maybe_flush(fields)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def increment(self, field: str, amount: int = 1) -> int:
+        """Incremento atómico en el registro; actualiza la copia local.
+
+        Si el campo tiene una asignación en buffer (p.ej. los contadores que
+        restaura un resume) se publica antes, para incrementar sobre ella.
+        """
+        if field in self._pending:
+            self.flush()
+        value = self._registry.increment(self.task_id, field, amount)
+        super().__setitem__(field, value)
+        return value
+
+
+_registry: Optional[TaskRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def _build_registry(settings: Optional[AppSettings]) -> TaskRegistry:
+    backend = os.getenv("TASK_REGISTRY_BACKEND", DEFAULT_BACKEND).strip().lower()
+    if backend == "memory":
+        return InMemoryTaskRegistry()
+    if backend == "redis":
+        url = os.getenv("TASK_REGISTRY_REDIS_URL") or os.getenv("CELERY_BROKER_URL", "redis://localhost:16379/0")
+        return RedisTaskRegistry(url)
+    if backend == "postgres":
+        if settings is None:
+            from .settings import load_settings
+
+            settings = load_settings(os.getenv("APP_ENV_FILE"))
+        return PostgresTaskRegistry(settings)
+    raise ValueError(f"TASK_REGISTRY_BACKEND no soportado: {backend}")
+
+
+def get_task_registry(settings: Optional[AppSettings] = None) -> TaskRegistry:
+    """Registro compartido del proceso (backend según `TASK_REGISTRY_BACKEND`)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = _build_registry(settings)
+                _logger.info("task_registry.ready", backend=type(_registry).__name__)
+    return _registry
+
+
+def set_task_registry(registry: Optional[TaskRegistry]) -> None:
+    """Reemplaza el registro del proceso (tests)."""
+    global _registry
+    _registry = registry
+
+
+def runner_executor() -> str:
+    """`inline` (BackgroundTasks del worker API) o `celery`."""
+    return os.getenv("RUNNER_EXECUTOR", "inline").strip().lower()
@@ -46,7 +46,7 @@ from .postgres_block import (
     fetch_cross_tab,
     refresh_transversal_views,
 )
-from .nucleus import probe_semantics
+from .nucleus import probe_semantics_batch
 
 _logger = structlog.get_logger()
 
@@ -95,19 +95,21 @@ def qdrant_segment_probe(
     results: List[Dict[str, Any]] = []
     interview_sets: List[set[str]] = []
 
-    for segment in segments:
-        name = segment.get("name") or segment.get("label") or "segment"
-        filters = segment.get("filters") or {}
-        start = time.perf_counter()
-        points = probe_semantics(
-            clients,
-            settings,
-            prompt=prompt,
-            top_k=top_k,
-            filters=filters,
-            project=project_id,
-        )
-        duration = time.perf_counter() - start
+    names = [segment.get("name") or segment.get("label") or "segment" for segment in segments]
+    segment_filters = [segment.get("filters") or {} for segment in segments]
+    start = time.perf_counter()
+    batch = probe_semantics_batch(
+        clients,
+        settings,
+        [prompt] * len(segments),
+        top_k=top_k,
+        filters=segment_filters,
+        project=project_id,
+    )
+    # Un solo lote para todos los segmentos: la latencia es la del lote.
+    duration = time.perf_counter() - start
+
+    for name, filters, points in zip(names, segment_filters, batch):
         entrevistas = sorted({p.get("archivo") for p in points if p.get("archivo")})
         interview_sets.append(set(entrevistas))
         results.append(
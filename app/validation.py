@@ -9,6 +9,8 @@ Este módulo implementa técnicas de validación propias de investigación cuali
 
 2. Outliers semánticos:
    - semantic_outliers(): Fragmentos atípicos que no encajan con el corpus
+   - Búsquedas de vecinos en lote (Qdrant) o pasada exacta en memoria
+     para el proyecto completo
    - Útil para identificar temas emergentes o errores de codificación
 
 3. Member checking:
@@ -31,21 +33,33 @@ from __future__ import annotations
 from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 import structlog
-from qdrant_client.models import Filter, FieldCondition, HasIdCondition, MatchValue
+from qdrant_client.models import Filter, FieldCondition, HasIdCondition, MatchValue, QueryRequest
 
 from .clients import ServiceClients
+from .fragment_neighbors import coerce_embedding, exact_neighbors
 from .postgres_block import (
     cumulative_code_curve,
     evaluate_curve_plateau,
+    fetch_exact_fragment_neighbors,
+    fetch_fragments_by_ids,
+    fetch_neighbor_lists,
+    fetch_project_fragment_embeddings,
     fetch_recent_fragments,
+    has_fragment_neighbors,
     member_checking_packets,
+    refresh_code_curve,
 )
 from .settings import AppSettings
 
 _logger = structlog.get_logger()
 
+# Consultas por llamada a `query_batch_points` (outliers por IDs / recientes).
+_QDRANT_BATCH_SIZE = 64
+
 
 def saturation_curve(pg_conn, *, project: Optional[str] = None, window: int = 3, threshold: int = 0) -> Dict[str, Any]:
+    # CLI, reportes y artefactos: materializa antes de leer (la API lo agenda aparte).
+    refresh_code_curve(pg_conn, project or "default")
     curve = cumulative_code_curve(pg_conn, project)
     plateau = evaluate_curve_plateau(curve, window=window, threshold=threshold)
     return {
@@ -65,6 +79,91 @@ def _build_exclusion_filter(fragment_id: str, project_id: str, speaker: Optional
     return Filter(must=must, must_not=must_not)
 
 
+def _neighbors_qdrant_batch(
+    clients: ServiceClients,
+    settings: AppSettings,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    project_id: str,
+    speaker: Optional[str],
+    neighbor_k: int,
+    batch_size: int,
+) -> List[List[Dict[str, Any]]]:
+    """Vecinos por fragmento usando `query_batch_points` en bloques de `batch_size`."""
+    results: List[List[Dict[str, Any]]] = []
+    step = max(1, batch_size)
+    for start in range(0, len(rows), step):
+        chunk = rows[start:start + step]
+        requests = [
+            QueryRequest(
+                query=row["embedding"],
+                filter=_build_exclusion_filter(row["fragmento_id"], project_id, speaker),
+                limit=neighbor_k,
+                with_payload=["archivo"],
+            )
+            for row in chunk
+        ]
+        responses = clients.qdrant.query_batch_points(
+            collection_name=settings.qdrant.collection,
+            requests=requests,
+        )
+        for response in responses:
+            results.append(
+                [
+                    {
+                        "fragmento_id": str(point.id),
+                        "score": point.score,
+                        "archivo": (point.payload or {}).get("archivo"),
+                    }
+                    for point in response.points
+                ]
+            )
+    return results
+
+
+def _neighbors_from_table(
+    clients: ServiceClients,
+    project_id: str,
+    rows: Sequence[Dict[str, Any]],
+    *,
+    speaker: Optional[str],
+    neighbor_k: int,
+) -> List[List[Dict[str, Any]]]:
+    """Vecinos desde el grafo k-NN materializado; pasada exacta para el resto.
+
+    Va a la pasada exacta todo fragmento sin lista almacenada o cuya lista
+    queda con menos de `neighbor_k` vecinos tras el filtro de speaker (p.ej.
+    una lista hecha sólo de turnos del entrevistador), para no reportarlo
+    como outlier por falta de vecinos. Esa pasada se resuelve en PG
+    (pgvector) sólo para esos fragmentos: no se cargan embeddings.
+    """
+    stored = fetch_neighbor_lists(clients.postgres, project_id, [row["fragmento_id"] for row in rows])
+    results: List[Optional[List[Dict[str, Any]]]] = []
+    missing: List[int] = []
+    for idx, row in enumerate(rows):
+        items = [
+            {"fragmento_id": n["fragmento_id"], "score": n["score"], "archivo": n["archivo"]}
+            for n in stored.get(str(row["fragmento_id"])) or []
+            if not speaker or n.get("speaker") == speaker
+        ][:neighbor_k]
+        if len(items) < neighbor_k:
+            missing.append(idx)
+            results.append(None)
+            continue
+        results.append(items)
+    if missing:
+        exact = fetch_exact_fragment_neighbors(
+            clients.postgres,
+            project_id,
+            [rows[idx]["fragmento_id"] for idx in missing],
+            limit=neighbor_k,
+            speaker=speaker,
+        )
+        for idx in missing:
+            results[idx] = exact.get(str(rows[idx]["fragmento_id"]))
+    return [items or [] for items in results]
+
+
 def semantic_outliers(
     clients: ServiceClients,
     settings: AppSettings,
@@ -75,60 +174,83 @@ def semantic_outliers(
     limit: int = 25,
     neighbor_k: int = 2,
     threshold: float = 0.8,
+    full_project: bool = False,
+    batch_size: int = _QDRANT_BATCH_SIZE,
 ) -> Dict[str, Any]:
+    """Detecta fragmentos cuyo vecino más cercano queda bajo `threshold`.
+
+    Modos:
+        - `fragment_ids`: carga los fragmentos con una sola consulta `ANY()`
+          y busca vecinos en Qdrant con `query_batch_points` por bloques.
+        - por defecto: últimos `limit` fragmentos (opcionalmente de `archivo`).
+        - `full_project=True`: evalúa todos los fragmentos del proyecto (o de
+          `archivo`) sin consultas a Qdrant: lee el grafo k-NN materializado
+          (`app.fragment_neighbors`) si existe, sin cargar embeddings, o hace
+          una pasada exacta de similitud coseno en memoria.
+    """
     pg_conn = clients.postgres
     project_id = project or "default"
     speaker_filter = "interviewee"
-    if fragment_ids:
-        rows = []
-        for fid in fragment_ids:
-            sql = "SELECT id, archivo, embedding, metadata, updated_at FROM entrevista_fragmentos WHERE id = %s AND project_id = %s"
-            with pg_conn.cursor() as cur:
-                cur.execute(sql, (fid, project_id))
-                row = cur.fetchone()
-            if row:
-                rows.append({
-                    "fragmento_id": row[0],
-                    "archivo": row[1],
-                    "embedding": row[2],
-                    "metadata": row[3],
-                    "updated_at": row[4],
-                })
+
+    if full_project and has_fragment_neighbors(pg_conn, project_id):
+        # Con grafo materializado basta con los metadatos: los embeddings sólo
+        # intervienen en la pasada exacta de los fragmentos sin lista útil.
+        mode = "knn_table"
+        rows = [
+            row
+            for row in fetch_project_fragment_embeddings(pg_conn, project=project_id, include_embedding=False)
+            if not archivo or row.get("archivo") == archivo
+        ]
+        neighbor_lists = _neighbors_from_table(
+            clients,
+            project_id,
+            rows,
+            speaker=speaker_filter,
+            neighbor_k=neighbor_k,
+        )
+    elif full_project:
+        mode = "exact"
+        pool = []
+        for row in fetch_project_fragment_embeddings(pg_conn, project=project_id):
+            row["embedding"] = coerce_embedding(row.get("embedding"))
+            if row["embedding"]:
+                pool.append(row)
+        rows = [row for row in pool if not archivo or row.get("archivo") == archivo]
+        # Igual que el filtro Qdrant: sólo se comparan contra fragmentos del entrevistado.
+        candidates = [row for row in pool if row.get("speaker") == speaker_filter]
+        neighbor_lists = exact_neighbors(rows, candidates, neighbor_k=neighbor_k)
     else:
-        rows = fetch_recent_fragments(pg_conn, project=project, archivo=archivo, limit=limit)
+        mode = "qdrant_batch"
+        if fragment_ids:
+            raw_rows = fetch_fragments_by_ids(pg_conn, fragment_ids, project=project_id)
+        else:
+            raw_rows = fetch_recent_fragments(pg_conn, project=project, archivo=archivo, limit=limit)
+        rows = []
+        for row in raw_rows:
+            row["embedding"] = coerce_embedding(row.get("embedding"))
+            if row["embedding"] and row.get("fragmento_id") is not None:
+                rows.append(row)
+        neighbor_lists = _neighbors_qdrant_batch(
+            clients,
+            settings,
+            rows,
+            project_id=project_id,
+            speaker=speaker_filter,
+            neighbor_k=neighbor_k,
+            batch_size=batch_size,
+        )
 
     results: List[Dict[str, Any]] = []
     outliers = 0
 
-    for row in rows:
-        embedding = row.get("embedding")
-        fragment_id = row.get("fragmento_id")
-        if not embedding or fragment_id is None:
-            continue
-
-        search_filter = _build_exclusion_filter(fragment_id, project_id, speaker_filter)
-        response = clients.qdrant.query_points(
-            collection_name=settings.qdrant.collection,
-            query=embedding,
-            limit=neighbor_k,
-            with_payload=True,
-            query_filter=search_filter,
-        )
-        neighbors = [
-            {
-                "fragmento_id": str(point.id),
-                "score": point.score,
-                "archivo": (point.payload or {}).get("archivo"),
-            }
-            for point in response.points
-        ]
+    for row, neighbors in zip(rows, neighbor_lists):
         best_score = neighbors[0]["score"] if neighbors else 0.0
         is_outlier = best_score < threshold
         if is_outlier:
             outliers += 1
         results.append(
             {
-                "fragmento_id": fragment_id,
+                "fragmento_id": row.get("fragmento_id"),
                 "archivo": row.get("archivo"),
                 "metadata": row.get("metadata"),
                 "updated_at": row.get("updated_at"),
@@ -139,10 +261,18 @@ def semantic_outliers(
             }
         )
 
+    _logger.info(
+        "validation.semantic_outliers",
+        project_id=project_id,
+        mode=mode,
+        fragmentos=len(results),
+        outliers=outliers,
+    )
     return {
         "total_fragmentos": len(results),
         "outliers": outliers,
         "threshold": threshold,
+        "modo": mode,
         "detalles": results,
     }
 
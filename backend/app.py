@@ -88,7 +88,7 @@ from io import StringIO
 from pathlib import Path
 import tempfile
 from time import perf_counter
-from typing import Any, Dict, List, Optional, Tuple, Union, cast, LiteralString
+from typing import Any, Dict, List, Optional, Tuple, Union, cast, Literal, LiteralString
 
 import structlog
 from rapidfuzz.distance import Levenshtein
@@ -108,7 +108,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt
 from datetime import datetime, timedelta
 from backend.auth import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, User, get_current_user, require_role
-from backend.celery_worker import task_analyze_interview, celery_app
+from backend.celery_worker import task_analyze_interview, task_sync_code_embeddings, celery_app
 from backend.routers.ingest import IngestRequest
 from celery.result import AsyncResult
 
@@ -139,6 +139,7 @@ from app.coding import (
     list_interview_fragments,
     list_open_codes,
     suggest_similar_fragments,
+    sync_fragment_coded_state,
     unassign_open_code,
     CodingError,
 )
@@ -178,6 +179,10 @@ from app.postgres_block import (
     get_backlog_health,
     get_dashboard_counts,
     add_project_member,
+    has_stale_sampling_features,
+    refresh_interview_sampling_features,
+    has_dirty_code_curve,
+    refresh_code_curve,
 )
 
 from qdrant_client.models import ContextExamplePair, FieldCondition, Filter, FilterSelector, MatchValue
@@ -2246,6 +2251,7 @@ async def api_dashboard_counts(
 
 @app.get("/api/research/overview")
 async def api_research_overview(
+    background_tasks: BackgroundTasks,
     project: str = Query(..., description="Proyecto requerido"),
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
@@ -2374,6 +2380,7 @@ async def api_research_overview(
 
                 saturation = None
                 try:
+                    _schedule_code_curve_refresh(background_tasks, settings, clients, project_id)
                     saturation = get_saturation_data(clients, project_id, window=window, threshold=threshold)
                 except Exception:
                     saturation = None
@@ -3497,8 +3504,71 @@ async def api_coding_fragment_context(
     return context
 
 
+def _refresh_sampling_features_task(project_id: str, settings: AppSettings) -> None:
+    clients = build_clients_or_error(settings)
+    try:
+        refresh_interview_sampling_features(clients.postgres, project_id)
+    except Exception as exc:
+        api_logger.error("api.sampling_features.refresh_failed", project=project_id, error=str(exc))
+    finally:
+        clients.close()
+
+
+def _schedule_sampling_features_refresh(
+    background_tasks: BackgroundTasks,
+    settings: AppSettings,
+    project_id: str,
+) -> None:
+    """Recálculo en Celery o en este worker (BackgroundTasks), según RUNNER_EXECUTOR."""
+    from app.task_registry import runner_executor
+
+    if runner_executor() == "celery":
+        from backend.celery_worker import task_refresh_sampling_features
+
+        cast(Any, task_refresh_sampling_features).delay(project_id)
+        return
+    background_tasks.add_task(_refresh_sampling_features_task, project_id, settings)
+
+
+def _refresh_code_curve_task(project_id: str, settings: AppSettings) -> None:
+    clients = build_clients_or_error(settings)
+    try:
+        refresh_code_curve(clients.postgres, project_id)
+    except Exception as exc:
+        api_logger.error("api.code_curve.refresh_failed", project=project_id, error=str(exc))
+    finally:
+        clients.close()
+
+
+def _schedule_code_curve_refresh(
+    background_tasks: BackgroundTasks,
+    settings: AppSettings,
+    clients: ServiceClients,
+    project_id: str,
+) -> None:
+    """Si la curva está marcada, la materializa en Celery o en BackgroundTasks.
+
+    La respuesta en curso sirve las filas guardadas.
+    """
+    from app.task_registry import runner_executor
+
+    try:
+        if not has_dirty_code_curve(clients.postgres, project_id):
+            return
+        if runner_executor() == "celery":
+            from backend.celery_worker import task_refresh_code_curve
+
+            cast(Any, task_refresh_code_curve).delay(project_id)
+            return
+        background_tasks.add_task(_refresh_code_curve_task, project_id, settings)
+    except Exception as exc:
+        clients.postgres.rollback()
+        api_logger.warning("api.code_curve.schedule_failed", project=project_id, error=str(exc))
+
+
 @app.get("/api/interviews")
 async def api_interviews(
+    background_tasks: BackgroundTasks,
     limit: int = 25,
     order: str = Query(
         default="ingest-desc",
@@ -3525,6 +3595,7 @@ async def api_interviews(
         description="Solo aplica a order=theoretical-sampling. Umbral de suma de codigos_nuevos en recent_window.",
     ),
     project: str = Query(..., description="Proyecto requerido"),
+    settings: AppSettings = Depends(get_settings),
     clients: ServiceClients = Depends(get_service_clients),
     user: User = Depends(require_auth),
 ) -> Dict[str, Any]:
@@ -3532,6 +3603,14 @@ async def api_interviews(
         project_id = resolve_project(project, allow_create=False, pg=clients.postgres)
         normalized_order = (order or "").strip().lower()
         if normalized_order == "theoretical-sampling":
+            # La lectura sirve las features almacenadas; las marcadas se
+            # recalculan fuera de la petición.
+            try:
+                if has_stale_sampling_features(clients.postgres, project_id):
+                    _schedule_sampling_features_refresh(background_tasks, settings, project_id)
+            except Exception as exc:
+                clients.postgres.rollback()
+                api_logger.warning("api.sampling_features.schedule_failed", project=project_id, error=str(exc))
             interviews, ranking_debug = list_available_interviews_with_ranking_debug(
                 clients,
                 project_id,
@@ -3728,6 +3807,7 @@ async def api_download_note(
 @app.post("/api/codes/candidates")
 async def api_create_candidate(
     payload: CandidateCodeRequest,
+    background_tasks: BackgroundTasks,
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
 ) -> Dict[str, Any]:
@@ -3756,6 +3836,8 @@ async def api_create_candidate(
         )
     finally:
         clients.close()
+    if count:
+        _schedule_code_embedding_sync(background_tasks, settings, project_id)
     
     return {"success": count > 0, "inserted": count}
 
@@ -3901,6 +3983,13 @@ async def api_validate_candidate(
             if success
             else 0
         )
+        if success and isinstance(promoted_count, dict):
+            sync_fragment_coded_state(
+                clients,
+                settings,
+                [row.get("fragment_id") for row in promoted_count.get("neo4j_sync_rows", [])],
+                project=project_id,
+            )
     finally:
         clients.close()
     
@@ -3956,6 +4045,7 @@ async def api_reject_candidate(
 @app.post("/api/codes/candidates/merge")
 async def api_merge_candidates(
     payload: MergeCandidatesRequest,
+    background_tasks: BackgroundTasks,
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
 ) -> Dict[str, Any]:
@@ -4016,6 +4106,8 @@ async def api_merge_candidates(
                 merged_by=user.user_id if user else None,
                 memo=payload.memo,
             )
+            if count:
+                _schedule_code_embedding_sync(background_tasks, settings, project_id)
             resp = {
                 "success": count > 0,
                 "dry_run": False,
@@ -4067,6 +4159,7 @@ class AutoMergeRequest(BaseModel):
 @app.post("/api/codes/candidates/auto-merge")
 async def api_auto_merge_candidates(
     payload: AutoMergeRequest,
+    background_tasks: BackgroundTasks,
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
 ) -> Dict[str, Any]:
@@ -4174,6 +4267,8 @@ async def api_auto_merge_candidates(
                     "merged_count": count,
                 })
             total_merged += count
+        if total_merged and not payload.dry_run:
+            _schedule_code_embedding_sync(background_tasks, settings, project_id)
         api_logger.info(
             "api.auto_merge_candidates.completed",
             project=payload.project,
@@ -4437,6 +4532,12 @@ class DetectDuplicatesRequest(BaseModel):
     
     project: str = Field(..., description="Proyecto")
     threshold: float = Field(0.80, ge=0.5, le=1.0, description="Umbral de similitud")
+    engine: Literal["rapidfuzz", "pg_trgm"] = Field(
+        "rapidfuzz",
+        description="rapidfuzz (sin extensiones) o pg_trgm (índice trigram en PostgreSQL)",
+    )
+    include_semantic: bool = Field(False, description="Incluir duplicados semánticos (embeddings de códigos)")
+    semantic_threshold: float = Field(0.85, ge=0.5, le=1.0, description="Similitud coseno mínima (semánticos)")
 
 
 def ensure_fuzzystrmatch(pg_conn) -> bool:
@@ -4522,6 +4623,33 @@ def _token_overlap_ok(a: str, b: str, min_jaccard: float = 0.5) -> bool:
     return True
 
 
+def _sync_code_embeddings_task(project_id: str, settings: AppSettings) -> None:
+    from app.code_embeddings import refresh_code_embeddings_after_change
+
+    clients = build_clients_or_error(settings)
+    try:
+        refresh_code_embeddings_after_change(clients, settings, project_id, logger=api_logger)
+    finally:
+        clients.close()
+
+
+def _schedule_code_embedding_sync(
+    background_tasks: BackgroundTasks,
+    settings: AppSettings,
+    project_id: str,
+) -> None:
+    """Re-sincronización de embeddings de códigos en Celery o en BackgroundTasks (best-effort)."""
+    from app.task_registry import runner_executor
+
+    try:
+        if runner_executor() == "celery":
+            cast(Any, task_sync_code_embeddings).delay(project_id)
+            return
+        background_tasks.add_task(_sync_code_embeddings_task, project_id, settings)
+    except Exception as exc:
+        api_logger.warning("codes.embeddings.schedule_failed", project=project_id, error=str(exc))
+
+
 def find_similar_codes_python_fallback(
     pg_conn,
     project_id: str,
@@ -4530,7 +4658,12 @@ def find_similar_codes_python_fallback(
 ) -> List[Dict[str, Any]]:
     """
     Encuentra códigos similares usando RapidFuzz (Levenshtein).
+
+    Los pares similares son los `limit` mejores del proyecto (no los primeros
+    encontrados): ver `find_similar_code_pairs`.
     """
+    from app.code_normalization import find_similar_code_pairs
+
     # Get unique codes from database
     sql = """
     SELECT DISTINCT codigo
@@ -4572,40 +4705,20 @@ def find_similar_codes_python_fallback(
         if len(duplicates) >= limit:
             break
     
-    # Calculate Levenshtein similarity for unique codes
-    unique_codes = list(set(_normalize_text(c) for c in codes))
-    
-    for i, c1 in enumerate(unique_codes):
-        for c2 in unique_codes[i+1:]:
-            max_len = max(len(c1), len(c2))
-            if max_len == 0:
-                continue
-            # Pre-filter by length difference
-            if abs(len(c1) - len(c2)) > int((1 - threshold) * max_len):
-                continue
-            
-            distance = _levenshtein_distance(c1, c2)
-            similarity = 1 - (distance / max_len)
-            
-            if similarity >= threshold and distance > 0:
-                if not _token_overlap_ok(c1, c2):
-                    continue
-                duplicates.append({
-                    "code1": rep_by_norm.get(c1, c1),
-                    "code2": rep_by_norm.get(c2, c2),
-                    "distance": distance,
-                    "similarity": round(similarity, 3),
-                    "is_exact_duplicate": False,
-                })
-                
-                if len(duplicates) >= limit:
-                    break
-        
-        if len(duplicates) >= limit:
-            break
+    # Pares similares (distancia > 0): top-k global con bloqueo por bigramas
+    remaining = limit - len(duplicates)
+    if remaining > 0:
+        pairs, stats = find_similar_code_pairs(normalized_codes, threshold=threshold, limit=remaining)
+        api_logger.debug("api.detect_duplicates.pairs", project=project_id, **stats)
+        for c1, c2, distance, similarity in pairs:
+            duplicates.append({
+                "code1": rep_by_norm.get(c1, c1),
+                "code2": rep_by_norm.get(c2, c2),
+                "distance": distance,
+                "similarity": round(similarity, 3),
+                "is_exact_duplicate": False,
+            })
     
-    # Sort by similarity
-    duplicates.sort(key=lambda x: x["similarity"], reverse=True)
     return duplicates[:limit]
 
 
@@ -4615,36 +4728,41 @@ def find_similar_codes_posthoc(
     threshold: float = 0.80,
     limit: int = 50,
     include_exact: bool = True,
-    use_unaccent: bool = False,
+    trgm_threshold: float = 0.3,
 ) -> List[Dict[str, Any]]:
     """
-    Encuentra pares de códigos candidatos similares usando Levenshtein.
-    
+    Encuentra pares de códigos candidatos similares usando Levenshtein (pg_trgm).
+
+    Los candidatos salen del índice GIN trigram sobre `codigo_norm` (operador
+    `%` con `pg_trgm.similarity_threshold = trgm_threshold`); Levenshtein sólo
+    se evalúa sobre esos vecinos, acotado con `levenshtein_less_equal`.
+    Requiere `setup_candidate_codes_trgm()` (CLI `coding trgm-setup`).
+
     Args:
         include_exact: Si True, incluye duplicados exactos (distancia=0)
+        trgm_threshold: Similitud trigram mínima para generar candidatos
     """
-    max_distance = int((1 - threshold) * 15)
-    normalize_expr = "unaccent(lower(trim(codigo)))" if use_unaccent else "lower(trim(codigo))"
-    
+    estados = ["pendiente", "validado", "hipotesis"]
+
     # Query para duplicados exactos (mismo código, diferentes entradas)
     exact_duplicates = []
     if include_exact:
-        sql_exact = f"""
+        sql_exact = """
         SELECT 
             MIN(codigo) AS codigo,
             COUNT(*) as count,
             array_agg(DISTINCT fuente_origen) as sources,
             array_agg(DISTINCT archivo) FILTER (WHERE archivo IS NOT NULL) as files
         FROM codigos_candidatos
-        WHERE project_id = %s AND estado IN ('pendiente', 'validado', 'hipotesis')
-        GROUP BY {normalize_expr}
+        WHERE project_id = %s AND estado = ANY(%s)
+        GROUP BY codigo_norm
         HAVING COUNT(*) > 1
         ORDER BY count DESC
         LIMIT %s
         """
         
         with pg_conn.cursor() as cur:
-            cur.execute(sql_exact, (project_id, limit))
+            cur.execute(sql_exact, (project_id, estados, limit))
             rows = cur.fetchall()
         
         for row in rows:
@@ -4659,40 +4777,48 @@ def find_similar_codes_posthoc(
                 "files": row[3][:5] if row[3] else [],  # Max 5 archivos
             })
     
-    # Query para similares (distancia > 0)
-    # OPTIMIZACIÓN: Filtro de longitud para reducir O(N²) a O(N*k)
-    # Solo comparamos códigos cuya diferencia de longitud sea <= max_distance
-    # Esto evita comparar "Organización" (12 chars) con "Si" (2 chars)
-        sql_similar = f"""
+    # Query para similares (distancia > 0): vecinos trigram por código.
+    sql_similar = """
     WITH unique_codes AS (
-                SELECT DISTINCT codigo, LENGTH({normalize_expr}) AS len, {normalize_expr} AS norm
-        FROM codigos_candidatos
-        WHERE project_id = %s AND estado IN ('pendiente', 'validado', 'hipotesis')
+        SELECT codigo_norm AS norm, MIN(codigo) AS codigo
+          FROM codigos_candidatos
+         WHERE project_id = %(project)s AND estado = ANY(%(estados)s) AND codigo_norm <> ''
+         GROUP BY codigo_norm
+    ),
+    pairs AS (
+        SELECT c1.codigo AS code1,
+               c2.codigo AS code2,
+               GREATEST(length(c1.norm), length(c2.norm)) AS max_len,
+               levenshtein_less_equal(
+                   c1.norm, c2.norm,
+                   floor((1 - %(threshold)s) * GREATEST(length(c1.norm), length(c2.norm)))::int
+               ) AS distance
+          FROM unique_codes c1
+          JOIN LATERAL (
+                SELECT cc.codigo_norm AS norm, MIN(cc.codigo) AS codigo
+                  FROM codigos_candidatos cc
+                 WHERE cc.codigo_norm %% c1.norm
+                   AND cc.codigo_norm > c1.norm
+                   AND cc.project_id = %(project)s
+                   AND cc.estado = ANY(%(estados)s)
+                 GROUP BY cc.codigo_norm
+          ) c2 ON TRUE
     )
-    SELECT 
-        c1.codigo AS code1,
-        c2.codigo AS code2,
-                levenshtein(c1.norm, c2.norm) AS distance,
-        GREATEST(c1.len, c2.len) AS max_len,
-                1.0 - (levenshtein(c1.norm, c2.norm)::float / 
-               GREATEST(c1.len, c2.len)::float) AS similarity
-    FROM unique_codes c1, unique_codes c2
-        WHERE c1.norm < c2.norm
-      -- OPTIMIZACIÓN: Pre-filtro por longitud (evita Levenshtein innecesario)
-      AND ABS(c1.len - c2.len) <= %s
-      -- Solo calcular Levenshtein si pasa el filtro de longitud
-            AND levenshtein(c1.norm, c2.norm) <= %s
-            AND levenshtein(c1.norm, c2.norm) > 0
-    ORDER BY similarity DESC
-    LIMIT %s
+    SELECT code1, code2, distance, max_len, 1.0 - distance::float / max_len AS similarity
+      FROM pairs
+     WHERE distance > 0
+       AND 1.0 - distance::float / max_len >= %(threshold)s
+     ORDER BY similarity DESC, code1, code2
+     LIMIT %(limit)s
     """
-    
 
     with pg_conn.cursor() as cur:
-        # Parámetros: project_id, max_len_diff, max_distance, limit
-        cur.execute(sql_similar, (project_id, max_distance, max_distance, limit))
+        cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(float(trgm_threshold)),))
+        cur.execute(
+            sql_similar,
+            {"project": project_id, "estados": estados, "threshold": float(threshold), "limit": limit},
+        )
         rows = cur.fetchall()
-
     
     similar_codes = [
         {
@@ -4703,7 +4829,6 @@ def find_similar_codes_posthoc(
             "is_exact_duplicate": False,
         }
         for row in rows
-        if row[4] >= threshold
     ]
     
     # Combinar: exactos primero, luego similares
@@ -4734,20 +4859,61 @@ async def api_detect_duplicates(
         from app.postgres_block import ensure_candidate_codes_table
         ensure_candidate_codes_table(clients.postgres)
         
-        # RapidFuzz no requiere extensiones en PostgreSQL (compatible con Azure)
-        duplicates = find_similar_codes_python_fallback(
-            clients.postgres,
-            project_id,
-            threshold=payload.threshold,
-            limit=50,
-        )
+        method = "rapidfuzz"
+        if payload.engine == "pg_trgm":
+            from app.postgres_block import ensure_candidate_codes_trgm
+
+            if ensure_candidate_codes_trgm(clients.postgres):
+                method = "pg_trgm"
+
+        if method == "pg_trgm":
+            duplicates = find_similar_codes_posthoc(
+                clients.postgres,
+                project_id,
+                threshold=payload.threshold,
+                limit=50,
+            )
+        else:
+            # RapidFuzz no requiere extensiones en PostgreSQL (compatible con Azure)
+            duplicates = find_similar_codes_python_fallback(
+                clients.postgres,
+                project_id,
+                threshold=payload.threshold,
+                limit=50,
+            )
+
+        semantic_count = 0
+        if payload.include_semantic:
+            from app.code_embeddings import semantic_duplicate_pairs
+
+            seen = {frozenset((_normalize_text(d["code1"]), _normalize_text(d["code2"]))) for d in duplicates}
+            for pair in semantic_duplicate_pairs(
+                clients,
+                project_id,
+                threshold=payload.semantic_threshold,
+                limit=50,
+            ):
+                key = frozenset((_normalize_text(pair["code1"]), _normalize_text(pair["code2"])))
+                if key in seen:
+                    continue
+                seen.add(key)
+                semantic_count += 1
+                duplicates.append({
+                    "code1": pair["code1"],
+                    "code2": pair["code2"],
+                    "distance": None,
+                    "similarity": round(pair["score"], 3),
+                    "is_exact_duplicate": False,
+                    "is_semantic": True,
+                })
 
         api_logger.info(
             "api.detect_duplicates.completed",
             project=payload.project,
             threshold=payload.threshold,
             count=len(duplicates),
-            method="rapidfuzz",
+            semantic_count=semantic_count,
+            method=method,
         )
         
         return {
@@ -4756,7 +4922,8 @@ async def api_detect_duplicates(
             "threshold": payload.threshold,
             "duplicates": duplicates,
             "count": len(duplicates),
-            "method": "rapidfuzz",
+            "semantic_count": semantic_count,
+            "method": method,
         }
     except HTTPException:
         raise
@@ -4922,6 +5089,7 @@ class GroupedSearchRequest(BaseModel):
     area_tematica: Optional[str] = Field(None, description="Filtrar por área temática")
     periodo: Optional[str] = Field(None, description="Filtrar por periodo temporal")
     archivo: Optional[str] = Field(None, description="Filtrar por archivo específico")
+    cursor: Optional[str] = Field(None, description="Cursor de la página anterior (next_cursor)")
 
 
 @app.post("/api/qdrant/search-grouped")
@@ -4943,60 +5111,34 @@ async def api_qdrant_search_grouped(
     
     clients = build_clients_or_error(settings)
     try:
-        # Generar embedding del query
-        from app.embeddings import embed_batch
-        embeddings = embed_batch(clients.aoai, settings.azure.deployment_embed, [payload.query])
-        if not embeddings or not embeddings[0]:
-            raise HTTPException(status_code=500, detail="Error generando embedding")
-        
-        query_vector = embeddings[0]
-        
-        # Usar búsqueda agrupada con filtros
-        from app.qdrant_block import search_similar_grouped
-        groups = search_similar_grouped(
-            clients.qdrant,
-            settings.qdrant.collection,
-            query_vector,
-            limit=payload.limit,
+        from app.queries import grouped_search
+
+        page = grouped_search(
+            clients,
+            settings,
+            payload.query,
+            project=project_id,
             group_by=payload.group_by,
+            limit=payload.limit,
             group_size=payload.group_size,
             score_threshold=payload.score_threshold,
-            project_id=project_id,
-            exclude_interviewer=True,
-            # Filtros avanzados
-            genero=payload.genero or "",
-            actor_principal=payload.actor_principal or "",
-            area_tematica=payload.area_tematica or "",
-            periodo=payload.periodo or "",
-            archivo_filter=payload.archivo or "",
+            filters={
+                "genero": payload.genero,
+                "actor_principal": payload.actor_principal,
+                "area_tematica": payload.area_tematica,
+                "periodo": payload.periodo,
+                "archivo": payload.archivo,
+            },
+            cursor=payload.cursor,
         )
-        
-        # Formatear resultados
-        results = []
-        for group in groups:
-            group_key = group.id if hasattr(group, 'id') else str(group)
-            hits = []
-            for hit in (group.hits if hasattr(group, 'hits') else []):
-                hits.append({
-                    "id": hit.id,
-                    "score": hit.score,
-                    "fragmento": hit.payload.get("fragmento", "")[:200],
-                    "archivo": hit.payload.get("archivo"),
-                    "speaker": hit.payload.get("speaker"),
-                    "actor_principal": hit.payload.get("actor_principal"),
-                })
-            results.append({
-                "group_key": group_key,
-                "hits": hits,
-            })
-        
         return {
             "success": True,
             "query": payload.query,
             "group_by": payload.group_by,
-            "results": results,
-            "total_groups": len(results),
+            **page,
         }
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as e:
         api_logger.error("qdrant.search_grouped.error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -5120,6 +5262,12 @@ async def api_promote_candidates(
         
         # 2. Sincronizar Neo4j si está habilitado y hay datos para sync
         neo4j_sync_rows = result.pop("neo4j_sync_rows", [])
+        sync_fragment_coded_state(
+            clients,
+            settings,
+            [row.get("fragment_id") for row in neo4j_sync_rows],
+            project=project_id,
+        )
         
         if settings.sync_neo4j_on_promote and neo4j_sync_rows:
             try:
@@ -5857,6 +6005,7 @@ class MergeDefinitiveCodesBody(BaseModel):
 @app.post("/api/codes/definitive/merge")
 async def api_merge_definitive_codes(
     body: MergeDefinitiveCodesBody,
+    background_tasks: BackgroundTasks,
     project: str = Query(..., description="Proyecto requerido"),
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
@@ -5869,7 +6018,7 @@ async def api_merge_definitive_codes(
 
     clients = build_clients_or_error(settings)
     try:
-        from app.postgres_block import merge_definitive_codes_by_code
+        from app.postgres_block import list_fragment_ids_for_code, merge_definitive_codes_by_code
         from app.neo4j_block import mark_codigo_merged
 
         result = merge_definitive_codes_by_code(
@@ -5881,6 +6030,15 @@ async def api_merge_definitive_codes(
             memo=body.memo,
         )
 
+        # Los fragmentos del source ahora cuelgan del target (dedup incluido).
+        if result.get("moved_rows") or result.get("dedup_deleted"):
+            sync_fragment_coded_state(
+                clients,
+                settings,
+                list_fragment_ids_for_code(clients.postgres, project_id, result.get("target")),
+                project=project_id,
+            )
+
         # Best-effort: also mark merged in Neo4j so GDS projections can filter.
         try:
             mark_codigo_merged(
@@ -5894,6 +6052,7 @@ async def api_merge_definitive_codes(
             )
         except Exception:
             pass
+        _schedule_code_embedding_sync(background_tasks, settings, project_id)
         return {"result": result}
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -6039,7 +6198,13 @@ async def api_similar_codes(
 class CheckBatchCodesRequest(BaseModel):
     project: str = Field(..., description="Project ID")
     codigos: List[str] = Field(..., description="List of code names to check")
+    memos: Optional[List[Optional[str]]] = Field(
+        default=None,
+        description="Optional memo/definition per code (same order as codigos), embedded as 'codigo: memo'",
+    )
     threshold: float = Field(default=0.85, ge=0.5, le=1.0, description="Similarity threshold")
+    include_semantic: bool = Field(default=False, description="Also match by code-name embeddings")
+    semantic_threshold: float = Field(default=0.85, ge=0.5, le=1.0, description="Cosine similarity threshold")
 
 
 class AiPlanMergeRequest(BaseModel):
@@ -6073,8 +6238,7 @@ async def api_check_batch_codes(
     from collections import defaultdict
 
     from app.code_normalization import (
-        find_similar_codes_with_stats,
-        get_existing_codes_for_project,
+        get_code_index,
         normalize_code,
     )
     
@@ -6082,6 +6246,8 @@ async def api_check_batch_codes(
         project_id = resolve_project(payload.project, allow_create=False)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if payload.memos is not None and len(payload.memos) != len(payload.codigos):
+        raise HTTPException(status_code=400, detail="memos debe tener la misma longitud que codigos")
     
     started = time.perf_counter()
     clients = build_clients_or_error(settings)
@@ -6093,9 +6259,9 @@ async def api_check_batch_codes(
             input_count=len(payload.codigos or []),
         )
 
-        # Get existing codes from DB
+        # Índice del catálogo (sólo se relee si cambió su versión)
         t0 = time.perf_counter()
-        existing_codes = get_existing_codes_for_project(clients.postgres, project_id)
+        code_index = get_code_index(clients.postgres, project_id)
         t_fetch_ms = (time.perf_counter() - t0) * 1000.0
 
         # ---------------------------------------------------------------------
@@ -6123,6 +6289,7 @@ async def api_check_batch_codes(
         scan_stats = {
             "groups_scanned": 0,
             "comparisons": 0,
+            "skipped_token_blocking": 0,
             "skipped_len_prefilter": 0,
             "skipped_similarity": 0,
             "skipped_token_overlap": 0,
@@ -6131,30 +6298,48 @@ async def api_check_batch_codes(
             "scan_elapsed_ms_sum": 0.0,
         }
 
-        similar_by_norm: Dict[str, List[Tuple[str, float]]] = {}
-        for norm_key, idxs in groups.items():
-            if not norm_key:
-                similar_by_norm[norm_key] = []
-                continue
-            representative = payload.codigos[idxs[0]]
+        # Un solo pase vectorizado: representantes de cada grupo contra el índice del proyecto.
+        norm_keys = [k for k in groups if k]
+        sims_batch, st = code_index.match_batch(
+            [payload.codigos[groups[k][0]] for k in norm_keys],
+            threshold=payload.threshold,
+            limit=3,
+        )
+        similar_by_norm: Dict[str, List[Tuple[str, float]]] = {"": []}
+        similar_by_norm.update(zip(norm_keys, sims_batch))
 
-            sims, st = find_similar_codes_with_stats(
-                representative,
-                existing_codes,
-                threshold=payload.threshold,
-                limit=3,
-            )
-            similar_by_norm[norm_key] = sims
-
-            scan_stats["groups_scanned"] += 1
-            scan_stats["comparisons"] += int(st.get("comparisons", 0))
-            scan_stats["skipped_len_prefilter"] += int(st.get("skipped_len_prefilter", 0))
-            scan_stats["skipped_similarity"] += int(st.get("skipped_similarity", 0))
-            scan_stats["skipped_token_overlap"] += int(st.get("skipped_token_overlap", 0))
-            scan_stats["kept"] += int(st.get("kept", 0))
-            scan_stats["scan_elapsed_ms_sum"] += float(st.get("elapsed_ms", 0.0) or 0.0)
-            if float(st.get("elapsed_ms", 0.0) or 0.0) >= 200.0:
-                scan_stats["slow_scans"] += 1
+        # Vecinos semánticos (embeddings de códigos), sin repetir los léxicos.
+        semantic_by_norm: Dict[str, List[Tuple[str, float]]] = {}
+        if payload.include_semantic and norm_keys:
+            from app.code_embeddings import semantic_code_matches
+
+            try:
+                semantic_batch = semantic_code_matches(
+                    clients,
+                    settings,
+                    project_id,
+                    [payload.codigos[groups[k][0]] for k in norm_keys],
+                    memos=[payload.memos[groups[k][0]] for k in norm_keys] if payload.memos else None,
+                    threshold=payload.semantic_threshold,
+                    limit=3,
+                )
+            except Exception as exc:
+                api_logger.warning("api.codes.check_batch.semantic_failed", project=project_id, error=str(exc))
+                semantic_batch = [[] for _ in norm_keys]
+            for k, matches in zip(norm_keys, semantic_batch):
+                lexical = {name for name, _ in similar_by_norm.get(k, [])}
+                semantic_by_norm[k] = [m for m in matches if m[0] not in lexical]
+
+        scan_stats["groups_scanned"] = int(st.get("queries", 0))
+        scan_stats["comparisons"] = int(st.get("comparisons", 0))
+        scan_stats["skipped_token_blocking"] = int(st.get("skipped_token_blocking", 0))
+        scan_stats["skipped_len_prefilter"] = int(st.get("skipped_len_prefilter", 0))
+        scan_stats["skipped_similarity"] = int(st.get("skipped_similarity", 0))
+        scan_stats["skipped_token_overlap"] = int(st.get("skipped_token_overlap", 0))
+        scan_stats["kept"] = int(st.get("kept", 0))
+        scan_stats["scan_elapsed_ms_sum"] = float(st.get("elapsed_ms", 0.0) or 0.0)
+        if scan_stats["scan_elapsed_ms_sum"] >= 200.0:
+            scan_stats["slow_scans"] = 1
 
         t_scan_ms = (time.perf_counter() - t1) * 1000.0
 
@@ -6178,6 +6363,7 @@ async def api_check_batch_codes(
             norm_key = normalize_code(codigo)
             group_size = len(groups.get(norm_key, []))
             similar = similar_by_norm.get(norm_key, [])
+            semantic = semantic_by_norm.get(norm_key, [])
 
             if similar:
                 try:
@@ -6188,10 +6374,13 @@ async def api_check_batch_codes(
             results.append(
                 {
                     "codigo": codigo,
-                    "has_similar": bool(similar),
+                    "has_similar": bool(similar or semantic),
                     "similar": [
                         {"existing": s[0], "similarity": round(s[1], 2)}
                         for s in similar
+                    ] + [
+                        {"existing": s[0], "similarity": round(s[1], 2), "semantic": True}
+                        for s in semantic
                     ],
                     "duplicate_in_batch": group_size > 1,
                     "batch_group_size": group_size,
@@ -6246,7 +6435,7 @@ async def api_check_batch_codes(
             threshold=float(payload.threshold),
             input_count=len(payload.codigos or []),
             empty_count=len(empty_indexes),
-            existing_count=len(existing_codes),
+            existing_count=code_index.existing_count,
             batch_unique_count=len(groups),
             empty_norm_key_count=int(empty_norm_key_count),
             batch_duplicate_groups=len(duplicate_groups),
@@ -6270,7 +6459,7 @@ async def api_check_batch_codes(
             "results": results,
             "has_any_similar": has_any_similar,
             "checked_count": len(payload.codigos),
-            "existing_count": len(existing_codes),
+            "existing_count": code_index.existing_count,
             # Campos adicionales (compatibles): métricas de intra-batch
             "batch_unique_count": len(groups),
             "batch_duplicate_groups": len(duplicate_groups),
@@ -6304,7 +6493,7 @@ async def api_ai_plan_merges(
     """
     from collections import defaultdict
 
-    from app.code_normalization import find_similar_codes, get_existing_codes_for_project, normalize_code
+    from app.code_normalization import get_code_index, normalize_code
     from app.postgres_block import insert_ai_merge_plan
 
     try:
@@ -6332,7 +6521,7 @@ async def api_ai_plan_merges(
 
     clients = build_clients_or_error(settings)
     try:
-        existing_codes = get_existing_codes_for_project(clients.postgres, project_id)
+        code_index = get_code_index(clients.postgres, project_id)
 
         # Agrupar por clave normalizada para evitar cómputo repetido
         groups: Dict[str, List[int]] = defaultdict(list)
@@ -6341,18 +6530,14 @@ async def api_ai_plan_merges(
             groups[norm_key].append(idx)
 
         # Calcular similitudes por grupo (solo el representante)
-        similar_by_norm: Dict[str, List[Tuple[str, float]]] = {}
-        for norm_key, idxs in groups.items():
-            if not norm_key:
-                similar_by_norm[norm_key] = []
-                continue
-            representative = deduped[idxs[0]]
-            similar_by_norm[norm_key] = find_similar_codes(
-                representative,
-                existing_codes,
-                threshold=float(payload.threshold),
-                limit=3,
-            )
+        norm_keys = [k for k in groups if k]
+        sims_batch, _stats = code_index.match_batch(
+            [deduped[groups[k][0]] for k in norm_keys],
+            threshold=float(payload.threshold),
+            limit=3,
+        )
+        similar_by_norm: Dict[str, List[Tuple[str, float]]] = {"": []}
+        similar_by_norm.update(zip(norm_keys, sims_batch))
 
         # Construir pares sugeridos (best match) y deduplicar por source
         pairs: List[Dict[str, Any]] = []
@@ -6387,7 +6572,7 @@ async def api_ai_plan_merges(
         meta = {
             "request_id": getattr(getattr(request, "state", None), "request_id", None),
             "session_id": getattr(getattr(request, "state", None), "session_id", None),
-            "existing_count": len(existing_codes),
+            "existing_count": code_index.existing_count,
             "deduped_input_count": len(deduped),
         }
 
@@ -6662,6 +6847,7 @@ async def api_coding_citations(
 
 @app.get("/api/coding/saturation")
 async def api_coding_saturation(
+    background_tasks: BackgroundTasks,
     project: str = Query(..., description="Proyecto requerido"),
     window: int = Query(default=3, ge=1, le=10, description="Ventana de entrevistas para detectar plateau"),
     threshold: int = Query(default=2, ge=0, le=10, description="Máximo de códigos nuevos para considerar plateau"),
@@ -6682,6 +6868,7 @@ async def api_coding_saturation(
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     clients = build_clients_or_error(settings)
     try:
+        _schedule_code_curve_refresh(background_tasks, settings, clients, project_id)
         data = get_saturation_data(clients, project_id, window=window, threshold=threshold)
     finally:
         clients.close()
@@ -21,12 +21,23 @@ Configuración:
 
 Tareas disponibles:
     - task_analyze_interview: Analiza fragmentos de entrevista con LLM
+    - task_run_coding_suggest_runner: Runner de sugerencias de codificación
+    - task_run_agent: Agente de investigación autónoma
+    - task_reconcile_dashboard_counters: Reconciliación periódica (beat)
+    - task_sync_code_embeddings: Re-embebe códigos tras alta/renombre/fusión
+    - task_refresh_betweenness: Recalcula la betweenness persistida de un proyecto
+    - task_refresh_sampling_features: Recalcula las features de muestreo marcadas
+    - task_refresh_code_curve: Materializa la curva de saturación marcada
 
 Ejecución del worker:
     celery -A backend.celery_worker worker --loglevel=info
+    celery -A backend.celery_worker beat --loglevel=info   # tareas periódicas
 
 Variables de entorno:
     CELERY_BROKER_URL: URL de Redis (default: redis://localhost:6379/0)
+    RUNNER_EXECUTOR: "celery" para encolar runners aquí (default: inline)
+    TASK_REGISTRY_BACKEND: postgres | redis | memory (estado de runners)
+    DASHBOARD_RECONCILE_SECONDS: periodo de reconciliación de contadores (default: 3600)
 
 Example:
     # Desde endpoint FastAPI
@@ -83,6 +94,12 @@ celery_app.conf.update(
     timezone="UTC",                  # Zona horaria
     enable_utc=True,                 # Usar UTC
     task_track_started=True,         # Trackear inicio de tareas
+    beat_schedule={
+        "reconcile-dashboard-counters": {
+            "task": "backend.celery_worker.task_reconcile_dashboard_counters",
+            "schedule": float(os.getenv("DASHBOARD_RECONCILE_SECONDS", "3600")),
+        },
+    },
 )
 
 
@@ -436,3 +453,147 @@ def task_transcribe_audio(
                 tmp_path.unlink(missing_ok=True)
         except Exception:
             pass
+
+
+# =============================================================================
+# RUNNERS (estado en app.task_registry; habilitar con RUNNER_EXECUTOR=celery)
+# =============================================================================
+
+@celery_app.task(bind=True)
+def task_run_coding_suggest_runner(
+    self,
+    task_id: str,
+    req: Dict,
+    resume_state: Dict | None = None,
+):
+    """
+    Ejecuta el runner de sugerencias de codificación en un worker Celery.
+
+    El endpoint ya registró la tarea en el registro compartido; el progreso
+    se publica ahí y cualquier réplica de la API responde `/status`.
+    """
+    from backend.routers.coding import (
+        CodingSuggestRunnerExecuteRequest,
+        _run_coding_suggest_runner_task,
+    )
+
+    logger.info("task.coding_runner.start", task_id=task_id, celery_id=self.request.id)
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    _run_coding_suggest_runner_task(
+        task_id=task_id,
+        req=CodingSuggestRunnerExecuteRequest(**req),
+        settings=settings,
+        resume_state=resume_state,
+    )
+    return {"task_id": task_id}
+
+
+@celery_app.task(bind=True)
+def task_run_agent(self, task_id: str, **kwargs):
+    """Ejecuta el agente de investigación (`_run_agent_task`) en un worker Celery."""
+    import asyncio
+
+    from backend.routers.agent import _run_agent_task
+
+    logger.info("task.agent.start", task_id=task_id, celery_id=self.request.id)
+    asyncio.run(_run_agent_task(task_id=task_id, **kwargs))
+    return {"task_id": task_id}
+
+
+# =============================================================================
+# MANTENIMIENTO (periódicas vía celery beat)
+# =============================================================================
+
+@celery_app.task(bind=True)
+def task_reconcile_dashboard_counters(self, project_id: str | None = None):
+    """Recalcula los contadores del dashboard y registra los desvíos corregidos."""
+    from app.postgres_block import reconcile_dashboard_counters
+
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    clients = build_service_clients(settings)
+    try:
+        result = reconcile_dashboard_counters(clients.postgres, project_id)
+    finally:
+        clients.close()
+    logger.info(
+        "task.dashboard_counters.reconciled",
+        celery_id=self.request.id,
+        project_id=project_id,
+        proyectos=result["proyectos"],
+        desvios=len(result["desvios"]),
+    )
+    return result
+
+
+@celery_app.task(bind=True)
+def task_sync_code_embeddings(self, project_id: str):
+    """Sincroniza el catálogo de códigos embebido (sólo si el proyecto ya está embebido)."""
+    from app.code_embeddings import refresh_code_embeddings_after_change
+
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    clients = build_service_clients(settings)
+    try:
+        refresh_code_embeddings_after_change(clients, settings, project_id, logger=logger)
+    finally:
+        clients.close()
+    logger.info("task.code_embeddings.synced", celery_id=self.request.id, project_id=project_id)
+
+
+@celery_app.task(bind=True)
+def task_refresh_betweenness(self, project_id: str):
+    """Recalcula (sin presupuesto de tiempo) la betweenness persistida del proyecto."""
+    from app.axial import compute_betweenness_cache
+
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    clients = build_service_clients(settings)
+    try:
+        payload = compute_betweenness_cache(clients, settings, project_id)
+    finally:
+        clients.close()
+    logger.info(
+        "task.betweenness.refreshed",
+        celery_id=self.request.id,
+        project_id=project_id,
+        sample_size=payload["info"].get("sample_size"),
+    )
+    return {"project_id": project_id, "rows": len(payload["results"])}
+
+
+@celery_app.task(bind=True)
+def task_refresh_sampling_features(self, project_id: str):
+    """Recalcula las filas `stale` de interview_sampling_features del proyecto."""
+    from app.postgres_block import refresh_interview_sampling_features
+
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    clients = build_service_clients(settings)
+    try:
+        refreshed = refresh_interview_sampling_features(clients.postgres, project_id)
+    finally:
+        clients.close()
+    logger.info(
+        "task.sampling_features.refreshed",
+        celery_id=self.request.id,
+        project_id=project_id,
+        entrevistas=refreshed,
+    )
+    return {"project_id": project_id, "entrevistas": refreshed}
+
+
+@celery_app.task(bind=True)
+def task_refresh_code_curve(self, project_id: str):
+    """Materializa la curva de saturación del proyecto si está marcada."""
+    from app.postgres_block import refresh_code_curve
+
+    settings = load_settings(os.getenv("APP_ENV_FILE"))
+    clients = build_service_clients(settings)
+    try:
+        refreshed = refresh_code_curve(clients.postgres, project_id)
+    finally:
+        clients.close()
+    logger.info(
+        "task.code_curve.refreshed",
+        celery_id=self.request.id,
+        project_id=project_id,
+        refreshed=refreshed,
+    )
+    return {"project_id": project_id, "refreshed": refreshed}
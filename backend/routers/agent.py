@@ -26,6 +26,7 @@ from app.clients import ServiceClients, build_service_clients
 from app.coding_runner_core import constant_comparison_sample, attach_evidence_to_codes
 from app.settings import AppSettings, load_settings
 from app.project_state import resolve_project
+from app.task_registry import get_task_registry, runner_executor
 from app.error_handling import api_error, ErrorCode
 from backend.auth import User, get_current_user
 
@@ -588,10 +589,10 @@ class DiscoveryRunRequest(BaseModel):
 
 
 # ============================================================================
-# In-memory task storage (production: use Redis)
+# Task storage: registro compartido entre workers (app.task_registry)
 # ============================================================================
 
-_agent_tasks: Dict[str, dict] = {}
+_AGENT_TASK_KIND = "agent"
 
 
 # ============================================================================
@@ -638,7 +639,7 @@ async def execute_agent(
     )
 
     # Inicializar estado
-    _agent_tasks[task_id] = {
+    get_task_registry().create(task_id, {
         "status": "pending",
         "project_id": request.project_id,
         "current_stage": 0,
@@ -647,11 +648,10 @@ async def execute_agent(
         "codes_count": 0,
         "error": None,
         "started_at": datetime.now().isoformat(),
-    }
+    }, kind=_AGENT_TASK_KIND, project_id=request.project_id)
 
-    # Ejecutar en background
-    background_tasks.add_task(
-        _run_agent_task,
+    # Ejecutar en background (worker API o Celery)
+    run_kwargs = dict(
         task_id=task_id,
         project_id=request.project_id,
         concepts=request.concepts or [],
@@ -662,6 +662,12 @@ async def execute_agent(
         use_constant_comparison=request.use_constant_comparison,
         org_id=str(getattr(user, "organization_id", None) or ""),
     )
+    if runner_executor() == "celery":
+        from backend.celery_worker import task_run_agent
+
+        task_run_agent.delay(**run_kwargs)
+    else:
+        background_tasks.add_task(_run_agent_task, **run_kwargs)
 
     return {
         "task_id": task_id,
@@ -673,10 +679,10 @@ async def execute_agent(
 @router.get("/status/{task_id}", response_model=AgentStatusResponse)
 async def get_agent_status(task_id: str):
     """Consulta estado de una tarea del agente."""
-    if task_id not in _agent_tasks:
+    task = get_task_registry().get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
-    task = _agent_tasks[task_id]
     return AgentStatusResponse(
         task_id=task_id,
         status=task["status"],
@@ -694,10 +700,10 @@ async def get_agent_status(task_id: str):
 @router.get("/result/{task_id}", response_model=AgentResult)
 async def get_agent_result(task_id: str):
     """Obtiene resultado final de una tarea completada."""
-    if task_id not in _agent_tasks:
+    task = get_task_registry().get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
-    task = _agent_tasks[task_id]
     if task["status"] != "completed":
         raise HTTPException(status_code=400, detail=f"Task not completed: {task['status']}")
 
@@ -721,7 +727,7 @@ async def list_agent_tasks():
     """Lista todas las tareas del agente."""
     return [
         {"task_id": tid, **task}
-        for tid, task in _agent_tasks.items()
+        for tid, task in get_task_registry().list(kind=_AGENT_TASK_KIND).items()
     ]
 
 
@@ -831,13 +837,16 @@ async def _run_agent_task(
     org_id: str = "",
 ):
     """Ejecuta el agente en background, usando run_discovery_iterations para Discovery."""
+    task = get_task_registry().state(task_id)
+    if task is None:
+        return
     try:
-        _agent_tasks[task_id]["status"] = "running"
+        task["status"] = "running"
         settings = get_settings()
 
         # Fase 1: Ejecutar Discovery con run_discovery_iterations (robusto)
         _logger.info("agent.discovery.start", task_id=task_id, project_id=project_id)
-        _agent_tasks[task_id]["current_stage"] = 2  # Discovery stage
+        task["current_stage"] = 2  # Discovery stage
 
         clients = build_clients_or_error(settings)
         try:
@@ -862,7 +871,7 @@ async def _run_agent_task(
             )
 
             # Actualizar estado base
-            _agent_tasks[task_id].update({
+            task.update({
                 "iteration": len(discovery_result.get("runs", [])),
                 "discovery_memos": [r.get("id") for r in discovery_result.get("runs", [])],
                 "memos_count": len(discovery_result.get("runs", [])),
@@ -904,7 +913,7 @@ async def _run_agent_task(
                         "decisiones_requeridas": [],
                         "proximos_pasos": [],
                     }
-                    _agent_tasks[task_id].setdefault("errors", []).append(
+                    task.setdefault("errors", []).append(
                         f"Síntesis LLM fallida: {str(synth_err)[:100]}"
                     )
 
@@ -992,7 +1001,7 @@ async def _run_agent_task(
                     "config": discovery_result.get("config") or {},
                 }
 
-                _agent_tasks[task_id].update({
+                task.update({
                     "status": "completed",
                     "current_stage": 2,
                     "validated_codes": [],
@@ -1000,8 +1009,8 @@ async def _run_agent_task(
                     "final_report": None,
                     "codes_count": int(codes_inserted),
                     "post_run": post_run,
-                    "errors": _agent_tasks[task_id].get("errors", []),
-                    "final_landing_rate": _agent_tasks[task_id].get("final_landing_rate"),
+                    "errors": task.get("errors", []),
+                    "final_landing_rate": task.get("final_landing_rate"),
                 })
                 _logger.info(
                     "agent.execute.completed.discovery_only.post_run",
@@ -1017,7 +1026,7 @@ async def _run_agent_task(
 
         # Fase 2+: Ejecutar resto del pipeline con run_agent_with_real_functions
         _logger.info("agent.coding.start", task_id=task_id)
-        _agent_tasks[task_id]["current_stage"] = 3  # Coding stage
+        task["current_stage"] = 3  # Coding stage
 
         from app.agent_standalone import run_agent_with_real_functions
 
@@ -1028,21 +1037,21 @@ async def _run_agent_task(
             max_interviews=max_interviews,
             iterations_per_interview=iterations_per_interview,
             discovery_only=False,
-            task_callback=lambda state: _update_task_state(task_id, state),
+            task_callback=lambda state: _update_task_state(task, state),
         )
 
         # Merge errors from discovery and agent execution
-        all_errors = _agent_tasks[task_id].get("errors", []) + result.get("errors", [])
+        all_errors = task.get("errors", []) + result.get("errors", [])
 
         # Generate execution logs for frontend
         logs = [
             f" Agent started for project {project_id}",
             f" Concepts: {', '.join(concepts)}",
             f" Max interviews: {max_interviews}",
-            f" Discovery phase completed with {_agent_tasks[task_id].get('memos_count', 0)} runs",
+            f" Discovery phase completed with {task.get('memos_count', 0)} runs",
         ]
-        if _agent_tasks[task_id].get("final_landing_rate"):
-            lr = _agent_tasks[task_id]["final_landing_rate"]
+        if task.get("final_landing_rate"):
+            lr = task["final_landing_rate"]
             logs.append(f" Landing rate: {lr.get('landing_rate', 0):.1f}% ({lr.get('matched_count', 0)}/{lr.get('total_count', 0)} fragments)")
         if result.get("validated_codes"):
             logs.append(f" Generated {len(result.get('validated_codes', []))} validated codes")
@@ -1051,7 +1060,7 @@ async def _run_agent_task(
         logs.append(f" Agent completed in {result.get('iteration', 0)} iterations")
 
         # Update final state
-        _agent_tasks[task_id].update({
+        task.update({
             "status": "completed",
             "current_stage": result.get("current_stage", 9),
             "iteration": result.get("iteration", 0),
@@ -1075,7 +1084,7 @@ async def _run_agent_task(
 
     except Exception as e:
         _logger.error("agent.execute.error", task_id=task_id, error=str(e))
-        _agent_tasks[task_id].update({
+        task.update({
             "status": "error",
             "error": str(e),
             "logs": [
@@ -1083,12 +1092,14 @@ async def _run_agent_task(
                 f" Error: {str(e)}",
             ],
         })
+    finally:
+        task.flush()
 
 
-def _update_task_state(task_id: str, state: dict):
+def _update_task_state(task: dict, state: dict):
     """Callback para actualizar estado durante ejecución."""
-    if task_id in _agent_tasks:
-        _agent_tasks[task_id].update({
+    if task is not None:
+        task.update({
             "current_stage": state.get("current_stage", 0),
             "iteration": state.get("iteration", 0),
             "memos_count": len(state.get("memos", [])),
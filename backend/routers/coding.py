@@ -22,6 +22,7 @@ from app.clients import ServiceClients, build_service_clients
 from app.coding_runner_core import normalize_resume_state
 from app.project_state import resolve_project
 from app.settings import AppSettings, load_settings
+from app.task_registry import get_task_registry, runner_executor
 from backend.auth import User, get_current_user
 
 # Logger
@@ -164,7 +165,8 @@ class CodingFeedbackRequest(BaseModel):
 router = APIRouter(prefix="/api/coding", tags=["Coding"])
 codes_router = APIRouter(prefix="/api/codes", tags=["Codes"])
 
-_coding_suggest_runner_tasks: Dict[str, Dict[str, Any]] = {}
+# Estado de los runners en el registro compartido (app.task_registry).
+_RUNNER_TASK_KIND = "coding_suggest_runner"
 
 
 def _is_admin(user: User) -> bool:
@@ -648,7 +650,7 @@ def _run_coding_suggest_runner_task(
         insert_candidate_codes,
     )
 
-    task = _coding_suggest_runner_tasks.get(task_id)
+    task = get_task_registry(settings).state(task_id)
     if not task:
         return
     task["status"] = "running"
@@ -865,7 +867,7 @@ def _run_coding_suggest_runner_task(
                         )
                         if _is_transient_qdrant_error(exc) and qdrant_attempts < 3:
                             qdrant_attempts += 1
-                            task["qdrant_retries"] = int(task.get("qdrant_retries", 0)) + 1
+                            task.increment("qdrant_retries")
                             task["message"] = (
                                 f"Qdrant temporalmente no disponible (reintento {qdrant_attempts}/3). "
                                 f"Entrevista {idx}/{len(archivos)}: {archivo}"
@@ -874,7 +876,7 @@ def _run_coding_suggest_runner_task(
                             continue
 
                         # Non-transient or exhausted retries: don't kill the whole run.
-                        task["qdrant_failures"] = int(task.get("qdrant_failures", 0)) + 1
+                        task.increment("qdrant_failures")
                         err_msg = f"No se pudo consultar Qdrant ({exc})"
                         task.setdefault("errors", []).append(err_msg)
                         _capture_runner_error(
@@ -970,7 +972,7 @@ def _run_coding_suggest_runner_task(
                         while llm_attempts < 3 and not suggested_code:
                             llm_attempts += 1
                             try:
-                                task["llm_calls"] = int(task.get("llm_calls", 0)) + 1
+                                task.increment("llm_calls")
                                 llm_result = suggest_code_from_fragments(
                                     clients=clients,
                                     settings=settings,
@@ -1017,7 +1019,7 @@ def _run_coding_suggest_runner_task(
                                     attempt=llm_attempts,
                                     exc=exc,
                                 )
-                                task["llm_failures"] = int(task.get("llm_failures", 0)) + 1
+                                task.increment("llm_failures")
                                 task.setdefault("errors", []).append(
                                     f"LLM error (step={global_step} archivo={archivo} attempt={llm_attempts}/3): {exc}"
                                 )
@@ -1068,7 +1070,7 @@ def _run_coding_suggest_runner_task(
                                 for s in raw_suggestions[: min(12, len(raw_suggestions))]
                             ],
                         )
-                        task["memos_saved"] = int(task.get("memos_saved", 0)) + 1
+                        task.increment("memos_saved")
                         memos.append({
                             "archivo": archivo,
                             "step": global_step,
@@ -1182,6 +1184,7 @@ def _run_coding_suggest_runner_task(
                 seed = next_seed
 
                 # Checkpoint after a successful step (or Qdrant-skipped step)
+                task.flush()
                 try:
                     last_checkpoint_state = {
                         "auth": task_auth,
@@ -1261,7 +1264,7 @@ def _run_coding_suggest_runner_task(
                 exc=exc,
             )
         task["candidates_pending_after_db"] = pending_after
-        task["result"]["candidates_pending_after_db"] = pending_after
+        task["result"] = {**task["result"], "candidates_pending_after_db": pending_after}
 
         # Final checkpoint for completed runs
         try:
@@ -1328,7 +1331,7 @@ def _run_coding_suggest_runner_task(
             report_path = _save_runner_report(project=project_id, task_id=task_id, report=report)
             if report_path:
                 task["report_path"] = report_path
-                task["result"]["report_path"] = report_path
+                task["result"] = {**task["result"], "report_path": report_path}
         except Exception:
             pass
 
@@ -1410,7 +1413,37 @@ def _run_coding_suggest_runner_task(
         except Exception:
             pass
     finally:
-        clients.close()
+        try:
+            task.flush()
+        finally:
+            clients.close()
+
+
+def _dispatch_coding_suggest_runner(
+    background_tasks: BackgroundTasks,
+    *,
+    task_id: str,
+    req: CodingSuggestRunnerExecuteRequest,
+    settings: AppSettings,
+    resume_state: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Ejecuta el runner en este worker (BackgroundTasks) o lo encola en Celery."""
+    if runner_executor() == "celery":
+        from backend.celery_worker import task_run_coding_suggest_runner
+
+        task_run_coding_suggest_runner.delay(
+            task_id=task_id,
+            req=req.model_dump(),
+            resume_state=resume_state,
+        )
+        return
+    background_tasks.add_task(
+        _run_coding_suggest_runner_task,
+        task_id=task_id,
+        req=req,
+        settings=settings,
+        resume_state=resume_state,
+    )
 
 
 @router.post("/suggest/runner/execute")
@@ -1439,7 +1472,8 @@ async def execute_coding_suggest_runner(
         "roles": list(user.roles or []),
     }
 
-    _coding_suggest_runner_tasks[task_id] = {
+    registry = get_task_registry(settings)
+    registry.create(task_id, {
         "status": "pending",
         "project": project_id,
         "auth": task_auth,
@@ -1467,7 +1501,7 @@ async def execute_coding_suggest_runner(
         "message": "Inicializando...",
         "started_at": datetime.now().isoformat(),
         "report_path": None,
-    }
+    }, kind=_RUNNER_TASK_KIND, project_id=project_id)
 
     api_logger.info(
         "api.coding.suggest_runner.started",
@@ -1479,12 +1513,7 @@ async def execute_coding_suggest_runner(
         strategy=request.strategy,
     )
 
-    background_tasks.add_task(
-        _run_coding_suggest_runner_task,
-        task_id=task_id,
-        req=request,
-        settings=settings,
-    )
+    _dispatch_coding_suggest_runner(background_tasks, task_id=task_id, req=request, settings=settings)
 
     return {"task_id": task_id, "status": "started"}
 
@@ -1526,7 +1555,7 @@ async def resume_coding_suggest_runner(
         "org": str(user.organization_id),
         "roles": list(user.roles or []),
     }
-    _coding_suggest_runner_tasks[new_task_id] = {
+    get_task_registry(settings).create(new_task_id, {
         "status": "pending",
         "project": resumed_req.project,
         "auth": checkpoint_auth,
@@ -1557,7 +1586,7 @@ async def resume_coding_suggest_runner(
         "errors": [],
         "message": f"Reanudando desde checkpoint de {request.task_id}",
         "started_at": datetime.now().isoformat(),
-    }
+    }, kind=_RUNNER_TASK_KIND, project_id=resumed_req.project)
 
     api_logger.info(
         "api.coding.suggest_runner.resumed",
@@ -1566,8 +1595,8 @@ async def resume_coding_suggest_runner(
         project=resumed_req.project,
     )
 
-    background_tasks.add_task(
-        _run_coding_suggest_runner_task,
+    _dispatch_coding_suggest_runner(
+        background_tasks,
         task_id=new_task_id,
         req=resumed_req,
         settings=settings,
@@ -1582,7 +1611,7 @@ async def get_coding_suggest_runner_status(
     task_id: str,
     user: User = Depends(require_auth),
 ) -> CodingSuggestRunnerStatusResponse:
-    task = _coding_suggest_runner_tasks.get(task_id)
+    task = get_task_registry().get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
@@ -1620,7 +1649,7 @@ async def get_coding_suggest_runner_result(
     task_id: str,
     user: User = Depends(require_auth),
 ) -> CodingSuggestRunnerResultResponse:
-    task = _coding_suggest_runner_tasks.get(task_id)
+    task = get_task_registry().get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
 
@@ -92,7 +92,7 @@ async def api_dashboard_counts(
     
     clients = build_clients_or_error(settings)
     try:
-        from app.dashboard import get_dashboard_counts
+        from app.postgres_block import get_dashboard_counts
         counts = get_dashboard_counts(clients.postgres, project_id)
         return counts
     finally:
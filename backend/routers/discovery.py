@@ -55,6 +55,7 @@ class GroupedSearchRequest(BaseModel):
     area_tematica: Optional[str] = Field(None, description="Filtrar por área temática")
     periodo: Optional[str] = Field(None, description="Filtrar por periodo temporal")
     archivo: Optional[str] = Field(None, description="Filtrar por archivo específico")
+    cursor: Optional[str] = Field(None, description="Cursor de la página anterior (next_cursor)")
 
 #Create routers
 router = APIRouter(prefix="/api/discovery", tags=["Discovery"])
@@ -80,60 +81,34 @@ async def api_qdrant_search_grouped(
     
     clients = build_clients_or_error(settings)
     try:
-        # Generar embedding del query
-        from app.embedding import embed_texts
-        embeddings = embed_texts(clients.aoai, settings.AZURE_OPENAI_DEPLOYMENT_EMBEDDING, [payload.query])
-        if not embeddings or not embeddings[0]:
-            raise HTTPException(status_code=500, detail="Error generando embedding")
-        
-        query_vector = embeddings[0]
-        
-        # Usar búsqueda agrupada con filtros
-        from app.qdrant_block import search_similar_grouped
-        groups = search_similar_grouped(
-            clients.qdrant,
-            settings.QDRANT_COLLECTION,
-            query_vector,
-            limit=payload.limit,
+        from app.queries import grouped_search
+
+        page = grouped_search(
+            clients,
+            settings,
+            payload.query,
+            project=project_id,
             group_by=payload.group_by,
+            limit=payload.limit,
             group_size=payload.group_size,
             score_threshold=payload.score_threshold,
-            project_id=project_id,
-            exclude_interviewer=True,
-            # Filtros avanzados
-            genero=payload.genero,
-            actor_principal=payload.actor_principal,
-            area_tematica=payload.area_tematica,
-            periodo=payload.periodo,
-            archivo_filter=payload.archivo,
+            filters={
+                "genero": payload.genero,
+                "actor_principal": payload.actor_principal,
+                "area_tematica": payload.area_tematica,
+                "periodo": payload.periodo,
+                "archivo": payload.archivo,
+            },
+            cursor=payload.cursor,
         )
-        
-        # Formatear resultados
-        results = []
-        for group in groups:
-            group_key = group.id if hasattr(group, 'id') else str(group)
-            hits = []
-            for hit in (group.hits if hasattr(group, 'hits') else []):
-                hits.append({
-                    "id": hit.id,
-                    "score": hit.score,
-                    "fragmento": hit.payload.get("fragmento", "")[:200],
-                    "archivo": hit.payload.get("archivo"),
-                    "speaker": hit.payload.get("speaker"),
-                    "actor_principal": hit.payload.get("actor_principal"),
-                })
-            results.append({
-                "group_key": group_key,
-                "hits": hits,
-            })
-        
         return {
             "success": True,
             "query": payload.query,
             "group_by": payload.group_by,
-            "results": results,
-            "total_groups": len(results),
+            **page,
         }
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as e:
         api_logger.error("api.qdrant.search_grouped_error", error=str(e))
         raise HTTPException(status_code=500, detail=f"Error en búsqueda agrupada: {str(e)}") from e
@@ -2,7 +2,7 @@
 GraphRAG router - Graph analysis, axial coding, and link prediction endpoints.
 """
 from typing import Dict, Any, List, Optional, Union, cast
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 import structlog
 from functools import lru_cache
@@ -10,7 +10,14 @@ import os
 
 from app.clients import ServiceClients
 from app.settings import AppSettings, load_settings
-from app.axial import run_gds_analysis, AxialError, AxialNotReadyError
+from app.axial import (
+    betweenness_stale_while_revalidate,
+    compute_betweenness_cache,
+    run_gds_analysis,
+    run_gds_analysis_many,
+    AxialError,
+    AxialNotReadyError,
+)
 from backend.auth import User, get_current_user
 
 # Logger
@@ -68,6 +75,15 @@ class GDSRequest(BaseModel):
         description="Lista de formatos a devolver (raw, table, graph, all).",
     )
 
+class GDSBatchRequest(BaseModel):
+    project: str = Field(default="default", description="ID del proyecto (multi-tenant)")
+    algorithms: List[str] = Field(
+        default_factory=lambda: ["pagerank", "louvain"],
+        min_length=1,
+        description="Algoritmos a calcular sobre una sola extracción (louvain, pagerank, betweenness, leiden, eigenvector, degree).",
+    )
+    persist: bool = False
+
 class GraphRAGRequest(BaseModel):
     """Request for GraphRAG query."""
     query: str = Field(..., min_length=3)
@@ -111,11 +127,27 @@ axial_router = APIRouter(prefix="/api/axial", tags=["Axial"])
 @axial_router.post("/gds")
 async def api_run_gds_analysis(
     payload: GDSRequest,
+    background_tasks: BackgroundTasks,
     settings: AppSettings = Depends(get_settings),
     user: User = Depends(require_auth),
 ) -> List[Dict[str, Any]]:
-    """Execute Graph Data Science algorithms (Louvain, PageRank, Betweenness)."""
-    clients = build_neo4j_only(settings)
+    """Execute Graph Data Science algorithms (Louvain, PageRank, Betweenness).
+
+    Betweenness without persist is served from the persisted result
+    (stale-while-revalidate) instead of recomputing on every request.
+    """
+    if payload.algorithm == "betweenness" and not payload.persist:
+        snapshot = await api_axial_betweenness(
+            background_tasks,
+            project=payload.project,
+            refresh=False,
+            settings=settings,
+            user=user,
+        )
+        return snapshot["results"]
+
+    # Con persist se necesita PG para el espejo `graph_node_metrics`.
+    clients = build_clients_or_error(settings) if payload.persist else build_neo4j_only(settings)
     try:
         from app.project_state import resolve_project
 
@@ -162,6 +194,148 @@ async def api_run_gds_analysis(
     finally:
         clients.close()
 
+def _refresh_betweenness_task(project_id: str, settings: AppSettings) -> None:
+    clients = build_clients_or_error(settings)
+    try:
+        compute_betweenness_cache(clients, settings, project_id)
+    except Exception as exc:
+        api_logger.error("api.betweenness.refresh_failed", project=project_id, error=str(exc))
+    finally:
+        clients.close()
+
+
+def _schedule_betweenness_refresh(
+    background_tasks: BackgroundTasks,
+    settings: AppSettings,
+    project_id: str,
+) -> None:
+    """Recálculo en Celery o en este worker (BackgroundTasks), según RUNNER_EXECUTOR."""
+    from app.task_registry import runner_executor
+
+    if runner_executor() == "celery":
+        from backend.celery_worker import task_refresh_betweenness
+
+        task_refresh_betweenness.delay(project_id)
+        return
+    background_tasks.add_task(_refresh_betweenness_task, project_id, settings)
+
+
+@axial_router.get("/betweenness")
+async def api_axial_betweenness(
+    background_tasks: BackgroundTasks,
+    project: str = Query(default="default", description="ID del proyecto"),
+    refresh: bool = Query(default=False, description="Encolar recálculo aunque el resultado esté vigente"),
+    settings: AppSettings = Depends(get_settings),
+    user: User = Depends(require_auth),
+) -> Dict[str, Any]:
+    """Betweenness persistida (stale-while-revalidate) con detalle del muestreo."""
+    clients = build_clients_or_error(settings)
+    try:
+        from app.project_state import resolve_project
+
+        try:
+            project_id = resolve_project(project, allow_create=False, pg=clients.postgres)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        result = betweenness_stale_while_revalidate(
+            clients,
+            settings,
+            project_id,
+            schedule_refresh=lambda pid: _schedule_betweenness_refresh(background_tasks, settings, pid),
+            force_refresh=refresh,
+        )
+        api_logger.info(
+            "api.betweenness.served",
+            project=project_id,
+            stale=result["stale"],
+            refreshing=result["refreshing"],
+            rows=len(result["results"]),
+        )
+        return result
+    except HTTPException:
+        raise
+    except Exception as exc:
+        api_logger.error("api.betweenness.error", error=str(exc))
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    finally:
+        clients.close()
+
+
+@axial_router.get("/node-metrics")
+async def api_axial_node_metrics(
+    project: str = Query(default="default", description="ID del proyecto"),
+    metric: Optional[str] = Query(default=None, description="community_id, score_centralidad, score_intermediacion..."),
+    label: Optional[str] = Query(default=None, description="Codigo o Categoria"),
+    limit: int = Query(default=100, ge=1, le=5000),
+    settings: AppSettings = Depends(get_settings),
+    user: User = Depends(require_auth),
+) -> Dict[str, Any]:
+    """Métricas por nodo persistidas (espejo PG), sin consultar la base de grafos."""
+    clients = build_clients_or_error(settings)
+    try:
+        from app.postgres_block import fetch_graph_node_metrics
+        from app.project_state import resolve_project
+
+        try:
+            project_id = resolve_project(project, allow_create=False, pg=clients.postgres)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        rows = fetch_graph_node_metrics(clients.postgres, project_id, metric=metric, label=label, limit=limit)
+        return {"project": project_id, "metric": metric, "results": rows}
+    except HTTPException:
+        raise
+    except Exception as exc:
+        api_logger.error("api.node_metrics.error", error=str(exc))
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    finally:
+        clients.close()
+
+
+@axial_router.post("/gds/batch")
+async def api_run_gds_analysis_batch(
+    payload: GDSBatchRequest,
+    settings: AppSettings = Depends(get_settings),
+    user: User = Depends(require_auth),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Execute several graph algorithms over one extraction of the project graph."""
+    clients = build_clients_or_error(settings) if payload.persist else build_neo4j_only(settings)
+    try:
+        from app.project_state import resolve_project
+
+        try:
+            project_id = resolve_project(payload.project, allow_create=False)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        api_logger.info(
+            "api.gds_batch.start",
+            project=project_id,
+            algorithms=payload.algorithms,
+            persist=payload.persist,
+        )
+        results = run_gds_analysis_many(
+            cast(ServiceClients, clients),
+            settings,
+            payload.algorithms,
+            persist=payload.persist,
+            project=project_id,
+        )
+        api_logger.info(
+            "api.gds_batch.complete",
+            project=project_id,
+            rows={algo: len(rows) for algo, rows in results.items()},
+        )
+        return results
+    except AxialError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        api_logger.error("api.gds_batch.error", error=str(exc))
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    finally:
+        clients.close()
+
 # GraphRAG Query Endpoint
 @graphrag_router.post("/query")
 async def api_graphrag_query(
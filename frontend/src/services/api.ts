@@ -2145,6 +2145,8 @@ export interface GroupedHit {
 export interface SearchGroup {
   group_key: string;
   hits: GroupedHit[];
+  /** Contexto de la entrevista (sólo con group_by="archivo") */
+  context?: Record<string, unknown> | null;
 }
 
 /** Response for grouped search */
@@ -2154,6 +2156,8 @@ export interface GroupedSearchResponse {
   group_by: string;
   results: SearchGroup[];
   total_groups: number;
+  /** Cursor para pedir los grupos siguientes (null si no hay más) */
+  next_cursor?: string | null;
 }
 
 /**
@@ -2175,6 +2179,7 @@ export async function searchGrouped(
     area_tematica?: string | null;
     periodo?: string | null;
     archivo?: string | null;
+    cursor?: string | null;
   } = {}
 ): Promise<GroupedSearchResponse> {
   return apiFetchJson<GroupedSearchResponse>("/api/qdrant/search-grouped", {
@@ -2191,6 +2196,7 @@ export async function searchGrouped(
       area_tematica: options.area_tematica,
       periodo: options.periodo,
       archivo: options.archivo,
+      cursor: options.cursor,
     }),
   });
 }
@@ -11,6 +11,7 @@ from uuid import uuid4
 from app.analysis import analyze_interview_text, matriz_etapa3, matriz_etapa4, modelo_ascii, persist_analysis
 from app.coding import (
     assign_open_code,
+    backfill_fragment_coded_state,
     citations_for_code,
     coding_statistics,
     list_available_interviews,
@@ -19,6 +20,7 @@ from app.coding import (
     suggest_similar_fragments,
     CodingError,
 )
+from app.fragment_neighbors import DEFAULT_NEIGHBOR_K, build_fragment_neighbors
 from app.nucleus import centrality_report, coverage_report, nucleus_report, probe_semantics
 from app.axial import ALLOWED_REL_TYPES, AxialError, AxialNotReadyError, assign_axial_relation, run_gds_analysis
 from app.clients import build_service_clients
@@ -494,6 +496,31 @@ def cmd_status(args):
     )
 
 
+def cmd_dashboard_reconcile(args):
+    from app.postgres_block import reconcile_dashboard_counters
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        project_id = None if args.all_projects else (args.project or "default")
+        result = reconcile_dashboard_counters(clients.postgres, project_id)
+    finally:
+        clients.close()
+    logger.info(
+        "dashboard.counters_reconciled",
+        project=project_id,
+        proyectos=result["proyectos"],
+        desvios=len(result["desvios"]),
+    )
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    print(f"proyectos: {result['proyectos']}")
+    print(f"contadores: {result['contadores']}")
+    for key, delta in sorted(result["desvios"].items()):
+        print(f"desvio {key}: {delta:+d}")
+
+
 def cmd_project_create(args):
     settings, clients = build_context(args.env)
     try:
@@ -701,6 +728,114 @@ def cmd_coding_suggest(args):
         comparison_id=result.get("comparison_id"),
     )
 
+def cmd_coding_sync_coded(args):
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = backfill_fragment_coded_state(clients, settings, args.project, logger=logger)
+    finally:
+        clients.close()
+    logger.info("coding.sync_coded", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_neighbors(args):
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = build_fragment_neighbors(clients, args.project, k=args.k, logger=logger)
+    finally:
+        clients.close()
+    logger.info("coding.neighbors", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_queue(args):
+    from app.postgres_block import rebuild_coding_queue
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = rebuild_coding_queue(clients.postgres, args.project or "default")
+    finally:
+        clients.close()
+    logger.info("coding.queue_rebuild", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_curve(args):
+    from app.postgres_block import rebuild_code_curve
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = rebuild_code_curve(clients.postgres, args.project or "default")
+    finally:
+        clients.close()
+    logger.info("coding.curve_rebuild", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_cooccurrence(args):
+    from app.postgres_block import rebuild_code_cooccurrence
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = rebuild_code_cooccurrence(clients.postgres, args.project or "default")
+    finally:
+        clients.close()
+    logger.info("coding.cooccurrence_rebuild", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_embed_codes(args):
+    from app.code_embeddings import sync_code_embeddings
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = sync_code_embeddings(clients, settings, args.project or "default", logger=logger)
+    finally:
+        clients.close()
+    logger.info("coding.embed_codes", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+def cmd_coding_trgm_setup(args):
+    from app.postgres_block import setup_candidate_codes_trgm
+
+    logger = args.logger
+    settings, clients = build_context(args.env)
+    try:
+        result = {"pg_trgm": setup_candidate_codes_trgm(clients.postgres)}
+    finally:
+        clients.close()
+    logger.info("coding.trgm_setup", etapa="etapa3_codificacion", **result)
+    if getattr(args, "json", False):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
 def cmd_coding_stats(args):
     logger = args.logger
     settings, clients = build_context(args.env)
@@ -1263,6 +1398,7 @@ def cmd_validation_outliers(args):
             limit=args.limit,
             neighbor_k=args.neighbors,
             threshold=args.threshold,
+            full_project=args.full_project,
         )
     finally:
         clients.close()
@@ -1544,6 +1680,13 @@ def build_parser() -> argparse.ArgumentParser:
     )
     p_status.set_defaults(func=cmd_status, no_update=False)
 
+    p_dashboard = sub.add_parser("dashboard", help="Mantenimiento de contadores del dashboard")
+    dashboard_sub = p_dashboard.add_subparsers(dest="dashboard_command", required=True)
+    pd_reconcile = dashboard_sub.add_parser("reconcile", help="Recalcula los contadores desde las tablas de origen")
+    pd_reconcile.add_argument("--all-projects", action="store_true", help="Reconcilia todos los proyectos")
+    pd_reconcile.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pd_reconcile.set_defaults(func=cmd_dashboard_reconcile, dashboard_command="reconcile")
+
     p_project = sub.add_parser("project", help="Gestion de proyectos")
     project_sub = p_project.add_subparsers(dest="project_command", required=True)
 
@@ -1629,6 +1772,35 @@ def build_parser() -> argparse.ArgumentParser:
     pc_suggest.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
     pc_suggest.set_defaults(func=cmd_coding_suggest, coding_command='suggest')
 
+    pc_sync = coding_sub.add_parser("sync-coded", help="Recalcula el flag coded/code_count en Qdrant")
+    pc_sync.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_sync.set_defaults(func=cmd_coding_sync_coded, coding_command='sync-coded')
+
+    pc_neighbors = coding_sub.add_parser("neighbors", help="Materializa el grafo k-NN de fragmentos del proyecto")
+    pc_neighbors.add_argument("--k", type=int, default=DEFAULT_NEIGHBOR_K, help="Vecinos almacenados por fragmento")
+    pc_neighbors.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_neighbors.set_defaults(func=cmd_coding_neighbors, coding_command='neighbors')
+
+    pc_queue = coding_sub.add_parser("rebuild-queue", help="Reconstruye la cola de fragmentos pendientes de codificar")
+    pc_queue.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_queue.set_defaults(func=cmd_coding_queue, coding_command='rebuild-queue')
+
+    pc_curve = coding_sub.add_parser("rebuild-curve", help="Reconstruye la curva de saturación materializada")
+    pc_curve.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_curve.set_defaults(func=cmd_coding_curve, coding_command='rebuild-curve')
+
+    pc_cooc = coding_sub.add_parser("rebuild-cooccurrence", help="Reconstruye la tabla de co-ocurrencia de códigos")
+    pc_cooc.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_cooc.set_defaults(func=cmd_coding_cooccurrence, coding_command='rebuild-cooccurrence')
+
+    pc_embed = coding_sub.add_parser("embed-codes", help="Sincroniza los embeddings del catálogo de códigos (duplicados semánticos)")
+    pc_embed.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_embed.set_defaults(func=cmd_coding_embed_codes, coding_command='embed-codes')
+
+    pc_trgm = coding_sub.add_parser("trgm-setup", help="Crea el índice trigram de candidatos (motor post-hoc pg_trgm)")
+    pc_trgm.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
+    pc_trgm.set_defaults(func=cmd_coding_trgm_setup, coding_command='trgm-setup')
+
     pc_stats = coding_sub.add_parser("stats", help="Resumen de cobertura de codificación")
     pc_stats.add_argument("--json", action="store_true", help="Imprime salida en formato JSON")
     pc_stats.set_defaults(func=cmd_coding_stats, coding_command='stats')
@@ -1780,6 +1952,7 @@ def build_parser() -> argparse.ArgumentParser:
     pv_out.add_argument("--limit", type=int, default=25, help="Cantidad de fragmentos recientes a analizar si no se pasan IDs")
     pv_out.add_argument("--neighbors", type=int, default=2, help="Número de vecinos a consultar en Qdrant")
     pv_out.add_argument("--threshold", type=float, default=0.8, help="Umbral mínimo de score para no considerar outlier")
+    pv_out.add_argument("--full-project", action="store_true", help="Evalúa todos los fragmentos del proyecto con similitud exacta en memoria")
     pv_out.set_defaults(func=cmd_validation_outliers, validation_command='outliers')
 
     pv_overlap = validation_sub.add_parser("overlap", help="Triangulación de categorías por fuente en Neo4j")
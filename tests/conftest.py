@@ -6,6 +6,7 @@ import os
 from typing import Any, Dict
 
 os.environ.setdefault("NEO4J_API_KEY", "test-key")
+os.environ.setdefault("TASK_REGISTRY_BACKEND", "memory")
 
 
 def _passthrough_processor(*_args, **_kwargs):
@@ -242,3 +243,137 @@ if "rapidfuzz" not in sys.modules:
 
     sys.modules["rapidfuzz"] = rapidfuzz
     sys.modules["rapidfuzz.distance"] = distance
+
+
+# ---------------------------------------------------------------------------
+# Fixtures de PostgreSQL
+# ---------------------------------------------------------------------------
+#
+# `fake_pg` es el doble MagicMock de una conexión psycopg2 que usan los tests
+# de SQL; `pg_conn` abre una base de datos desechable en un PostgreSQL real
+# (TEST_DATABASE_URL, p.ej. postgresql://postgres@localhost/postgres) para los
+# tests de triggers y tablas mantenidas. Sin TEST_DATABASE_URL se omiten.
+
+import uuid  # noqa: E402
+from unittest.mock import MagicMock  # noqa: E402
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def fake_pg():
+    """Fábrica `(pg, cursor)`: `fetchone`/`fetchall` son los resultados sucesivos."""
+
+    def factory(*, fetchone=None, fetchall=None):
+        pg = MagicMock()
+        cur = pg.cursor.return_value.__enter__.return_value
+        if fetchone is not None:
+            cur.fetchone.side_effect = list(fetchone)
+        if fetchall is not None:
+            cur.fetchall.side_effect = list(fetchall)
+        return pg, cur
+
+    return factory
+
+
+def _reset_postgres_block_state(monkeypatch) -> None:
+    """Olvida las marcas de DDL aplicado y cachés de proceso de `postgres_block`."""
+    from app import postgres_block as pb
+
+    annotated = getattr(pb, "__annotations__", {})
+    for name in dir(pb):
+        if name.startswith("_") and name.endswith(("_ready", "_ensured", "_created", "_migrated")):
+            monkeypatch.setattr(pb, name, None if name in annotated else False)
+    if hasattr(pb, "invalidate_code_alias_closure"):
+        pb.invalidate_code_alias_closure()
+
+
+@pytest.fixture
+def pg_dsn(monkeypatch):
+    """DSN de una base de datos temporal creada para el test (y borrada al final)."""
+    psycopg2 = pytest.importorskip("psycopg2")
+    from psycopg2.extensions import make_dsn, parse_dsn
+
+    base = os.getenv("TEST_DATABASE_URL", "").strip()
+    if not base:
+        pytest.skip("TEST_DATABASE_URL no definido")
+    try:
+        admin = psycopg2.connect(base)
+    except Exception as exc:  # noqa: BLE001
+        pytest.skip(f"PostgreSQL no disponible: {exc}")
+    admin.autocommit = True
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE "{name}"')
+    params = parse_dsn(base)
+    params["dbname"] = name
+    dsn = make_dsn(**params)
+    # entrevista_fragmentos usa VECTOR(n): pgvector es requisito del esquema.
+    setup = psycopg2.connect(dsn)
+    setup.autocommit = True
+    try:
+        with setup.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    except Exception as exc:  # noqa: BLE001
+        setup.close()
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        admin.close()
+        pytest.skip(f"pgvector no disponible: {exc}")
+    setup.close()
+    _reset_postgres_block_state(monkeypatch)
+    try:
+        yield dsn
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        admin.close()
+        if "app.postgres_block" in sys.modules:
+            sys.modules["app.postgres_block"].invalidate_code_alias_closure()
+
+
+@pytest.fixture
+def pg_conn(pg_dsn):
+    """Conexión psycopg2 a la base temporal de `pg_dsn`."""
+    import psycopg2
+
+    conn = psycopg2.connect(pg_dsn)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def pg_insert(pg_conn):
+    """`insert(tabla, filas)`: inserta dicts (mismas claves) y hace commit."""
+    from psycopg2.extras import execute_values
+
+    def insert(table, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        columns = list(rows[0])
+        with pg_conn.cursor() as cur:
+            execute_values(
+                cur,
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                [tuple(row[c] for c in columns) for row in rows],
+            )
+        pg_conn.commit()
+
+    return insert
+
+
+@pytest.fixture
+def pg_select(pg_conn):
+    """`select(sql, params)`: filas ordenadas (para comparar tablas mantenidas)."""
+
+    def select(sql, params=None):
+        with pg_conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        pg_conn.commit()
+        return sorted(tuple(row) for row in rows)
+
+    return select
@@ -0,0 +1,100 @@
+"""Tests para la betweenness por muestreo y su caché stale-while-revalidate."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import networkx as nx
+import pytest
+
+from app import axial
+from app import graph_algorithms as ga_mod
+from app.graph_algorithms import GraphSnapshot, approximate_betweenness, betweenness_sample_size
+
+
+def _snapshot(n, m, seed):
+    G = nx.relabel_nodes(nx.gnm_random_graph(n, m, seed=seed, directed=True), str)
+    props = {nid: {"nombre": nid, "etiquetas": ["Codigo"]} for nid in G}
+    return GraphSnapshot(G, props, project_id="p1", version=1)
+
+
+@pytest.mark.parametrize("use_scipy", [True, False], ids=["scipy", "numpy"])
+def test_small_graph_is_exact(monkeypatch, use_scipy):
+    monkeypatch.setattr(ga_mod, "SCIPY_AVAILABLE", use_scipy and ga_mod.SCIPY_AVAILABLE)
+    snap = _snapshot(80, 320, seed=4)
+    scores, info = approximate_betweenness(snap)
+    expected = nx.betweenness_centrality(snap.graph)
+
+    assert info["exact"] and info["sample_size"] == 80
+    assert [scores[snap.index[n]] for n in snap.graph] == pytest.approx(
+        [expected[n] for n in snap.graph], abs=1e-12
+    )
+
+
+def test_sampled_scores_within_error_bound():
+    snap = _snapshot(600, 2400, seed=9)
+    scores, info = approximate_betweenness(snap, epsilon=0.2, seed=1)
+    expected = nx.betweenness_centrality(snap.graph)
+
+    assert info["sample_size"] == betweenness_sample_size(600, 0.2, 0.1) < 600
+    assert not info["exact"]
+    assert max(abs(scores[snap.index[n]] - expected[n]) for n in snap.graph) <= info["error_bound"]
+
+
+def test_time_budget_stops_between_batches():
+    snap = _snapshot(600, 2400, seed=9)
+    _, info = approximate_betweenness(snap, epsilon=0.05, time_budget=0.0, seed=1)
+
+    assert info["budget_exhausted"]
+    assert info["sample_size"] == ga_mod._BETWEENNESS_BATCH
+    assert info["error_bound"] > 0.05
+
+
+def _cached(version, **params):
+    return {
+        "graph_version": version,
+        "params": params,
+        "results": [{"nombre": "a", "score": 0.5}],
+        "computed_at": "2026-01-01T00:00:00",
+        "refreshing": False,
+    }
+
+
+def test_stale_result_is_served_and_refresh_scheduled():
+    clients = SimpleNamespace(postgres=MagicMock())
+    schedule = MagicMock()
+    with patch.object(axial, "get_graph_version", return_value=4), \
+         patch.object(axial, "fetch_graph_metric", return_value=_cached(3)), \
+         patch.object(axial, "claim_graph_metric_refresh", return_value=True), \
+         patch.object(axial, "compute_betweenness_cache") as compute:
+        result = axial.betweenness_stale_while_revalidate(clients, None, "p1", schedule_refresh=schedule)
+
+    compute.assert_not_called()
+    schedule.assert_called_once_with("p1")
+    assert result["stale"] and result["refreshing"]
+    assert result["results"][0]["nombre"] == "a"
+
+
+def test_fresh_result_skips_refresh():
+    clients = SimpleNamespace(postgres=MagicMock())
+    schedule = MagicMock()
+    with patch.object(axial, "get_graph_version", return_value=3), \
+         patch.object(axial, "fetch_graph_metric", return_value=_cached(3, exact=True)), \
+         patch.object(axial, "claim_graph_metric_refresh") as claim:
+        result = axial.betweenness_stale_while_revalidate(clients, None, "p1", schedule_refresh=schedule)
+
+    claim.assert_not_called()
+    schedule.assert_not_called()
+    assert not result["stale"]
+
+
+def test_missing_result_is_computed_with_budget():
+    clients = SimpleNamespace(postgres=MagicMock())
+    payload = {"results": [], "info": {"budget_exhausted": False}, "refreshing": False}
+    with patch.object(axial, "get_graph_version", return_value=3), \
+         patch.object(axial, "fetch_graph_metric", return_value=None), \
+         patch.object(axial, "compute_betweenness_cache", return_value=payload) as compute:
+        axial.betweenness_stale_while_revalidate(clients, None, "p1", schedule_refresh=MagicMock())
+
+    assert compute.call_args.kwargs["time_budget"] == axial.BETWEENNESS_SYNC_BUDGET_SECONDS
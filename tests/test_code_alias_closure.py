@@ -0,0 +1,113 @@
+"""Tests para el cierre de alias cacheado (resolución de códigos canónicos)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app import postgres_block as pb
+
+
+@pytest.fixture
+def ready(monkeypatch):
+    monkeypatch.setattr(pb, "_codes_catalog_table_ready", True)
+    monkeypatch.setattr(pb, "_code_alias_closure_ready", True)
+    pb.invalidate_code_alias_closure()
+    yield
+    pb.invalidate_code_alias_closure()
+
+
+def test_bulk_resolution_reads_closure_once_then_hits_cache(ready, fake_pg):
+    pg, cur = fake_pg()
+    cur.fetchone.return_value = (3, 3)
+    cur.fetchall.return_value = [("organizacion", "organización comunitaria"), ("org", "organización comunitaria")]
+
+    first = pb.resolve_canonical_codigos_bulk(pg, "p1", ["org", " territorio ", "", None])
+    assert first == {"org": "organización comunitaria", "territorio": "territorio"}
+
+    cur.execute.reset_mock()
+    second = pb.resolve_canonical_codigos_bulk(pg, "p1", ["organizacion"])
+
+    assert second == {"organizacion": "organización comunitaria"}
+    assert cur.execute.call_count == 1
+    assert "code_catalog_versions" in cur.execute.call_args.args[0]
+
+
+def test_stale_closure_is_recomputed_under_row_lock(ready, fake_pg):
+    pg, cur = fake_pg(fetchone=[(5, 4), (5, 4)])
+    cur.fetchall.return_value = []
+
+    assert pb.resolve_canonical_codigos_bulk(pg, "p1", ["a"]) == {"a": "a"}
+
+    sqls = [str(call.args[0]) for call in cur.execute.call_args_list]
+    assert any("FOR UPDATE" in sql for sql in sqls)
+    assert any("WITH RECURSIVE walk" in sql for sql in sqls)
+    assert any("SET closure_version" in sql for sql in sqls)
+
+
+def test_non_default_hops_keep_walking_the_chain(ready, fake_pg):
+    pg, cur = fake_pg(fetchall=[[("a", "merged", "b")], [("b", "active", None)]])
+
+    assert pb.resolve_canonical_codigos_bulk(pg, "p1", ["a"], max_hops=3) == {"a": "b"}
+    assert all("code_alias_closure" not in str(call.args[0]) for call in cur.execute.call_args_list)
+
+
+def _catalog(codigo, status="active", canonical=None, project="p1"):
+    return {"project_id": project, "codigo": codigo, "status": status, "canonical_codigo": canonical}
+
+
+_CODES = ["a", "b", "c", "d", "e", "f", "x"]
+
+
+def _assert_closure_matches_hop_walk(pg_conn, project="p1"):
+    closure = pb.resolve_canonical_codigos_bulk(pg_conn, project, _CODES)
+    # Otro `max_hops` evita el cierre: resolución desde cero, un salto por consulta.
+    walked = pb.resolve_canonical_codigos_bulk(pg_conn, project, _CODES, max_hops=pb._ALIAS_CLOSURE_MAX_HOPS - 1)
+    assert closure == walked
+    return closure
+
+
+def test_closure_matches_hop_walk_after_catalog_writes(pg_conn, pg_insert, pg_select):
+    # El catálogo se siembra desde las citas: la tabla de codificación debe existir.
+    pb.ensure_open_coding_table(pg_conn)
+    pb.ensure_code_alias_closure(pg_conn)
+    pg_insert("catalogo_codigos", [
+        _catalog("a", "merged", "b"),
+        _catalog("b", "merged", "c"),
+        _catalog("c"),
+        _catalog("d", "merged", "c"),
+        _catalog("e"),
+        _catalog("x"),
+        _catalog("a", "merged", "x", project="p2"),
+    ])
+    assert _assert_closure_matches_hop_walk(pg_conn)["a"] == "c"
+    version = pg_select("SELECT version FROM code_catalog_versions WHERE project_id = 'p1'")
+
+    # Cambios que no tocan fusiones no invalidan el cierre.
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE catalogo_codigos SET memo = 'nota' WHERE project_id = 'p1'")
+        cur.execute("INSERT INTO catalogo_codigos (project_id, codigo) VALUES ('p1', 'g')")
+    pg_conn.commit()
+    assert pg_select("SELECT version FROM code_catalog_versions WHERE project_id = 'p1'") == version
+
+    # Nueva fusión al final de la cadena, des-fusión intermedia y borrado.
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE catalogo_codigos SET status = 'merged', canonical_codigo = 'e' WHERE codigo = 'c'")
+    pg_conn.commit()
+    assert _assert_closure_matches_hop_walk(pg_conn)["a"] == "e"
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE catalogo_codigos SET status = 'active', canonical_codigo = NULL WHERE codigo = 'b'")
+        cur.execute("DELETE FROM catalogo_codigos WHERE codigo = 'd'")
+    pg_conn.commit()
+    closure = _assert_closure_matches_hop_walk(pg_conn)
+    assert closure["a"] == "b" and closure["d"] == "d"
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE catalogo_codigos SET canonical_codigo = 'x' WHERE project_id = 'p1' AND codigo = 'a'")
+    pg_conn.commit()
+    assert _assert_closure_matches_hop_walk(pg_conn)["a"] == "x"
+    assert _assert_closure_matches_hop_walk(pg_conn, project="p2")["a"] == "x"
+    assert pg_select("SELECT codigo, canonical FROM code_alias_closure WHERE project_id = 'p1'") == [
+        ("a", "x"),
+        ("c", "e"),
+    ]
@@ -0,0 +1,166 @@
+"""Tests para la tabla de co-ocurrencia de códigos mantenida."""
+
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import patch
+
+from app import postgres_block as pb
+from app.link_prediction import _get_graph_data_from_postgres
+
+
+def test_fetch_reads_maintained_table(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_cooccurrence_ready", True)
+    pg, cur = fake_pg(fetchall=[[("a", "b", 3), ("a", "c", 2)]])
+
+    rows = pb.fetch_code_cooccurrences(pg, "p1", min_fragments=2, limit=5)
+
+    sql, params = cur.execute.call_args.args
+    assert "FROM code_cooccurrence" in sql
+    assert "analisis_codigos_abiertos" not in sql
+    assert params == {"project": "p1", "min": 2, "limit": 5}
+    assert rows == [("a", "b", 3), ("a", "c", 2)]
+
+
+def test_fetch_falls_back_to_self_join(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_cooccurrence_ready", False)
+    pg, cur = fake_pg(fetchall=[[("a", "b", 2)]])
+
+    rows = pb.fetch_code_cooccurrences(pg, "p1", min_fragments=2)
+
+    sql = cur.execute.call_args.args[0]
+    assert "JOIN analisis_codigos_abiertos b" in sql
+    assert "LIMIT" not in sql
+    assert rows == [("a", "b", 2)]
+
+
+def test_rebuild_refills_only_the_project(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_cooccurrence_ready", True)
+    pg, cur = fake_pg()
+    cur.fetchone.return_value = (4, 9)
+
+    assert pb.rebuild_code_cooccurrence(pg, "p1") == {"pares": 4, "coocurrencias": 9}
+
+    sqls = [call.args[0] for call in cur.execute.call_args_list]
+    assert sqls[0].startswith("DELETE FROM code_cooccurrence")
+    assert "WHERE a.project_id = %(project)s" in sqls[1]
+    pg.commit.assert_called_once()
+
+
+def test_link_prediction_adjacency_uses_table(fake_pg):
+    pg, _cur = fake_pg(fetchall=[[("Cat", "cod1", "causa")]])
+    with patch("app.postgres_block.ensure_codes_catalog_table"), \
+         patch("app.postgres_block.resolve_canonical_codigos_bulk", side_effect=lambda _pg, _p, codes: {}), \
+         patch("app.postgres_block.fetch_code_cooccurrences", return_value=[("cod1", "cod2", 3)]) as fetch:
+        adjacency, node_types = _get_graph_data_from_postgres(pg, "p1")
+
+    fetch.assert_called_once_with(pg, "p1", min_fragments=2)
+    assert adjacency["cod1"] == {"Cat", "cod2"}
+    assert node_types["cod2"] == "Codigo"
+
+
+def _code(fid, codigo, project="p1"):
+    return {"project_id": project, "fragmento_id": fid, "codigo": codigo, "archivo": "a.docx", "cita": "cita"}
+
+
+_TABLE_SQL = "SELECT project_id, code_a, code_b, weight, fragments FROM code_cooccurrence"
+
+
+def _assert_matches_rebuild(pg_conn, pg_select, projects=("p1", "p2")):
+    """La tabla mantenida por triggers es igual a la recalculada con la consulta de relleno."""
+    maintained = pg_select(_TABLE_SQL)
+    for project in projects:
+        pb.rebuild_code_cooccurrence(pg_conn, project)
+    assert maintained == pg_select(_TABLE_SQL)
+    return maintained
+
+
+def test_table_matches_recompute_after_writes(pg_conn, pg_insert, pg_select):
+    assert pb.ensure_code_cooccurrence(pg_conn) is True
+    pg_insert("analisis_codigos_abiertos", [
+        _code("f1", "a"),
+        _code("f1", "b"),
+        _code("f1", "c"),
+        _code("f2", "a"),
+        _code("f2", "b"),
+        _code("f3", "d"),
+        _code("g1", "a", project="p2"),
+        _code("g1", "b", project="p2"),
+    ])
+    assert ("p1", "a", "b", 2.0, 2) in _assert_matches_rebuild(pg_conn, pg_select)
+
+    # Unassign.
+    pg_insert("analisis_codigos_abiertos", [_code("f3", "a")])
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE fragmento_id = 'f1' AND codigo = 'c'")
+    pg_conn.commit()
+    _assert_matches_rebuild(pg_conn, pg_select)
+
+    # Fusión 'b' -> 'd': borra la cita duplicada del fragmento y renombra el resto.
+    with pg_conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM analisis_codigos_abiertos a
+             WHERE a.project_id = 'p1' AND a.codigo = 'b'
+               AND EXISTS (SELECT 1 FROM analisis_codigos_abiertos d
+                            WHERE d.project_id = a.project_id AND d.fragmento_id = a.fragmento_id AND d.codigo = 'd')
+            """
+        )
+        cur.execute("UPDATE analisis_codigos_abiertos SET codigo = 'd' WHERE project_id = 'p1' AND codigo = 'b'")
+    pg_conn.commit()
+    _assert_matches_rebuild(pg_conn, pg_select)
+
+    # Sólo memo/cita: no cambia ningún par.
+    before = pg_select("SELECT project_id, code_a, code_b, fragments, updated_at FROM code_cooccurrence")
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET memo = 'nota', cita = 'otra'")
+    pg_conn.commit()
+    assert pg_select("SELECT project_id, code_a, code_b, fragments, updated_at FROM code_cooccurrence") == before
+    _assert_matches_rebuild(pg_conn, pg_select)
+
+
+def test_concurrent_writes_to_one_fragment_keep_their_pair(pg_dsn, pg_conn, pg_insert, pg_select):
+    import psycopg2
+
+    assert pb.ensure_code_cooccurrence(pg_conn) is True
+    first = psycopg2.connect(pg_dsn)
+    second = psycopg2.connect(pg_dsn)
+    errors = []
+
+    def _assign_b():
+        try:
+            with second.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO analisis_codigos_abiertos (project_id, fragmento_id, codigo, archivo, cita) "
+                    "VALUES ('p1', 'f1', 'b', 'a.docx', 'cita')"
+                )
+            second.commit()
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    try:
+        with first.cursor() as cur:
+            cur.execute(
+                "INSERT INTO analisis_codigos_abiertos (project_id, fragmento_id, codigo, archivo, cita) "
+                "VALUES ('p1', 'f1', 'a', 'a.docx', 'cita')"
+            )
+        worker = threading.Thread(target=_assign_b)
+        worker.start()
+        # La segunda transacción espera el lock del fragmento (sin él terminaría
+        # antes del commit de la primera, sin ver la cita 'a').
+        deadline = time.monotonic() + 10
+        while worker.is_alive() and time.monotonic() < deadline:
+            waiting = pg_select("SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND NOT granted")
+            if waiting[0][0]:
+                break
+            time.sleep(0.05)
+        first.commit()
+        worker.join(timeout=10)
+    finally:
+        first.close()
+        second.close()
+
+    assert not errors
+    assert pg_select(_TABLE_SQL) == [("p1", "a", "b", 1.0, 1)]
+    _assert_matches_rebuild(pg_conn, pg_select, projects=("p1",))
@@ -0,0 +1,195 @@
+"""Tests para la curva de saturación materializada."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from app import postgres_block as pb
+
+
+def test_curve_read_serves_stored_rows(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_curve_ready", True)
+    rows = [(1, "a.docx", 4, 4, 4), (2, "b.docx", 3, 1, 5)]
+    pg, cur = fake_pg(fetchall=[rows])
+
+    curve = pb.cumulative_code_curve(pg, "p1")
+
+    sqls = [call.args[0] for call in cur.execute.call_args_list]
+    assert len(sqls) == 1
+    assert "interview_code_novelty" in sqls[0]
+    assert not any("code_curve_state" in sql or "analisis_codigos_abiertos" in sql for sql in sqls)
+    pg.commit.assert_not_called()
+    assert curve[1]["porcentaje_nuevos"] == 1 / 3
+    assert curve[1]["porcentaje_cobertura"] == 1.0
+    assert pb.evaluate_curve_plateau(curve, window=1, threshold=1)["plateau"] is True
+
+
+def test_dirty_curve_materializes_once(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_curve_ready", True)
+    pg, cur = fake_pg(fetchone=[(1,)])
+
+    assert pb.refresh_code_curve(pg, "p1") is True
+
+    claim_sql = cur.execute.call_args_list[0].args[0]
+    assert "SKIP LOCKED" in claim_sql
+    materialize_sql = cur.execute.call_args_list[-1].args[0]
+    assert "code_archivo_stats" in materialize_sql
+    assert "IS DISTINCT FROM" in materialize_sql
+    assert "dirty = FALSE" in materialize_sql
+    pg.commit.assert_called_once()
+
+
+def test_claimed_or_clean_curve_is_not_materialized(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_code_curve_ready", True)
+    pg, cur = fake_pg(fetchone=[None])
+
+    assert pb.refresh_code_curve(pg, "p1") is False
+    assert cur.execute.call_count == 1
+
+
+# Consulta previa a la materialización: recalcula la curva desde las citas.
+_LEGACY_CURVE_SQL = """
+WITH interview_order AS (
+    SELECT
+        archivo,
+        MIN(created_at) AS first_seen,
+        ROW_NUMBER() OVER (ORDER BY MIN(created_at), archivo) AS interview_idx
+    FROM analisis_codigos_abiertos
+    WHERE project_id = %s
+    GROUP BY archivo
+),
+first_code AS (
+    SELECT DISTINCT ON (codigo)
+        codigo,
+        archivo AS first_archivo
+    FROM analisis_codigos_abiertos
+    WHERE project_id = %s
+    ORDER BY codigo, created_at, archivo
+),
+per_interview AS (
+    SELECT
+        io.interview_idx,
+        io.archivo,
+        COUNT(DISTINCT aca.codigo) AS codigos_totales,
+        COUNT(DISTINCT CASE WHEN fc.first_archivo = io.archivo THEN aca.codigo END) AS nuevos_codigos
+    FROM interview_order io
+    LEFT JOIN analisis_codigos_abiertos aca
+      ON aca.archivo = io.archivo
+     AND aca.project_id = %s
+    LEFT JOIN first_code fc
+      ON fc.codigo = aca.codigo
+    GROUP BY io.interview_idx, io.archivo
+)
+SELECT
+    interview_idx,
+    archivo,
+    codigos_totales,
+    nuevos_codigos,
+    SUM(nuevos_codigos) OVER (ORDER BY interview_idx) AS codigos_acumulados
+FROM per_interview
+ORDER BY interview_idx
+"""
+
+_T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _code(fid, codigo, archivo, minutes, project="p1"):
+    return {
+        "project_id": project,
+        "fragmento_id": fid,
+        "codigo": codigo,
+        "archivo": archivo,
+        "cita": "cita",
+        "created_at": _T0 + timedelta(minutes=minutes),
+    }
+
+
+def _assert_curve_matches_legacy(pg_conn, pg_select, project="p1"):
+    pb.refresh_code_curve(pg_conn, project)
+    curve = [
+        (item["interview_idx"], item["archivo"], item["codigos_totales"], item["nuevos_codigos"], item["codigos_acumulados"])
+        for item in pb.cumulative_code_curve(pg_conn, project)
+    ]
+    assert curve == pg_select(_LEGACY_CURVE_SQL, (project, project, project))
+
+
+def test_curve_matches_legacy_sql_after_writes(pg_conn, pg_insert, pg_select):
+    pb.ensure_code_curve(pg_conn)
+    pg_insert("analisis_codigos_abiertos", [
+        _code("a1", "confianza", "a.docx", 0),
+        _code("a2", "territorio", "a.docx", 1),
+        _code("b1", "confianza", "b.docx", 10),
+        _code("b2", "miedo", "b.docx", 11),
+        _code("c1", "miedo", "c.docx", 20),
+        _code("c2", "red", "c.docx", 21),
+        _code("x1", "confianza", "a.docx", 5, project="p2"),
+    ])
+    _assert_curve_matches_legacy(pg_conn, pg_select)
+
+    # Asignación: un código nuevo en la última entrevista y otra cita de uno existente.
+    pg_insert("analisis_codigos_abiertos", [_code("c3", "rabia", "c.docx", 22), _code("b3", "confianza", "b.docx", 12)])
+    _assert_curve_matches_legacy(pg_conn, pg_select)
+
+    # Unassign: b.docx pierde la única cita de 'miedo' y deja de ser su primera aparición.
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE project_id = 'p1' AND fragmento_id = 'b2'")
+    pg_conn.commit()
+    _assert_curve_matches_legacy(pg_conn, pg_select)
+
+    # Reorden: c.docx pasa a ser la primera entrevista.
+    with pg_conn.cursor() as cur:
+        cur.execute(
+            "UPDATE analisis_codigos_abiertos SET created_at = created_at - INTERVAL '1 day' "
+            "WHERE project_id = 'p1' AND archivo = 'c.docx'"
+        )
+    pg_conn.commit()
+    _assert_curve_matches_legacy(pg_conn, pg_select)
+    assert pb.cumulative_code_curve(pg_conn, "p1")[0]["archivo"] == "c.docx"
+
+    # Merge: 'territorio' se fusiona en 'confianza' (renombre de código).
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET codigo = 'confianza' WHERE codigo = 'territorio'")
+    pg_conn.commit()
+    _assert_curve_matches_legacy(pg_conn, pg_select)
+    _assert_curve_matches_legacy(pg_conn, pg_select, project="p2")
+
+
+def test_statement_triggers_replace_row_trigger(pg_conn, pg_select):
+    pb.ensure_code_curve(pg_conn)
+    triggers = pg_select(
+        "SELECT tgname, (tgtype & 1) = 1 FROM pg_trigger WHERE tgname LIKE 'trg_aca_code_curve%%'", ()
+    )
+    assert triggers == [
+        ("trg_aca_code_curve_delete", False),
+        ("trg_aca_code_curve_insert", False),
+        ("trg_aca_code_curve_update", False),
+    ]
+
+
+def test_read_does_not_refresh_and_refresh_rewrites_only_changed_rows(pg_conn, pg_insert, pg_select):
+    pb.ensure_code_curve(pg_conn)
+    pg_insert("analisis_codigos_abiertos", [
+        _code("a1", "confianza", "a.docx", 0),
+        _code("b1", "miedo", "b.docx", 10),
+        _code("c1", "red", "c.docx", 20),
+    ])
+    assert pb.has_dirty_code_curve(pg_conn, "p1") is True
+    assert pb.cumulative_code_curve(pg_conn, "p1") == []
+    assert pb.has_dirty_code_curve(pg_conn, "p1") is True
+
+    assert pb.refresh_code_curve(pg_conn, "p1") is True
+    assert pb.refresh_code_curve(pg_conn, "p1") is False
+    versions_sql = "SELECT interview_idx, xmin::text FROM interview_code_novelty WHERE project_id = 'p1'"
+    before = dict(pg_select(versions_sql, ()))
+
+    # Otra cita de un par existente: no cambia la curva ni marca el proyecto.
+    pg_insert("analisis_codigos_abiertos", [_code("b2", "miedo", "b.docx", 12)])
+    assert pb.has_dirty_code_curve(pg_conn, "p1") is False
+
+    # Un código nuevo en la última entrevista sólo reescribe su fila.
+    pg_insert("analisis_codigos_abiertos", [_code("c2", "rabia", "c.docx", 21)])
+    assert pb.refresh_code_curve(pg_conn, "p1") is True
+    after = dict(pg_select(versions_sql, ()))
+    assert after[1] == before[1] and after[2] == before[2]
+    assert after[3] != before[3]
+    _assert_curve_matches_legacy(pg_conn, pg_select)
@@ -0,0 +1,144 @@
+"""Tests para el catálogo de códigos embebido (duplicados semánticos)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app import code_embeddings as ce
+
+
+def _settings():
+    return SimpleNamespace(
+        qdrant=SimpleNamespace(collection="fragmentos"),
+        azure=SimpleNamespace(deployment_embed="embed"),
+        embed_dims=2,
+    )
+
+
+def _response(*points):
+    return SimpleNamespace(
+        points=[SimpleNamespace(payload={"codigo": code}, score=score) for code, score in points]
+    )
+
+
+def test_sync_embeds_only_changed_codes_and_canonicalizes_pairs():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+    changed = [
+        {"codigo": "falta de confianza en el municipio", "texto": "falta de confianza en el municipio", "text_hash": "h1"},
+    ]
+    clients.qdrant.query_batch_points.return_value = [
+        _response(
+            ("falta de confianza en el municipio", 1.0),
+            ("desconfianza institucional", 0.91),
+            ("codigo fusionado", 0.88),
+        )
+    ]
+
+    with patch.object(ce, "fetch_code_embedding_diff", return_value=(changed, ["codigo fusionado"])), \
+         patch.object(ce, "embed_batch", return_value=[[0.1, 0.9]]) as embed, \
+         patch.object(ce, "ensure_collection"), \
+         patch.object(ce, "apply_code_embedding_sync", return_value=1) as apply:
+        result = ce.sync_code_embeddings(clients, _settings(), "p1")
+
+    embed.assert_called_once_with(clients.aoai, "embed", ["falta de confianza en el municipio"])
+    assert clients.qdrant.query_batch_points.call_args.kwargs["collection_name"] == "fragmentos_codes"
+    kwargs = apply.call_args.kwargs
+    assert kwargs["pairs"] == [("desconfianza institucional", "falta de confianza en el municipio", 0.91)]
+    assert kwargs["removed"] == ["codigo fusionado"]
+    assert [row[0] for row in kwargs["embedded"]] == ["falta de confianza en el municipio"]
+    clients.qdrant.delete.assert_called_once()
+    assert result["embebidos"] == 1 and result["retirados"] == 1 and result["pendientes"] == 0
+
+
+def test_sync_without_changes_skips_embeddings():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+
+    with patch.object(ce, "fetch_code_embedding_diff", return_value=([], [])), \
+         patch.object(ce, "embed_batch") as embed, \
+         patch.object(ce, "apply_code_embedding_sync") as apply:
+        result = ce.sync_code_embeddings(clients, _settings(), "p1")
+
+    embed.assert_not_called()
+    apply.assert_not_called()
+    assert result["embebidos"] == 0
+
+
+def test_semantic_matches_excludes_the_code_itself():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+    clients.qdrant.query_batch_points.return_value = [
+        _response(("desconfianza institucional", 0.99), ("falta de confianza en el municipio", 0.9)),
+    ]
+
+    with patch.object(ce, "has_code_embeddings", return_value=True), \
+         patch.object(ce, "embed_batch", return_value=[[0.2, 0.8]]) as embed:
+        result = ce.semantic_code_matches(
+            clients,
+            _settings(),
+            "p1",
+            ["desconfianza institucional", ""],
+            memos=["Recelo hacia las instituciones ", None],
+            threshold=0.85,
+        )
+
+    embed.assert_called_once_with(
+        clients.aoai, "embed", ["desconfianza institucional: Recelo hacia las instituciones"]
+    )
+    assert result == [[("falta de confianza en el municipio", 0.9)], []]
+
+
+def test_semantic_duplicate_pairs_only_reads_materialized_pairs():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+    pairs = [{"code1": "a", "code2": "b", "score": 0.9}]
+
+    with patch.object(ce, "fetch_code_semantic_pairs", return_value=pairs) as fetch, \
+         patch.object(ce, "sync_code_embeddings") as sync:
+        assert ce.semantic_duplicate_pairs(clients, "p1", threshold=0.8) == pairs
+
+    sync.assert_not_called()
+    fetch.assert_called_once_with(clients.postgres, "p1", threshold=0.8, limit=50)
+
+
+def test_catalog_text_uses_the_prehoc_template(pg_conn, pg_insert):
+    from app.postgres_block import ensure_code_embedding_tables, ensure_open_coding_table, fetch_code_embedding_diff
+
+    ensure_open_coding_table(pg_conn)
+    ensure_code_embedding_tables(pg_conn)
+    pg_insert("catalogo_codigos", [
+        {"project_id": "p1", "codigo": "desconfianza institucional", "memo": " Recelo hacia las instituciones "},
+        {"project_id": "p1", "codigo": "territorio", "memo": ""},
+        {"project_id": "p1", "codigo": "red de apoyo", "memo": None},
+    ])
+    pg_insert("codigos_candidatos", [
+        {"project_id": "p1", "codigo": "miedo", "fuente_origen": "llm", "estado": "pendiente"},
+    ])
+
+    changed, removed = fetch_code_embedding_diff(pg_conn, "p1")
+
+    assert removed == []
+    assert {row["codigo"]: row["texto"] for row in changed} == {
+        codigo: ce.code_embedding_text(codigo, memo)
+        for codigo, memo in [
+            ("desconfianza institucional", " Recelo hacia las instituciones "),
+            ("territorio", ""),
+            ("red de apoyo", None),
+            ("miedo", None),
+        ]
+    }
+
+
+def test_code_embedding_sync_follows_runner_executor(monkeypatch):
+    from backend import app as backend_app
+
+    background = MagicMock()
+    settings = _settings()
+    with patch.object(backend_app, "task_sync_code_embeddings") as task:
+        monkeypatch.setenv("RUNNER_EXECUTOR", "inline")
+        backend_app._schedule_code_embedding_sync(background, settings, "p1")
+        background.add_task.assert_called_once_with(backend_app._sync_code_embeddings_task, "p1", settings)
+        task.delay.assert_not_called()
+
+        monkeypatch.setenv("RUNNER_EXECUTOR", "celery")
+        backend_app._schedule_code_embedding_sync(background, settings, "p1")
+        task.delay.assert_called_once_with("p1")
+        assert background.add_task.call_count == 1
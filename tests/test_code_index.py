@@ -0,0 +1,99 @@
+"""Tests para el índice vectorizado de similitud de códigos (Pre-Hoc)."""
+
+from __future__ import annotations
+
+import random
+
+from app import code_normalization as cn
+from app import postgres_block as pb
+
+
+def _catalog(n=400, seed=3):
+    rng = random.Random(seed)
+    words = "organizacion social territorio genero enfoque de la participacion vivienda salud agua riesgo red apoyo".split()
+    codes = []
+    for _ in range(n):
+        code = "_".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        if rng.random() < 0.3:
+            code = code.replace("o", "ó", 1)
+        codes.append(code)
+    return list(dict.fromkeys(codes))
+
+
+def test_match_batch_matches_find_similar_codes():
+    catalog = _catalog()
+    queries = _catalog(n=40, seed=9) + ["", "organizacion", "zzz"]
+    index = cn.CodeIndex(catalog)
+
+    for threshold in (0.7, 0.85):
+        batch, stats = index.match_batch(queries, threshold=threshold, limit=3)
+        expected = [cn.find_similar_codes(q, catalog, threshold=threshold, limit=3) for q in queries]
+        assert batch == expected
+        assert stats["queries"] == len(queries) - 1
+        skipped = stats["skipped_len_prefilter"] + stats["skipped_similarity"] + stats["skipped_token_overlap"]
+        assert skipped + stats["kept"] == stats["comparisons"]
+
+
+def _stub_catalog(monkeypatch, versions, catalogs):
+    versions, catalogs = iter(versions), iter(catalogs)
+    fetched = []
+    monkeypatch.setattr(pb, "get_code_catalog_version", lambda pg, project_id: next(versions))
+
+    def fetch(pg, project_id):
+        fetched.append(project_id)
+        return next(catalogs)
+
+    monkeypatch.setattr(cn, "get_existing_codes_for_project", fetch)
+    return fetched
+
+
+def test_get_code_index_reads_catalog_only_when_version_changes(monkeypatch):
+    cn.invalidate_code_index()
+    base = ["organización", "territorio"]
+    fetched = _stub_catalog(monkeypatch, [1, 1, 2, 3], [base, base, base + ["género"]])
+
+    first = cn.get_code_index(object(), "p1")
+    assert cn.get_code_index(object(), "p1") is first
+    assert fetched == ["p1"]
+    # Sello nuevo con el mismo catálogo (p.ej. otra cita de un código existente): se reutiliza.
+    assert cn.get_code_index(object(), "p1") is first
+    changed = cn.get_code_index(object(), "p1")
+    assert changed is not first
+    assert len(fetched) == 3
+    assert changed.match_batch(["genero"])[0] == [[("género", 1.0)]]
+
+
+def test_get_code_index_without_versioning_compares_catalog(monkeypatch):
+    cn.invalidate_code_index()
+    base = ["organización", "territorio"]
+    fetched = _stub_catalog(monkeypatch, [None, None, None], [base, base, base + ["género"]])
+
+    first = cn.get_code_index(object(), "p1")
+    assert cn.get_code_index(object(), "p1") is first
+    assert cn.get_code_index(object(), "p1") is not first
+    assert len(fetched) == 3
+
+
+def test_catalog_version_follows_code_writes(pg_conn, pg_insert):
+    cn.invalidate_code_index()
+    assert pb.get_code_catalog_version(pg_conn, "p1") == 0
+    pg_insert("analisis_codigos_abiertos", [
+        {"project_id": "p1", "fragmento_id": "f1", "codigo": "territorio", "archivo": "a.docx", "cita": "c"},
+    ])
+    index = cn.get_code_index(pg_conn, "p1")
+    assert index.codes == ["territorio"]
+    version = pb.get_code_catalog_version(pg_conn, "p1")
+
+    # Cambios que no tocan el catálogo no invalidan el índice.
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET cita = 'otra' WHERE project_id = 'p1'")
+    pg_conn.commit()
+    assert pb.get_code_catalog_version(pg_conn, "p1") == version
+    assert cn.get_code_index(pg_conn, "p1") is index
+
+    pg_insert("codigos_candidatos", [
+        {"project_id": "p1", "codigo": "territorios", "fuente_origen": "llm", "estado": "pendiente"},
+    ])
+    assert pb.get_code_catalog_version(pg_conn, "p1") > version
+    assert sorted(cn.get_code_index(pg_conn, "p1").codes) == ["territorio", "territorios"]
+    assert pb.get_code_catalog_version(pg_conn, "p2") == 0
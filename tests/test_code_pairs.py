@@ -0,0 +1,66 @@
+"""Tests para el top-k de pares similares con bloqueo por bigramas."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+from app.code_normalization import (
+    _levenshtein_distance,
+    _token_overlap_ok,
+    find_similar_code_pairs,
+    normalize_code,
+)
+
+_WORDS = ["confianza", "institucional", "red", "apoyo", "vecinal", "genero", "territorio", "organizacion", "memoria", "conflicto"]
+
+
+def _catalog(n, seed=11):
+    rng = random.Random(seed)
+    codes = set()
+    while len(codes) < n:
+        words = rng.sample(_WORDS, rng.randint(1, 3))
+        code = "_".join(words)
+        if rng.random() < 0.5:
+            pos = rng.randrange(len(code))
+            code = code[:pos] + rng.choice("aeiousz") + code[pos + 1:]
+        codes.add(normalize_code(code))
+    return sorted(codes)
+
+
+@pytest.fixture(scope="module")
+def scanned():
+    norms = _catalog(150)
+    distances = [
+        (a, b, _levenshtein_distance(a, b))
+        for i, a in enumerate(norms)
+        for b in norms[i + 1:]
+    ]
+    return norms, distances
+
+
+def _exhaustive(distances, threshold, limit):
+    pairs = []
+    for a, b, distance in distances:
+        similarity = 1 - distance / max(len(a), len(b))
+        if distance > 0 and similarity >= threshold and _token_overlap_ok(a, b):
+            c1, c2 = sorted((a, b))
+            pairs.append((c1, c2, distance, similarity))
+    pairs.sort(key=lambda p: (-p[3], p[0], p[1]))
+    return pairs[:limit]
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.8, 0.9])
+def test_pairs_match_exhaustive_scan(scanned, threshold):
+    norms, distances = scanned
+    pairs, stats = find_similar_code_pairs(norms, threshold=threshold, limit=40)
+
+    assert pairs == _exhaustive(distances, threshold, 40)
+    assert stats["comparisons"] <= stats["pairs_total"]
+
+
+def test_pairs_skip_most_comparisons_at_default_threshold(scanned):
+    norms, _ = scanned
+    _, stats = find_similar_code_pairs(norms, threshold=0.8, limit=50)
+
+    assert stats["comparisons"] < stats["pairs_total"] // 10
@@ -0,0 +1,82 @@
+"""Tests para la exclusión de fragmentos codificados vía payload `coded` en Qdrant."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.coding import _build_qdrant_filter, suggest_similar_fragments
+from app.qdrant_block import set_fragment_coded_state
+
+
+def test_filter_excludes_coded_and_seed_server_side():
+    q_filter = _build_qdrant_filter({}, "p1", exclude_coded=True, exclude_ids=["seed"])
+    keys = [getattr(cond, "key", None) for cond in q_filter.must_not]
+    assert "coded" in keys
+    assert any(getattr(cond, "has_id", None) == ["seed"] for cond in q_filter.must_not)
+
+
+def test_set_fragment_coded_state_groups_by_count():
+    client = MagicMock()
+    updated = set_fragment_coded_state(client, "col", {"a": 0, "b": 2, "c": 2})
+
+    assert updated == 3
+    payloads = {
+        call.kwargs["payload"]["code_count"]: sorted(call.kwargs["points"])
+        for call in client.set_payload.call_args_list
+    }
+    assert payloads == {0: ["a"], 2: ["b", "c"]}
+
+
+def test_suggest_similar_fragments_single_query_without_pg_exclusions():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock())
+    settings = SimpleNamespace(qdrant=SimpleNamespace(collection="fragmentos"))
+    clients.qdrant.query_points.return_value = SimpleNamespace(
+        points=[SimpleNamespace(id=f"f{i}", score=0.9 - i * 0.1, payload={"archivo": "a"}) for i in range(3)]
+    )
+    fragment = {"embedding": [0.1, 0.2], "fragmento": "texto"}
+
+    with patch("app.coding.fetch_fragment_by_id", return_value=fragment):
+        result = suggest_similar_fragments(clients, settings, "seed", top_k=3, project="p1")
+
+    clients.qdrant.query_points.assert_called_once()
+    assert clients.qdrant.query_points.call_args.kwargs["limit"] == 3
+    assert [s["fragmento_id"] for s in result["suggestions"]] == ["f0", "f1", "f2"]
+
+
+def test_reingest_restores_coded_payload():
+    from app import ingestion
+
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), neo4j=MagicMock(), aoai=MagicMock(), embed_dims=2)
+    settings = SimpleNamespace(
+        qdrant=SimpleNamespace(collection="fragmentos"),
+        neo4j=SimpleNamespace(database="neo4j"),
+        azure=SimpleNamespace(deployment_embed="emb"),
+    )
+    fragments = [
+        SimpleNamespace(text=f"texto {i}", speaker="interviewee", interviewer_tokens=0, interviewee_tokens=20)
+        for i in range(2)
+    ]
+    ids = [ingestion.make_fragment_id("e1.docx", i) for i in range(2)]
+
+    with patch("app.project_state.get_project", return_value={"id": "p1"}), \
+         patch.object(ingestion, "ensure_collection"), \
+         patch.object(ingestion, "ensure_payload_indexes"), \
+         patch.object(ingestion, "ensure_fragment_table"), \
+         patch.object(ingestion, "ensure_neo4j_constraints", side_effect=RuntimeError("sin neo4j")), \
+         patch.object(ingestion, "load_fragment_records", return_value=SimpleNamespace(fragments=fragments, stats={})), \
+         patch.object(ingestion, "embed_batch", side_effect=lambda *a, **k: [[0.1, 0.2] for _ in a[2]]), \
+         patch.object(ingestion, "insert_fragments"), \
+         patch.object(ingestion, "upsert"), \
+         patch.object(ingestion, "_mark_fragments_sync_status"), \
+         patch.object(ingestion, "refresh_neighbors_after_ingest"), \
+         patch.object(ingestion, "_logger", MagicMock()), \
+         patch("app.coding.count_codes_by_fragment", return_value={ids[0]: 3, ids[1]: 0}) as counts:
+        ingestion.ingest_documents(clients, settings, ["e1.docx"], project="p1", org_id="org")
+
+    assert counts.call_args.args[1:] == ("p1", ids)
+    payloads = {
+        call.kwargs["payload"]["code_count"]: (call.kwargs["payload"]["coded"], call.kwargs["points"])
+        for call in clients.qdrant.set_payload.call_args_list
+    }
+    assert payloads == {3: (True, [ids[0]]), 0: (False, [ids[1]])}
@@ -0,0 +1,154 @@
+"""Tests para la cola de codificación abierta (fragment_coding_state)."""
+
+from __future__ import annotations
+
+from app import postgres_block as pb
+
+
+def test_random_strategy_wraps_around_rand_key(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_coding_queue_ready", True)
+    row = ("f1", "a.docx", 3, "texto", None, None, False)
+    pg, cur = fake_pg(fetchone=[None, row])
+
+    frag = pb.select_next_uncoded_fragment(pg, project_id="p1", strategy="random")
+
+    assert frag["fragmento_id"] == "f1"
+    first_sql, second_sql = (call.args[0] for call in cur.execute.call_args_list)
+    assert "rand_key >= %s" in first_sql and "random()" not in first_sql
+    assert "rand_key >= %s" not in second_sql
+    assert "analisis_codigos_abiertos" not in first_sql
+
+
+def test_pending_counts_read_counters(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_coding_queue_ready", True)
+    pg, cur = fake_pg(fetchone=[(12, 4)])
+
+    counts = pb.get_open_coding_pending_counts(pg, project_id="p1", archivo="a.docx")
+
+    assert counts == {"pending_total": 12, "pending_in_archivo": 4}
+    assert "coding_queue_counts" in cur.execute.call_args.args[0]
+
+
+def _fragment(fid, archivo, par_idx, speaker="interviewee", project="p1"):
+    return {
+        "project_id": project,
+        "id": fid,
+        "archivo": archivo,
+        "par_idx": par_idx,
+        "fragmento": f"texto {fid}",
+        "char_len": 10,
+        "speaker": speaker,
+    }
+
+
+def _code(fid, codigo, archivo="a.docx", project="p1"):
+    return {"project_id": project, "fragmento_id": fid, "codigo": codigo, "archivo": archivo, "cita": "cita"}
+
+
+_STATE_SQL = """
+SELECT project_id, fragmento_id, archivo, par_idx, code_count
+  FROM fragment_coding_state
+"""
+
+_RECOMPUTE_STATE_SQL = """
+SELECT ef.project_id, ef.id, ef.archivo, ef.par_idx,
+       (SELECT COUNT(*) FROM analisis_codigos_abiertos a
+         WHERE a.project_id = ef.project_id AND a.fragmento_id = ef.id)
+  FROM entrevista_fragmentos ef
+ WHERE ef.speaker IS NULL OR ef.speaker <> 'interviewer'
+"""
+
+_COUNTS_SQL = "SELECT project_id, archivo, total, pending FROM coding_queue_counts WHERE total <> 0 OR pending <> 0"
+
+_RECOMPUTE_COUNTS_SQL = """
+SELECT project_id, archivo, COUNT(*), COUNT(*) FILTER (WHERE code_count = 0)
+  FROM fragment_coding_state
+ GROUP BY project_id, archivo
+"""
+
+
+def test_queue_tables_match_recompute_after_writes(pg_conn, pg_insert, pg_select):
+    pb.ensure_coding_queue(pg_conn)
+    pg_insert("entrevista_fragmentos", [
+        _fragment("f1", "a.docx", 0),
+        _fragment("f2", "a.docx", 1),
+        _fragment("f3", "b.docx", 0),
+        _fragment("f4", "b.docx", 1, speaker="interviewer"),
+        _fragment("g1", "a.docx", 0, project="p2"),
+    ])
+    pg_insert("analisis_codigos_abiertos", [
+        _code("f1", "confianza"),
+        _code("f1", "territorio"),
+        _code("f2", "confianza"),
+        _code("g1", "confianza", project="p2"),
+    ])
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE fragmento_id = 'f1' AND codigo = 'territorio'")
+        cur.execute("UPDATE analisis_codigos_abiertos SET fragmento_id = 'f3' WHERE fragmento_id = 'f2'")
+        cur.execute("UPDATE entrevista_fragmentos SET speaker = 'interviewer' WHERE id = 'f1'")
+        cur.execute("UPDATE entrevista_fragmentos SET archivo = 'c.docx' WHERE id = 'f3'")
+        cur.execute("DELETE FROM entrevista_fragmentos WHERE id = 'f2'")
+    pg_conn.commit()
+
+    assert pg_select(_STATE_SQL) == pg_select(_RECOMPUTE_STATE_SQL)
+    assert pg_select(_COUNTS_SQL) == pg_select(_RECOMPUTE_COUNTS_SQL)
+    assert pb.get_open_coding_pending_counts(pg_conn, project_id="p1", archivo="c.docx") == {
+        "pending_total": 0,
+        "pending_in_archivo": 0,
+    }
+    assert pb.rebuild_coding_queue(pg_conn, "p1") == {"fragmentos": 1, "pendientes": 0}
+    assert pg_select(_STATE_SQL) == pg_select(_RECOMPUTE_STATE_SQL)
+
+
+def test_queue_triggers_are_per_statement_and_replace_row_triggers(pg_conn, pg_insert, pg_select):
+    # Trigger por fila de una versión anterior: ensure_coding_queue lo reemplaza.
+    pb.ensure_fragment_table(pg_conn)
+    with pg_conn.cursor() as cur:
+        cur.execute("CREATE FUNCTION fcs_sync_fragment() RETURNS TRIGGER AS $$ BEGIN RETURN NULL; END; $$ LANGUAGE plpgsql")
+        cur.execute(
+            "CREATE TRIGGER trg_ef_coding_state AFTER INSERT ON entrevista_fragmentos "
+            "FOR EACH ROW EXECUTE FUNCTION fcs_sync_fragment()"
+        )
+    pg_conn.commit()
+    pb.ensure_coding_queue(pg_conn)
+    triggers = pg_select(
+        "SELECT tgname, (tgtype & 1) = 1 FROM pg_trigger "
+        "WHERE tgname LIKE 'trg_fcs_%' OR tgname LIKE '%_coding_state%'"
+    )
+    assert [name for name, _ in triggers] == [
+        "trg_aca_coding_state_delete",
+        "trg_aca_coding_state_insert",
+        "trg_aca_coding_state_update",
+        "trg_ef_coding_state_delete",
+        "trg_ef_coding_state_insert",
+        "trg_ef_coding_state_update",
+        "trg_fcs_counts_delete",
+        "trg_fcs_counts_insert",
+        "trg_fcs_counts_update",
+    ]
+    assert not any(per_row for _, per_row in triggers)
+
+    pg_insert("entrevista_fragmentos", [_fragment(f"f{i}", "a.docx" if i % 2 else "b.docx", i) for i in range(6)])
+    pg_insert("analisis_codigos_abiertos", [_code(f"f{i}", c) for i in range(4) for c in ("x", "y")])
+    with pg_conn.cursor() as cur:
+        # Fusión: varias filas cambian de fragmento en una sola sentencia.
+        cur.execute(
+            "UPDATE analisis_codigos_abiertos SET fragmento_id = CASE fragmento_id WHEN 'f0' THEN 'f5' ELSE 'f4' END "
+            "WHERE fragmento_id IN ('f0', 'f1')"
+        )
+        # Re-ingesta: upsert que actualiza unos fragmentos e inserta otros.
+        cur.execute(
+            """
+            INSERT INTO entrevista_fragmentos (project_id, id, archivo, par_idx, fragmento, speaker)
+            VALUES ('p1', 'f2', 'c.docx', 2, 't', 'interviewee'),
+                   ('p1', 'f3', 'a.docx', 3, 't', 'interviewer'),
+                   ('p1', 'f6', 'c.docx', 6, 't', NULL)
+            ON CONFLICT (project_id, id) DO UPDATE
+               SET archivo = EXCLUDED.archivo, speaker = EXCLUDED.speaker
+            """
+        )
+        cur.execute("UPDATE entrevista_fragmentos SET fragmento = 'sin cambios para la cola'")
+    pg_conn.commit()
+
+    assert pg_select(_STATE_SQL) == pg_select(_RECOMPUTE_STATE_SQL)
+    assert pg_select(_COUNTS_SQL) == pg_select(_RECOMPUTE_COUNTS_SQL)
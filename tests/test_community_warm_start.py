@@ -0,0 +1,100 @@
+"""Tests para comunidades en caliente (partición previa, ids estables)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import networkx as nx
+import pytest
+
+from app import graph_algorithms as ga_mod
+from app.graph_algorithms import GraphAlgorithms, GraphEngine
+
+
+def _cliques(extra_edges=()):
+    """Dos cliques de 5 códigos unidas por una arista, más aristas extra."""
+    G = nx.DiGraph()
+    for group in (range(0, 5), range(5, 10)):
+        G.add_edges_from((str(a), str(b)) for a in group for b in group if a < b)
+    G.add_edge("4", "5")
+    G.add_edges_from(extra_edges)
+    props = {n: {"nombre": f"codigo_{n}", "etiquetas": ["Codigo"]} for n in G.nodes()}
+    return G, props
+
+
+@pytest.fixture(autouse=True)
+def _clean_caches():
+    ga_mod.invalidate_graph_snapshots()
+    ga_mod.forget_community_partitions()
+    yield
+    ga_mod.invalidate_graph_snapshots()
+    ga_mod.forget_community_partitions()
+
+
+def _run(algorithm, graph, version, **kwargs):
+    clients = SimpleNamespace(postgres=MagicMock(), neo4j=MagicMock())
+    settings = SimpleNamespace(neo4j=SimpleNamespace(database="neo4j"))
+    ga = GraphAlgorithms(clients, settings, force_engine=GraphEngine.NETWORKX)
+    with patch.object(GraphAlgorithms, "_load_graph_data", return_value=graph), \
+         patch("app.postgres_block.get_graph_version", return_value=version):
+        results = getattr(ga, algorithm)("p1", **kwargs)
+    return {r["nombre"]: r["community_id"] for r in results}
+
+
+def test_stable_community_ids_follow_overlap():
+    previous = {"a": 7, "b": 7, "c": 3, "d": 3}
+    keys = ["a", "b", "c", "d", "e"]
+
+    assert ga_mod.stable_community_ids(keys, [1, 1, 0, 0, 2], previous) == [7, 7, 3, 3, 8]
+    assert ga_mod.stable_community_ids(keys, [0, 0, 0, 1, 1], None) == [0, 0, 0, 1, 1]
+
+
+def test_initial_membership_keeps_previous_groups():
+    assert ga_mod.initial_membership(["a", "b", "x", "c"], {"a": 5, "b": 5, "c": 9}) == [0, 0, 1, 2]
+
+
+def test_snapshot_node_keys_use_label_and_name():
+    G, props = _cliques()
+    snap = ga_mod.GraphSnapshot(G, props, project_id="p1", version=1)
+
+    assert snap.node_keys[snap.index["3"]] == "Codigo|codigo_3"
+    assert snap.undirected_edges().shape == (snap.num_edges, 2)
+
+
+@pytest.mark.parametrize("algorithm", ["louvain", "leiden"])
+def test_rerun_keeps_community_ids(algorithm):
+    first = _run(algorithm, _cliques(), version=1)
+    assert len(set(first.values())) == 2
+
+    ga_mod.invalidate_graph_snapshots()
+    second = _run(algorithm, _cliques(extra_edges=[("1", "3")]), version=2)
+
+    assert second == first
+
+
+def test_leiden_warm_start_and_reuse():
+    pytest.importorskip("leidenalg")
+    import leidenalg
+
+    first = _run("leiden", _cliques(), version=1)
+    with patch.object(leidenalg, "find_partition", wraps=leidenalg.find_partition) as find:
+        assert _run("leiden", _cliques(), version=1) == first
+        find.assert_not_called()
+
+        ga_mod.invalidate_graph_snapshots()
+        _run("leiden", _cliques(extra_edges=[("0", "2")]), version=2)
+        kwargs = find.call_args.kwargs
+        assert kwargs["seed"] == ga_mod.DEFAULT_COMMUNITY_SEED
+        assert len(kwargs["initial_membership"]) == 10
+
+        ga_mod.invalidate_graph_snapshots()
+        _run("leiden", _cliques(extra_edges=[("0", "2")]), version=3, warm_start=False)
+        assert "initial_membership" not in find.call_args.kwargs
+
+
+def test_louvain_resolution_splits_communities():
+    coarse = _run("louvain", _cliques(), version=1, resolution=0.05, warm_start=False)
+    fine = _run("louvain", _cliques(), version=1, resolution=1.0, warm_start=False)
+
+    assert len(set(coarse.values())) < len(set(fine.values()))
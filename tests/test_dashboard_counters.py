@@ -0,0 +1,176 @@
+"""Tests para los contadores del dashboard mantenidos por triggers."""
+
+from __future__ import annotations
+
+from app import postgres_block as pb
+
+
+def test_dashboard_counts_single_counter_read(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_dashboard_counters_ready", True)
+    rows = [
+        ("p1", "fragmentos_totales", 10),
+        ("p1", "archivos", 2),
+        ("p1", "fragmentos_entrevistador", 4),
+        ("p1", "fragmentos_entrevistado", 5),
+        ("p1", "fragmentos_otros", 1),
+        ("p1", "entrevistas_revisadas", 1),
+        ("p1", "citas", 7),
+        ("p1", "codigos_unicos", 3),
+        ("p1", "fragmentos_codificados", 3),
+        ("p1", "relaciones", 2),
+        ("p1", "categorias", 1),
+        ("p1", "codigos_relacionados", 2),
+        ("p1", "candidatos:pendiente", 4),
+        ("p1", "candidatos:validado", 1),
+    ]
+    pg, cur = fake_pg(fetchall=[rows])
+
+    counts = pb.get_dashboard_counts(pg, "p1")
+
+    cur.execute.assert_called_once()
+    assert "project_dashboard_counters" in cur.execute.call_args.args[0]
+    assert counts["ingesta"]["fragmentos_analizables"] == 6
+    assert counts["familiarizacion"]["porcentaje"] == 50.0
+    assert counts["codificacion"]["fragmentos_sin_codigo"] == 3
+    assert counts["codificacion"]["porcentaje_cobertura"] == 50.0
+    assert counts["axial"] == {"relaciones": 2, "categorias": 1, "codigos_relacionados": 2}
+    assert counts["candidatos"]["pendiente"] == 4
+    assert counts["candidatos"]["total"] == 5
+
+
+def test_reconcile_reports_drift(monkeypatch, fake_pg):
+    monkeypatch.setattr(pb, "_dashboard_counters_ready", True)
+    before = [("p1", "citas", 5), ("p1", "archivos", 2)]
+    after = [("p1", "citas", 7), ("p1", "archivos", 2), ("p1", "relaciones", 1)]
+    pg, cur = fake_pg(fetchall=[before, after])
+
+    result = pb.reconcile_dashboard_counters(pg, "p1")
+
+    assert result["desvios"] == {"p1:citas": 2, "p1:relaciones": 1}
+    assert result["proyectos"] == 1
+    pg.commit.assert_called_once()
+
+
+def _fragment(fid, archivo, speaker="interviewee", project="p1"):
+    return {
+        "project_id": project,
+        "id": fid,
+        "archivo": archivo,
+        "par_idx": 0,
+        "fragmento": f"texto {fid}",
+        "char_len": 10,
+        "speaker": speaker,
+    }
+
+
+def _code(fid, codigo, project="p1"):
+    return {"project_id": project, "fragmento_id": fid, "codigo": codigo, "archivo": "a.docx", "cita": "cita"}
+
+
+def _axial(categoria, codigo, relacion="causa", project="p1"):
+    return {
+        "project_id": project,
+        "categoria": categoria,
+        "codigo": codigo,
+        "relacion": relacion,
+        "archivo": "a.docx",
+    }
+
+
+def _candidate(codigo, fid, estado="pendiente", project="p1"):
+    return {
+        "project_id": project,
+        "codigo": codigo,
+        "fragmento_id": fid,
+        "fuente_origen": "llm",
+        "estado": estado,
+    }
+
+
+_COUNTERS_SQL = "SELECT project_id, metric, value FROM project_dashboard_counters WHERE value <> 0"
+_MEMBERS_SQL = "SELECT project_id, metric, member, refs FROM project_dashboard_members"
+
+
+def test_counters_match_recompute_after_writes(pg_conn, pg_insert, pg_select):
+    pb.ensure_dashboard_counters(pg_conn)
+    pg_insert("entrevista_fragmentos", [
+        _fragment("f1", "a.docx"),
+        _fragment("f2", "a.docx", speaker="interviewer"),
+        _fragment("f3", "b.docx", speaker=None),
+        _fragment("g1", "a.docx", project="p2"),
+    ])
+    pg_insert("familiarization_reviews", [
+        {"project_id": "p1", "archivo": "a.docx"},
+        {"project_id": "p2", "archivo": "a.docx"},
+    ])
+    pg_insert("analisis_codigos_abiertos", [
+        _code("f1", "confianza"),
+        _code("f1", "territorio"),
+        _code("f3", "confianza"),
+        _code("g1", "confianza", project="p2"),
+    ])
+    pg_insert("analisis_axial", [
+        _axial("vinculo", "confianza"),
+        _axial("vinculo", "territorio", relacion="condicion"),
+    ])
+    pg_insert("codigos_candidatos", [
+        _candidate("miedo", "f1"),
+        _candidate("rabia", "f3"),
+        _candidate("miedo", "g1", project="p2"),
+    ])
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE entrevista_fragmentos SET speaker = 'interviewee', archivo = 'c.docx' WHERE id = 'f3'")
+        cur.execute("DELETE FROM entrevista_fragmentos WHERE id = 'f2'")
+        cur.execute("UPDATE familiarization_reviews SET project_id = 'p3' WHERE project_id = 'p2'")
+        cur.execute("UPDATE analisis_codigos_abiertos SET fragmento_id = 'f3' WHERE codigo = 'territorio'")
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE fragmento_id = 'f3' AND codigo = 'confianza'")
+        cur.execute("UPDATE analisis_axial SET categoria = 'arraigo' WHERE codigo = 'territorio'")
+        cur.execute("DELETE FROM analisis_axial WHERE codigo = 'confianza'")
+        cur.execute("UPDATE codigos_candidatos SET estado = 'validado' WHERE codigo = 'miedo'")
+        cur.execute("DELETE FROM codigos_candidatos WHERE codigo = 'rabia'")
+    pg_conn.commit()
+
+    counters = pg_select(_COUNTERS_SQL)
+    members = pg_select(_MEMBERS_SQL)
+    result = pb.reconcile_dashboard_counters(pg_conn)
+
+    assert result["desvios"] == {}
+    assert pg_select(_COUNTERS_SQL) == counters
+    assert pg_select(_MEMBERS_SQL) == members
+    assert pb.get_dashboard_counts(pg_conn, "p1")["ingesta"]["archivos"] == 2
+
+
+def test_counter_triggers_are_per_statement_and_replace_row_triggers(pg_conn, pg_insert, pg_select):
+    # Triggers por fila de una versión anterior: ensure_dashboard_counters los reemplaza.
+    pb.ensure_open_coding_table(pg_conn)
+    with pg_conn.cursor() as cur:
+        cur.execute("CREATE FUNCTION pdc_sync_open_codes() RETURNS TRIGGER AS $$ BEGIN RETURN NULL; END; $$ LANGUAGE plpgsql")
+        cur.execute(
+            "CREATE TRIGGER trg_pdc_open_codes_insert_delete AFTER INSERT OR DELETE ON analisis_codigos_abiertos "
+            "FOR EACH ROW EXECUTE FUNCTION pdc_sync_open_codes()"
+        )
+        cur.execute(
+            "CREATE TRIGGER trg_pdc_open_codes_update AFTER UPDATE ON analisis_codigos_abiertos "
+            "FOR EACH ROW EXECUTE FUNCTION pdc_sync_open_codes()"
+        )
+    pg_conn.commit()
+    pb.ensure_dashboard_counters(pg_conn)
+    triggers = pg_select("SELECT tgname, (tgtype & 1) = 1 FROM pg_trigger WHERE tgname LIKE 'trg_pdc_%'")
+    assert len(triggers) == 15
+    assert not any(per_row for _, per_row in triggers)
+    assert "trg_pdc_open_codes_insert_delete" not in {name for name, _ in triggers}
+
+    pg_insert("entrevista_fragmentos", [_fragment(f"f{i}", f"{i % 3}.docx") for i in range(6)])
+    pg_insert("analisis_codigos_abiertos", [_code(f"f{i}", c) for i in range(6) for c in ("agua", "luz")])
+    with pg_conn.cursor() as cur:
+        # Fusión en una sola sentencia: 'luz' desaparece como código distinto.
+        cur.execute("UPDATE analisis_codigos_abiertos SET codigo = 'energia' WHERE codigo = 'luz'")
+        cur.execute("UPDATE analisis_codigos_abiertos SET cita = 'sin efecto en contadores'")
+        cur.execute("UPDATE entrevista_fragmentos SET archivo = 'unico.docx' WHERE archivo <> '0.docx'")
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE fragmento_id IN ('f0', 'f1')")
+    pg_conn.commit()
+
+    assert pb.reconcile_dashboard_counters(pg_conn)["desvios"] == {}
+    counts = pb.get_dashboard_counts(pg_conn, "p1")
+    assert counts["ingesta"]["archivos"] == 2
+    assert counts["codificacion"]["codigos_unicos"] == 2
@@ -0,0 +1,123 @@
+"""Tests para el runner de discovery concurrente."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app import discovery_runner as dr
+
+
+def _response(*ids):
+    return SimpleNamespace(
+        points=[SimpleNamespace(id=fid, score=0.8, payload={"archivo": "a.docx", "fragmento": "x"}) for fid in ids]
+    )
+
+
+def test_landing_rate_index_matches_pg_shape():
+    index = dr.LandingRateIndex({"f1": ["agua"], "f3": ["luz", "agua"]}, total_rows=3)
+
+    result = index.rate(["f1", "f2", "f3", "f4"])
+    assert result["landing_rate"] == 50.0
+    assert result["matched_count"] == 2
+    assert result["matched_codes"] == ["agua", "luz"]
+    assert result["reason"] == "ok"
+    assert dr.LandingRateIndex({}, 0).rate(["f1"])["reason"] == "no_definitive_codes"
+    assert dr.LandingRateIndex({}, 0).rate([])["reason"] == "no_fragments"
+
+
+def test_run_discovery_batches_embeddings_and_one_insert_per_phase():
+    clients = SimpleNamespace(postgres=MagicMock(), aoai=MagicMock())
+    settings = SimpleNamespace(
+        azure=SimpleNamespace(deployment_embed="emb"),
+        qdrant=SimpleNamespace(collection="fragmentos"),
+    )
+    qdrant = MagicMock()
+    qdrant.query_batch_points = AsyncMock(
+        side_effect=lambda collection_name, requests, timeout: [_response("f1", "f2") for _ in requests]
+    )
+    qdrant.close = AsyncMock()
+    inserted = []
+
+    def fake_insert(_pg, *, project, records):
+        inserted.append(list(records))
+        return [{"id": i, "created_at": None} for i, _ in enumerate(records)]
+
+    interviews = [{"archivo": "a.docx"}, {"archivo": "b.docx"}]
+    with patch.object(dr, "_open_async_qdrant", return_value=qdrant), \
+         patch.object(dr, "embed_batch", side_effect=lambda _c, _d, texts: [[0.1]] * len(texts)) as embed, \
+         patch.object(dr, "list_interviews_summary", return_value=interviews), \
+         patch.object(dr, "insert_discovery_runs", side_effect=fake_insert), \
+         patch.object(dr, "fetch_project_fragment_codes", return_value=({"f1": ["agua"]}, 1)) as codes:
+        result = asyncio.run(
+            dr.run_discovery_iterations(
+                project_id="p1",
+                concepts=["agua", "luz"],
+                clients=clients,
+                settings=settings,
+                per_interview_iters=2,
+                global_iters=2,
+            )
+        )
+
+    embed.assert_called_once()
+    # 2 conceptos x 2 entrevistas + 2 globales
+    assert qdrant.query_batch_points.await_count == 6
+    codes.assert_called_once()
+    assert [len(batch) for batch in inserted] == [8, 4]
+    assert len(result["runs"]) == 12
+    assert result["errors"] == []
+    second_iter = [r for r in result["runs"] if r["iter"] == 1]
+    assert all(r["overlap"] == 1.0 for r in second_iter)
+    assert all(r["landing_rate"] == 0.5 for r in result["runs"])
+    assert result["final_landing_rate"]["matched_count"] == 1
+    qdrant.close.assert_awaited_once()
+
+
+def test_global_phase_failure_keeps_per_interview_records():
+    clients = SimpleNamespace(postgres=MagicMock(), aoai=MagicMock())
+    settings = SimpleNamespace(
+        azure=SimpleNamespace(deployment_embed="emb"),
+        qdrant=SimpleNamespace(collection="fragmentos"),
+    )
+    qdrant = MagicMock()
+    qdrant.query_batch_points = AsyncMock(
+        side_effect=lambda collection_name, requests, timeout: [_response("f1") for _ in requests]
+    )
+    qdrant.close = AsyncMock()
+    inserted = []
+
+    def fake_insert(_pg, *, project, records):
+        inserted.append([r["scope"] for r in records])
+        return [{"id": i, "created_at": None} for i, _ in enumerate(records)]
+
+    collect = dr._collect_phase_records
+
+    def failing_collect(*, scope, **kwargs):
+        if scope == "global":
+            raise RuntimeError("fase global")
+        return collect(scope=scope, **kwargs)
+
+    with patch.object(dr, "_open_async_qdrant", return_value=qdrant), \
+         patch.object(dr, "embed_batch", side_effect=lambda _c, _d, texts: [[0.1]] * len(texts)), \
+         patch.object(dr, "list_interviews_summary", return_value=[{"archivo": "a.docx"}]), \
+         patch.object(dr, "insert_discovery_runs", side_effect=fake_insert), \
+         patch.object(dr, "_collect_phase_records", side_effect=failing_collect), \
+         pytest.raises(RuntimeError):
+        asyncio.run(
+            dr.run_discovery_iterations(
+                project_id="p1",
+                concepts=["agua"],
+                clients=clients,
+                settings=settings,
+                per_interview_iters=2,
+                global_iters=1,
+                use_real_landing_rate=False,
+            )
+        )
+
+    assert inserted == [["per_interview", "per_interview"]]
+    qdrant.close.assert_awaited_once()
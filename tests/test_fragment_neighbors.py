@@ -0,0 +1,111 @@
+"""Tests para el grafo k-NN materializado de fragmentos."""
+
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app import fragment_neighbors as fn
+
+
+class _MemoryStore:
+    """Reemplazo en memoria de las funciones de `fragment_neighbors` en PG."""
+
+    def __init__(self):
+        self.lists = {}
+
+    def replace(self, _pg, _project, neighbors, *, full_rebuild=False):
+        if full_rebuild:
+            self.lists = {}
+        self.lists.update({fid: list(items) for fid, items in neighbors.items()})
+        return sum(len(items) for items in neighbors.values())
+
+    def floor(self, _pg, _project):
+        return {fid: (len(items), min(s for _, s in items)) for fid, items in self.lists.items() if items}
+
+    def referrers(self, _pg, _project, ids):
+        return {fid for fid, items in self.lists.items() if any(nid in ids for nid, _ in items)}
+
+    def lists_for(self, _pg, _project, ids):
+        return {
+            fid: [{"fragmento_id": nid, "score": score} for nid, score in self.lists[fid]]
+            for fid in ids
+            if fid in self.lists
+        }
+
+
+def _pool(n, dims=8, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"fragmento_id": f"f{i:03d}", "archivo": f"a{i % 3}", "embedding": [rng.uniform(-1, 1) for _ in range(dims)]}
+        for i in range(n)
+    ]
+
+
+def test_exact_neighbors_matches_brute_force():
+    pool = _pool(30)
+    lists = fn.exact_neighbors(pool, pool, neighbor_k=4, block_size=7)
+
+    for row, items in zip(pool, lists):
+        assert row["fragmento_id"] not in [n["fragmento_id"] for n in items]
+        scores = [n["score"] for n in items]
+        assert scores == sorted(scores, reverse=True)
+        assert len(items) == 4
+
+
+def test_incremental_update_matches_full_rebuild():
+    full_pool = _pool(40)
+    initial, added = full_pool[:30], full_pool[30:]
+    clients = SimpleNamespace(postgres=object())
+
+    incremental = _MemoryStore()
+    rebuilt = _MemoryStore()
+    with patch.object(fn, "replace_fragment_neighbors", incremental.replace), \
+         patch.object(fn, "fetch_neighbor_floor", incremental.floor), \
+         patch.object(fn, "fetch_neighbor_lists", incremental.lists_for), \
+         patch.object(fn, "fetch_neighbor_referrers", incremental.referrers):
+        with patch.object(fn, "_load_pool", return_value=[dict(r) for r in initial]):
+            fn.build_fragment_neighbors(clients, "p1", k=5)
+        with patch.object(fn, "_load_pool", return_value=[dict(r) for r in full_pool]):
+            fn.update_fragment_neighbors(clients, "p1", [r["fragmento_id"] for r in added], k=5)
+
+    with patch.object(fn, "replace_fragment_neighbors", rebuilt.replace), \
+         patch.object(fn, "_load_pool", return_value=[dict(r) for r in full_pool]):
+        fn.build_fragment_neighbors(clients, "p1", k=5)
+
+    assert incremental.lists.keys() == rebuilt.lists.keys()
+    for fid, expected in rebuilt.lists.items():
+        got = incremental.lists[fid]
+        assert [nid for nid, _ in got] == [nid for nid, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=1e-5)
+
+
+def test_reingest_rescores_lists_that_reference_it():
+    pool = _pool(30)
+    # Re-ingesta: los mismos IDs con texto (y embedding) distinto.
+    changed = {row["fragmento_id"]: [-x for x in row["embedding"]] for row in pool[:3]}
+    reingested = [dict(r, embedding=changed.get(r["fragmento_id"], r["embedding"])) for r in pool]
+    clients = SimpleNamespace(postgres=object())
+
+    incremental = _MemoryStore()
+    rebuilt = _MemoryStore()
+    with patch.object(fn, "replace_fragment_neighbors", incremental.replace), \
+         patch.object(fn, "fetch_neighbor_floor", incremental.floor), \
+         patch.object(fn, "fetch_neighbor_lists", incremental.lists_for), \
+         patch.object(fn, "fetch_neighbor_referrers", incremental.referrers):
+        with patch.object(fn, "_load_pool", return_value=[dict(r) for r in pool]):
+            fn.build_fragment_neighbors(clients, "p1", k=5)
+        with patch.object(fn, "_load_pool", return_value=[dict(r) for r in reingested]):
+            fn.update_fragment_neighbors(clients, "p1", list(changed), k=5)
+
+    with patch.object(fn, "replace_fragment_neighbors", rebuilt.replace), \
+         patch.object(fn, "_load_pool", return_value=[dict(r) for r in reingested]):
+        fn.build_fragment_neighbors(clients, "p1", k=5)
+
+    for fid, expected in rebuilt.lists.items():
+        got = incremental.lists[fid]
+        assert [nid for nid, _ in got] == [nid for nid, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=1e-5)
@@ -0,0 +1,140 @@
+"""Tests para el snapshot versionado del grafo y `GraphAlgorithms.run_many`."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import networkx as nx
+import pytest
+
+from app import graph_algorithms as ga_mod
+from app.graph_algorithms import GraphAlgorithmError, GraphAlgorithms, GraphEngine
+
+
+def _graph():
+    G = nx.DiGraph()
+    G.add_edges_from([("0", "1"), ("0", "2"), ("2", "1"), ("3", "1"), ("2", "3")])
+    props = {
+        "0": {"nombre": "cat", "etiquetas": ["Categoria"]},
+        "1": {"nombre": "a", "etiquetas": ["Codigo"]},
+        "2": {"nombre": "b", "etiquetas": ["Codigo"]},
+        "3": {"nombre": "c", "etiquetas": ["Codigo"]},
+    }
+    return G, props
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache():
+    ga_mod.invalidate_graph_snapshots()
+    yield
+    ga_mod.invalidate_graph_snapshots()
+
+
+def _algorithms():
+    clients = SimpleNamespace(postgres=MagicMock(), neo4j=MagicMock())
+    settings = SimpleNamespace(neo4j=SimpleNamespace(database="neo4j"))
+    return GraphAlgorithms(clients, settings, force_engine=GraphEngine.NETWORKX)
+
+
+def test_snapshot_csr_matches_graph():
+    G, props = _graph()
+    snap = ga_mod.GraphSnapshot(G, props, project_id="p1", version=3)
+
+    assert snap.num_nodes == 4 and snap.num_edges == 5
+    for i, nid in enumerate(snap.node_ids):
+        targets = {snap.node_ids[j] for j in snap.indices[snap.indptr[i]:snap.indptr[i + 1]]}
+        assert targets == set(G.successors(nid))
+    assert snap.out_degree().tolist() == [G.out_degree(n) for n in snap.node_ids]
+    assert snap.names[snap.index["2"]] == "b"
+
+
+def test_run_many_extracts_once():
+    ga = _algorithms()
+    with patch.object(GraphAlgorithms, "_load_graph_data", return_value=_graph()) as load, \
+         patch("app.postgres_block.get_graph_version", return_value=None):
+        results = ga.run_many("p1", algorithms=["pagerank", "louvain", "betweenness"])
+
+    assert load.call_count == 1
+    assert set(results) == {"pagerank", "louvain", "betweenness"}
+    assert results["pagerank"][0]["nombre"] == "a"
+    assert {r["nombre"] for r in results["louvain"]} == {"cat", "a", "b", "c"}
+
+
+def test_snapshot_reused_until_version_bumps():
+    version = {"value": 5}
+    with patch.object(GraphAlgorithms, "_load_graph_data", return_value=_graph()) as load, \
+         patch("app.postgres_block.get_graph_version", side_effect=lambda *_: version["value"]):
+        _algorithms().pagerank("p1")
+        _algorithms().betweenness("p1")
+        assert load.call_count == 1
+
+        version["value"] = 6
+        _algorithms().louvain("p1")
+        assert load.call_count == 2
+
+
+def test_run_many_rejects_unknown_algorithm():
+    with pytest.raises(GraphAlgorithmError):
+        _algorithms().run_many("p1", algorithms=["pagerank", "hdbscan"])
+
+
+def _versions(pg_select):
+    return dict(pg_select("SELECT project_id, version FROM graph_versions"))
+
+
+def test_graph_version_bumps_once_per_statement_and_project(pg_conn, pg_insert, pg_select):
+    from app import postgres_block as pb
+
+    # Trigger por fila de una versión anterior: ensure_graph_versions lo reemplaza.
+    pb.ensure_axial_table(pg_conn)
+    with pg_conn.cursor() as cur:
+        cur.execute("CREATE FUNCTION gv_bump() RETURNS TRIGGER AS $$ BEGIN RETURN NULL; END; $$ LANGUAGE plpgsql")
+        cur.execute("CREATE TRIGGER trg_gv_axial AFTER INSERT ON analisis_axial FOR EACH ROW EXECUTE FUNCTION gv_bump()")
+    pg_conn.commit()
+    assert pb.ensure_graph_versions(pg_conn) is True
+    assert pg_select(
+        "SELECT tgname, (tgtype & 1) = 1 FROM pg_trigger WHERE tgname LIKE 'trg_gv_%'"
+    ) == [
+        ("trg_gv_axial_delete", False),
+        ("trg_gv_axial_insert", False),
+        ("trg_gv_axial_update", False),
+        ("trg_gv_catalog_update", False),
+        ("trg_gv_open_coding_delete", False),
+        ("trg_gv_open_coding_insert", False),
+        ("trg_gv_open_coding_update", False),
+    ]
+
+    pg_insert("analisis_codigos_abiertos", [
+        {"project_id": p, "fragmento_id": f, "codigo": c, "archivo": "a.docx", "cita": "cita"}
+        for p, f, c in [("p1", "f1", "a"), ("p1", "f1", "b"), ("p1", "f2", "a"), ("p2", "g1", "a")]
+    ])
+    assert _versions(pg_select) == {"p1": 1, "p2": 1}
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET cita = 'otra', memo = 'nota'")
+    pg_conn.commit()
+    assert _versions(pg_select) == {"p1": 1, "p2": 1}
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET codigo = 'c' WHERE project_id = 'p1' AND codigo = 'a'")
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE project_id = 'p2'")
+    pg_conn.commit()
+    assert _versions(pg_select) == {"p1": 2, "p2": 2}
+
+    pg_insert("analisis_axial", [
+        {"project_id": "p1", "categoria": "vinculo", "codigo": c, "relacion": "causa", "archivo": "a.docx"}
+        for c in ("b", "c")
+    ])
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_axial SET memo = 'nota'")
+    pg_conn.commit()
+    assert _versions(pg_select) == {"p1": 4, "p2": 2}
+
+    pg_insert("catalogo_codigos", [{"project_id": "p1", "codigo": c} for c in ("b", "c")])
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE catalogo_codigos SET memo = 'nota'")
+        cur.execute("UPDATE catalogo_codigos SET status = 'merged', canonical_codigo = 'c' WHERE codigo = 'b'")
+    pg_conn.commit()
+    assert _versions(pg_select) == {"p1": 5, "p2": 2}
+    assert pb.get_graph_version(pg_conn, "p1") == 5
@@ -0,0 +1,45 @@
+"""Tests para la búsqueda agrupada paginada por cursor."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.queries import _decode_group_cursor, _encode_group_cursor, grouped_search
+
+
+def _group(key, *scores):
+    hits = [
+        SimpleNamespace(id=f"{key}-{i}", score=s, payload={"fragmento": "texto", "archivo": key})
+        for i, s in enumerate(scores)
+    ]
+    return SimpleNamespace(id=key, hits=hits)
+
+
+def test_group_cursor_round_trip_and_invalid():
+    assert _decode_group_cursor(_encode_group_cursor(["a.docx", "b.docx"])) == ["a.docx", "b.docx"]
+    assert _decode_group_cursor(None) == []
+    with pytest.raises(ValueError):
+        _decode_group_cursor("no-es-un-cursor")
+
+
+def test_grouped_search_excludes_seen_groups_and_hydrates_context():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+    settings = SimpleNamespace(
+        azure=SimpleNamespace(deployment_embed="emb"),
+        qdrant=SimpleNamespace(collection="fragmentos"),
+    )
+    cursor = _encode_group_cursor(["a.docx"])
+
+    with patch("app.embeddings.embed_batch", return_value=[[0.1, 0.2]]), \
+         patch("app.qdrant_block.search_similar_grouped", return_value=[_group("b.docx", 0.9, 0.8), _group("c.docx", 0.7)]) as search, \
+         patch("app.postgres_block.fetch_interviews_context", return_value={"b.docx": {"archivo": "b.docx"}}) as ctx:
+        page = grouped_search(clients, settings, "agua", project="p1", limit=2, cursor=cursor)
+
+    assert search.call_args.kwargs["exclude_groups"] == ["a.docx"]
+    ctx.assert_called_once()
+    assert [r["group_key"] for r in page["results"]] == ["b.docx", "c.docx"]
+    assert page["results"][0]["context"] == {"archivo": "b.docx"}
+    assert _decode_group_cursor(page["next_cursor"]) == ["a.docx", "b.docx", "c.docx"]
@@ -0,0 +1,69 @@
+"""Tests para la evidencia batched de relaciones ocultas."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.axial_evidence import build_link_prediction_evidence_pack
+from app.link_prediction import discover_hidden_relationships
+
+
+def _clients(fake_pg):
+    pg, cur = fake_pg()
+    cur.fetchall.return_value = []
+    neo4j = MagicMock()
+    neo4j.session.side_effect = RuntimeError("neo4j down")
+    settings = SimpleNamespace(neo4j=SimpleNamespace(database="neo4j"))
+    return SimpleNamespace(postgres=pg, neo4j=neo4j), settings
+
+
+def test_hidden_relationships_fetch_evidence_once_for_all_pairs(fake_pg):
+    clients, settings = _clients(fake_pg)
+    with patch("app.postgres_block.fetch_code_cooccurrences", return_value=[("a", "b", 3), ("c", "d", 2)]), \
+         patch("app.neo4j_block.fetch_pair_fragment_ids", side_effect=RuntimeError("neo4j down")), \
+         patch("app.neo4j_block.fetch_code_fragment_ids", side_effect=RuntimeError("neo4j down")), \
+         patch("app.postgres_block.fetch_pair_fragment_ids", return_value={("a", "b"): ["f1", "f2"]}) as pairs, \
+         patch("app.postgres_block.fetch_code_fragment_ids", return_value={"c": ["f3"], "d": ["f4"]}) as codes:
+        rels = discover_hidden_relationships(clients, settings, "p1", top_k=5)
+
+    pairs.assert_called_once()
+    assert pairs.call_args.args[2] == [("a", "b"), ("c", "d")]
+    codes.assert_called_once()
+    assert codes.call_args.args[2] == ["c", "d"]
+
+    by_pair = {(r["source"], r["target"]): r for r in rels}
+    assert by_pair[("a", "b")]["evidence_kind"] == "direct"
+    assert by_pair[("a", "b")]["evidence_ids"] == ["f1", "f2"]
+    assert by_pair[("c", "d")]["evidence_kind"] == "indirect"
+    assert by_pair[("c", "d")]["supporting_evidence_ids"] == ["f3", "f4"]
+
+
+def test_evidence_pack_hydrates_fragments_in_one_lookup(fake_pg):
+    clients, settings = _clients(fake_pg)
+    clients.neo4j = None
+    excerpts = {
+        fid: {"id": fid, "archivo": "a.docx", "par_idx": i, "speaker": "interviewee", "fragmento": "texto " * 10}
+        for i, fid in enumerate(["f1", "f2", "f3", "f4", "f5"])
+    }
+    excerpts["f5"]["speaker"] = "interviewer"
+    co = {("a", "b"): ["f1", "f2", "f5"], ("c", "d"): ["f3", "f4"]}
+    with patch("app.postgres_block.ensure_open_coding_table"), \
+         patch("app.postgres_block.fetch_pair_fragment_ids", return_value=co) as pairs, \
+         patch("app.postgres_block.fetch_fragment_excerpts", return_value=excerpts) as hydrate:
+        pack = build_link_prediction_evidence_pack(
+            clients,
+            settings,
+            project_id="p1",
+            suggestions=[{"source": "a", "target": "b"}, {"source": "c", "target": "d"}],
+            positive_total=4,
+            negative_total=0,
+            excerpt_chars=20,
+        )
+
+    pairs.assert_called_once()
+    assert pairs.call_args.kwargs["interviewee_only"] is True
+    hydrate.assert_called_once()
+    positives = [[e["fragmento_id"] for e in s["positive"]] for s in pack["suggestions"]]
+    assert positives == [["f1", "f2"], ["f3", "f4"]]
+    assert pack["suggestions"][0]["coverage"] == {"cooccurrence_pg": 2}
@@ -0,0 +1,101 @@
+"""Tests para la escritura de métricas por clave (project_id, label, nombre)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import networkx as nx
+import pytest
+
+from app import graph_algorithms as ga_mod
+from app.graph_algorithms import GraphAlgorithms, GraphEngine
+
+
+def _graph():
+    # Ids sintéticos como los del extractor de PostgreSQL.
+    G = nx.DiGraph()
+    G.add_edges_from([("0", "1"), ("0", "2"), ("2", "1"), ("3", "1")])
+    props = {
+        "0": {"nombre": "cat", "etiquetas": ["Categoria"]},
+        "1": {"nombre": "a", "etiquetas": ["Codigo"]},
+        "2": {"nombre": "b", "etiquetas": ["Codigo"]},
+        "3": {"nombre": "c", "etiquetas": ["Codigo"]},
+    }
+    return G, props
+
+
+@pytest.fixture(autouse=True)
+def _clean_caches():
+    ga_mod.invalidate_graph_snapshots()
+    ga_mod.forget_community_partitions()
+    yield
+    ga_mod.invalidate_graph_snapshots()
+    ga_mod.forget_community_partitions()
+
+
+def _algorithms(session):
+    neo4j = MagicMock()
+    neo4j.session.return_value.__enter__.return_value = session
+    clients = SimpleNamespace(postgres=MagicMock(), neo4j=neo4j)
+    settings = SimpleNamespace(neo4j=SimpleNamespace(database="neo4j"))
+    return GraphAlgorithms(clients, settings, force_engine=GraphEngine.NETWORKX)
+
+
+def _written(session):
+    """{(label, nombre): props} de todas las llamadas UNWIND."""
+    nodes = {}
+    for call in session.run.call_args_list:
+        query = call.args[0]
+        label = query.split("MATCH (n:`", 1)[1].split("`", 1)[0]
+        assert "id(n)" not in query
+        assert call.kwargs["project_id"] == "p1"
+        for row in call.kwargs["rows"]:
+            nodes.setdefault((label, row["nombre"]), {}).update(row["props"])
+    return nodes
+
+
+def test_run_many_writes_all_metrics_in_one_pass():
+    session = MagicMock()
+    ga = _algorithms(session)
+    with patch.object(GraphAlgorithms, "_load_graph_data", return_value=_graph()), \
+         patch("app.postgres_block.get_graph_version", return_value=None), \
+         patch("app.postgres_block.replace_graph_node_metrics") as mirror:
+        ga.run_many("p1", algorithms=["pagerank", "louvain", "betweenness"], persist=True)
+
+    assert ga.clients.neo4j.session.call_count == 1
+    # Una sentencia por etiqueta, con las tres propiedades por nodo.
+    assert session.run.call_count == 2
+    nodes = _written(session)
+    assert set(nodes) == {("Categoria", "cat"), ("Codigo", "a"), ("Codigo", "b"), ("Codigo", "c")}
+    assert set(nodes[("Codigo", "a")]) == {"score_centralidad", "community_id", "score_intermediacion"}
+
+    mirror.assert_called_once()
+    rows = mirror.call_args.args[2]
+    assert {metric for _, _, metric, _ in rows} == {"score_centralidad", "community_id", "score_intermediacion"}
+    assert len(rows) == 12
+
+
+def test_single_metric_persist_is_key_based():
+    session = MagicMock()
+    ga = _algorithms(session)
+    with patch.object(GraphAlgorithms, "_load_graph_data", return_value=_graph()), \
+         patch("app.postgres_block.get_graph_version", return_value=None), \
+         patch("app.postgres_block.replace_graph_node_metrics") as mirror:
+        results = ga.pagerank("p1", persist=True)
+
+    nodes = _written(session)
+    top = results[0]
+    assert nodes[("Codigo", top["nombre"])]["score_centralidad"] == pytest.approx(top["score"])
+    assert mirror.call_count == 1
+
+
+def test_gds_results_are_mirrored_only():
+    ga = _algorithms(MagicMock())
+    results = [{"nombre": "a", "etiquetas": ["Codigo"], "community_id": 3}]
+    with patch("app.postgres_block.replace_graph_node_metrics") as mirror, \
+         patch.object(GraphAlgorithms, "_write_graph_metrics") as write:
+        assert ga._mirrored("p1", "community_id", results, persist=True) is results
+
+    write.assert_not_called()
+    assert mirror.call_args.args[2] == [("Codigo", "a", "community_id", 3.0)]
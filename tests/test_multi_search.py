@@ -0,0 +1,43 @@
+"""Tests para multi_search (embeddings y búsquedas en lote)."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.queries import multi_search
+
+
+def _response(*ids):
+    return SimpleNamespace(
+        points=[SimpleNamespace(id=fid, score=0.9, payload={"archivo": "a.docx"}) for fid in ids]
+    )
+
+
+def test_multi_search_dedupes_texts_and_aligns_results():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock(), aoai=MagicMock())
+    settings = SimpleNamespace(
+        azure=SimpleNamespace(deployment_embed="emb"),
+        qdrant=SimpleNamespace(collection="fragmentos"),
+    )
+    # Primer lote: la tercera búsqueda (speaker) no trae nada y se reintenta sin speaker.
+    clients.qdrant.query_batch_points.side_effect = [
+        [_response("f1"), _response("f2"), _response()],
+        [_response("f3")],
+    ]
+    specs = [
+        ("agua", {"archivo": "a.docx"}, 3),
+        {"query": "luz", "top_k": 2},
+        ("agua", {"speaker": "interviewee"}, 5),
+        ("", None, 5),
+    ]
+
+    with patch("app.embeddings.embed_batch", return_value=[[0.1], [0.2]]) as embed:
+        results = multi_search(clients, settings, specs, project="p1")
+
+    assert embed.call_args.args[2] == ["agua", "luz"]
+    assert clients.qdrant.query_batch_points.call_count == 2
+    first_batch = clients.qdrant.query_batch_points.call_args_list[0].kwargs["requests"]
+    assert [r.limit for r in first_batch] == [3, 2, 5]
+    assert [[h["fragmento_id"] for h in hits] for hits in results] == [["f1"], ["f2"], ["f3"], []]
+    assert results[0][0]["archivo"] == "a.docx"
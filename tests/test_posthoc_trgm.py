@@ -0,0 +1,82 @@
+"""Tests para la detección post-hoc de duplicados con índice trigram."""
+
+from __future__ import annotations
+
+from app import postgres_block as pb
+
+
+def test_setup_trgm_adds_generated_column_and_gin(monkeypatch, fake_pg):
+    pg, cur = fake_pg()
+    cur.fetchone.return_value = None
+    monkeypatch.setattr(pb, "_candidate_codes_trgm_ready", None)
+    monkeypatch.setattr(pb, "ensure_candidate_codes_table", lambda _pg: None)
+    monkeypatch.setattr(pb, "ensure_unaccent", lambda _pg: True)
+
+    assert pb.setup_candidate_codes_trgm(pg) is True
+
+    sql = " ".join(str(call.args[0]) for call in cur.execute.call_args_list)
+    assert "CREATE FUNCTION code_norm" in sql and "IMMUTABLE" in sql
+    assert "GENERATED ALWAYS AS (code_norm(codigo)) STORED" in sql
+    assert "gin_trgm_ops" in sql
+    assert pb.ensure_candidate_codes_trgm(pg) is True
+
+
+def test_setup_trgm_reports_missing_extension(monkeypatch, fake_pg):
+    pg, cur = fake_pg()
+    cur.execute.side_effect = RuntimeError("permission denied")
+    monkeypatch.setattr(pb, "_candidate_codes_trgm_ready", None)
+    monkeypatch.setattr(pb, "ensure_candidate_codes_table", lambda _pg: None)
+
+    assert pb.setup_candidate_codes_trgm(pg) is False
+    pg.rollback.assert_called()
+
+
+def test_setup_trgm_rolls_back_when_a_later_step_fails(monkeypatch, fake_pg):
+    pg, cur = fake_pg()
+    cur.fetchone.return_value = None
+
+    def execute(sql, *args):
+        if "ALTER TABLE" in sql:
+            raise RuntimeError("lock timeout")
+
+    cur.execute.side_effect = execute
+    monkeypatch.setattr(pb, "_candidate_codes_trgm_ready", None)
+    monkeypatch.setattr(pb, "ensure_candidate_codes_table", lambda _pg: None)
+    monkeypatch.setattr(pb, "ensure_unaccent", lambda _pg: False)
+
+    assert pb.setup_candidate_codes_trgm(pg) is False
+    pg.rollback.assert_called_once()
+    assert pb._candidate_codes_trgm_ready is None
+
+
+def test_ensure_trgm_only_checks_catalog(monkeypatch, fake_pg):
+    pg, cur = fake_pg(fetchone=[(False,), (True,)])
+    monkeypatch.setattr(pb, "_candidate_codes_trgm_ready", None)
+
+    assert pb.ensure_candidate_codes_trgm(pg) is False
+    assert pb.ensure_candidate_codes_trgm(pg) is True
+    assert pb.ensure_candidate_codes_trgm(pg) is True
+
+    sqls = [str(call.args[0]) for call in cur.execute.call_args_list]
+    assert len(sqls) == 2
+    assert not any("CREATE" in sql or "ALTER" in sql for sql in sqls)
+
+
+def test_posthoc_uses_trigram_candidates_not_cross_join(fake_pg):
+    from backend.app import find_similar_codes_posthoc
+
+    pg, cur = fake_pg(fetchall=[
+        [("Confianza", 2, ["llm"], ["a.docx"])],
+        [("confianza", "confiansa", 1, 9, 0.889)],
+    ])
+
+    result = find_similar_codes_posthoc(pg, "p1", threshold=0.8)
+
+    sqls = [str(call.args[0]) for call in cur.execute.call_args_list]
+    similar_sql = sqls[-1]
+    assert "pg_trgm.similarity_threshold" in sqls[1]
+    assert "codigo_norm %% c1.norm" in similar_sql
+    assert "CROSS JOIN" not in similar_sql.upper()
+    assert similar_sql.count("levenshtein") == 1
+    assert [r["is_exact_duplicate"] for r in result] == [True, False]
+    assert result[1]["similarity"] == 0.889
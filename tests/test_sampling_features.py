@@ -0,0 +1,204 @@
+"""Tests para el ranking de muestreo teórico servido desde interview_sampling_features."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app import postgres_block as pb
+from app.coding import list_available_interviews_with_ranking_debug
+
+
+def _feature(archivo, *, area, fragmentos=10, has_report=False, fecha=None, nuevos=0, actualizado="2026-01-01T00:00:00Z"):
+    return {
+        "archivo": archivo,
+        "fragmentos": fragmentos,
+        "actor_principal": None,
+        "area_tematica": area,
+        "blob_url": None,
+        "actualizado": actualizado,
+        "has_report": has_report,
+        "fecha_analisis": fecha,
+        "codigos_nuevos": nuevos,
+        "codigos": 3 if has_report else 0,
+    }
+
+
+def test_theoretical_sampling_reads_features_once():
+    clients = SimpleNamespace(postgres=MagicMock())
+    features = [
+        _feature("a1.docx", area="salud", has_report=True, fecha=datetime(2026, 1, 2), nuevos=5),
+        _feature("a2.docx", area="salud"),
+        _feature("b1.docx", area="vivienda"),
+        _feature("solo_informe.docx", area=None, fragmentos=0, has_report=True, fecha=datetime(2026, 1, 3), nuevos=0),
+    ]
+
+    with patch("app.coding.load_interview_sampling_features", return_value=features) as load, \
+         patch("app.coding.list_interviews_summary") as summary:
+        ordered, debug = list_available_interviews_with_ranking_debug(
+            clients, "p1", order="theoretical-sampling", recent_window=2, saturation_new_codes_threshold=2
+        )
+
+    load.assert_called_once()
+    summary.assert_not_called()
+    clients.postgres.cursor.assert_not_called()
+    # Segmento sin entrevistas analizadas primero; analizada excluida.
+    assert [it["archivo"] for it in ordered] == ["b1.docx", "a2.docx"]
+    assert debug[0]["signals"]["new_codes_recent"] == 5
+    assert debug[0]["signals"]["saturated"] is False
+
+
+def test_theoretical_sampling_degrades_when_features_unavailable():
+    clients = SimpleNamespace(postgres=MagicMock())
+    interviews = [{"archivo": "a.docx", "fragmentos": 2, "actualizado": "2026-01-01T00:00:00Z"}]
+
+    with patch("app.coding.load_interview_sampling_features", side_effect=RuntimeError("sin tabla")), \
+         patch("app.coding.list_interviews_summary", return_value=interviews):
+        ordered, debug = list_available_interviews_with_ranking_debug(clients, "p1", order="theoretical-sampling")
+
+    assert [it["archivo"] for it in ordered] == ["a.docx"]
+    assert debug[0]["reason"] == "degraded_to_ingest_desc"
+
+
+def _fragment(fid, archivo, *, area="salud", speaker="interviewee", project="p1"):
+    return {
+        "project_id": project,
+        "id": fid,
+        "archivo": archivo,
+        "par_idx": 0,
+        "fragmento": f"texto {fid}",
+        "char_len": 10,
+        "speaker": speaker,
+        "area_tematica": area,
+    }
+
+
+def _code(fid, codigo, archivo, project="p1"):
+    return {"project_id": project, "fragmento_id": fid, "codigo": codigo, "archivo": archivo, "cita": "cita"}
+
+
+def _report(archivo, nuevos, project="p1"):
+    return {"project_id": project, "archivo": archivo, "report_json": json.dumps({"codigos_nuevos": nuevos})}
+
+
+_FEATURES_SQL = """
+SELECT archivo, fragmentos, area_tematica, has_report, codigos_nuevos, codigos, stale
+  FROM interview_sampling_features WHERE project_id = 'p1'
+"""
+
+_RECOMPUTE_SQL = """
+WITH f AS (
+    SELECT * FROM entrevista_fragmentos
+     WHERE project_id = 'p1' AND (speaker IS NULL OR speaker <> 'interviewer')
+), archivos AS (
+    SELECT archivo FROM f
+    UNION
+    SELECT archivo FROM interview_reports WHERE project_id = 'p1'
+)
+SELECT a.archivo,
+       (SELECT COUNT(*) FROM f WHERE f.archivo = a.archivo),
+       (SELECT MAX(area_tematica) FROM f WHERE f.archivo = a.archivo),
+       EXISTS (SELECT 1 FROM interview_reports r WHERE r.project_id = 'p1' AND r.archivo = a.archivo),
+       COALESCE((SELECT (report_json->>'codigos_nuevos')::int FROM interview_reports r
+                  WHERE r.project_id = 'p1' AND r.archivo = a.archivo), 0),
+       (SELECT COUNT(DISTINCT codigo) FROM analisis_codigos_abiertos c
+         WHERE c.project_id = 'p1' AND c.archivo = a.archivo),
+       FALSE
+  FROM archivos a
+"""
+
+
+def test_features_match_recompute_after_worker_refresh(pg_conn, pg_insert, pg_select):
+    pb.ensure_interview_sampling_features(pg_conn)
+    pg_insert("entrevista_fragmentos", [
+        _fragment("a1", "a.docx"),
+        _fragment("a2", "a.docx", speaker="interviewer"),
+        _fragment("b1", "b.docx", area="vivienda"),
+        _fragment("c1", "c.docx"),
+        _fragment("x1", "a.docx", project="p2"),
+    ])
+    pg_insert("analisis_codigos_abiertos", [
+        _code("a1", "confianza", "a.docx"),
+        _code("a1", "territorio", "a.docx"),
+        _code("b1", "confianza", "b.docx"),
+    ])
+    pg_insert("interview_reports", [_report("a.docx", 2), _report("solo_informe.docx", 1)])
+
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 4
+    assert pg_select(_FEATURES_SQL) == pg_select(_RECOMPUTE_SQL)
+
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM analisis_codigos_abiertos WHERE codigo = 'territorio'")
+        cur.execute("UPDATE entrevista_fragmentos SET archivo = 'd.docx' WHERE id = 'b1'")
+        cur.execute("DELETE FROM entrevista_fragmentos WHERE id = 'c1'")
+        cur.execute("""UPDATE interview_reports SET report_json = '{"codigos_nuevos": 5}' WHERE archivo = 'a.docx'""")
+    pg_conn.commit()
+
+    # La lectura no recalcula: sirve lo almacenado y deja las marcas al worker.
+    stored = {f["archivo"]: f for f in pb.load_interview_sampling_features(pg_conn, "p1")}
+    assert stored["a.docx"]["codigos_nuevos"] == 2
+    assert pb.has_stale_sampling_features(pg_conn, "p1") is True
+
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 4
+    assert pb.has_stale_sampling_features(pg_conn, "p1") is False
+    assert pg_select(_FEATURES_SQL) == pg_select(_RECOMPUTE_SQL)
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1", full=True) == 3
+    assert pg_select(_FEATURES_SQL) == pg_select(_RECOMPUTE_SQL)
+
+
+def test_refresh_skips_rows_claimed_by_another_worker(pg_dsn, pg_conn, pg_insert, pg_select):
+    import psycopg2
+
+    pb.ensure_interview_sampling_features(pg_conn)
+    pg_insert("entrevista_fragmentos", [_fragment("a1", "a.docx"), _fragment("b1", "b.docx")])
+
+    other = psycopg2.connect(pg_dsn)
+    try:
+        with other.cursor() as cur:
+            cur.execute(
+                "SELECT archivo FROM interview_sampling_features WHERE archivo = 'a.docx' FOR UPDATE"
+            )
+        assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 1
+        assert pg_select("SELECT archivo FROM interview_sampling_features WHERE stale") == [("a.docx",)]
+    finally:
+        other.rollback()
+        other.close()
+
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 1
+    assert pg_select(_FEATURES_SQL) == pg_select(_RECOMPUTE_SQL)
+
+
+def test_stale_triggers_are_per_statement_and_skip_unrelated_updates(pg_conn, pg_insert, pg_select):
+    # Trigger por fila de una versión anterior: ensure_interview_sampling_features lo reemplaza.
+    pb.ensure_fragment_table(pg_conn)
+    with pg_conn.cursor() as cur:
+        cur.execute("CREATE FUNCTION isf_touch() RETURNS TRIGGER AS $$ BEGIN RETURN NULL; END; $$ LANGUAGE plpgsql")
+        cur.execute(
+            "CREATE TRIGGER trg_isf_fragments AFTER INSERT ON entrevista_fragmentos "
+            "FOR EACH ROW EXECUTE FUNCTION isf_touch()"
+        )
+    pg_conn.commit()
+    pb.ensure_interview_sampling_features(pg_conn)
+    triggers = pg_select("SELECT tgname, (tgtype & 1) = 1 FROM pg_trigger WHERE tgname LIKE 'trg_isf_%'")
+    assert len(triggers) == 9
+    assert not any(per_row for _, per_row in triggers)
+
+    pg_insert("entrevista_fragmentos", [_fragment(f"a{i}", "a.docx") for i in range(3)] + [_fragment("b1", "b.docx")])
+    pg_insert("analisis_codigos_abiertos", [_code("a0", "confianza", "a.docx"), _code("b1", "confianza", "b.docx")])
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 2
+
+    with pg_conn.cursor() as cur:
+        # Columnas que no alimentan las features: no marcan nada.
+        cur.execute("UPDATE entrevista_fragmentos SET fragmento = 'otro texto', char_len = 20")
+        cur.execute("UPDATE analisis_codigos_abiertos SET cita = 'otra cita', memo = 'nota'")
+    pg_conn.commit()
+    assert pb.has_stale_sampling_features(pg_conn, "p1") is False
+
+    with pg_conn.cursor() as cur:
+        cur.execute("UPDATE analisis_codigos_abiertos SET codigo = 'arraigo' WHERE archivo = 'b.docx'")
+    pg_conn.commit()
+    assert pg_select("SELECT archivo FROM interview_sampling_features WHERE stale") == [("b.docx",)]
+    assert pb.refresh_interview_sampling_features(pg_conn, "p1") == 1
+    assert pg_select(_FEATURES_SQL) == pg_select(_RECOMPUTE_SQL)
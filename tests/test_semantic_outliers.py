@@ -0,0 +1,137 @@
+"""Tests para la detección batched de outliers semánticos."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.fragment_neighbors import coerce_embedding, exact_neighbors
+from app.validation import semantic_outliers
+
+
+def _row(fid, emb, archivo="a.docx", speaker="interviewee"):
+    return {"fragmento_id": fid, "archivo": archivo, "embedding": emb, "speaker": speaker}
+
+
+def test_coerce_embedding_parses_pgvector_text():
+    assert coerce_embedding("[1, 0.5,-2]") == [1.0, 0.5, -2.0]
+    assert coerce_embedding((1, 2)) == [1.0, 2.0]
+    assert coerce_embedding(None) is None
+    assert coerce_embedding("[]") is None
+
+
+def test_neighbors_exact_excludes_self_and_orders_by_score():
+    pool = [
+        _row("f1", [1.0, 0.0]),
+        _row("f2", [0.9, 0.1]),
+        _row("f3", [0.0, 1.0]),
+    ]
+    neighbors = exact_neighbors(pool, pool, neighbor_k=2, block_size=2)
+
+    assert [n["fragmento_id"] for n in neighbors[0]] == ["f2", "f3"]
+    assert [n["fragmento_id"] for n in neighbors[2]] == ["f2", "f1"]
+    assert neighbors[0][0]["score"] > 0.99
+
+
+def test_semantic_outliers_by_ids_uses_one_batch_call():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock())
+    settings = SimpleNamespace(qdrant=SimpleNamespace(collection="fragmentos"))
+    rows = [_row("f1", "[1,0]"), _row("f2", "[0,1]")]
+    clients.qdrant.query_batch_points.return_value = [
+        SimpleNamespace(points=[SimpleNamespace(id="f9", score=0.95, payload={"archivo": "b.docx"})]),
+        SimpleNamespace(points=[SimpleNamespace(id="f8", score=0.40, payload={})]),
+    ]
+
+    with patch("app.validation.fetch_fragments_by_ids", return_value=rows):
+        result = semantic_outliers(clients, settings, project="p1", fragment_ids=["f1", "f2"])
+
+    clients.qdrant.query_batch_points.assert_called_once()
+    assert len(clients.qdrant.query_batch_points.call_args.kwargs["requests"]) == 2
+    assert result["outliers"] == 1
+    assert [d["outlier"] for d in result["detalles"]] == [False, True]
+
+
+def test_semantic_outliers_full_project_skips_qdrant():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock())
+    settings = SimpleNamespace(qdrant=SimpleNamespace(collection="fragmentos"))
+    rows = [
+        _row("f1", [1.0, 0.0]),
+        _row("f2", [0.99, 0.05]),
+        _row("f3", [0.0, 1.0], archivo="b.docx"),
+    ]
+
+    with patch("app.validation.fetch_project_fragment_embeddings", return_value=rows), \
+         patch("app.validation.has_fragment_neighbors", return_value=False):
+        result = semantic_outliers(clients, settings, project="p1", full_project=True, threshold=0.5)
+
+    clients.qdrant.query_batch_points.assert_not_called()
+    assert result["modo"] == "exact"
+    assert result["total_fragmentos"] == 3
+    assert [d["fragmento_id"] for d in result["detalles"] if d["outlier"]] == ["f3"]
+
+
+def test_knn_table_list_emptied_by_speaker_filter_uses_exact_pass():
+    clients = SimpleNamespace(postgres=MagicMock(), qdrant=MagicMock())
+    settings = SimpleNamespace(qdrant=SimpleNamespace(collection="fragmentos"))
+    rows = [_row("f1", None), _row("f2", None)]
+    # f1 sólo tiene guardado a un vecino del entrevistador: tras el filtro queda vacía.
+    stored = {
+        "f1": [{"fragmento_id": "f3", "score": 0.1, "archivo": "a.docx", "speaker": "interviewer"}],
+        "f2": [{"fragmento_id": "f1", "score": 0.99, "archivo": "a.docx", "speaker": "interviewee"}],
+    }
+    exact = {"f1": [{"fragmento_id": "f2", "score": 0.99, "archivo": "a.docx"}]}
+
+    with patch("app.validation.fetch_project_fragment_embeddings", return_value=rows) as fetch_rows, \
+         patch("app.validation.has_fragment_neighbors", return_value=True), \
+         patch("app.validation.fetch_neighbor_lists", return_value=stored), \
+         patch("app.validation.fetch_exact_fragment_neighbors", return_value=exact) as fetch_exact:
+        result = semantic_outliers(
+            clients, settings, project="p1", full_project=True, threshold=0.5, neighbor_k=1
+        )
+
+    assert fetch_rows.call_args.kwargs["include_embedding"] is False
+    # Sólo el fragmento sin lista útil va a la pasada exacta.
+    assert fetch_exact.call_args.args[2] == ["f1"]
+    assert fetch_exact.call_args.kwargs == {"limit": 1, "speaker": "interviewee"}
+    assert result["modo"] == "knn_table"
+    by_id = {d["fragmento_id"]: d for d in result["detalles"]}
+    assert by_id["f1"]["outlier"] is False
+    assert by_id["f2"]["outlier"] is False
+
+
+def test_exact_neighbors_in_pg_match_numpy(pg_conn, pg_insert):
+    import random
+
+    from app import postgres_block as pb
+
+    rng = random.Random(3)
+    pb.ensure_fragment_table(pg_conn)
+    fragments = []
+    for i in range(12):
+        speaker = "interviewer" if i == 5 else ("interviewee" if i % 4 else None)
+        fragments.append({
+            "project_id": "p1",
+            "id": f"f{i:02d}",
+            "archivo": f"a{i % 3}.docx",
+            "par_idx": i,
+            "fragmento": f"texto {i}",
+            "embedding": str([rng.uniform(-1, 1) for _ in range(1536)]),
+            "speaker": speaker,
+        })
+    pg_insert("entrevista_fragmentos", fragments)
+
+    pool = [
+        {"fragmento_id": row["fragmento_id"], "archivo": row["archivo"], "embedding": coerce_embedding(row["embedding"])}
+        for row in pb.fetch_project_fragment_embeddings(pg_conn, project="p1")
+        if row["speaker"] == "interviewee"
+    ]
+    queries = [row for row in pool if row["fragmento_id"] in {"f01", "f02"}]
+    expected = exact_neighbors(queries, pool, neighbor_k=3)
+    got = pb.fetch_exact_fragment_neighbors(pg_conn, "p1", ["f01", "f02"], limit=3, speaker="interviewee")
+
+    for row, items in zip(queries, expected):
+        stored = got[row["fragmento_id"]]
+        assert [n["fragmento_id"] for n in stored] == [n["fragmento_id"] for n in items]
+        assert [n["score"] for n in stored] == pytest.approx([n["score"] for n in items], abs=1e-4)
@@ -0,0 +1,96 @@
+"""Tests para el registro compartido de tareas de runners/agente."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.task_registry import InMemoryTaskRegistry, RedisTaskRegistry, TaskRegistry, TaskState
+
+
+def test_task_state_writes_through_to_registry():
+    registry = InMemoryTaskRegistry()
+    registry.create("t1", {"status": "pending", "llm_calls": 0}, kind="coding_suggest_runner")
+
+    task = registry.state("t1")
+    task["status"] = "running"
+    task.setdefault("errors", []).append("fallo qdrant")
+    assert task.increment("llm_calls") == 1
+    task.update({"message": "paso 1", "result": {"ok": True}})
+    task.flush()
+
+    stored = registry.get("t1")
+    assert stored["status"] == "running"
+    assert stored["errors"] == ["fallo qdrant"]
+    assert stored["llm_calls"] == 1
+    assert stored["result"] == {"ok": True}
+    assert task["errors"] == ["fallo qdrant"]
+
+
+def test_increment_is_shared_between_states():
+    registry = InMemoryTaskRegistry()
+    registry.create("t1", {"memos_saved": 0}, kind="agent")
+
+    first, second = registry.state("t1"), registry.state("t1")
+    first.increment("memos_saved")
+    assert second.increment("memos_saved") == 2
+    assert list(registry.list(kind="agent")) == ["t1"]
+    assert registry.list(kind="coding_suggest_runner") == {}
+
+
+def test_redis_registry_encodes_fields_and_keeps_errors_apart():
+    registry = RedisTaskRegistry.__new__(RedisTaskRegistry)
+    registry._redis = MagicMock()
+    registry._redis.hgetall.return_value = {"status": '"running"', "llm_calls": "3"}
+    registry._redis.lrange.return_value = ["e1"]
+    registry._redis.hincrby.return_value = 4
+
+    assert registry.get("t1") == {"status": "running", "llm_calls": 3, "errors": ["e1"]}
+    assert TaskState(registry, "t1", registry.get("t1")).increment("llm_calls") == 4
+    registry._redis.hincrby.assert_called_once_with("runner_task:t1", "llm_calls", 1)
+
+
+def test_task_state_buffers_progress_until_checkpoint():
+    registry = MagicMock(wraps=InMemoryTaskRegistry())
+    registry.create("t1", {"status": "pending"}, kind="coding_suggest_runner")
+    task = TaskState(registry, "t1", registry.get("t1"), flush_interval=3600)
+
+    task["status"] = "running"
+    assert registry.update.call_count == 1
+    for step in range(50):
+        task["current_step"] = step
+        task["message"] = f"paso {step}"
+    assert registry.update.call_count == 1
+    assert registry.get("t1")["status"] == "running"
+    assert "current_step" not in registry.get("t1")
+
+    task["errors"].append("fallo qdrant")
+    task.flush()
+    assert registry.update.call_count == 2
+    stored = registry.get("t1")
+    assert stored["current_step"] == 49
+    assert stored["message"] == "paso 49"
+    assert stored["errors"] == ["fallo qdrant"]
+
+
+def test_task_registry_is_abstract():
+    with pytest.raises(TypeError):
+        TaskRegistry()  # type: ignore[abstract]
+
+
+def test_increment_after_buffered_assignment_on_resume():
+    registry = InMemoryTaskRegistry()
+    registry.create("t1", {"status": "pending", "memos_saved": 0, "llm_calls": 0}, kind="agent")
+    task = TaskState(registry, "t1", registry.get("t1"), flush_interval=3600)
+
+    # Resume: los contadores del checkpoint se asignan en buffer...
+    task.update({"memos_saved": 7, "llm_calls": 12})
+    # ...y los incrementos posteriores parten de ellos, no del valor almacenado.
+    assert task.increment("memos_saved") == 8
+    assert task.increment("llm_calls", 2) == 14
+    task.flush()
+
+    stored = registry.get("t1")
+    assert stored["memos_saved"] == 8
+    assert stored["llm_calls"] == 14